@@ -39,8 +39,12 @@
 '''
 import sys
 import re
+import time
+import bisect
+import contextlib
 import figureText
-from utilsLib import MatchRcd, TextMapping, TextMappingFromStrings, TextTransformer, spacedOutRegex
+import stageCache
+from utilsLib import MatchRcd, TextMapping, TextMappingFromStrings, TextTransformer, spacedOutRegex, squeezeLetterSpacing, figureWordsRe
 
 PARABOUNDARY = '\n\n'        # signifies paragraph boundaries in extracted text
 PARABOUNDARY_REGEX = r'\n\n' # regex chars for paragraph boundaries
@@ -69,6 +73,24 @@ class GXDrouter (object):
                 numChars=30,    # n chars on each side of cat1/2 match to report
                 ageContext=210, # n chars around age matches to keep & search
                 minTextLen=500, # if extracted text len is < this, route it
+                numFigTextWords=75, # n words around "figure/table" in
+                                #   paragraphs to keep as figure text
+                figTextConversion='legCloseWords', # figureText conversion
+                                #   type: 'legends', 'legParagraphs',
+                                #   'legCloseWords'
+                useFigTextSpans=False, # search figure text as spans of the
+                                #   full text (see _setFigText())
+                unifiedTermScan=False, # search cat1 and cat2 terms in
+                                #   one shared copy of the text, figure
+                                #   text as spans (see routeThisRef())
+                squeezeLetterSpacing=False, # squeeze the letter spaced
+                                #   words of the text first (see
+                                #   routeThisRef())
+                asciiText=False,# the text is ASCII only (e.g., from
+                                #   sdGetTestSet.py), so the age regex's can
+                                #   use re.ASCII (see _buildMouseAgeDetection())
+                timeBudget=None,# max seconds to spend routing one ref.
+                                #   None = no limit. See routeThisRef()
                 ):
         self.numChars = numChars
         self.skipJournals = {j for j in skipJournals} # set of journal names
@@ -79,15 +101,25 @@ class GXDrouter (object):
         self.cat2Terms    = cat2Terms
         self.cat2Exclude  = cat2Exclude
         self.minTextLen   = minTextLen
+        self.timeBudget   = timeBudget
+        self.timedOut     = False
+        self.stageTracker = None        # see setStageTracker()
+        self.stageCache   = None        # see setStageCache()
 
-        # figure text extraction: keep figure legends and words around 
-        #  "figure/table" in other paragraphs.
+        # figure text extraction: by default keep figure legends and words
+        #  around "figure/table" in other paragraphs.
         # figure legends are paragraphs that start with "fig", "figure", "table"
-        self.numFigTextWords = 75       # n words around "figure/table" in
-                                        #   paragraphs to keep as figure text
+        self.numFigTextWords   = numFigTextWords
+        self.figTextConversion = figTextConversion
+        self.unifiedTermScan   = unifiedTermScan
+        self.useFigTextSpans   = useFigTextSpans or unifiedTermScan
+        self.squeezeLetterSpacing = squeezeLetterSpacing
+        self.asciiText    = asciiText
+        self.textOffsetMap = None       # see routeThisRef()
         self.figTextConverter = figureText.Text2FigConverter( \
-                                            conversionType='legCloseWords',
-                                            numWords=self.numFigTextWords)
+                                            conversionType=figTextConversion,
+                                            numWords=self.numFigTextWords,
+                                            squeezedText=squeezeLetterSpacing)
         self._buildCat1Detection()
         self._buildCat2Detection()
         self._buildMouseAgeDetection()
@@ -103,7 +135,16 @@ class GXDrouter (object):
 
     def _gotCat1(self, text):
         """ Return True if text contains a cat1 term not in an exclude context.
+            text can be a figureText.FigTextView
         """
+        if isinstance(text, figureText.FigTextView):
+            matched = []        # spans of the matches so far
+            self.cat1Excludes = findMatchesInSpans(text, self.cat1ExcludeDict,
+                                        'excludeCat1', self.numChars, matched)
+            self.cat1Matches = findMatchesInSpans(text, self.cat1TermsDict,
+                                        'cat1', self.numChars, matched)
+            return len(self.cat1Matches)
+
         newText, self.cat1Excludes = findMatches(text,
                             self.cat1ExcludeDict, 'excludeCat1', self.numChars)
         newText, self.cat1Matches = findMatches(newText,
@@ -120,7 +161,16 @@ class GXDrouter (object):
 
     def _gotCat2(self, text):
         """ Return True if text contains a cat2 term not in an exclude context.
+            text can be a figureText.FigTextView
         """
+        if isinstance(text, figureText.FigTextView):
+            matched = []        # spans of the matches so far
+            self.cat2Excludes = findMatchesInSpans(text, self.cat2ExcludeDict,
+                                        'excludeCat2', self.numChars, matched)
+            self.cat2Matches = findMatchesInSpans(text, self.cat2TermsDict,
+                                        'cat2', self.numChars, matched)
+            return len(self.cat2Matches)
+
         newText, self.cat2Excludes = findMatches(text,
                             self.cat2ExcludeDict, 'excludeCat2', self.numChars)
         newText, self.cat2Matches = findMatches(newText,
@@ -128,8 +178,18 @@ class GXDrouter (object):
         return len(self.cat2Matches)
 
     def _buildMouseAgeDetection(self):
+        # if self.asciiText, the age regex's are compiled w/ re.ASCII:
+        #   \b \w \s \d and case folding are then table lookups instead of
+        #   unicode checks, ~20% faster on the figure text.
+        #   On ASCII text they match the same, except \s no longer
+        #   matches the \x1c-\x1f control chars.
+        reFlags = re.IGNORECASE
+        if self.asciiText: reFlags |= re.ASCII
+
         # ageTextTransformer matches age regex's against text
-        self.ageTextTransformer = AgeTextTransformer(context=self.ageContext)
+        self.ageTextTransformer = AgeTextTransformer(context=self.ageContext,
+                                    squeezedText=self.squeezeLetterSpacing,
+                                    asciiText=self.asciiText)
 
         # ageExcludeTextTransformer matches age Exclude terms in the text
         #   around age matches.
@@ -137,7 +197,7 @@ class GXDrouter (object):
                 'excludeAge', self.ageExclude, lambda x: x.upper(), context=0)
 
         self.ageExcludeTextTransformer = TextTransformer( \
-                                                [self.ageExcludeTextMapping])
+                            [self.ageExcludeTextMapping], reFlags=reFlags)
             # re to detect strings that would prohibit an age exclude term
             # from causing the exclusion if they occur between
             # the exclude term and the matching age text:
@@ -148,12 +208,20 @@ class GXDrouter (object):
             #         \Wfig = any nonalphnumeric + 'fig'
             #         or 't al'
         regex = PARABOUNDARY_REGEX + r'|[;]\s|(?<!\Wfig|t al)[.]\s'
-        self.ageExcludeBlockRE = re.compile(regex)  # ; or . or para
+        self.ageExcludeBlockRE = re.compile(regex,  # ; or . or para
+                                        re.ASCII if self.asciiText else 0)
 
     def _gotMouseAge(self, text):
         """ Return True if we find mouse age terms in text
+            text can be a figureText.FigTextView
         """
-        newText = self.ageTextTransformer.transformText(text)
+        if isinstance(text, figureText.FigTextView):
+            # the age regex's have literal spaces (e.g., 'fig e1' in 'fix2'),
+            #  so search w/ '\n' replaced like the blurbs in the string
+            self.ageTextTransformer.findSpanMatches(text.getFindText(),
+                                                                text.spans)
+        else:
+            newText = self.ageTextTransformer.transformText(text)
 
         # get ageMatches and throw away "fix" matches
         ageMatches = [ m for m in self.ageTextTransformer.getMatches()
@@ -176,8 +244,12 @@ class GXDrouter (object):
                 Modify m.matchText, m.preText, or m.postText to highlight the
                     exclude term that indicates it is not a good match,
                 Set m.matchType to 'excludeAge'
+                Set m.excludeText to the (1st) exclude text found
+                    (and m.ageMapping to the name of the age mapping)
         """
         goodAgeMatch = True     # assume no exclusion terms detected
+        m.ageMapping = m.matchType
+        m.excludeText = None
 
         # Search m.matchText for age exclusion terms
         newText = self.ageExcludeTextTransformer.transformText(m.matchText)
@@ -187,6 +259,7 @@ class GXDrouter (object):
             newMText = m.matchText[:em.start] + em.replText + \
                                                         m.matchText[em.end:]
             m.matchText = newMText
+            m.excludeText = em.matchText
             goodAgeMatch = False
             break
         self.ageExcludeTextTransformer.resetMatches()
@@ -201,6 +274,7 @@ class GXDrouter (object):
                 newPText = m.preText[:em.start] + em.replText + \
                                                             m.preText[em.end:]
                 m.preText = newPText
+                if m.excludeText is None: m.excludeText = em.matchText
                 goodAgeMatch = False
                 break
         self.ageExcludeTextTransformer.resetMatches()
@@ -215,6 +289,7 @@ class GXDrouter (object):
                 newPText = m.postText[:em.start] + em.replText + \
                                                             m.postText[em.end:]
                 m.postText = newPText
+                if m.excludeText is None: m.excludeText = em.matchText
                 goodAgeMatch = False
                 break
         self.ageExcludeTextTransformer.resetMatches()
@@ -239,7 +314,45 @@ class GXDrouter (object):
             Checks journal.
             Searches the full text for cat1 terms.
             Searches figure text for mouse_age and cat2 terms.
+
+            If self.timeBudget is set, the elapsed time is checked before
+            each step after the 1st. Once the budget is used up, the
+            remaining steps are skipped, getTimedOut() returns True, and the
+            ref is routed "Yes" so curators look at it (like refs whose text
+            is too short). A ref that goes over the budget in its last step
+            keeps its routing, since all the steps were done.
+            Note a single regex pass cannot be interrupted, so a pathological
+            pass can still overrun the budget. regexScaling.py is the guard
+            for that.
+
+            If a stage cache is set (see setStageCache()), the results of
+            each step are taken from it when they are there, and the figure
+            text is only computed if the age or cat2 step needs it.
+
+            If self.squeezeLetterSpacing, the letter spaced figure words of
+            the text ("F I G U R E", "T A B L E", "s u p p l e m e n t a l")
+            are squeezed first (utilsLib.squeezeLetterSpacing) and all the
+            steps search the squeezed text, so the legend and 'fix1' age
+            regex's are plain words instead of spacedOutRegex()'s.
+            MatchRcd offsets are then in the squeezed text (getTextOffsetMap()
+            maps them back to text). minTextLen is still checked on text.
+            The routings can differ from w/o squeezing:
+              a letter spaced "F I G U R E" in a paragraph that is not a
+                legend becomes a figure reference, so the words around it
+                are figure text (w/o squeezing only legends can start w/ it)
+              a letter spaced word glued to the single letters next to it
+                is not squeezed ("a f i g u r e" -> "afigure" is not a
+                figure word), so it is not a legend start or a 'fix1'
+
+            If self.unifiedTermScan, the cat1 and cat2 steps share one copy
+            of the text w/ '\n' replaced by ' ' (figureText.FigTextView):
+            cat1 terms are searched in all of it, cat2 terms only in the
+            figure text spans (see findMatchesInSpans() for terms at span
+            boundaries). Matched terms are skipped by offset instead of
+            replaced in a new copy of the text for each term.
         """
+        self.startTime = time.time()
+        self.timedOut = False
         self.cat1Matches = []
         self.cat1Excludes = []
         self.ageMatches = []
@@ -260,11 +373,50 @@ class GXDrouter (object):
             self.goodJournal = 1
 
         textLen = len(text)
-        gotCat1 = self._gotCat1(text)
-
-        figText = PARABOUNDARY.join(self.figTextConverter.text2FigText(text))
-        gotMouseAge = self._gotMouseAge(figText)
-        gotCat2     = self._gotCat2(figText)
+        docKey = None
+        if self.stageCache is not None: docKey = stageCache.getDocKey(text)
+
+        self.textOffsetMap = None
+        if self.squeezeLetterSpacing:
+            with self._stage('squeeze'):
+                text, self.textOffsetMap = squeezeLetterSpacing(text)
+
+        findText = None
+        cat1Text = text
+        if self.unifiedTermScan:
+            cat1Text = figureText.FigTextView(text, [(0, len(text))])
+            findText = cat1Text.getFindText()
+
+        with self._stage('cat1'):
+            self._runStage('cat1', docKey, lambda: self._gotCat1(cat1Text),
+                                            ['cat1Excludes', 'cat1Matches'])
+            gotCat1 = len(self.cat1Matches)
+        if self._isOverBudget(): return 'Yes'
+
+        with self._stage('figText'):
+            self.figText = None
+            self.figTextSpans = None
+            if self._needsFigText(docKey):
+                self._runStage('figText', docKey,
+                                lambda: self._setFigText(text),
+                                ['figTextSpans' if self.useFigTextSpans
+                                                            else 'figText'])
+            if self.figTextSpans is not None:
+                self.figText = figureText.FigTextView(text,
+                                        self.figTextSpans, findText=findText)
+        if self._isOverBudget(): return 'Yes'
+
+        with self._stage('age'):
+            self._runStage('age', docKey,
+                                lambda: self._gotMouseAge(self.figText),
+                                            ['ageMatches', 'ageExcludes'])
+            gotMouseAge = len(self.ageMatches)
+        if self._isOverBudget(): return 'Yes'
+
+        with self._stage('cat2'):
+            self._runStage('cat2', docKey, lambda: self._gotCat2(self.figText),
+                                            ['cat2Excludes', 'cat2Matches'])
+            gotCat2     = len(self.cat2Matches)
 
         if (gotCat1 and gotMouseAge and gotCat2 and self.goodJournal) \
             or textLen < self.minTextLen:
@@ -272,6 +424,105 @@ class GXDrouter (object):
         else:
             return 'No'
 
+    def _setFigText(self, text):
+        """ Set the figure text: a string of the figure text blurbs joined by
+            PARABOUNDARY,
+            or if self.useFigTextSpans, the (start, end) spans of text that
+            are figure text (figureText.Text2FigConverter.text2FigSpans()).
+            The age and cat2 steps then search text[start:end] for each
+            span (via figureText.FigTextView) instead of a copy, and their
+            MatchRcds have offsets in the full text. Their context chars are
+            within the span.
+            Like the cat1/cat2 terms, the age regex's are searched in the
+            text w/ '\n' replaced by ' ' (FigTextView.getFindText()), so
+            their MatchRcd text has ' ' for line breaks too.
+            The words in the spans are the same as in the blurbs, but w/ the
+            original spacing between them, so a few matches can differ
+            (e.g., a term w/ one space where the text has two).
+        """
+        if self.useFigTextSpans:
+            self.figTextSpans = self.figTextConverter.text2FigSpans(text)
+        else:
+            self.figText = PARABOUNDARY.join( \
+                                    self.figTextConverter.text2FigText(text))
+
+    def _needsFigText(self, docKey):
+        """ Return True if the age or cat2 step has to search the figure text
+        """
+        if self.stageCache is None: return True
+        return not (self.stageCache.has('age', docKey) and
+                                        self.stageCache.has('cat2', docKey))
+
+    def _runStage(self, stageName, docKey, compute, attrNames):
+        """ Do a routing step: compute() sets the attributes in attrNames.
+            If there is a stage cache, set them from the cached results of
+            the step instead, or add the computed values to the cache.
+        """
+        if self.stageCache is None:
+            compute()
+            return
+        values = self.stageCache.get(stageName, docKey)
+        if values is None:
+            compute()
+            self.stageCache.put(stageName, docKey,
+                                    [getattr(self, a) for a in attrNames])
+        else:
+            for name, value in zip(attrNames, values):
+                setattr(self, name, value)
+
+    def getStageParams(self):
+        """ Return {stage name: params}: everything besides the document
+            text that the result of each routing step depends on.
+            Used as stage cache fingerprints.
+        """
+        figText = (self.figTextConversion, self.numFigTextWords)
+        if self.useFigTextSpans: figText += ('spans',)
+        squeezed = ()
+        if self.squeezeLetterSpacing:
+            squeezed = ('squeezed', figureWordsRe.pattern)
+        figText += squeezed
+        return {
+            'cat1'   : (list(self.cat1ExcludeDict.items()),
+                        list(self.cat1TermsDict.items()), self.numChars,
+                        squeezed, self.unifiedTermScan),
+            'figText': figText,
+            'age'    : (figText, self.ageContext, self.ageExclude,
+                        self.ageTextTransformer.getBigRegex(),
+                        self.ageExcludeTextTransformer.getBigRegex(),
+                        self.ageExcludeBlockRE.pattern, self.asciiText),
+            'cat2'   : (figText, list(self.cat2ExcludeDict.items()),
+                        list(self.cat2TermsDict.items()), self.numChars),
+            }
+
+    def setStageCache(self, cache):
+        """ Set a stageCache.StageCache (or None) to get the results of
+            the routing steps from (and add new results to).
+            Sets the cache's stage fingerprints for this router's vocabs.
+        """
+        self.stageCache = cache
+        if cache is not None: cache.setStageParams(self.getStageParams())
+
+    def setStageTracker(self, tracker):
+        """ Set a profileLib.StageTracker (or None) to attribute the time
+            and memory of each routing step (cat1, figText, age, cat2) to.
+        """
+        self.stageTracker = tracker
+
+    def _stage(self, stageName):
+        """ Return a context manager for a routing step
+        """
+        if self.stageTracker is None: return contextlib.nullcontext()
+        return self.stageTracker.stage(stageName)
+
+    def _isOverBudget(self):
+        """ Return True (and set self.timedOut) if routing the current ref
+            has taken longer than self.timeBudget seconds.
+        """
+        if self.timeBudget is not None and \
+                            time.time() - self.startTime > self.timeBudget:
+            self.timedOut = True
+        return self.timedOut
+
     def getExplanation(self):
         """ Return text that summarizes this routing algorithm and vocabs
         """
@@ -288,6 +539,15 @@ class GXDrouter (object):
         for t in sorted(self.cat1ExcludeDict.keys()):
             output += "\t'%s'\n" % t
 
+        if self.figTextConversion != 'legCloseWords':
+            output += 'Figure text conversion: %s\n' % self.figTextConversion
+        if self.useFigTextSpans:
+            output += 'Figure text searched as spans of the full text\n'
+        if self.unifiedTermScan:
+            output += 'Category1 and Category2 terms searched in one ' \
+                                                    'shared copy of the text\n'
+        if self.squeezeLetterSpacing:
+            output += 'Letter spaced words squeezed before searching\n'
         output += 'Number of figure text words: %d\n' % self.numFigTextWords
 
         output += 'Category2 terms in figure text (%d terms):\n' % \
@@ -300,7 +560,9 @@ class GXDrouter (object):
         for t in sorted(self.cat2ExcludeDict.keys()):
             output += "\t'%s'\n" % t
 
-        output += 'Mouse age regular expression - searched in figure text:\n'
+        output += 'Mouse age regular expression - searched in figure text'
+        if self.asciiText: output += ' (ASCII mode)'
+        output += ':\n'
         output += self.ageTextTransformer.getBigRegex() + '\n'
 
         output += 'Num chars around age matches to look for age excludes: %d\n'\
@@ -317,6 +579,10 @@ class GXDrouter (object):
         output += 'Mouse age exclude blocking logic for ". ":\n'
         output += '". " not following "fig" nor "et al"\n'
 
+        if self.timeBudget is not None:
+            output += 'Route refs that take > %.1f seconds to route\n' % \
+                                                    self.timeBudget
+
         output += 'Route=No for these journals (%d journals):\n' % \
                                                     len(self.skipJournals)
         for t in sorted(self.skipJournals):
@@ -326,6 +592,8 @@ class GXDrouter (object):
         return output
 
     def getGoodJournal(self):  return self.goodJournal
+    def getTimedOut(self):     return self.timedOut
+    def getTextOffsetMap(self): return self.textOffsetMap
     def getCat1Matches(self):  return self.cat1Matches
     def getCat1Excludes(self): return self.cat1Excludes
     def getAgeMatches(self):   return self.ageMatches
@@ -359,23 +627,35 @@ class AgeTextTransformer (TextTransformer):
       matches   = ageTransformer.getMatches() # to get MatchRcds for matches
       reportStr = ageTransformer.getReport()  # to get formatted match report
     """
-    def __init__(self, context=210, fixContext=10):
+    def __init__(self, context=210, fixContext=10,
+                squeezedText=False,     # True if the text's letter spaced
+                                        #   words are squeezed, see
+                                        #   utilsLib.squeezeLetterSpacing()
+                asciiText=False,        # True if the text is ASCII only:
+                                        #   compile the regex w/ re.ASCII
+                ):
         self.context    = context       # n chars around age matches to keep
         self.fixContext = fixContext    # n chars around "fixes" to keep
                                         #   see "fix" age mappings below.
-        ageMappings     = getAgeMappings(context=context, fixContext=fixContext)
+        ageMappings     = getAgeMappings(context=context,
+                                fixContext=fixContext, squeezedText=squeezedText)
 
-        super().__init__(ageMappings, reFlags=re.IGNORECASE)
+        reFlags = re.IGNORECASE
+        if asciiText: reFlags |= re.ASCII
+        super().__init__(ageMappings, reFlags=reFlags)
 
     def getContext(self):    return self.context
     def getFixContext(self): return self.fixContext
 #-----------------------------------
 
-def getAgeMappings(context=210, fixContext=10):
+def getAgeMappings(context=210, fixContext=10, squeezedText=False):
     """ Return list of age TextMapping objects with the specified number of
         characters for context to keep for each match.
         fixContext is the num of characters to keep for mappings that just
             fix weird text problems
+        squeezedText: True if the letter spaced words of the text to match
+            are squeezed (utilsLib.squeezeLetterSpacing()), so 'fix1' can
+            match plain words
 
         These age mappings are a little different from the age mappings
         defined for the autolittriage relevanceClassifier and gxdhtclassifier
@@ -399,6 +679,7 @@ def getAgeMappings(context=210, fixContext=10):
         context=fixContext),
     TextMapping('fix1',       # correct 'F I G U R E n' so it doesn't
                               # look like embryonic day "E n". "T A B L E" too
+        r'\b(?:figure|table)\b' if squeezedText else
         r'\b(?:' +
             spacedOutRegex('figure') +
             r'|' + spacedOutRegex('table') +
@@ -630,3 +911,49 @@ def findMatches(text, termDict, matchType, ctxLen):
 
     return resultText, matchRcds
 # end findMatches() -----------------------------------
+
+def findMatchesInSpans(figText, termDict, matchType, ctxLen, matched):
+    """ find all matches for terms in the termDict in the spans of a
+            figureText.FigTextView, like findMatches() does in the figure
+            text string, but w/o copying the text for each term.
+        Return the list of MatchRcds for the matches. Their start/end are
+            offsets in the full text, their context is within the span.
+        matched: the sorted, non overlapping [(start, end)] of the matches
+            so far (updated). Text that matched earlier terms (or an earlier
+            findMatchesInSpans() call) can't match again, as findMatches()
+            replaces it.
+        Each term is searched w/ one str.find() pass over all the spans
+            (figText.getPackedFindText()).
+        A match has to be within one span: the spans are searched joined by
+            figureText.SPAN_SEPARATOR, so a term that starts at the end of
+            one span can't match w/ words at the start of the next one
+            (like the blurbs joined by PARABOUNDARY in the figure text
+            string), and text between the spans is never searched.
+    """
+    text = figText.text
+    spans = figText.spans
+    packedText, packedStarts = figText.getPackedFindText()
+
+    matchRcds = []
+    for term, replacement in termDict.items():
+        termLen = len(term)
+        packedStart = packedText.find(term)
+        while packedStart != -1:
+            spanIndex = bisect.bisect_right(packedStarts, packedStart) - 1
+            spanStart, spanEnd = spans[spanIndex]
+            matchStart = spanStart + packedStart - packedStarts[spanIndex]
+            matchEnd = matchStart + termLen
+            i = bisect.bisect_left(matched, (matchEnd,))
+            if i > 0 and matched[i-1][1] > matchStart:  # overlaps a match
+                packedStart = packedText.find(term, packedStart+1)
+                continue
+            matched.insert(i, (matchStart, matchEnd))
+
+            pre  = text[max(spanStart, matchStart-ctxLen) : matchStart]
+            post = text[matchEnd : min(spanEnd, matchEnd+ctxLen)]
+            matchRcds.append(MatchRcd(matchType, matchStart, matchEnd,
+                            text[matchStart:matchEnd], pre, post, replacement))
+
+            packedStart = packedText.find(term, packedStart+termLen)
+    return matchRcds
+# end findMatchesInSpans() -----------------------------------
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Benchmark harness for the router hot paths.
+           Times these benchmarks over documents grouped into size buckets:
+            findMatches      - cat2 term search (GXD2aryRouter.findMatches)
+            transformText    - age exclude TextTransformer.transformText()
+            ageTransformer   - AgeTextTransformer.transformText()
+            figText_legends       - Text2FigConverter.text2FigText() for
+            figText_legParagraphs     each of the three conversion types
+            figText_legCloseWords
+            routeThisRef     - end to end GXDrouter.routeThisRef()
+           For each benchmark & bucket, reports throughput, latency
+            percentiles and peak memory (tracemalloc) as a JSON-able dict.
+           Also compares two sets of results and flags regressions.
+
+  To Use:
+    import benchmarkLib
+    docs = [benchmarkLib.BenchDoc(ID, text, journal), ...]
+    results = benchmarkLib.runBenchmarks(docs, router, buckets=[0, 10000])
+    json.dump(results, fp)
+    ...
+    regressions = benchmarkLib.compareResults(oldResults, newResults, 10.0)
+
+  To Run Automated Unit Tests:  python test_benchmarkLib.py [-v]
+'''
+import time
+import platform
+import tracemalloc
+import figureText
+from GXD2aryRouter import findMatches
+#-----------------------------------
+
+DEFAULT_BUCKETS = [0, 10000, 50000, 200000]  # lower bounds of size buckets
+PERCENTILES = [50, 90, 99]
+
+#-----------------------------------
+
+class BenchDoc (object):
+    """ A document to run the benchmarks on
+    """
+    def __init__(self, ID, text, journal=''):
+        self.ID      = ID
+        self.text    = text
+        self.journal = journal
+#-----------------------------------
+
+def getBenchmarks(router):
+    """ Return list of (name, function) for the benchmarks.
+        Each function takes a BenchDoc and does one unit of work on it.
+        router is the GXDrouter whose vocabs and transformers are used.
+    """
+    figConverters = {}
+    for convType in ['legends', 'legParagraphs', 'legCloseWords']:
+        figConverters[convType] = figureText.Text2FigConverter( \
+                        conversionType=convType, numWords=router.numFigTextWords)
+
+    def benchFindMatches(doc):
+        findMatches(doc.text, router.cat2TermsDict, 'cat2', router.numChars)
+
+    def benchTransformText(doc):
+        tt = router.ageExcludeTextTransformer
+        tt.transformText(doc.text)
+        tt.resetMatches()
+
+    def benchAgeTransformer(doc):
+        tt = router.ageTextTransformer
+        tt.transformText(doc.text)
+        tt.resetMatches()
+
+    def benchFigText(convType):
+        converter = figConverters[convType]
+        def bench(doc):
+            converter.text2FigText(doc.text)
+        return bench
+
+    def benchRouteThisRef(doc):
+        router.routeThisRef(doc.text, doc.journal)
+
+    return [('findMatches',             benchFindMatches),
+            ('transformText',           benchTransformText),
+            ('ageTransformer',          benchAgeTransformer),
+            ('figText_legends',         benchFigText('legends')),
+            ('figText_legParagraphs',   benchFigText('legParagraphs')),
+            ('figText_legCloseWords',   benchFigText('legCloseWords')),
+            ('routeThisRef',            benchRouteThisRef),
+            ]
+#-----------------------------------
+
+def bucketDocs(docs, buckets=DEFAULT_BUCKETS):
+    """ Group docs by text length.
+        buckets is a sorted list of bucket lower bounds.
+        Return list of (bucketName, [docs]) for the non-empty buckets,
+            in bucket order. bucketName is like '10000-50000' or '200000+'
+    """
+    bounds = sorted(buckets)
+    grouped = [[] for b in bounds]
+    for doc in docs:
+        textLen = len(doc.text)
+        idx = None
+        for i, lower in enumerate(bounds):
+            if textLen >= lower: idx = i
+        if idx is not None:
+            grouped[idx].append(doc)
+
+    result = []
+    for i, lower in enumerate(bounds):
+        if not grouped[i]: continue
+        if i+1 < len(bounds): name = '%d-%d' % (lower, bounds[i+1])
+        else:                 name = '%d+' % lower
+        result.append((name, grouped[i]))
+    return result
+#-----------------------------------
+
+def percentile(values, pct):
+    """ Return the pct percentile of values (nearest rank method)
+    """
+    if not values: return 0.0
+    ordered = sorted(values)
+    rank = int(round(pct / 100.0 * len(ordered) + 0.5)) - 1
+    rank = min(max(rank, 0), len(ordered)-1)
+    return ordered[rank]
+#-----------------------------------
+
+def timeBenchmark(benchFunc, docs, repeat=1):
+    """ Run benchFunc on each doc.
+        Return list of latencies (seconds), one per doc: the best of repeat
+            runs.
+    """
+    latencies = []
+    for doc in docs:
+        best = None
+        for i in range(repeat):
+            start = time.perf_counter()
+            benchFunc(doc)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        latencies.append(best)
+    return latencies
+#-----------------------------------
+
+def peakMemory(benchFunc, docs):
+    """ Run benchFunc on each doc with tracemalloc tracing.
+        Return the max over the docs of the peak bytes allocated while
+            processing one doc.
+        (done separately from timing since tracing slows things down)
+    """
+    wasTracing = tracemalloc.is_tracing()
+    if not wasTracing: tracemalloc.start()
+    maxPeak = 0
+    for doc in docs:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        benchFunc(doc)
+        peak = tracemalloc.get_traced_memory()[1] - base
+        maxPeak = max(maxPeak, peak)
+    if not wasTracing: tracemalloc.stop()
+    return maxPeak
+#-----------------------------------
+
+def runBenchmarks(docs, router,
+                    buckets=DEFAULT_BUCKETS,
+                    repeat=1,           # times to run each doc, keep the best
+                    measureMemory=True, # do the (slow) tracemalloc pass
+                    benchNames=None,    # [benchmark names to run] or None=all
+                    progress=None,      # function to call w/ progress msgs
+                    ):
+    """ Run the benchmarks over the docs grouped into size buckets.
+        Return dict {'meta': {...}, 'results': [ {...}, ...] }
+        with one result dict per (benchmark, bucket).
+    """
+    results = []
+    bucketed = bucketDocs(docs, buckets)
+    for benchName, benchFunc in getBenchmarks(router):
+        if benchNames and benchName not in benchNames: continue
+
+        for bucketName, bucketDocList in bucketed:
+            if progress: progress('%s %s: %d docs\n' % (benchName, bucketName,
+                                                        len(bucketDocList)))
+            latencies = timeBenchmark(benchFunc, bucketDocList, repeat=repeat)
+            seconds = sum(latencies)
+            totalChars = sum([len(d.text) for d in bucketDocList])
+
+            result = {
+                'benchmark'  : benchName,
+                'bucket'     : bucketName,
+                'numDocs'    : len(bucketDocList),
+                'totalChars' : totalChars,
+                'seconds'    : seconds,
+                'docsPerSec' : len(bucketDocList) / seconds if seconds else 0.0,
+                'charsPerSec': totalChars / seconds if seconds else 0.0,
+                'latencyMs'  : {},
+                'peakMemBytes': None,
+                }
+            for pct in PERCENTILES:
+                result['latencyMs']['p%d' % pct] = \
+                                            percentile(latencies, pct) * 1000
+            result['latencyMs']['max'] = max(latencies) * 1000
+
+            if measureMemory:
+                result['peakMemBytes'] = peakMemory(benchFunc, bucketDocList)
+            results.append(result)
+
+    meta = {
+        'time'     : time.strftime("%Y/%m/%d-%H:%M:%S"),
+        'python'   : platform.python_version(),
+        'platform' : platform.platform(),
+        'numDocs'  : len(docs),
+        'buckets'  : sorted(buckets),
+        'repeat'   : repeat,
+        }
+    return {'meta': meta, 'results': results}
+#-----------------------------------
+
+class Regression (object):
+    """ A metric of one (benchmark, bucket) that got worse
+    """
+    def __init__(self, benchmark, bucket, metric, oldValue, newValue, pctChange):
+        self.benchmark = benchmark
+        self.bucket    = bucket
+        self.metric    = metric
+        self.oldValue  = oldValue
+        self.newValue  = newValue
+        self.pctChange = pctChange  # % worse (always positive)
+#-----------------------------------
+
+# metrics compared between runs: (name, function to get it, bigger is better)
+COMPARED_METRICS = [
+    ('charsPerSec',  lambda r: r['charsPerSec'],       True),
+    ('latency p50',  lambda r: r['latencyMs']['p50'],  False),
+    ('latency p90',  lambda r: r['latencyMs']['p90'],  False),
+    ('peakMemBytes', lambda r: r['peakMemBytes'],      False),
+    ]
+
+def compareResults(oldResults, newResults, threshold=10.0):
+    """ Compare two results dicts from runBenchmarks().
+        Return (comparisons, regressions)
+        comparisons: list of (benchmark, bucket, metric, old, new, pctChange)
+            for every metric in both, pctChange > 0 means new is worse.
+        regressions: list of Regressions that are more than threshold % worse
+    """
+    oldByKey = {(r['benchmark'], r['bucket']) : r
+                                            for r in oldResults['results']}
+    comparisons = []
+    regressions = []
+    for new in newResults['results']:
+        key = (new['benchmark'], new['bucket'])
+        if key not in oldByKey: continue
+        old = oldByKey[key]
+
+        for metric, getValue, biggerIsBetter in COMPARED_METRICS:
+            oldValue = getValue(old)
+            newValue = getValue(new)
+            if oldValue is None or newValue is None or oldValue == 0: continue
+
+            pctChange = (newValue - oldValue) / oldValue * 100
+            if biggerIsBetter: pctChange = -pctChange
+
+            comparisons.append((key[0], key[1], metric, oldValue, newValue,
+                                                                    pctChange))
+            if pctChange > threshold:
+                regressions.append(Regression(key[0], key[1], metric,
+                                                oldValue, newValue, pctChange))
+    return comparisons, regressions
+#-----------------------------------
+
+def formatResults(results):
+    """ Return a human readable table for a results dict from runBenchmarks()
+    """
+    output = '\t'.join(['benchmark', 'bucket', 'numDocs', 'MB/sec',
+                        'p50 ms', 'p90 ms', 'p99 ms', 'max ms', 'peak MB',
+                        ]) + '\n'
+    for r in results['results']:
+        if r['peakMemBytes'] is None: peak = '-'
+        else: peak = '%.2f' % (r['peakMemBytes'] / 1e6)
+        output += '\t'.join([r['benchmark'], r['bucket'], str(r['numDocs']),
+                            '%.3f' % (r['charsPerSec'] / 1e6),
+                            '%.2f' % r['latencyMs']['p50'],
+                            '%.2f' % r['latencyMs']['p90'],
+                            '%.2f' % r['latencyMs']['p99'],
+                            '%.2f' % r['latencyMs']['max'],
+                            peak,
+                            ]) + '\n'
+    return output
+#-----------------------------------
+
+def formatComparisons(comparisons, threshold=10.0):
+    """ Return a human readable table of comparisons from compareResults()
+    """
+    output = '\t'.join(['status', 'benchmark', 'bucket', 'metric', 'old',
+                                            'new', '% worse']) + '\n'
+    for (benchmark, bucket, metric, old, new, pctChange) in comparisons:
+        if pctChange > threshold: status = 'REGRESSION'
+        else:                     status = 'ok'
+        output += '\t'.join([status, benchmark, bucket, metric,
+                            '%.2f' % old, '%.2f' % new, '%+.1f' % pctChange,
+                            ]) + '\n'
+    return output
+#-----------------------------------
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Benchmark the router hot paths (see benchmarkLib.py) and compare
+            benchmark results between two runs.
+
+  run:     read a sample file of GXD classified reference records, run the
+            benchmarks over the documents grouped into size buckets, write
+            the results as JSON.
+  compare: compare two JSON result files, report metrics that got worse by
+            more than a threshold %. Exit code 1 if any did.
+
+  Examples:
+    doBenchmark.py run testSet.txt before.json
+    ...make an engine change...
+    doBenchmark.py run testSet.txt after.json
+    doBenchmark.py compare before.json after.json --threshold 5
+'''
+import sys
+import time
+import json
+import argparse
+import benchmarkLib
+import routerVocabs
+import GXD2aryRefSample as SampleLib
+#-----------------------------------
+
+sampleObjType = SampleLib.ClassifiedRefSample
+
+#-----------------------------------
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='benchmark the GXD 2ndary triage router hot paths')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    runParser = subparsers.add_parser('run', help='run the benchmarks')
+
+    runParser.add_argument('sampleFileName', action='store',
+        help="the sample file to read. '-' for stdin")
+
+    runParser.add_argument('outFile', action='store',
+        help="JSON results file to write. '-' for stdout")
+
+    runParser.add_argument('--vocabdir', dest='vocabDir', action='store',
+        required=False, default='.',
+        help="directory holding the vocab files. Default: '.'")
+
+    runParser.add_argument('--buckets', dest='buckets', action='store',
+        required=False,
+        default=','.join(map(str, benchmarkLib.DEFAULT_BUCKETS)),
+        help="comma separated doc length bucket lower bounds. Default: %s" % \
+                        ','.join(map(str, benchmarkLib.DEFAULT_BUCKETS)))
+
+    runParser.add_argument('--bench', dest='benchNames', action='append',
+        required=False, default=None,
+        help="only run this benchmark (may repeat). Default: all")
+
+    runParser.add_argument('--repeat', dest='repeat', action='store',
+        required=False, type=int, default=1,
+        help="run each doc this many times, keep the best. Default: 1")
+
+    runParser.add_argument('--nomem', dest='measureMemory',
+        action='store_false', required=False,
+        help="skip the (slow) peak memory measurement")
+
+    runParser.add_argument('-l', '--limit', dest='nToDo',
+        required=False, type=int, default=0,            # 0 means ALL
+        help="only process this many references. Default is no limit")
+
+    compareParser = subparsers.add_parser('compare',
+        help='compare two JSON result files')
+
+    compareParser.add_argument('oldFile', action='store',
+        help="JSON results from the baseline run")
+
+    compareParser.add_argument('newFile', action='store',
+        help="JSON results from the candidate run")
+
+    compareParser.add_argument('--threshold', dest='threshold', action='store',
+        required=False, type=float, default=10.0,
+        help="flag metrics more than this %% worse. Default: 10")
+
+    for p in [runParser, compareParser]:
+        p.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+            required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    if args.command == 'run':
+        args.buckets = [int(b) for b in args.buckets.split(',')]
+
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def doRun():
+    startTime = time.time()
+    verbose(time.ctime() + '\n')
+
+    testSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
+    if args.sampleFileName == '-': testSet.read(sys.stdin)
+    else: testSet.read(args.sampleFileName)
+
+    if args.nToDo > 0: samples = testSet.getSamples()[:args.nToDo]
+    else: samples = testSet.getSamples()
+
+    docs = [benchmarkLib.BenchDoc(s.getID(), s.getDocument(),
+                                    s.getField('journal')) for s in samples]
+    verbose('read %d refs from %s\n' % (len(docs), args.sampleFileName))
+
+    router = routerVocabs.RouterVocabs.fromDir(args.vocabDir).buildRouter( \
+                                                                numChars=30)
+
+    results = benchmarkLib.runBenchmarks(docs, router, buckets=args.buckets,
+                                repeat=args.repeat,
+                                measureMemory=args.measureMemory,
+                                benchNames=args.benchNames, progress=verbose)
+    results['meta']['sampleFile'] = args.sampleFileName
+
+    if args.outFile == '-':
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.outFile, 'w') as fp:
+            json.dump(results, fp, indent=2)
+            fp.write('\n')
+        sys.stdout.write(benchmarkLib.formatResults(results))
+
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+    return 0
+#-----------------------------------
+
+def doCompare():
+    with open(args.oldFile, 'r') as fp: oldResults = json.load(fp)
+    with open(args.newFile, 'r') as fp: newResults = json.load(fp)
+
+    comparisons, regressions = benchmarkLib.compareResults(oldResults,
+                                                newResults, args.threshold)
+    sys.stdout.write(benchmarkLib.formatComparisons(comparisons,
+                                                            args.threshold))
+    sys.stdout.write("%d regressions > %.1f%% in %d comparisons\n" % \
+                            (len(regressions), args.threshold, len(comparisons)))
+    if regressions: return 1
+    return 0
+#-----------------------------------
+
+def main():
+    if args.command == 'run': exitCode = doRun()
+    else: exitCode = doCompare()
+
+    exit(exitCode)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
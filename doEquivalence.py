@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Validate a candidate router engine against the reference GXDrouter
+            over a whole sample file (or a synthetic corpus).
+           Both routers are built from the same vocab files. Every reference
+            is routed by both and the routings, match counts and MatchRcd
+            fields are compared (see routerEquivalence.py).
+
+  Outputs: report to stdout: summary counts, then for the first divergent
+            references, the differences w/ context and a minimized snippet
+            that reproduces the divergence.
+           Exit code 1 if any reference diverges.
+
+  Examples:
+    # candidate is a GXDrouter option, compare everything
+    doEquivalence.py testSet.txt --candopt asciiText=True
+
+    # span figure text has full text coords & line breaks, compare the rest
+    doEquivalence.py testSet.txt --candopt unifiedTermScan=True \
+                            --ignore start,end,matchText,preText,postText
+
+    # candidate is some other class w/ the GXDrouter interface
+    doEquivalence.py testSet.txt --candidate myRouter.FastRouter
+
+    # synthetic corpus, no sample file needed
+    doEquivalence.py --synthetic 2000 --seed 1 --candopt asciiText=True
+'''
+import sys
+import ast
+import time
+import argparse
+import importlib
+import routerVocabs
+import routerEquivalence
+import syntheticCorpus
+import GXD2aryRefSample as SampleLib
+#-----------------------------------
+
+sampleObjType = SampleLib.ClassifiedRefSample
+
+#-----------------------------------
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='compare a candidate router engine to the reference ' +
+        'GXDrouter, reference by reference. Write report to stdout.')
+
+    parser.add_argument('sampleFileName', action='store', nargs='?',
+        default=None, help="the sample file to read. '-' for stdin")
+
+    parser.add_argument('--synthetic', dest='numSynthetic', action='store',
+        required=False, type=int, default=0,
+        help="instead of a sample file, generate this many synthetic refs")
+
+    parser.add_argument('--seed', dest='seed', action='store',
+        required=False, type=int, default=1,
+        help="random seed for --synthetic. Default: 1")
+
+    parser.add_argument('--vocabdir', dest='vocabDir', action='store',
+        required=False, default='.',
+        help="directory holding the vocab files. Default: '.'")
+
+    parser.add_argument('--candidate', dest='candidate', action='store',
+        required=False, default='GXD2aryRouter.GXDrouter',
+        help="candidate router class, module.Class. It is instantiated " +
+            "like GXDrouter. Default: GXD2aryRouter.GXDrouter")
+
+    parser.add_argument('--candopt', dest='candOpts', action='append',
+        required=False, default=[],
+        help="keyword arg for the candidate, name=value (may repeat). " +
+                "value is a python literal")
+
+    parser.add_argument('--refopt', dest='refOpts', action='append',
+        required=False, default=[],
+        help="keyword arg for the reference GXDrouter, name=value")
+
+    parser.add_argument('--ignore', dest='ignoreFields', action='store',
+        required=False, default='',
+        help="comma separated MatchRcd fields to not compare, e.g. start,end")
+
+    parser.add_argument('--unordered', dest='ordered', action='store_false',
+        required=False, help="compare match lists ignoring their order")
+
+    parser.add_argument('--maxreport', dest='maxReport', action='store',
+        required=False, type=int, default=10,
+        help="report details for this many divergent refs. Default: 10")
+
+    parser.add_argument('--nominimize', dest='minimize', action='store_false',
+        required=False, help="skip finding minimal reproducing snippets")
+
+    parser.add_argument('-l', '--limit', dest='nToDo',
+        required=False, type=int, default=0,            # 0 means ALL
+        help="only process this many references. Default is no limit")
+
+    parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+        required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    if not args.sampleFileName and not args.numSynthetic:
+        parser.error('need a sample file or --synthetic')
+
+    args.candOpts = parseOpts(parser, args.candOpts)
+    args.refOpts  = parseOpts(parser, args.refOpts)
+    args.ignoreFields = set([f for f in args.ignoreFields.split(',') if f])
+    for f in args.ignoreFields:
+        if f not in routerEquivalence.MATCHRCD_FIELDS:
+            parser.error("invalid MatchRcd field '%s'" % f)
+
+    return args
+#-----------------------------------
+
+def parseOpts(parser, opts):
+    """ Return {name: value} for list of 'name=value' strings
+    """
+    kwargs = {}
+    for opt in opts:
+        if '=' not in opt: parser.error("invalid option '%s'" % opt)
+        name, value = opt.split('=', 1)
+        try:
+            kwargs[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            kwargs[name] = value            # treat as a plain string
+    return kwargs
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def getCandidateClass(name):
+    """ Return the class named 'module.Class'
+    """
+    moduleName, className = name.rsplit('.', 1)
+    return getattr(importlib.import_module(moduleName), className)
+#-----------------------------------
+
+def getDocs(vocabs):
+    """ Return iterator of (ID, text, journal) for the refs to check
+    """
+    if args.numSynthetic:
+        generator = syntheticCorpus.SyntheticRefGenerator(vocabs,
+                                                            seed=args.seed)
+        numToDo = args.numSynthetic
+        if args.nToDo > 0: numToDo = min(numToDo, args.nToDo)
+        for fields in generator.genRecords(numToDo):
+            yield fields['ID'], fields['text'], fields['journal']
+    else:
+        testSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
+        if args.sampleFileName == '-': testSet.read(sys.stdin)
+        else: testSet.read(args.sampleFileName)
+
+        if args.nToDo > 0: samples = testSet.getSamples()[:args.nToDo]
+        else: samples = testSet.getSamples()
+        for s in samples:
+            yield s.getID(), s.getDocument(), s.getField('journal')
+#-----------------------------------
+
+def main():
+    startTime = time.time()
+    verbose(time.ctime() + '\n')
+
+    vocabs = routerVocabs.RouterVocabs.fromDir(args.vocabDir)
+    refRouter = vocabs.buildRouter(**args.refOpts)
+
+    candClass = getCandidateClass(args.candidate)
+    candRouter = candClass(vocabs.skipJournals, vocabs.cat1Terms,
+                            vocabs.cat1Exclude, vocabs.ageExclude,
+                            vocabs.cat2Terms, vocabs.cat2Exclude,
+                            **args.candOpts)
+
+    checker = routerEquivalence.EquivalenceChecker(refRouter, candRouter,
+                                        ignoreFields=args.ignoreFields,
+                                        ordered=args.ordered,
+                                        maxReport=args.maxReport,
+                                        minimize=args.minimize)
+
+    sys.stdout.write("Reference: GXDrouter %s\n" % str(args.refOpts))
+    sys.stdout.write("Candidate: %s %s\n" % (args.candidate,str(args.candOpts)))
+    if args.ignoreFields:
+        sys.stdout.write("Ignoring MatchRcd fields: %s\n" % \
+                                            ', '.join(sorted(args.ignoreFields)))
+
+    for i, (refID, text, journal) in enumerate(getDocs(vocabs)):
+        if i % 1000 == 0: verbose('..%d\n' % i)
+        if not checker.checkRef(refID, text, journal):
+            verbose('%s diverges\n' % refID)
+
+    sys.stdout.write(checker.getReport())
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+
+    if checker.numDivergent: exit(1)
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
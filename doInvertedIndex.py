@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Build a positional inverted index of a sample file (see
+            invertedIndex.py) and run phrase and proximity queries on it,
+            instead of grepping/scanning the whole corpus.
+
+  build:   index the text (or figure text) of a sample file
+  query:   for each phrase (optionally near another phrase), report
+            numPos, numNeg, posFraction, negFraction, dValue (the doStatic
+            columns) and numMatches. Optionally w/ snippets and the
+            matching reference IDs (e.g., to select refs to re-route).
+
+  Examples:
+    doInvertedIndex.py build testSet.txt testSet.inv
+    doInvertedIndex.py query testSet.inv 'in situ' 'northern blot'
+    doInvertedIndex.py query testSet.inv 'in situ' --near e14.5 --window 10
+    doInvertedIndex.py query testSet.inv - --snippets 3 < cat2Terms.txt
+    doInvertedIndex.py query testSet.inv 'whole mount' --ids > refIDs.txt
+'''
+import sys
+import time
+import argparse
+import invertedIndex
+import GXD2aryRefSample as SampleLib
+#-----------------------------------
+
+sampleObjType = SampleLib.ClassifiedRefSample
+
+#-----------------------------------
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='build & query a positional inverted index of a sample ' +
+        'file for phrase and proximity queries')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    buildParser = subparsers.add_parser('build', help='build an index')
+
+    buildParser.add_argument('sampleFileName', action='store',
+        help="the sample file to read")
+
+    buildParser.add_argument('indexDir', action='store',
+        help="directory to write the index to")
+
+    buildParser.add_argument('--figtext', dest='figText', action='store_true',
+        required=False,
+        help="index only the figure text (legends + 75 words around " +
+            "figure references)")
+
+    buildParser.add_argument('-l', '--limit', dest='nToDo',
+        required=False, type=int, default=0,            # 0 means ALL
+        help="only index this many references. Default is no limit")
+
+    queryParser = subparsers.add_parser('query', help='query an index')
+
+    queryParser.add_argument('indexDir', action='store',
+        help="index directory to query")
+
+    queryParser.add_argument('phrases', nargs='+',
+        help="phrases to find. '-' to read phrases from stdin")
+
+    queryParser.add_argument('--near', dest='near', action='store',
+        required=False, default=None,
+        help="only count phrases that have this phrase within --window words")
+
+    queryParser.add_argument('--window', dest='window', action='store',
+        required=False, type=int, default=10,
+        help="max words between the phrase and the --near phrase. " +
+            "Default: 10")
+
+    queryParser.add_argument('--sameparagraph', dest='sameParagraph',
+        action='store_true', required=False,
+        help="the --near phrase must be in the same paragraph")
+
+    queryParser.add_argument('--snippets', dest='numSnippets', action='store',
+        required=False, type=int, default=0,
+        help="show this many example snippets for each query. Default: 0")
+
+    queryParser.add_argument('--width', dest='width', action='store',
+        required=False, type=int, default=40,
+        help="chars of context on each side of a match. Default: 40")
+
+    queryParser.add_argument('--ids', dest='ids', action='store_true',
+        required=False,
+        help="write only the IDs of the references w/ matches, 1 per line")
+
+    for p in [buildParser, queryParser]:
+        p.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+            required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def doBuild():
+    startTime = time.time()
+    verbose(time.ctime() + '\n')
+
+    testSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
+    testSet.read(args.sampleFileName)
+
+    if args.nToDo > 0: samples = testSet.getSamples()[:args.nToDo]
+    else: samples = testSet.getSamples()
+    verbose('indexing %d refs\n' % len(samples))
+
+    def getDocs():
+        for s in samples:
+            text = s.getDocument()
+            if args.figText:
+                text = '\n\n'.join( \
+                        SampleLib.figConverterLegCloseWords75.text2FigText(text))
+            yield s.getID(), s.isPositive(), text
+
+    def progress(numDocs):
+        if numDocs % 1000 == 0: verbose('..%d\n' % numDocs)
+
+    info = {'sampleFile' : args.sampleFileName,
+            'figText'    : args.figText,
+            'built'      : time.ctime(),
+            }
+    invertedIndex.buildIndex(args.indexDir, getDocs(),
+                        testSet.getNumPositives(), testSet.getNumNegatives(),
+                        info=info, progress=progress)
+    verbose("wrote index '%s'\n" % args.indexDir)
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+#-----------------------------------
+
+def doQuery():
+    startTime = time.time()
+    index = invertedIndex.InvertedIndex.load(args.indexDir)
+    info = index.info
+
+    phrases = []
+    for phrase in args.phrases:
+        if phrase == '-':           # read phrases from stdin
+            phrases += [line[:-1] for line in sys.stdin \
+                            if not line.startswith('#') and line.strip() != '']
+        else:
+            phrases.append(phrase)
+
+    if not args.ids:
+        where = 'figure text' if info.get('figText') else 'text'
+        sys.stdout.write("Querying %s of %d refs from '%s'  index '%s'\n" % \
+            (where, index.getNumDocs(), info.get('sampleFile'), args.indexDir))
+        if args.near:
+            sys.stdout.write("Near: '%s' within %d words%s\n" % (args.near,
+                args.window, ', same paragraph' if args.sameParagraph else ''))
+        header = "%s\t%s\t%s\t%s\t%s\t%s\t%s\n" % ('term', 'numPos', 'numNeg',
+                            'posFraction', 'negFraction', 'dValue','numMatches')
+        sys.stdout.write(header)
+
+    totalNumPos = index.totalNumPos
+    totalNumNeg = index.totalNumNeg
+    allIDs = []
+    for phrase in phrases:
+        if args.near:
+            matches = index.findNear(phrase, args.near, window=args.window,
+                                            sameParagraph=args.sameParagraph)
+        else:
+            matches = index.findPhrase(phrase)
+
+        if args.ids:
+            allIDs += [index.IDs[doc] for doc in matches.getDocs()]
+            continue
+
+        numPos, numNeg = index.countDocs(matches)
+        posFraction = numPos / totalNumPos if totalNumPos else 0.0
+        negFraction = numNeg / totalNumNeg if totalNumNeg else 0.0
+        sys.stdout.write("'%s'\t%d\t%d\t%.2f\t%.2f\t%.2f\t%d\n" % \
+                        (phrase, numPos, numNeg, posFraction, negFraction,
+                        posFraction - negFraction, len(matches)))
+        if args.numSnippets:
+            for ID, snippet in index.getSnippets(matches, args.numSnippets,
+                                                                args.width):
+                sys.stdout.write("    %s\t%s\n" % (ID, repr(snippet)))
+
+    if args.ids:
+        for ID in sorted(set(allIDs)):
+            sys.stdout.write('%s\n' % ID)
+    else:
+        sys.stdout.write("Total Pos Refs: %d\nTotal Neg Refs: %d\n" % \
+                                                (totalNumPos, totalNumNeg))
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+#-----------------------------------
+
+def main():
+    if args.command == 'build': doBuild()
+    elif args.command == 'query': doQuery()
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
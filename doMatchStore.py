@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Build a paragraph level match store of a sample file (see
+            matchStore.py) and use it to evaluate routing rules that search
+            cat1, age, and cat2 in different scopes, w/o re-running the
+            regex's.
+
+  build:   find & store the paragraphs and matches of each ref's full text
+  eval:    route the refs w/ cat1, age, and cat2 searched in the given
+            scopes. Each option can be a comma separated list of values:
+            every combination is evaluated.
+           Scopes: fullText, legends, legParagraphs, legCloseWords/N
+            (GXDrouter searches cat1 in fullText, age and cat2 in
+            legCloseWords/75)
+
+  Outputs: for one rule: the doRouting2 Summary (Precision, Recall, NPV,
+            TP/FP/TN/FN for Overall, Keeps and Discards)
+           for several rules: a tab delimited table, 1 line per rule
+
+  Examples:
+    doMatchStore.py build testSet.matches < testSet.txt
+    doMatchStore.py eval testSet.matches --agescope fullText
+    doMatchStore.py eval testSet.matches --agescope legCloseWords/50,fullText \
+                                    --cat2scope legends,legParagraphs
+'''
+import sys
+import time
+import argparse
+import itertools
+import matchStore
+import routerVocabs
+import routingFeatures
+import GXD2aryRefSample as SampleLib
+#-----------------------------------
+
+sampleObjType = SampleLib.ClassifiedRefSample
+
+#-----------------------------------
+
+def scopeList(s):
+    values = s.split(',')
+    for x in values:
+        try:
+            matchStore.parseScope(x)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+    return values
+
+def intList(s):  return [int(x) for x in s.split(',')]
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='build a paragraph level match store of a sample file ' +
+        'and evaluate routing rules w/ different search scopes')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    buildParser = subparsers.add_parser('build',
+        help='build a match store, read testSet from stdin')
+
+    buildParser.add_argument('storeFile', action='store',
+        help="file to write the match store to")
+
+    buildParser.add_argument('--maxagecontext', dest='maxAgeContext',
+        type=int, required=False,
+        default=matchStore.DEFAULT_MAX_AGE_CONTEXT,
+        help="largest ageContext the rules can use. Default: %d" % \
+                                        matchStore.DEFAULT_MAX_AGE_CONTEXT)
+
+    buildParser.add_argument('-l', '--limit', dest='nToDo',
+        required=False, type=int, default=0,            # 0 means ALL
+        help="only store this many references. Default is no limit")
+
+    evalParser = subparsers.add_parser('eval',
+        help='evaluate routing rules over a match store')
+
+    evalParser.add_argument('storeFile', action='store',
+        help="match store file to read")
+
+    evalParser.add_argument('--cat1scope', dest='cat1Scopes', type=scopeList,
+        required=False, default=['fullText'],
+        help="scopes to search cat1 terms in. Default: fullText")
+
+    evalParser.add_argument('--agescope', dest='ageScopes', type=scopeList,
+        required=False, default=['legCloseWords/75'],
+        help="scopes to search mouse ages in. Default: legCloseWords/75")
+
+    evalParser.add_argument('--cat2scope', dest='cat2Scopes', type=scopeList,
+        required=False, default=['legCloseWords/75'],
+        help="scopes to search cat2 terms in. Default: legCloseWords/75")
+
+    evalParser.add_argument('--agecontext', dest='ageContexts', type=intList,
+        required=False, default=[210],
+        help="n chars around age matches to search for age exclude terms. " +
+            "Default: 210")
+
+    evalParser.add_argument('--mintextlen', dest='minTextLens', type=intList,
+        required=False, default=[500],
+        help="refs w/ shorter text are routed Yes. Default: 500")
+
+    for p in [buildParser, evalParser]:
+        p.add_argument('--vocabdir', dest='vocabDir', action='store',
+            required=False, default='.',
+            help="directory holding the vocab files. Default: '.'")
+
+        p.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+            required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def build(vocabs):
+    testSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
+    testSet.read(sys.stdin)
+    verbose('read %d refs\n' % testSet.getNumSamples())
+    samples = testSet.getSamples()
+    if args.nToDo > 0: samples = samples[:args.nToDo]
+
+    store = matchStore.MatchStore(vocabs, args.maxAgeContext)
+    for ref in samples:
+        store.addRef(ref.getID(), ref.getDocument(), ref.getField('journal'),
+                    ref.isPositive(), ref.getField('relevance') == 'keep')
+    store.save(args.storeFile)
+    verbose("wrote matches of %d refs to '%s'\n" % (len(store),
+                                                            args.storeFile))
+
+def evaluate(vocabs):
+    store = matchStore.MatchStore.load(args.storeFile, vocabs)
+    verbose("loaded matches of %d refs from '%s'\n" % (len(store),
+                                                            args.storeFile))
+    rules = list(itertools.product(args.cat1Scopes, args.ageScopes,
+                        args.cat2Scopes, args.ageContexts, args.minTextLens))
+    results = []
+    for cat1Scope, ageScope, cat2Scope, ageContext, minTextLen in rules:
+        fm = store.getFeatureMatrix(cat1Scope, ageScope, cat2Scope,
+                                                                ageContext)
+        results.append(routingFeatures.evaluateRule(fm,
+                            routingFeatures.RoutingRule(minTextLen=minTextLen)))
+
+    if len(rules) == 1:
+        sys.stdout.write("cat1 in %s, age in %s, cat2 in %s, " \
+                        "ageContext=%d minTextLen=%d\n" % rules[0])
+        sys.stdout.write(routingFeatures.getSummary(results[0]))
+    else:
+        cols = ['cat1Scope', 'ageScope', 'cat2Scope', 'ageContext',
+                                                                'minTextLen']
+        for label in routingFeatures.SUBSETS:
+            cols += ['%s %s' % (label, m) for m in ['Precision', 'Recall',
+                                                                    'NPV']]
+        cols += routingFeatures.PRED_TYPES
+        sys.stdout.write('\t'.join(cols) + '\n')
+        for rule, result in zip(rules, results):
+            items = [str(x) for x in rule]
+            for label in routingFeatures.SUBSETS:
+                items += ['%.2f' % m for m in
+                            routingFeatures.computeMetrics(result[label])]
+            items += [str(result['Overall'][predType])
+                                for predType in routingFeatures.PRED_TYPES]
+            sys.stdout.write('\t'.join(items) + '\n')
+    verbose("evaluated %d rules\n" % len(rules))
+
+def main():
+    startTime = time.time()
+    vocabs = routerVocabs.RouterVocabs.fromDir(args.vocabDir)
+    if args.command == 'build': build(vocabs)
+    else: evaluate(vocabs)
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
@@ -19,14 +19,27 @@
                Try1/Details.txt
                Try1/*Matches.txt
                Try1/Summary.txt
+               Try1/vocabs/      (a copy of the vocab files and the
+                                    router options)
            Summary and other info is also written to stdout.
 '''
+import os
 import sys
 import time
+import shutil
 import argparse
 import unittest
+import contextlib
 import figureText
+import profileLib
+import routerVocabs
+import routingFeatures
+import termMatrix
+import routingStats
+import stageCache
 from  GXD2aryRouter import GXDrouter
+from routingFiles import routingFieldSep, matchesHdr, formatMatches, \
+                            getMatchFileKey, getMatchFileNames
 import GXD2aryRefSample as SampleLib
 from sklearnHelperLib import predictionType
 #-----------------------------------
@@ -51,6 +64,60 @@ def getArgs():
         type=int, required=False, default=None,
         help="only include the 1st n chars of text fields (for debugging)")
 
+    parser.add_argument('--timebudget', dest='timeBudget',
+        type=float, required=False, default=None,
+        help="max seconds to spend routing a ref. Refs over budget are " +
+                "routed 'Yes'. Default is no limit")
+
+    parser.add_argument('--squeeze', dest='squeezeLetterSpacing',
+        action='store_true', required=False,
+        help="squeeze letter spaced figure words ('F I G U R E') before " +
+            "searching the text. Use --compare w/ a run w/o it to check " +
+            "the routings")
+
+    parser.add_argument('--ascii', dest='asciiText',
+        action='store_true', required=False,
+        help="the text is ASCII only (as from sdGetTestSet.py): match the " +
+            "age regex's in ASCII mode (faster)")
+
+    parser.add_argument('--unified', dest='unifiedTermScan',
+        action='store_true', required=False,
+        help="search cat1 and cat2 terms in one shared copy of the text, " +
+            "cat2 only in the figure text spans. Use --compare w/ a run " +
+            "w/o it to check the routings")
+
+    parser.add_argument('--profile', dest='profile', action='store_true',
+        required=False,
+        help="cProfile the routing loop, write baseName profile.pstats and " +
+            "profile.collapsed (flame graph stacks)")
+
+    parser.add_argument('--memprofile', dest='memProfile', action='store_true',
+        required=False,
+        help="tracemalloc the routing loop, write baseName memprofile.txt: " +
+            "peak memory & time by reference and stage")
+
+    parser.add_argument('--cachedir', dest='cacheDir', action='store',
+        required=False, default=None,
+        help="directory for a cache of the results of each routing stage " +
+            "(cat1, figText, age, cat2). Reruns only recompute the stages " +
+            "whose vocabs changed. Default: no cache")
+
+    parser.add_argument('--bootstrap', dest='numResamples', type=int,
+        required=False, default=routingStats.DEFAULT_NUM_RESAMPLES,
+        help="bootstrap resamples for the confidence intervals in the " +
+            "summary. 0 for none. Default: %d" % \
+                                        routingStats.DEFAULT_NUM_RESAMPLES)
+
+    parser.add_argument('--compare', dest='compareFilename', action='store',
+        required=False, default=None,
+        help="Routings.txt file of an earlier run to compare this run to " +
+            "(McNemar & paired bootstrap) in the summary")
+
+    parser.add_argument('--journalrefs', dest='minJournalRefs', type=int,
+        required=False, default=20,
+        help="break the statistics down for journals w/ at least this " +
+            "many refs. Default: 20")
+
     parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
         required=False, help="skip helpful messages to stderr")
 
@@ -72,12 +139,13 @@ AGEEXCLUDEFILENAME  = '/Users/jak/work/GXD2ndaryProto/ageExclude.txt'
 args.routingsFilename  = "%sRoutings.txt" % args.baseName
 args.detailsFilename   = "%sDetails.txt"  % args.baseName
 args.summaryFilename   = "%sSummary.txt"  % args.baseName
+args.profileFileBase   = "%sprofile"      % args.baseName
+args.memProfileFilename= "%smemprofile.txt" % args.baseName
+args.featuresFilename  = "%sFeatures.npz" % args.baseName
+args.termMatrixFilename= "%sTermMatrix.npz" % args.baseName
+args.vocabSnapshotDir  = "%svocabs/"      % args.baseName
 
-fileSplitModulus = 4    # split big files based on this modulus,
-                        #  see match output files below.
-
-# Formatting for the output reports
-routingFieldSep = '|'
+# Formatting for the output reports (match files: see routingFiles.py)
 routingHdr = routingFieldSep.join(['ID',
                     'knownClassName',
                     'routing',
@@ -110,40 +178,14 @@ def formatRouting(r, routing, predType, goodJournal, numCat1Matches,
                     ] + r.getExtraInfo()) + '\n'
     return t
 
-matchesFieldSep = '\t'
-matchesHdr = matchesFieldSep.join(['ID',
-                    'routing',
-                    'predType',
-                    'goodJournal',
-                    'Cat1 matches',
-                    'Age matches',
-                    'Cat2 matches',
-                    'matchType',
-                    'preText',
-                    'matchText',
-                    'postText',
-                    'confidence',
-                    ]) + '\n'
-
-def formatMatches(ID, routing, predType, goodJournal, numCat1Matches,
-                    numAgeMatches, numCat2Matches, matchRcds, confidence):
-    output = ''
-    for m in matchRcds:
-        output += matchesFieldSep.join([
-                   str(ID),
-                   routing,
-                   predType,
-                   str(goodJournal),
-                   str(numCat1Matches),
-                   str(numAgeMatches),
-                   str(numCat2Matches),
-                   m.matchType,
-                   "'%s'" % m.preText.replace('\n','\\n').replace('\t','\\t'),
-                   "'%s'" % m.matchText.replace('\n','\\n').replace('\t','\\t'),
-                   "'%s'" % m.postText.replace('\n','\\n').replace('\t','\\t'),
-                   str(confidence),
-                   ]) + '\n'
-    return output
+def getReportMatches(router, text, matchRcds):
+    """ Return the matchRcds w/ their offsets and text in text, not in the
+        squeezed text if the router squeezed letter spaced words
+        (see GXDrouter.getTextOffsetMap())
+    """
+    offsetMap = router.getTextOffsetMap()
+    if offsetMap is None or offsetMap.isIdentity(): return matchRcds
+    return [offsetMap.getOrigMatchRcd(m, text) for m in matchRcds]
 
 #-----------------------------------
 
@@ -179,7 +221,14 @@ def process():
 
     # initialize GXDrouter
     gxdRouter = GXDrouter(skipJournals, cat1Terms, cat1Exclude, ageExclude,
-                                        cat2Terms, cat2Exclude, numChars=30)
+                                        cat2Terms, cat2Exclude, numChars=30,
+                                        timeBudget=args.timeBudget,
+                            squeezeLetterSpacing=args.squeezeLetterSpacing,
+                            unifiedTermScan=args.unifiedTermScan,
+                            asciiText=args.asciiText)
+    if args.cacheDir:
+        cache = stageCache.StageCache(args.cacheDir)
+        gxdRouter.setStageCache(cache)
 
     # get testSet from stdin. Set samples to list of samples (refs) to route
     testSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
@@ -204,39 +253,45 @@ def process():
     # This is all because the match files get too big to import into Excel
     #  and Google Sheets.
     matchesFile = {}   # matchesFile[(cat,predType)] = output file for matches
-    for cat in ['Cat1', 'Cat2', 'Age']:
-        for predType in ['FP', 'TN', 'FN']:
-            fileName = '%s%s%smatches.txt' % (args.baseName, cat, predType)
-            fp = open(fileName, 'w')
-            #print("opening '%s' for output" % fileName)
-            matchesFile[(cat, predType)] = fp
-
-        for predType in ['TP']:
-            for dig in range(fileSplitModulus):
-                fileName = '%s%s%s_%dmatches.txt' % (args.baseName, cat,
-                                                                predType, dig)
-                fp = open(fileName, 'w')
-                #print("opening '%s' for output" % fileName)
-                matchesFile[(cat, predType, dig)] = fp
+    for key, fileName in getMatchFileNames(args.baseName).items():
+        matchesFile[key] = open(fileName, 'w')
 
     for fp in matchesFile.values():
         fp.write(timeString + ' ')
         fp.write(matchesHdr)
 
+    # profilers
+    global stageTracker
+    if args.memProfile:
+        stageTracker = profileLib.StageTracker(measureMemory=True)
+        gxdRouter.setStageTracker(stageTracker)
+        stageTracker.start()
+    if args.profile:
+        cpuProfiler = profileLib.CpuProfiler()
+        cpuProfiler.start()
+
     # initialize reference counts
     numProcessed = 0            # total number of references processed
+    timedOutIDs  = []           # IDs of refs that went over the time budget
     allCounts  = {'TP': 0, 'FP': 0, 'TN': 0, 'FN': 0}   # for all refs
     keepCounts = {'TP': 0, 'FP': 0, 'TN': 0, 'FN': 0}   # for keep refs
     discCounts = {'TP': 0, 'FP': 0, 'TN': 0, 'FN': 0}   # for discard refs
+    features = routingFeatures.FeatureMatrix()  # for what-if rule evaluation
+    routedYes = []              # for the routing statistics
+    terms = termMatrix.TermMatrix.fromRouter(gxdRouter) # matches per term
 
     # for each record, routeThisRef(), gather counts, write routing & matches
     for i, ref in enumerate(samples):
         refID = ref.getID()
+        if stageTracker: stageTracker.setRef(refID)
         conf = ref.getField('confidence')
         text = ref.getDocument()
         textLen = len(text)
 
         routing = gxdRouter.routeThisRef(text, ref.getField('journal'))
+        if gxdRouter.getTimedOut():
+            timedOutIDs.append(refID)
+            verbose("%s over time budget, text length %d\n" % (refID,textLen))
         numCat1Matches  = len(gxdRouter.getCat1Matches())
         numCat1Excludes = len(gxdRouter.getCat1Excludes())
 
@@ -248,6 +303,7 @@ def process():
 
         predType = predictionType(ref.getKnownClassName(), routing,
                                                         positiveClass='Yes')
+        routedYes.append(routing == 'Yes')
         allCounts[predType] += 1
 
         relevance = ref.getField('relevance')
@@ -260,34 +316,63 @@ def process():
 
         goodJournal = gxdRouter.getGoodJournal()
 
+        features.addRef(refID, ref.isPositive(), relevance == 'keep',
+                ref.getField('journal'),
+                routingFeatures.getRouterFeatures(gxdRouter, textLen),
+                timedOut=gxdRouter.getTimedOut())
+        terms.addRouterMatches(refID, gxdRouter)
+
         # Routings file
-        r = formatRouting(ref, routing, predType, goodJournal, 
+        with stage('formatRouting'):
+            r = formatRouting(ref, routing, predType, goodJournal, 
                                             numCat1Matches, numCat1Excludes,
                                             numAgeMatches,  numAgeExcludes,
                                             numCat2Matches, numCat2Excludes,
                                             textLen)
-        routingsFile.write(r)
+            routingsFile.write(r)
 
-        # Cat1 match report
-        matchRpt = formatMatches(refID, routing, predType, 
+        with stage('formatMatches'):
+            # Cat1 match report
+            matchRpt = formatMatches(refID, routing, predType, 
                 goodJournal, numCat1Matches, numAgeMatches, numCat2Matches,
-                gxdRouter.getCat1Matches() + gxdRouter.getCat1Excludes(), conf)
-        matchesFile[getMatchFileKey('Cat1', predType, refID)].write(matchRpt)
+                getReportMatches(gxdRouter, text,
+                    gxdRouter.getCat1Matches() + gxdRouter.getCat1Excludes()), conf)
+            matchesFile[getMatchFileKey('Cat1',predType,refID)].write(matchRpt)
 
-        # Age match report
-        matchRpt = formatMatches(refID, routing, predType, 
+            # Age match report
+            matchRpt = formatMatches(refID, routing, predType, 
                 goodJournal, numCat1Matches, numAgeMatches, numCat2Matches,
-                gxdRouter.getAgeMatches() + gxdRouter.getAgeExcludes(), conf)
-        matchesFile[getMatchFileKey('Age', predType, refID)].write(matchRpt)
+                getReportMatches(gxdRouter, text,
+                    gxdRouter.getAgeMatches() + gxdRouter.getAgeExcludes()), conf)
+            matchesFile[getMatchFileKey('Age', predType,refID)].write(matchRpt)
 
-        # Cat2 match report
-        matchRpt = formatMatches(refID, routing, predType, 
+            # Cat2 match report
+            matchRpt = formatMatches(refID, routing, predType, 
                 goodJournal, numCat1Matches, numAgeMatches, numCat2Matches,
-                gxdRouter.getCat2Matches() + gxdRouter.getCat2Excludes(), conf)
-        matchesFile[getMatchFileKey('Cat2', predType, refID)].write(matchRpt)
+                getReportMatches(gxdRouter, text,
+                    gxdRouter.getCat2Matches() + gxdRouter.getCat2Excludes()), conf)
+            matchesFile[getMatchFileKey('Cat2',predType,refID)].write(matchRpt)
 
     # end routing loop
 
+    if args.profile:
+        cpuProfiler.stop()
+        pstatsFile, collapsedFile = cpuProfiler.write(args.profileFileBase)
+        verbose("wrote '%s' and '%s'\n" % (pstatsFile, collapsedFile))
+    if args.memProfile:
+        stageTracker.stop()
+        gxdRouter.setStageTracker(None)
+        memFile = open(args.memProfileFilename, 'w')
+        memFile.write(timeString + '\n')
+        memFile.write(stageTracker.getReport())
+        memFile.close()
+        verbose("wrote '%s'\n" % args.memProfileFilename)
+
+    if args.cacheDir:
+        gxdRouter.setStageCache(None)
+        cache.save()
+        verbose("saved stage cache '%s'\n" % args.cacheDir)
+
     # close Routing and Match files
     routingsFile.close()
     for f in matchesFile.values():
@@ -299,31 +384,49 @@ def process():
     detailsFile.write(gxdRouter.getExplanation())
     detailsFile.close()
 
-    # compute Precision, Recall, write summary
-    summary = 'Summary\n'
-    for counts, label in [(allCounts, 'Overall'), (keepCounts, 'Keeps'),
-                                                    (discCounts, 'Discards')]:
-        numRefs = sum(counts.values())
-        summary += "%s - Total Refs: %d\n" % (label, numRefs)
-
-        summaryLineItems = []
-        p, r, npv = computeMetrics(counts)
-        summaryLineItems.append("Precision %.2f" % p)
-        summaryLineItems.append("Recall %.2f" % r)
-        summaryLineItems.append("NPV %.2f" % npv)
-        summary += '   '.join(summaryLineItems) + '\n'
-
-        summary += "    TP      FP      TN      FN\n"
-        countLineItems = []
-        numRefs = 0
-        for predType in ['TP', 'FP', 'TN', 'FN']:
-            countLineItems.append("%6d" % counts[predType])
-        summary += ', '.join(countLineItems) + '\n'
+    # features for doWhatIf.py, term matches for doTermImpact.py
+    features.save(args.featuresFilename)
+    terms.save(args.termMatrixFilename)
+
+    # the vocabs of this run, for doVocabImpact.py
+    os.makedirs(args.vocabSnapshotDir, exist_ok=True)
+    for fileName in [SKIPJOURNALFILENAME, CAT1EXCLUDEFILENAME,
+                        CAT2TERMFILENAME, CAT2EXCLUDEFILENAME,
+                        AGEEXCLUDEFILENAME]:
+        shutil.copy(fileName, args.vocabSnapshotDir)
+    routerVocabs.writeRouterOptions(args.vocabSnapshotDir, gxdRouter)
 
+    # compute Precision, Recall, write summary
+    summary = routingFeatures.getSummary({'Overall' : allCounts,
+                                          'Keeps'   : keepCounts,
+                                          'Discards': discCounts})
+
+    run = routingStats.RoutingRun(features.IDs, routedYes,
+                        features.isPositive, features.isKeep, features.journals)
+    if args.numResamples > 0:
+        summary += routingStats.getBootstrapReport(run, args.numResamples,
+                                    minJournalRefs=args.minJournalRefs) + '\n'
+    if args.compareFilename:
+        prevRun = routingStats.RoutingRun.fromRoutingsFile(args.compareFilename)
+        summary += routingStats.getComparisonReport(prevRun, run,
+                    max(args.numResamples, 1),
+                    minJournalRefs=args.minJournalRefs,
+                    labels=(args.compareFilename, 'this run')) + '\n'
+
+    if args.cacheDir:
+        summary += cache.getReport() + '\n'
+
+    if args.timeBudget is not None:
+        summary += "%d refs over %.1f second time budget (routed Yes):\n" % \
+                                        (len(timedOutIDs), args.timeBudget)
+        for refID in timedOutIDs:
+            summary += "    %s\n" % refID
         summary += '\n'
 
     summary += "wrote %d routings to '%s'\n" % (numProcessed,
                                                     args.routingsFilename)
+    summary += "wrote features to '%s' and '%s'\n" % (args.featuresFilename,
+                                                    args.termMatrixFilename)
     summary += "%8.3f seconds\n\n" %  (time.time()-startTime)
 
     summaryFile = open(args.summaryFilename, 'w')
@@ -336,34 +439,14 @@ def process():
     return
 #-----------------------------------
 
-def getMatchFileKey(cat, predType, refID):
-    """ Compute and return the key into the dict of Match output files
-        For predTypes FP, TN, FN, this is just (cat, predType)
-        For predType TP, the output files are split based on the modulus of
-            the last two digits of the reference ID
-            (because there are so many TP, the files get too big to import
-            into Excel or Google Sheets)
-    """
-    if predType == 'TP':
-        lastDig = int(refID[-2:])
-        dig = lastDig % fileSplitModulus
-        key = (cat, predType, dig)
-    else:
-        key = (cat, predType)
-    return key
-#-----------------------------------
-
-def computeMetrics(counts):
-    if (counts['TP'] + counts['FP']) == 0: p = 0.0      # check for zero div
-    else: p = counts['TP'] / (counts['TP'] + counts['FP']) * 100
-
-    if (counts['TP'] + counts['FN']) == 0: r = 0.0      # check for zero div
-    else: r = counts['TP'] / (counts['TP'] + counts['FN']) * 100
+stageTracker = None     # profileLib.StageTracker if --memprofile
 
-    if (counts['TN'] + counts['FN']) == 0: npv = 0.0      # check for zero div
-    else: npv = counts['TN'] / (counts['TN'] + counts['FN']) * 100
-
-    return p, r, npv
+def stage(stageName):
+    """ Return a context manager that attributes time & memory to stageName
+        for the current reference (if --memprofile)
+    """
+    if stageTracker is None: return contextlib.nullcontext()
+    return stageTracker.stage(stageName)
 #-----------------------------------
 
 def verbose(text):
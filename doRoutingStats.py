@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Bootstrap confidence intervals for the Precision/Recall/NPV of a
+            routing run, and a paired comparison (McNemar + paired
+            bootstrap) of two runs, by relevance and journal
+            (see routingStats.py).
+           Use it to decide if a metric change between two vocab versions
+            is bigger than the noise before shipping the vocab.
+
+  Inputs:  doRouting2 Routings.txt file(s)
+
+  Examples:
+    doRoutingStats.py Age6Assay12/Routings.txt
+    doRoutingStats.py Age6Assay12/Routings.txt --compare Age6Assay13/Routings.txt
+'''
+import sys
+import time
+import argparse
+import routingStats
+#-----------------------------------
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='bootstrap confidence intervals for a routing run, ' +
+        'paired comparison of two runs')
+
+    parser.add_argument('routingsFile', action='store',
+        help="doRouting2 Routings.txt file")
+
+    parser.add_argument('--compare', dest='compareFile', action='store',
+        required=False, default=None,
+        help="Routings.txt file of a 2nd run, compared to the 1st")
+
+    parser.add_argument('--resamples', dest='numResamples', type=int,
+        required=False, default=routingStats.DEFAULT_NUM_RESAMPLES,
+        help="number of bootstrap resamples. Default: %d" % \
+                                        routingStats.DEFAULT_NUM_RESAMPLES)
+
+    parser.add_argument('--confidence', dest='confidence', type=float,
+        required=False, default=0.95,
+        help="confidence level of the intervals. Default: 0.95")
+
+    parser.add_argument('--journalrefs', dest='minJournalRefs', type=int,
+        required=False, default=20,
+        help="break the statistics down for journals w/ at least this " +
+            "many refs. Default: 20")
+
+    parser.add_argument('--seed', dest='seed', type=int,
+        required=False, default=1,
+        help="random seed for the resampling. Default: 1")
+
+    parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+        required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def main():
+    startTime = time.time()
+    run = routingStats.RoutingRun.fromRoutingsFile(args.routingsFile)
+    verbose("read %d routings from '%s'\n" % (len(run), args.routingsFile))
+
+    sys.stdout.write("%s\n" % args.routingsFile)
+    sys.stdout.write(routingStats.getBootstrapReport(run, args.numResamples,
+                        args.confidence, args.minJournalRefs, args.seed))
+    if args.compareFile:
+        run2 = routingStats.RoutingRun.fromRoutingsFile(args.compareFile)
+        verbose("read %d routings from '%s'\n" % (len(run2),
+                                                            args.compareFile))
+        sys.stdout.write("\n%s\n" % args.compareFile)
+        sys.stdout.write(routingStats.getBootstrapReport(run2,
+                        args.numResamples, args.confidence,
+                        args.minJournalRefs, args.seed))
+        sys.stdout.write('\n')
+        sys.stdout.write(routingStats.getComparisonReport(run, run2,
+                        args.numResamples, args.confidence,
+                        args.minJournalRefs, args.seed,
+                        labels=(args.routingsFile, args.compareFile)))
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,10 @@ import os
 import time
 import argparse
 import unittest
+import contextlib
+import profileLib
+import staticLib
+import ngramMining
 import GXD2aryRefSample as SampleLib
 from sklearnHelperLib import predictionType
 #from utilsLib import removeNonAscii
@@ -33,18 +37,83 @@ def getArgs():
     parser.add_argument('excludeFileName', action='store',
         help="file of exclude terms or 'none'")
 
-    parser.add_argument('terms', nargs='+',
+    parser.add_argument('terms', nargs='*',
         help="terms that you want analysis for. '-' to read terms from stdin")
 
+    parser.add_argument('--mine', dest='mine', action='store_true',
+        required=False,
+        help="instead of analyzing given terms, mine all word n-grams and " +
+            "report those w/ the highest dValues")
+
+    parser.add_argument('--figtext', dest='figText', action='store_true',
+        required=False,
+        help="--mine only the figure text (legends + 75 words around " +
+            "figure references), like the router's cat2 search")
+
+    parser.add_argument('--maxn', dest='maxN', action='store',
+        required=False, type=int, default=4,
+        help="--mine n-grams of up to this many words. Default: 4")
+
+    parser.add_argument('--mindf', dest='minDF', action='store',
+        required=False, type=int, default=5,
+        help="--mine ignores n-grams in fewer refs than this. Default: 5")
+
+    parser.add_argument('--topk', dest='topK', action='store',
+        required=False, type=int, default=200,
+        help="--mine reports this many n-grams. Default: 200")
+
+    parser.add_argument('--lowest', dest='lowest', action='store_true',
+        required=False,
+        help="--mine reports the lowest dValues (negative ref terms, " +
+            "exclude term candidates) instead of the highest")
+
+    parser.add_argument('--sketchwidth', dest='sketchWidth', action='store',
+        required=False, type=int, default=2**22,
+        help="--mine count-min sketch width, memory is 16 bytes * width. " +
+            "Default: 2**22")
+
     parser.add_argument('-l', '--limit', dest='nToDo',
         required=False, type=int, default=0,            # 0 means ALL
         help="only process this many references. Default is no limit")
 
+    parser.add_argument('--workers', dest='workers', action='store',
+        required=False, type=int, default=1,
+        help="number of processes to shard the references across. " +
+            "Default: 1")
+
+    parser.add_argument('--cachedir', dest='cacheDir', action='store',
+        required=False, default=None,
+        help="directory for a cache of the exclusion-masked text of the " +
+            "sample file. Reruns w/ the same sample & exclude files skip " +
+            "reading and masking. Default: no cache")
+
+    parser.add_argument('--profile', dest='profile', action='store_true',
+        required=False,
+        help="cProfile the analysis, write PREFIXprofile.pstats and " +
+            "PREFIXprofile.collapsed (flame graph stacks). " +
+            "Only profiles the main process if --workers > 1")
+
+    parser.add_argument('--memprofile', dest='memProfile', action='store_true',
+        required=False,
+        help="tracemalloc the analysis, write PREFIXmemprofile.txt: " +
+            "peak memory & time by reference and stage")
+
+    parser.add_argument('--profileprefix', dest='profilePrefix',
+        action='store', required=False, default='doStatic_',
+        help="filename prefix for --profile & --memprofile output files. " +
+            "Default: 'doStatic_'")
+
     parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
         required=False, help="skip helpful messages to stderr")
 
     args =  parser.parse_args()
 
+    if not args.terms and not args.mine:
+        parser.error('need terms to analyze or --mine')
+
+    if args.memProfile and args.workers > 1:
+        parser.error('--memprofile needs --workers 1')
+
     return args
 #-----------------------------------
 
@@ -71,33 +140,129 @@ class MyTests(unittest.TestCase):
 #-----------------------------------
 
 def main():
-    doStaticAnalysis()
+    if args.mine: doMining()
+    else: doStaticAnalysis()
 
     exit(0)
 #-----------------------------------
-class TermStats (object):
-    def __init__(self, term, numPos, numNeg):
-        self.term = term
-        self.numPos = numPos
-        self.numNeg = numNeg
+stageTracker = None     # profileLib.StageTracker if --memprofile
+
+def stage(stageName):
+    """ Return a context manager that attributes time & memory to stageName
+        for the current reference (if --memprofile)
+    """
+    if stageTracker is None: return contextlib.nullcontext()
+    return stageTracker.stage(stageName)
+#-----------------------------------
 
-def doStaticAnalysis():
+def doMining():
     startTime = time.time()
     timeString = time.ctime()
     verbose(timeString + '\n')
 
-    ## get testSet of samples
     testSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
     testSet.read(args.sampleFileName)
 
     if args.nToDo > 0: samples = testSet.getSamples()[:args.nToDo]
     else: samples = testSet.getSamples()
 
-    t = "Analyzing %d refs from '%s'  %s\n" % (len(samples),
-                                                args.sampleFileName,timeString)
+    where = 'figure text' if args.figText else 'full text'
+    t = "Mining %d-%d word terms in %s of %d refs from '%s'  %s\n" % \
+                (1, args.maxN, where, len(samples), args.sampleFileName,
+                                                                timeString)
     verbose(t)
     sys.stdout.write(t)
 
+    if args.excludeFileName != 'none':
+        exclude = [line.strip() for line in open(args.excludeFileName, 'r') \
+                            if not line.startswith('#') and line.strip() != '']
+    else:
+        exclude = []
+    excludeDict = staticLib.getExcludeDict(exclude)
+
+    def getMaskedDocs():
+        for ref in samples:
+            text = ref.getDocument()
+            if args.figText:
+                paragraphs = \
+                    SampleLib.figConverterLegCloseWords75.text2FigText(text)
+            else:
+                paragraphs = text.split(ngramMining.PARAGRAPH_BOUNDARY)
+            yield ngramMining.PARAGRAPH_BOUNDARY.join( \
+                    [staticLib.maskText(p, excludeDict) for p in paragraphs]),\
+                    ref.isPositive()
+
+    def progress(passNum, i):
+        if i % 1000 == 0: verbose('%s%d' % ('.' if i else ' pass ', passNum))
+
+    miner = ngramMining.NgramMiner(minDF=args.minDF, maxN=args.maxN,
+                                                sketchWidth=args.sketchWidth)
+    miner.mine(getMaskedDocs, progress)
+    verbose('\n%d candidate n-grams counted, %d w/ df >= %d\n' % \
+                        (miner.numCandidates, len(miner.counts), args.minDF))
+
+    totalNumPos = testSet.getNumPositives()
+    totalNumNeg = testSet.getNumNegatives()
+    header = "%s\t%s\t%s\t%s\t%s\t%s\n" % ('term', 'numPos', 'numNeg',
+                                        'posFraction', 'negFraction', 'dValue')
+    sys.stdout.write(header)
+    for ts in miner.getTopTerms(totalNumPos, totalNumNeg, k=args.topK,
+                                                        lowest=args.lowest):
+        sys.stdout.write("'%s'\t%d\t%d\t%.2f\t%.2f\t%.2f\n" % \
+                        (ts.term, ts.numPos, ts.numNeg,
+                        ts.posFraction, ts.negFraction, ts.dValue))
+
+    sys.stdout.write("Total Pos Refs: %d\nTotal Neg Refs: %d\n" % \
+                                                (totalNumPos, totalNumNeg))
+    sys.stdout.write("Excluded terms:\n")
+    for term in sorted(excludeDict.keys()):
+        sys.stdout.write("'%s'\n" % term)
+
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+    return
+#-----------------------------------
+
+def getDocs(exclude, excludeDict):
+    """ Return (IDs, isPositives, texts, totalNumPos, totalNumNeg, maskDict)
+        for the refs to analyze.
+        If args.cacheDir, the texts are already masked and maskDict is None.
+        Else the texts are raw and need masking w/ maskDict.
+        Totals are for the whole sample file, regardless of args.nToDo.
+    """
+    if args.cacheDir:
+        cachePath = staticLib.getCachePath(args.cacheDir, args.sampleFileName,
+                                                                    exclude)
+        corpus = staticLib.MaskedCorpus.load(cachePath)
+        if corpus is not None:
+            verbose("read masked text cache '%s'\n" % cachePath)
+        else:
+            testSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
+            testSet.read(args.sampleFileName)
+            corpus = staticLib.MaskedCorpus.fromSamples(testSet.getSamples(),
+                            excludeDict, testSet.getNumPositives(),
+                            testSet.getNumNegatives(), workers=args.workers)
+            corpus.save(cachePath)
+            verbose("wrote masked text cache '%s'\n" % cachePath)
+        n = args.nToDo if args.nToDo > 0 else len(corpus)
+        return corpus.IDs[:n], corpus.isPositives[:n], corpus.texts[:n], \
+                                corpus.totalNumPos, corpus.totalNumNeg, None
+
+    testSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
+    testSet.read(args.sampleFileName)
+
+    if args.nToDo > 0: samples = testSet.getSamples()[:args.nToDo]
+    else: samples = testSet.getSamples()
+
+    return [s.getID() for s in samples], [s.isPositive() for s in samples], \
+            [s.getDocument() for s in samples], \
+            testSet.getNumPositives(), testSet.getNumNegatives(), excludeDict
+#-----------------------------------
+
+def doStaticAnalysis():
+    startTime = time.time()
+    timeString = time.ctime()
+    verbose(timeString + '\n')
+
     ## get Exclude terms
     if args.excludeFileName != 'none':
         exclude = [line.strip() for line in open(args.excludeFileName, 'r') \
@@ -105,8 +270,7 @@ def doStaticAnalysis():
     else:
         exclude = []
 
-    excludeDict = {x.lower() : x.upper() for x in exclude}
-    verbose('got %d exclude terms\n' % len(exclude))
+    excludeDict = staticLib.getExcludeDict(exclude)
 
     ## get terms to do static analysis on
     terms = []
@@ -116,46 +280,70 @@ def doStaticAnalysis():
                             if not line.startswith('#') and line.strip() != '']
         else:
             terms.append(term)
+
+    ## get the docs: raw from the sample file, or masked from the cache
+    IDs, isPositives, texts, totalNumPos, totalNumNeg, maskDict = \
+                                                getDocs(exclude, excludeDict)
+
+    t = "Analyzing %d refs from '%s'  %s\n" % (len(texts),
+                                                args.sampleFileName,timeString)
+    verbose(t)
+    sys.stdout.write(t)
+    verbose('got %d exclude terms\n' % len(exclude))
     verbose('got %d terms to analyze\n' % len(terms))
 
     ## Analyze
-    totalNumPos = testSet.getNumPositives()
-    totalNumNeg = testSet.getNumNegatives()
-    TermsAndStats = []
-
     header = "%s\t%s\t%s\t%s\t%s\t%s\n" % ('term', 'numPos', 'numNeg',
                                         'posFraction', 'negFraction', 'dValue')
     sys.stdout.write(header)
-    
-    for term in terms:
-        term = term.lower()
-        numPos = 0
-        numNeg = 0
-        for i, ref in enumerate(samples):
+
+    # profilers
+    global stageTracker
+    if args.memProfile:
+        stageTracker = profileLib.StageTracker(measureMemory=True)
+        stageTracker.start()
+    if args.profile:
+        cpuProfiler = profileLib.CpuProfiler()
+        cpuProfiler.start()
+
+    # each doc is normalized & masked once, then all terms counted
+    if args.workers > 1:
+        verbose('counting w/ %d workers\n' % args.workers)
+        counter = staticLib.countDocFreqs(texts, isPositives, terms,
+                                    excludeDict=maskDict, workers=args.workers)
+    else:
+        counter = staticLib.DocFreqCounter(terms)
+        for i, (ID, isPositive, text) in enumerate(zip(IDs, isPositives,
+                                                                    texts)):
             if i % 1000 == 0: verbose('.')
+            if stageTracker: stageTracker.setRef(ID)
 
-            text = ref.getDocument()
+            if maskDict is not None:
+                with stage('exclude'):
+                    text = staticLib.maskText(text, maskDict)
 
-            # remove exclude terms first
-            newText = text.replace('\n', ' ')
-            for exTerm, replacement in excludeDict.items():
-                splits = newText.split(exTerm)
-                newText = replacement.join(splits)
-
-            if newText.find(term) != -1:
-                if ref.isPositive():
-                    numPos += 1
-                else:
-                    numNeg += 1
-        ts = TermStats(term, numPos, numNeg)
-        ts.posFraction = numPos / totalNumPos
-        ts.negFraction = numNeg / totalNumNeg
-        ts.dValue = ts.posFraction - ts.negFraction     # discrimative value
-        TermsAndStats.append(ts)
+            with stage('find'):
+                counter.addDoc(text, isPositive)
 
+    TermsAndStats = counter.getTermStats(totalNumPos, totalNumNeg)
+    for ts in TermsAndStats:
         sys.stdout.write("'%s'\t%d\t%d\t%.2f\t%.2f\t%.2f\n" % \
                         (ts.term, ts.numPos, ts.numNeg,
                         ts.posFraction, ts.negFraction, ts.dValue))
+    if args.profile:
+        cpuProfiler.stop()
+        pstatsFile, collapsedFile = cpuProfiler.write(args.profilePrefix +
+                                                                    'profile')
+        verbose("wrote '%s' and '%s'\n" % (pstatsFile, collapsedFile))
+    if args.memProfile:
+        stageTracker.stop()
+        memFileName = args.profilePrefix + 'memprofile.txt'
+        memFile = open(memFileName, 'w')
+        memFile.write(timeString + '\n')
+        memFile.write(stageTracker.getReport())
+        memFile.close()
+        verbose("wrote '%s'\n" % memFileName)
+
     sys.stdout.write("Total Pos Refs: %d\nTotal Neg Refs: %d\n" % \
                                                 (totalNumPos, totalNumNeg))
     sys.stdout.write("Excluded terms:\n")
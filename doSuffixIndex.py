@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Build a suffix array index of a sample file (see suffixIndex.py)
+            and query it for document frequencies of terms, instantly,
+            instead of rescanning the corpus w/ doStatic.py.
+
+  build:   index the (exclusion-masked) text or figure text of a sample file
+  query:   report numPos, numNeg, posFraction, negFraction, dValue for
+            terms, in the same columns as doStatic.py. Optionally w/ example
+            contexts for each term.
+
+  Examples:
+    doSuffixIndex.py build testSet.txt cat2Exclude.txt testSet.idx
+    doSuffixIndex.py build testSet.txt cat2Exclude.txt testSet.fig.idx --figtext
+    doSuffixIndex.py query testSet.fig.idx 'in situ' 'northern blot'
+    doSuffixIndex.py query testSet.fig.idx - --contexts 3 < cat2Terms.txt
+'''
+import sys
+import time
+import argparse
+import staticLib
+import suffixIndex
+import GXD2aryRefSample as SampleLib
+#-----------------------------------
+
+sampleObjType = SampleLib.ClassifiedRefSample
+
+#-----------------------------------
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='build & query a suffix array index of a sample file ' +
+        'for term document frequencies')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    buildParser = subparsers.add_parser('build', help='build an index')
+
+    buildParser.add_argument('sampleFileName', action='store',
+        help="the sample file to read")
+
+    buildParser.add_argument('excludeFileName', action='store',
+        help="file of exclude terms to mask or 'none'")
+
+    buildParser.add_argument('indexDir', action='store',
+        help="directory to write the index to")
+
+    buildParser.add_argument('--figtext', dest='figText', action='store_true',
+        required=False,
+        help="index only the figure text (legends + 75 words around " +
+            "figure references)")
+
+    buildParser.add_argument('--shardsize', dest='shardSize', action='store',
+        required=False, type=int, default=suffixIndex.DEFAULT_SHARD_SIZE,
+        help="approx bytes of text per index shard. Default: %d" % \
+                                                suffixIndex.DEFAULT_SHARD_SIZE)
+
+    buildParser.add_argument('--maxlen', dest='maxLen', action='store',
+        required=False, type=int, default=suffixIndex.DEFAULT_MAXLEN,
+        help="longest term (bytes) the index can answer. Default: %d" % \
+                                                suffixIndex.DEFAULT_MAXLEN)
+
+    buildParser.add_argument('-l', '--limit', dest='nToDo',
+        required=False, type=int, default=0,            # 0 means ALL
+        help="only index this many references. Default is no limit")
+
+    queryParser = subparsers.add_parser('query', help='query an index')
+
+    queryParser.add_argument('indexDir', action='store',
+        help="index directory to query")
+
+    queryParser.add_argument('terms', nargs='+',
+        help="terms that you want analysis for. '-' to read terms from stdin")
+
+    queryParser.add_argument('--contexts', dest='numContexts', action='store',
+        required=False, type=int, default=0,
+        help="show this many example contexts for each term. Default: 0")
+
+    queryParser.add_argument('--width', dest='width', action='store',
+        required=False, type=int, default=40,
+        help="bytes of context on each side of a term. Default: 40")
+
+    for p in [buildParser, queryParser]:
+        p.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+            required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def doBuild():
+    startTime = time.time()
+    verbose(time.ctime() + '\n')
+
+    testSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
+    testSet.read(args.sampleFileName)
+
+    if args.nToDo > 0: samples = testSet.getSamples()[:args.nToDo]
+    else: samples = testSet.getSamples()
+
+    if args.excludeFileName != 'none':
+        exclude = [line.strip() for line in open(args.excludeFileName, 'r') \
+                            if not line.startswith('#') and line.strip() != '']
+    else:
+        exclude = []
+    excludeDict = staticLib.getExcludeDict(exclude)
+    verbose('indexing %d refs, %d exclude terms\n' % (len(samples),
+                                                                len(exclude)))
+
+    def getDocs():
+        for s in samples:
+            text = s.getDocument()
+            if args.figText:
+                text = '\n\n'.join( \
+                        SampleLib.figConverterLegCloseWords75.text2FigText(text))
+            yield s.getID(), s.isPositive(), \
+                                suffixIndex.prepText(text, excludeDict)
+
+    def progress(shardNum, numDocs):
+        verbose('..shard %d done, %d refs\n' % (shardNum, numDocs))
+
+    info = {'sampleFile' : args.sampleFileName,
+            'excludeFile': args.excludeFileName,
+            'figText'    : args.figText,
+            'built'      : time.ctime(),
+            }
+    suffixIndex.buildIndex(args.indexDir, getDocs(), testSet.getNumPositives(),
+                        testSet.getNumNegatives(), info=info,
+                        shardSize=args.shardSize, maxLen=args.maxLen,
+                        progress=progress)
+    verbose("wrote index '%s'\n" % args.indexDir)
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+#-----------------------------------
+
+def doQuery():
+    startTime = time.time()
+    index = suffixIndex.SuffixIndex.load(args.indexDir)
+    info = index.info
+
+    terms = []
+    for term in args.terms:
+        if term == '-':           # read terms from stdin
+            terms += [line[:-1] for line in sys.stdin \
+                            if not line.startswith('#') and line.strip() != '']
+        else:
+            terms.append(term)
+
+    where = 'figure text' if info.get('figText') else 'text'
+    sys.stdout.write("Analyzing %s of %d refs from '%s'  index '%s'\n" % \
+            (where, index.getNumDocs(), info.get('sampleFile'), args.indexDir))
+
+    header = "%s\t%s\t%s\t%s\t%s\t%s\n" % ('term', 'numPos', 'numNeg',
+                                        'posFraction', 'negFraction', 'dValue')
+    sys.stdout.write(header)
+    for term in terms:
+        ts = index.getTermStats(term)
+        sys.stdout.write("'%s'\t%d\t%d\t%.2f\t%.2f\t%.2f\n" % \
+                        (ts.term, ts.numPos, ts.numNeg,
+                        ts.posFraction, ts.negFraction, ts.dValue))
+        if args.numContexts:
+            for ID, context in index.getContexts(term, args.numContexts,
+                                                                args.width):
+                sys.stdout.write("    %s\t%s\n" % (ID, repr(context)))
+
+    sys.stdout.write("Total Pos Refs: %d\nTotal Neg Refs: %d\n" % \
+                                        (index.totalNumPos, index.totalNumNeg))
+    sys.stdout.write("Excluded terms from: '%s'\n" % info.get('excludeFile'))
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+#-----------------------------------
+
+def main():
+    if args.command == 'build': doBuild()
+    elif args.command == 'query': doQuery()
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
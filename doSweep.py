@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Evaluate a grid of GXD secondary triage router configurations
+            (figure text conversion type & number of words, ageContext,
+            numChars, minTextLen) in one pass over a test set, sharing the
+            text reading and searches across the configurations
+            (see routerSweep.py).
+
+  Inputs:  (stdin) Sample file of GXD classified reference records.
+            See refSample.py for the fields of these records.
+           the vocab files
+           configuration params. Each can be a comma separated list of
+            values: every combination is evaluated.
+
+  Outputs: a tab delimited table, 1 line per configuration: Precision,
+            Recall, NPV for Overall, Keeps and Discards, and TP/FP/TN/FN
+
+  Examples:
+    doSweep.py --figtextwords 50,75 < testSet.txt
+    doSweep.py --conversion legends,legParagraphs,legCloseWords \
+                --agecontext 150,210 --mintextlen 500,1000 < testSet.txt
+'''
+import sys
+import time
+import argparse
+import routerVocabs
+import routerSweep
+import GXD2aryRefSample as SampleLib
+#-----------------------------------
+
+sampleObjType = SampleLib.ClassifiedRefSample
+
+#-----------------------------------
+
+def intList(s):  return [int(x) for x in s.split(',')]
+
+def conversionList(s):
+    values = s.split(',')
+    for x in values:
+        if x not in routerSweep.CONVERSION_TYPES:
+            raise argparse.ArgumentTypeError("expected one of %s, got '%s'" \
+                        % (', '.join(routerSweep.CONVERSION_TYPES), x))
+    return values
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='evaluate a grid of router configurations in one pass, ' +
+        'read testSet from stdin')
+
+    parser.add_argument('--conversion', dest='conversionTypes',
+        type=conversionList, required=False, default=['legCloseWords'],
+        help="figure text conversion types: legends, legParagraphs, " +
+            "legCloseWords. Default: legCloseWords")
+
+    parser.add_argument('--figtextwords', dest='numFigTextWords',
+        type=intList, required=False, default=[75],
+        help="n words around figure/table references to keep as figure " +
+            "text (legCloseWords). Default: 75")
+
+    parser.add_argument('--agecontext', dest='ageContexts', type=intList,
+        required=False, default=[210],
+        help="n chars around age matches to search for age exclude terms. " +
+            "Default: 210")
+
+    parser.add_argument('--numchars', dest='numChars', type=intList,
+        required=False, default=[30],
+        help="n chars around cat1/cat2 matches to report. Default: 30")
+
+    parser.add_argument('--mintextlen', dest='minTextLens', type=intList,
+        required=False, default=[500],
+        help="refs w/ shorter text are routed Yes. Default: 500")
+
+    parser.add_argument('--vocabdir', dest='vocabDir', action='store',
+        required=False, default='.',
+        help="directory holding the vocab files. Default: '.'")
+
+    parser.add_argument('-l', '--limit', dest='nToDo',
+        required=False, type=int, default=0, 		# 0 means ALL
+        help="only process this many references. Default is no limit")
+
+    parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+        required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def main():
+    startTime = time.time()
+    configs = routerSweep.getConfigGrid(args.conversionTypes,
+                    args.numFigTextWords, args.ageContexts, args.numChars,
+                    args.minTextLens)
+    vocabs = routerVocabs.RouterVocabs.fromDir(args.vocabDir)
+    sweep = routerSweep.RouterSweep(vocabs, configs)
+
+    testSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
+    testSet.read(sys.stdin)
+    verbose('read %d refs, %d configurations\n' % (testSet.getNumSamples(),
+                                                                len(configs)))
+    samples = testSet.getSamples()
+    if args.nToDo > 0: samples = samples[:args.nToDo]
+
+    for ref in samples:
+        sweep.addRef(ref.getID(), ref.getDocument(), ref.getField('journal'),
+                    ref.isPositive(), ref.getField('relevance') == 'keep')
+
+    sys.stdout.write(sweep.getTable())
+    verbose(sweep.getReport())
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
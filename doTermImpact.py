@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Report, for every vocab term (cat1, cat2, age mappings, and the
+            exclude terms), how routing TP/FP/TN/FN and Precision/Recall/NPV
+            would change if the term were removed from its vocab - using the
+            Features.npz and TermMatrix.npz of one doRouting2 run instead of
+            a doRouting2 run per term (see termMatrix.py).
+
+           The changes are estimates (interactions between terms are
+            ignored). Confirm promising changes w/ doRouting2.
+
+  Outputs: tab delimited, 1 line per term:
+            category, term, numRefs (w/ a match to the term), numPosRefs,
+            dTP, dFP, dTN, dFN (Overall),
+            Precision, Recall, NPV w/o the term and their changes (Overall),
+            Keeps Recall, Discards NPV w/o the term
+
+  Examples:
+    doTermImpact.py Try1/
+    doTermImpact.py Try1/ --category cat2 --category cat2Exclude \
+                                                    --sort dPrecision
+    doTermImpact.py Try1/ --unused          # terms that never matched
+'''
+import sys
+import time
+import argparse
+import termMatrix
+import routingFeatures
+#-----------------------------------
+
+SORT_KEYS = ['vocab', 'numRefs', 'dPrecision', 'dRecall', 'dNPV']
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='estimate the routing impact of removing each vocab ' +
+        'term, from the output of one doRouting2 run')
+
+    parser.add_argument('baseName', action='store',
+        help="doRouting2 output base file name, e.g., 'Try1/'")
+
+    parser.add_argument('--category', dest='categories', action='append',
+        required=False, default=None, choices=termMatrix.CATEGORIES,
+        help="only report terms in this category. Repeatable. Default: all")
+
+    parser.add_argument('--sort', dest='sortKey', action='store',
+        required=False, default='vocab', choices=SORT_KEYS,
+        help="sort by vocab order or by decreasing numRefs or change. " +
+            "Default: vocab")
+
+    parser.add_argument('--unused', dest='unused', action='store_true',
+        required=False,
+        help="only list the terms that matched no refs")
+
+    parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+        required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def main():
+    startTime = time.time()
+    fm = routingFeatures.FeatureMatrix.load(args.baseName + 'Features.npz')
+    tm = termMatrix.TermMatrix.load(args.baseName + 'TermMatrix.npz')
+    verbose("loaded %d refs, %d terms, %d matching (ref, term) pairs\n" % \
+                                (len(tm), tm.getNumColumns(), len(tm.data)))
+
+    rule = routingFeatures.RoutingRule()
+    impacts = termMatrix.getTermImpacts(fm, tm, rule)
+    verbose("computed term impacts in %.3f seconds\n" % \
+                                                    (time.time() - startTime))
+
+    base = impacts.baseCounts['Overall']
+    baseP, baseR, baseNPV = routingFeatures.computeMetrics(base)
+    p, r, npv = impacts.getMetrics('Overall')
+    keepsR = impacts.getMetrics('Keeps')[1]
+    discardsNPV = impacts.getMetrics('Discards')[2]
+    counts = impacts.counts['Overall']
+
+    cols = range(len(impacts.columns))
+    if args.categories:
+        cols = [c for c in cols if termMatrix.splitColumnName( \
+                            impacts.columns[c])[0] in args.categories]
+    if args.unused:
+        cols = [c for c in cols if impacts.numRefs[c] == 0]
+    sortKeys = {'vocab'     : lambda c: c,
+                'numRefs'   : lambda c: -impacts.numRefs[c],
+                'dPrecision': lambda c: -(p[c] - baseP),
+                'dRecall'   : lambda c: -(r[c] - baseR),
+                'dNPV'      : lambda c: -(npv[c] - baseNPV),
+                }
+    cols = sorted(cols, key=sortKeys[args.sortKey])
+
+    sys.stdout.write("Rule: %s\n" % rule)
+    sys.stdout.write("As is: Precision %.2f   Recall %.2f   NPV %.2f   " \
+        "TP %d  FP %d  TN %d  FN %d\n" % (baseP, baseR, baseNPV,
+        base['TP'], base['FP'], base['TN'], base['FN']))
+    sys.stdout.write('\t'.join(['category', 'term', 'numRefs', 'numPosRefs',
+                        'dTP', 'dFP', 'dTN', 'dFN',
+                        'Precision', 'Recall', 'NPV',
+                        'dPrecision', 'dRecall', 'dNPV',
+                        'Keeps Recall', 'Discards NPV']) + '\n')
+    for c in cols:
+        category, term = termMatrix.splitColumnName(impacts.columns[c])
+        items = [category, "'%s'" % term, str(impacts.numRefs[c]),
+                    str(impacts.numPosRefs[c])]
+        items += [str(counts[t][c] - base[t])
+                                    for t in routingFeatures.PRED_TYPES]
+        items += ['%.2f' % x for x in [p[c], r[c], npv[c], p[c] - baseP,
+                        r[c] - baseR, npv[c] - baseNPV, keepsR[c],
+                        discardsNPV[c]]]
+        sys.stdout.write('\t'.join(items) + '\n')
+
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
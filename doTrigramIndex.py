@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Build a trigram index of a sample file (see trigramIndex.py) and
+            use it to run regexes - e.g., new or changed age TextMappings -
+            over just the documents they could possibly match.
+
+  build:   index the text (or figure text) of a sample file
+  query:   show the trigram query for regexes and how many docs (and
+            paragraphs) are candidates
+  scan:    run a regex or an age mapping (GXD2aryRouter.getAgeMappings())
+            over the candidate docs, report the matching refs.
+           If both --agemapping and --regex are given, the regex is a
+            changed version of the mapping: report the refs whose matches
+            change (the refs the change can affect).
+           Age mappings are run like the router does: all the age mappings
+            in one regex (AgeTextTransformer), keeping the matches of the
+            given mapping, so the 'fix' mappings and earlier mappings mask it.
+           Regexes that require no trigram (e.g., r'\bE\d') are run over all
+            the docs.
+
+  Examples:
+    doTrigramIndex.py build testSet.txt testSet.tri --figtext
+    doTrigramIndex.py query testSet.tri 'embryonic\s+days?'
+    doTrigramIndex.py scan testSet.tri --agemapping fetus --examples 5
+    doTrigramIndex.py scan testSet.tri --agemapping fetus \
+                                    --regex '\b(?:foetus|fetus(?:es)?)\b' --ids
+'''
+import sys
+import time
+import argparse
+import trigramIndex
+import GXD2aryRouter
+from utilsLib import TextTransformer
+import GXD2aryRefSample as SampleLib
+#-----------------------------------
+
+sampleObjType = SampleLib.ClassifiedRefSample
+
+#-----------------------------------
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='build a trigram index of a sample file and run regexes ' +
+        'over just the documents they could match')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    buildParser = subparsers.add_parser('build', help='build an index')
+
+    buildParser.add_argument('sampleFileName', action='store',
+        help="the sample file to read")
+
+    buildParser.add_argument('indexDir', action='store',
+        help="directory to write the index to")
+
+    buildParser.add_argument('--figtext', dest='figText', action='store_true',
+        required=False,
+        help="index only the figure text (legends + 75 words around " +
+            "figure references), the text the age mappings are run on")
+
+    buildParser.add_argument('--paragraphs', dest='paragraphs',
+        action='store_true', required=False,
+        help="also index the paragraphs of each doc")
+
+    buildParser.add_argument('-l', '--limit', dest='nToDo',
+        required=False, type=int, default=0,            # 0 means ALL
+        help="only index this many references. Default is no limit")
+
+    queryParser = subparsers.add_parser('query',
+        help='show trigram queries and candidate counts for regexes')
+
+    queryParser.add_argument('indexDir', action='store',
+        help="index directory to query")
+
+    queryParser.add_argument('regexes', nargs='+',
+        help="regexes (python syntax, matched ignoring case)")
+
+    scanParser = subparsers.add_parser('scan',
+        help='run a regex or age mapping over the candidate docs')
+
+    scanParser.add_argument('indexDir', action='store',
+        help="index directory to use")
+
+    scanParser.add_argument('--regex', dest='regex', action='store',
+        required=False, default=None,
+        help="regex to run (python syntax, matched ignoring case)")
+
+    scanParser.add_argument('--agemapping', dest='ageMapping', action='store',
+        required=False, default=None,
+        help="name of the GXD2aryRouter age mapping to run, e.g., eday")
+
+    scanParser.add_argument('--verify', dest='verify', action='store_true',
+        required=False,
+        help="also scan all docs and check the results are the same")
+
+    scanParser.add_argument('--examples', dest='numExamples', action='store',
+        required=False, type=int, default=0,
+        help="show matches for this many refs. Default: 0")
+
+    scanParser.add_argument('--ids', dest='ids', action='store_true',
+        required=False,
+        help="write only the IDs of the matching (or changed) refs")
+
+    for p in [buildParser, queryParser, scanParser]:
+        p.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+            required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    if args.command == 'scan':
+        if not args.regex and not args.ageMapping:
+            parser.error('scan needs --regex and/or --agemapping')
+        if args.ageMapping:
+            names = [m.name for m in GXD2aryRouter.getAgeMappings()]
+            if args.ageMapping not in names:
+                parser.error("unknown age mapping '%s'. Choose from: %s" % \
+                                        (args.ageMapping, ', '.join(names)))
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def doBuild():
+    startTime = time.time()
+    verbose(time.ctime() + '\n')
+
+    testSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
+    testSet.read(args.sampleFileName)
+
+    if args.nToDo > 0: samples = testSet.getSamples()[:args.nToDo]
+    else: samples = testSet.getSamples()
+    verbose('indexing %d refs\n' % len(samples))
+
+    def getDocs():
+        for s in samples:
+            text = s.getDocument()
+            if args.figText:
+                text = '\n\n'.join( \
+                        SampleLib.figConverterLegCloseWords75.text2FigText(text))
+            yield s.getID(), s.isPositive(), text
+
+    def progress(numDocs):
+        if numDocs % 1000 == 0: verbose('..%d\n' % numDocs)
+
+    info = {'sampleFile' : args.sampleFileName,
+            'figText'    : args.figText,
+            'built'      : time.ctime(),
+            }
+    trigramIndex.buildIndex(args.indexDir, getDocs(),
+                paragraphs=args.paragraphs, info=info, progress=progress)
+    verbose("wrote index '%s'\n" % args.indexDir)
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+#-----------------------------------
+
+def doQuery():
+    index = trigramIndex.TrigramIndex.load(args.indexDir)
+    numDocs = index.getNumDocs()
+    for regex in args.regexes:
+        query = trigramIndex.regexToQuery(regex)
+        candidates = index.getCandidates(query)
+        numCands = numDocs if candidates is None else len(candidates)
+        sys.stdout.write("regex: %s\n" % regex)
+        sys.stdout.write("  query: %s\n" % trigramIndex.queryToString(query))
+        sys.stdout.write("  candidate docs: %d of %d%s\n" % (numCands, numDocs,
+                        ' (full scan)' if candidates is None else ''))
+        if index.hasParagraphs:
+            paras = index.getCandidateParagraphs(query)
+            numParas = len(index.paraDocs)
+            sys.stdout.write("  candidate paragraphs: %d of %d\n" % \
+                        (numParas if paras is None else len(paras), numParas))
+#-----------------------------------
+
+def getAgeBigRegex(regex=None):
+    """ Return the AgeTextTransformer regex of all the age mappings,
+        w/ args.ageMapping's regex replaced by regex if given
+    """
+    mappings = GXD2aryRouter.getAgeMappings()
+    for m in mappings:
+        if regex and m.name == args.ageMapping: m.regex = regex
+    return TextTransformer(mappings).getBigRegex()
+
+def getMatchTexts(matches):
+    return [m.group() for m in matches]
+
+def doScan():
+    startTime = time.time()
+    index = trigramIndex.TrigramIndex.load(args.indexDir)
+    numDocs = index.getNumDocs()
+
+    regexes = []                # [(label, regex, age big regex)]
+    if args.ageMapping:
+        mapping = [m for m in GXD2aryRouter.getAgeMappings()
+                                            if m.name == args.ageMapping][0]
+        regexes.append(("mapping '%s'" % mapping.name, mapping.regex,
+                                                        getAgeBigRegex()))
+    if args.regex:
+        regexes.append(('regex', args.regex,
+                    getAgeBigRegex(args.regex) if args.ageMapping else None))
+
+    results = []                # [{doc: [matches]}] for each regex
+    for label, regex, bigRegex in regexes:
+        scanner = trigramIndex.RegexScanner(index, regex, scanRegex=bigRegex,
+                            groupName=args.ageMapping if bigRegex else None)
+        scanStart = time.time()
+        result = scanner.scan()
+        results.append(result)
+        if not args.ids:
+            sys.stdout.write("%s: %d candidate docs of %d%s, %d docs match, " \
+                    "%.3f seconds\n" % (label, len(scanner.candidates),
+                    numDocs, ' (full scan)' if scanner.isFullScan else '',
+                    len(result), time.time() - scanStart))
+        if args.verify:
+            scanner.candidates = range(numDocs)
+            if scanner.scan().keys() != result.keys():
+                sys.stdout.write("VERIFY FAILED for %s\n" % label)
+                exit(1)
+            verbose('%s verified w/ a full scan\n' % label)
+
+    if len(results) == 2:       # changed mapping: docs w/ different matches
+        old, new = results
+        docs = sorted([doc for doc in set(old.keys()) | set(new.keys())
+                    if getMatchTexts(old.get(doc, [])) !=
+                       getMatchTexts(new.get(doc, []))])
+    else:
+        old = new = results[0]
+        docs = sorted(results[0].keys())
+
+    if args.ids:
+        for doc in docs: sys.stdout.write('%s\n' % index.IDs[doc])
+        return
+
+    numPos = sum([1 for doc in docs if index.isPositives[doc]])
+    what = 'changed' if len(results) == 2 else 'matching'
+    sys.stdout.write("%s refs: %d  positive: %d  negative: %d\n" % \
+                                (what, len(docs), numPos, len(docs) - numPos))
+    for doc in docs[:args.numExamples]:
+        sys.stdout.write("  %s %s\n" % (index.IDs[doc],
+                        'pos' if index.isPositives[doc] else 'neg'))
+        if len(results) == 2:
+            sys.stdout.write("    old: %s\n" % getMatchTexts(old.get(doc,[])))
+            sys.stdout.write("    new: %s\n" % getMatchTexts(new.get(doc,[])))
+        else:
+            sys.stdout.write("    %s\n" % getMatchTexts(new.get(doc, [])))
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+#-----------------------------------
+
+def main():
+    if args.command == 'build': doBuild()
+    elif args.command == 'query': doQuery()
+    elif args.command == 'scan': doScan()
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
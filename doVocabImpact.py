@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+'''
+  Purpose: After editing vocab files, update a doRouting2 run by re-routing
+            only the refs the vocab changes can affect, and patch the run's
+            output files in place (see vocabImpact.py).
+           For the per term edit loop: edit a vocab file, run this, look at
+            the routing changes and the new Summary, repeat.
+
+  Inputs:  doRouting2 output base name (Routings.txt, Features.npz,
+            TermMatrix.npz, the match files, and vocabs/: the vocabs and
+            router options (--squeeze, --unified, --ascii) the run used.
+            The refs are re-routed w/ the same router options, so a run
+            whose vocabs/ has no router options file is not patched)
+           a trigram index of the full text of the run's sample file:
+            doTrigramIndex.py build testSet.txt testSet.tri
+           the edited vocab files
+
+  Outputs: patched Routings.txt, match files, Features.npz, TermMatrix.npz,
+            Details.txt, a new Summary.txt (w/ a paired comparison to the
+            routings before the change), and vocabs/ updated to the new
+            vocabs. Summary also to stdout.
+
+  Examples:
+    doVocabImpact.py Try1/ testSet.tri
+    doVocabImpact.py Try1/ testSet.tri --vocabdir newVocabs/ --dryrun
+'''
+import os
+import sys
+import time
+import shutil
+import argparse
+import trigramIndex
+import routerVocabs
+import routingFiles
+import routingStats
+import routingFeatures
+import vocabImpact
+#-----------------------------------
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='re-route only the refs affected by vocab changes and ' +
+        'patch the output files of a doRouting2 run')
+
+    parser.add_argument('baseName', action='store',
+        help="doRouting2 output base file name, e.g., 'Try1/'")
+
+    parser.add_argument('indexDir', action='store',
+        help="trigram index of the full text of the run's sample file")
+
+    parser.add_argument('--vocabdir', dest='vocabDir', action='store',
+        required=False, default='.',
+        help="directory holding the new vocab files. Default: '.'")
+
+    parser.add_argument('--oldvocabdir', dest='oldVocabDir', action='store',
+        required=False, default=None,
+        help="directory holding the vocab files the run used. " +
+            "Default: baseName vocabs/")
+
+    parser.add_argument('--dryrun', dest='dryRun', action='store_true',
+        required=False,
+        help="report the affected refs and routing changes, don't patch")
+
+    parser.add_argument('--bootstrap', dest='numResamples', type=int,
+        required=False, default=routingStats.DEFAULT_NUM_RESAMPLES,
+        help="bootstrap resamples for the confidence intervals in the " +
+            "summary. Default: %d" % routingStats.DEFAULT_NUM_RESAMPLES)
+
+    parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+        required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    if args.oldVocabDir is None:
+        args.oldVocabDir = args.baseName + 'vocabs/'
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def getSummary(routings, oldRun, impactReport):
+    """ Return the Summary text for the patched routings
+    """
+    run = routingStats.RoutingRun(routings.getIDs(),
+                [routings.getValue(ID, 'routing') == 'Yes'
+                                            for ID in routings.getIDs()],
+                oldRun.isPositive, oldRun.isKeep, oldRun.journals)
+    summary = routingFeatures.getSummary( \
+            {'Overall' : routingFeatures.getCounts(run.routedYes,
+                                                            run.isPositive),
+             'Keeps'   : routingFeatures.getCounts(run.routedYes,
+                                                run.isPositive, run.isKeep),
+             'Discards': routingFeatures.getCounts(run.routedYes,
+                                                run.isPositive, ~run.isKeep),
+            })
+    if args.numResamples > 0:
+        summary += routingStats.getBootstrapReport(run,
+                                                args.numResamples) + '\n'
+    summary += routingStats.getComparisonReport(oldRun, run,
+                max(args.numResamples, 1),
+                labels=('before the vocab change', 'after')) + '\n'
+    summary += impactReport + '\n'
+    return summary
+
+def main():
+    startTime = time.time()
+    timeString = time.ctime()
+
+    oldVocabs = routerVocabs.RouterVocabs.fromDir(args.oldVocabDir)
+    newVocabs = routerVocabs.RouterVocabs.fromDir(args.vocabDir)
+    changes = vocabImpact.getVocabChanges(oldVocabs, newVocabs)
+    verbose("%d vocab changes\n" % len(changes))
+    if not changes:
+        sys.stdout.write("No vocab changes between '%s' and '%s'\n" % \
+                                            (args.oldVocabDir, args.vocabDir))
+        exit(0)
+
+    snapshotDir = args.baseName + 'vocabs/'
+    try:
+        routerOptions = routerVocabs.readRouterOptions(snapshotDir)
+    except FileNotFoundError:
+        sys.stderr.write("No router options '%s' in '%s': can't re-route " \
+                            % (routerVocabs.ROUTEROPTIONSFILENAME, snapshotDir) +
+                            "the way the run did. Re-run doRouting2.py\n")
+        exit(1)
+    verbose("router options: %s\n" % routerOptions)
+    router = newVocabs.buildRouter(**routerOptions)
+    fm = routingFeatures.FeatureMatrix.load(args.baseName + 'Features.npz')
+    routings = routingFiles.RoutingsFile.read(args.baseName + 'Routings.txt')
+    index = trigramIndex.TrigramIndex.load(args.indexDir)
+
+    affected = vocabImpact.findAffectedRefs(changes, fm, index, router)
+    verbose("%d of %d refs affected  %.3f seconds\n" % (len(affected),
+                                            len(fm), time.time()-startTime))
+    oldRoutings = {ID: routings.getValue(ID, 'routing') for ID in affected}
+    oldRun = routingStats.RoutingRun(routings.getIDs(),
+                [routings.getValue(ID, 'routing') == 'Yes'
+                                            for ID in routings.getIDs()],
+                fm.isPositive, fm.isKeep, fm.journals)
+
+    results = vocabImpact.rerouteRefs(affected, fm, routings, index, router)
+    verbose("re-routed  %.3f seconds\n" % (time.time()-startTime))
+    impactReport = vocabImpact.getImpactReport(changes, affected,
+                                                        oldRoutings, results)
+    if args.dryRun:
+        sys.stdout.write(impactReport)
+        exit(0)
+
+    vocabImpact.patchRun(args.baseName, routings, fm, results, router,
+                                                                timeString)
+    # the run's vocabs are new (its router options are the same)
+    for fileName in [routerVocabs.SKIPJOURNALFILENAME,
+                        routerVocabs.CAT1EXCLUDEFILENAME,
+                        routerVocabs.CAT2TERMFILENAME,
+                        routerVocabs.CAT2EXCLUDEFILENAME,
+                        routerVocabs.AGEEXCLUDEFILENAME]:
+        shutil.copy(os.path.join(args.vocabDir, fileName), snapshotDir)
+
+    summary = getSummary(routings, oldRun, impactReport)
+    summary += "patched '%s' files: %d refs re-routed\n" % (args.baseName,
+                                                                len(results))
+    summary += "%8.3f seconds\n\n" %  (time.time()-startTime)
+    with open(args.baseName + 'Summary.txt', 'w') as fp:
+        fp.write(timeString + '\n')
+        fp.write(summary)
+    sys.stdout.write(summary)
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Propose vocab changes (term removals from cat2Terms, cat2Exclude,
+            ageExclude) that maximize routing Precision while keeping Recall
+            above a floor, from the cached match data of one doRouting2 run
+            (see vocabOptimizer.py). No re-routing, so this can search
+            many vocabs on a new curator data set overnight.
+
+  Inputs:  doRouting2 output base name (reads Features.npz, TermMatrix.npz)
+           the vocab files the doRouting2 run used
+
+  Outputs: stdout: the metric trajectory, 1 line per term removed
+           a unified diff of the vocab files w/ the proposed removals,
+            default: baseName VocabDiff.txt. Apply w/ 'patch -p0'.
+           Confirm the proposed vocabs w/ doRouting2.
+
+  Examples:
+    doVocabOptimizer.py Try1/ --minrecall 95
+    doVocabOptimizer.py Try1/ --minrecall 90 --beam 5 --subset Keeps \
+                                                --category cat2Exclude
+'''
+import sys
+import time
+import argparse
+import termMatrix
+import routingFeatures
+import vocabOptimizer
+#-----------------------------------
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='propose vocab term removals that maximize precision ' +
+        'at a recall floor, from the output of one doRouting2 run')
+
+    parser.add_argument('baseName', action='store',
+        help="doRouting2 output base file name, e.g., 'Try1/'")
+
+    parser.add_argument('--minrecall', dest='minRecall', action='store',
+        type=float, required=False, default=95.0,
+        help="Recall floor (percent). Default: 95")
+
+    parser.add_argument('--subset', dest='subset', action='store',
+        required=False, default='Overall', choices=routingFeatures.SUBSETS,
+        help="refs to compute Precision & Recall on. Default: Overall")
+
+    parser.add_argument('--category', dest='categories', action='append',
+        required=False, default=None, choices=termMatrix.CATEGORIES,
+        help="vocab to remove terms from. Repeatable. Default: " +
+            ', '.join(vocabOptimizer.DEFAULT_CATEGORIES))
+
+    parser.add_argument('--beam', dest='beamWidth', action='store',
+        type=int, required=False, default=1,
+        help="beam width. 1 is greedy. Default: 1")
+
+    parser.add_argument('--maxsteps', dest='maxSteps', action='store',
+        type=int, required=False, default=None,
+        help="max number of terms to remove. Default: no limit")
+
+    parser.add_argument('--diff', dest='diffFilename', action='store',
+        required=False, default=None,
+        help="file to write the vocab diff to. Default: baseName " +
+            "VocabDiff.txt")
+
+    parser.add_argument('--cat1exclude', dest='cat1ExcludeFile',
+        required=False, default='cat1Exclude.txt',
+        help="cat1 exclude vocab file. Default: cat1Exclude.txt")
+
+    parser.add_argument('--cat2terms', dest='cat2TermsFile',
+        required=False, default='cat2Terms.txt',
+        help="cat2 vocab file. Default: cat2Terms.txt")
+
+    parser.add_argument('--cat2exclude', dest='cat2ExcludeFile',
+        required=False, default='cat2Exclude.txt',
+        help="cat2 exclude vocab file. Default: cat2Exclude.txt")
+
+    parser.add_argument('--ageexclude', dest='ageExcludeFile',
+        required=False, default='ageExclude.txt',
+        help="age exclude vocab file. Default: ageExclude.txt")
+
+    parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+        required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    if args.categories is None:
+        args.categories = vocabOptimizer.DEFAULT_CATEGORIES
+    if args.diffFilename is None:
+        args.diffFilename = args.baseName + 'VocabDiff.txt'
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def formatState(step, state):
+    p, r, npv = state.getMetrics()
+    c = state.counts[args.subset]
+    if state.move is None: move = ('', '(as is)')
+    else: move = termMatrix.splitColumnName(state.optimizer.tm.columns[
+                                                                state.move])
+    return '\t'.join([str(step), move[0], "'%s'" % move[1],
+                        '%.2f' % p, '%.2f' % r, '%.2f' % npv] +
+                        [str(c[t]) for t in routingFeatures.PRED_TYPES]) + '\n'
+
+def main():
+    startTime = time.time()
+    fm = routingFeatures.FeatureMatrix.load(args.baseName + 'Features.npz')
+    tm = termMatrix.TermMatrix.load(args.baseName + 'TermMatrix.npz')
+    verbose("loaded %d refs, %d terms\n" % (len(tm), tm.getNumColumns()))
+
+    opt = vocabOptimizer.VocabOptimizer(fm, tm, routingFeatures.RoutingRule(),
+                        categories=args.categories, minRecall=args.minRecall,
+                        subset=args.subset)
+    verbose("%d candidate terms in %s\n" % (len(opt.candidates),
+                                                ', '.join(args.categories)))
+    def progress(step, state):
+        p, r, npv = state.getMetrics()
+        verbose("step %d: Precision %.2f Recall %.2f  %.1f seconds\n" % \
+                                        (step, p, r, time.time()-startTime))
+    best = opt.search(beamWidth=args.beamWidth, maxSteps=args.maxSteps,
+                                                        progress=progress)
+
+    sys.stdout.write("%s Recall >= %.1f, beam width %d\n" % (args.subset,
+                                            args.minRecall, args.beamWidth))
+    sys.stdout.write('\t'.join(['step', 'category', 'term removed',
+                        'Precision', 'Recall', 'NPV'] +
+                        routingFeatures.PRED_TYPES) + '\n')
+    for step, state in enumerate(best.getPath()):
+        sys.stdout.write(formatState(step, state))
+    if not best.score[0]:
+        sys.stdout.write("No vocab found w/ Recall >= %.1f\n" % args.minRecall)
+
+    vocabFiles = {'cat1Exclude': args.cat1ExcludeFile,
+                  'cat2'       : args.cat2TermsFile,
+                  'cat2Exclude': args.cat2ExcludeFile,
+                  'ageExclude' : args.ageExcludeFile,
+                 }
+    vocabFiles = {c: f for c, f in vocabFiles.items() if c in args.categories}
+    diff = vocabOptimizer.getVocabDiff(best.getRemovedTerms(), vocabFiles)
+    with open(args.diffFilename, 'w') as fp:
+        fp.write(diff)
+    verbose("wrote %d removals to '%s'\n" % (len(best.getRemovedTerms()),
+                                                        args.diffFilename))
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Evaluate variations of the GXD secondary triage routing rule
+            over the per-reference features of an earlier doRouting2 run,
+            without re-routing (see routingFeatures.py).
+
+  Inputs:  a doRouting2 Features.npz file (or a Routings.txt file)
+           rule thresholds. Each can be a comma separated list of values:
+            every combination is evaluated.
+
+  Outputs: for one rule: the doRouting2 Summary (Precision, Recall, NPV,
+            TP/FP/TN/FN for Overall, Keeps and Discards)
+           for several rules: a tab delimited table, 1 line per rule
+
+  Examples:
+    doWhatIf.py Try1/Features.npz --mincat2 2
+    doWhatIf.py Try1/Features.npz --mincat2 1,2,3 --mintextlen 500,1000 \
+                                                        --journal yes,no
+    doWhatIf.py Try1/Routings.txt --skipjournals newSkipJournals.txt
+'''
+import sys
+import time
+import argparse
+import itertools
+import routingFeatures
+#-----------------------------------
+
+def intList(s):  return [int(x) for x in s.split(',')]
+
+def boolList(s):
+    values = []
+    for x in s.split(','):
+        if x.lower() not in ('yes', 'no'):
+            raise argparse.ArgumentTypeError("expected yes or no, got '%s'"%x)
+        values.append(x.lower() == 'yes')
+    return values
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='evaluate routing rule variations on saved routing ' +
+        'features, w/o re-routing')
+
+    parser.add_argument('featureFile', action='store',
+        help="doRouting2 Features.npz file, or a Routings.txt file")
+
+    parser.add_argument('--mincat1', dest='minCat1', type=intList,
+        required=False, default=[1],
+        help="min number of cat1 matches. Default: 1")
+
+    parser.add_argument('--minage', dest='minAge', type=intList,
+        required=False, default=[1],
+        help="min number of mouse age matches. Default: 1")
+
+    parser.add_argument('--mincat2', dest='minCat2', type=intList,
+        required=False, default=[1],
+        help="min number of cat2 matches. Default: 1")
+
+    parser.add_argument('--mintextlen', dest='minTextLen', type=intList,
+        required=False, default=[500],
+        help="refs w/ shorter text are routed Yes. Default: 500")
+
+    parser.add_argument('--journal', dest='useJournal', type=boolList,
+        required=False, default=[True],
+        help="yes/no: apply the skip journal rule. Default: yes")
+
+    parser.add_argument('--skipjournals', dest='skipJournalsFile',
+        required=False, default=None,
+        help="file of journals to skip, instead of the skip list of the run")
+
+    parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+        required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def main():
+    startTime = time.time()
+    if args.featureFile.endswith('.npz'):
+        fm = routingFeatures.FeatureMatrix.load(args.featureFile)
+    else:
+        fm = routingFeatures.FeatureMatrix.fromRoutingsFile(args.featureFile)
+    verbose("loaded features of %d refs from '%s'\n" % (len(fm),
+                                                            args.featureFile))
+    skipJournals = None
+    if args.skipJournalsFile:
+        skipJournals = [line.strip() for line in open(args.skipJournalsFile)
+                            if not line.startswith('#') and line.strip() != '']
+
+    rules = [routingFeatures.RoutingRule(minCat1=c1, minAge=age, minCat2=c2,
+                useJournal=useJ, minTextLen=textLen, skipJournals=skipJournals)
+             for c1, age, c2, textLen, useJ in itertools.product(args.minCat1,
+                args.minAge, args.minCat2, args.minTextLen, args.useJournal)]
+
+    evalStart = time.time()
+    results = [routingFeatures.evaluateRule(fm, rule) for rule in rules]
+    evalTime = time.time() - evalStart
+
+    if len(rules) == 1:
+        sys.stdout.write("Rule: %s\n" % rules[0])
+        sys.stdout.write(routingFeatures.getSummary(results[0]))
+    else:
+        cols = ['rule']
+        for label in routingFeatures.SUBSETS:
+            cols += ['%s %s' % (label, m) for m in ['Precision', 'Recall',
+                                                                    'NPV']]
+        cols += routingFeatures.PRED_TYPES
+        sys.stdout.write('\t'.join(cols) + '\n')
+        for rule, result in zip(rules, results):
+            items = [str(rule)]
+            for label in routingFeatures.SUBSETS:
+                items += ['%.2f' % m for m in
+                            routingFeatures.computeMetrics(result[label])]
+            items += [str(result['Overall'][predType])
+                                for predType in routingFeatures.PRED_TYPES]
+            sys.stdout.write('\t'.join(items) + '\n')
+
+    verbose("evaluated %d rules in %.3f seconds\n" % (len(rules), evalTime))
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
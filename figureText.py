@@ -13,12 +13,18 @@ Example Usage:
     for b in converter.text2FigText(text):
         print b  # a chunk of text that contains figure related text
 
+    # or as (start, end) spans of text, w/o copying the text
+    figText = FigTextView(text, converter.text2FigSpans(text))
+    for start, end in figText.spans:
+        ... re.finditer(text, start, end) ...
+
 To run automated tests:   python test_figureText.py [-v]
 
 #######################################################################
 """
 
 import re
+import bisect
 from utilsLib import spacedOutRegex
 
 class Text2FigConverter (object):
@@ -40,12 +46,16 @@ class Text2FigConverter (object):
                                         #   'legCloseWords'
                 numWords=50,		# if 'legCloseWords', how many words
                                         #   to include on each side of "fig"
+                squeezedText=False,	# True if the text's letter spaced
+                                        #   words are squeezed, see
+                                        #   utilsLib.squeezeLetterSpacing()
                 ):
         self.conversionType = conversionType
         if conversionType not in ['legends', 'legParagraphs', 'legCloseWords']:
             raise AttributeError("invalid text2fig conversion type '%s'\n" % \
                                                     self.conversionType)
         self.numWords = numWords
+        self.legendRe = squeezedLegendRe if squeezedText else legendRe
 
     def text2FigText(self, text,
         ):
@@ -53,11 +63,111 @@ class Text2FigConverter (object):
         Return list of figure/table text blurbs in text
         """
         if self.conversionType == 'legCloseWords':
-            return text2FigText_LegendAndWords(text,self.numWords)
+            return text2FigText_LegendAndWords(text,self.numWords,
+                                                                self.legendRe)
         elif self.conversionType == 'legends':
-            return text2FigText_Legend(text)
+            return text2FigText_Legend(text, self.legendRe)
         elif self.conversionType == 'legParagraphs':
-            return text2FigText_LegendAndParagraph(text)
+            return text2FigText_LegendAndParagraph(text, self.legendRe)
+
+    def text2FigSpans(self, text,
+        ):
+        """
+        Return list of (start, end) spans of text: the figure/table text
+          blurbs of text2FigText() as spans of the original text.
+        For 'legends' and 'legParagraphs', text[start:end] is the blurb.
+        For 'legCloseWords', text[start:end] has the same words as the blurb
+          but w/ the original whitespace between them (and a figure/table
+          word that doesn't start a word, e.g., "x-fig", is not split off).
+        """
+        spans = []
+        findFigWords = self.conversionType != 'legends'
+        for start, end, isLegend, figWords in scanParagraphs(text,
+                                                findFigWords, self.legendRe):
+            if isLegend:
+                spans.append((start, end))
+            elif not figWords:
+                continue
+            elif self.conversionType == 'legParagraphs':
+                spans.append((start, end))
+            elif self.conversionType == 'legCloseWords':
+                spans += getFigureBlurbSpans(text, start, end, self.numWords,
+                                                [s for s, e in figWords])
+        return spans
+#---------------------------------
+
+class FigTextView (object):
+    """
+    IS the figure text of a document as (start, end) spans of the document
+       text, w/o copying the text.
+       Matchers scan text[start:end] for each span (e.g., w/
+       re.finditer(text, start, end)), so their match offsets are offsets
+       in the document.
+    HAS: text, spans
+    DOES: getText(): the figure text as a string (the spans joined by
+            PARAGRAPH_BOUNDARY), only built if asked for
+          getFindText(): text w/ '\n' replaced by ' ' for term searches
+            (can be passed in to share it w/ other views of the same text)
+          getPackedFindText(): the spans of getFindText() joined by
+            SPAN_SEPARATOR, for searching all the spans w/ one str.find()
+          getTextOffset(): map an offset in getText() to an offset in text
+    """
+    def __init__(self, text, spans, findText=None):
+        self.text = text
+        self.spans = spans
+        self.figText = None
+        self.findText = findText
+        self.packedFindText = None
+
+    def getText(self):
+        if self.figText is None:
+            self.figText = PARAGRAPH_BOUNDARY.join([self.text[s:e]
+                                                    for s, e in self.spans])
+        return self.figText
+
+    def getFindText(self):
+        if self.findText is None:
+            self.findText = self.text.replace('\n', ' ')
+        return self.findText
+
+    def getPackedFindText(self):
+        """ Return (packedText, packedStarts): the spans of getFindText()
+            joined by SPAN_SEPARATOR, and the offset of each span in
+            packedText.
+            So span i's offset o in packedText is spans[i][0] + o -
+            packedStarts[i] in text.
+        """
+        if self.packedFindText is None:
+            findText = self.getFindText()
+            if len(self.spans) == 1 and self.spans[0] == (0, len(findText)):
+                self.packedFindText = (findText, [0])     # no need to copy
+            else:
+                parts = []
+                packedStarts = []
+                pos = 0
+                for start, end in self.spans:
+                    parts.append(findText[start:end])
+                    packedStarts.append(pos)
+                    pos += end - start + SPAN_SEPARATOR_LEN
+                self.packedFindText = (SPAN_SEPARATOR.join(parts),
+                                                                packedStarts)
+        return self.packedFindText
+
+    def getTextOffset(self, offset):
+        """ Return the offset in text of offset in getText()
+            (offsets in the paragraph boundaries map to the end of a span)
+        """
+        for start, end in self.spans:
+            if offset <= end - start: return start + offset
+            offset -= end - start + PARAGRAPH_BOUNDARY_LEN
+        raise IndexError("offset is past the end of the figure text")
+
+    def __len__(self):
+        if not self.spans: return 0
+        return sum([e - s for s, e in self.spans]) + \
+                                PARAGRAPH_BOUNDARY_LEN * (len(self.spans) - 1)
+
+    def __str__(self): return self.getText()
 #---------------------------------
 
 # Nomenclature:
@@ -67,6 +177,10 @@ class Text2FigConverter (object):
 PARAGRAPH_BOUNDARY = '\n\n'	# defines a paragraph boundary
 PARAGRAPH_BOUNDARY_LEN = len(PARAGRAPH_BOUNDARY)
 
+SPAN_SEPARATOR = '\x00'  # between spans in FigTextView.getPackedFindText(),
+                         #  not in any term, so terms can't match across spans
+SPAN_SEPARATOR_LEN = len(SPAN_SEPARATOR)
+
 # match a word "figure" or "table" in various forms
 #  i.e.,  "fig" or "figure" or "figures" or "table" or "tables"
 figureRe = re.compile(r'\b(?:fig(?:ure)?|table)s?\b', re.IGNORECASE)
@@ -90,6 +204,35 @@ legendRe = re.compile(\
         r')\b',
         re.IGNORECASE)
 
+# legendRe for text whose letter spaced words are squeezed
+#   (utilsLib.squeezeLetterSpacing()): plain words instead of spacedOutRegex's
+#   and the words before "Figure" "Table" can run into them since squeezed
+#   words next to each other become one ("s u p p f i g" -> "suppfig")
+squeezedLegendRe = re.compile(\
+        r'\b(?:' +
+            r'(?:(?:supp(?:\w|[ ])*|online|extended[ ]*data)\s*)?' +
+            r'(?:figure|fig|table)' +
+        r')\b',
+        re.IGNORECASE)
+
+nonSpaceRe = re.compile(r'\S')		# 1st char of a paragraph (w/o strip)
+wordRe     = re.compile(r'\S+')		# the words of str.split()
+
+# match a paragraph boundary or a figureRe word, for scanParagraphs().
+#   Starts w/ a char class so the re module can skip ahead to the candidate
+#   chars instead of trying the whole pattern at each char (figureRe starts
+#   w/ \b, so it can't). The \b before the word is the negative lookbehind.
+paraOrFigureRe = re.compile(\
+        r'[\nFfTt](?:' +
+            r'(?<=\n)\n' + r'|' +
+            r'(?<!\w[Ff])(?<=[Ff])(?i:ig(?:ure)?s?)\b' + r'|' +
+            r'(?<!\w[Tt])(?<=[Tt])(?i:ables?)\b' +
+        r')')
+
+# the chars legendRe can match at the start of a paragraph (w/ IGNORECASE,
+#   "s" also matches the long s), so most paragraphs can skip legendRe
+LEGEND_START_CHARS = frozenset('SsOoEeFfTt\u017f')
+
 #---------------------------------
 
 def paragraphIterator(text,	# text (string) to search for paragraphs
@@ -105,30 +248,100 @@ def paragraphIterator(text,	# text (string) to search for paragraphs
     yield text[start: ].strip()
 #---------------------------------
 
+def paragraphSpanIterator(text,	# text (string) to search for paragraphs
+    ):
+    """iterate through the (start, end) spans of the paragraphs in text
+       (the paragraphs of paragraphIterator(), w/o copying them)
+    """
+    start = 0
+    textLen = len(text)
+    while True:
+        endPara = text.find(PARAGRAPH_BOUNDARY, start)
+        if endPara == -1: endPara = textLen
+        m = nonSpaceRe.search(text, start, endPara)
+        if m is None:
+            yield (start, start)
+        else:
+            end = endPara
+            while text[end-1].isspace(): end -= 1
+            yield (m.start(), end)
+        if endPara == textLen: break
+        start = endPara + PARAGRAPH_BOUNDARY_LEN
+#---------------------------------
+
+def scanParagraphs(text,	# text (string) to search for paragraphs
+    findFigWords=True,		# False: skip the figure/table words search
+    legendRe=legendRe,		# or squeezedLegendRe
+    ):
+    """iterate through (start, end, isLegend, [(start, end)] of figure/table
+         words) of the paragraphs in text
+       The paragraphs are the paragraphIterator() ones as (start, end) spans,
+         isLegend is legendRe.match() of the paragraph, the figure/table
+         words are the figureRe matches in it.
+       One pass through the text finds the paragraph boundaries and the
+         figure/table words together (paraOrFigureRe), w/o copying the
+         paragraphs, and legendRe is only tried on paragraphs that start
+         w/ a char it can match.
+    """
+    start = 0
+    figWords = []
+    if not findFigWords:		# only need the paragraph boundaries
+        endPara = text.find(PARAGRAPH_BOUNDARY)
+        while endPara != -1:
+            yield _scannedParagraph(text, start, endPara, figWords, legendRe)
+            start = endPara + PARAGRAPH_BOUNDARY_LEN
+            endPara = text.find(PARAGRAPH_BOUNDARY, start)
+        yield _scannedParagraph(text, start, len(text), figWords, legendRe)
+        return
+
+    for m in paraOrFigureRe.finditer(text):
+        if text[m.start()] == '\n':	# paragraph boundary
+            yield _scannedParagraph(text, start, m.start(), figWords,
+                                                                    legendRe)
+            start = m.end()
+            figWords = []
+        else:
+            figWords.append(m.span())
+    yield _scannedParagraph(text, start, len(text), figWords, legendRe)
+#---------------------------------
+
+def _scannedParagraph(text, start, end, figWords, legendRe):
+    """ Return scanParagraphs() tuple for the paragraph text[start:end]
+    """
+    while start < end and text[start].isspace(): start += 1
+    while end > start and text[end-1].isspace(): end -= 1
+    isLegend = start < end and text[start] in LEGEND_START_CHARS \
+                        and legendRe.match(text, start, end) is not None
+    return (start, end, isLegend, figWords)
+#---------------------------------
+
 def text2FigText_Legend(text,
+    legendRe=legendRe,		# or squeezedLegendRe
     ):
     """
     Return list of paragraphs in text that are figure or table legends
     (paragraph starts with "fig" or "table")
     """
-    return [ p for p in paragraphIterator(text) if legendRe.match(p) ]
+    return [ text[start:end] for start, end, isLegend, figWords
+                in scanParagraphs(text, False, legendRe) if isLegend ]
 #---------------------------------
 
-def text2FigText_LegendAndParagraph(text,):
+def text2FigText_LegendAndParagraph(text, legendRe=legendRe,):
     """
     Return list of paragraphs in text that talk about figures or tables
     (includes legends)
     """
     figParagraphs = []
 
-    for p in paragraphIterator(text):
-        if legendRe.match(p) or figureRe.search(p):
-            figParagraphs.append(p)
+    for start, end, isLegend, figWords in scanParagraphs(text, True,
+                                                                legendRe):
+        if isLegend or figWords:
+            figParagraphs.append(text[start:end])
 
     return figParagraphs
 #---------------------------------
 
-def text2FigText_LegendAndWords(text, numWords=50,):
+def text2FigText_LegendAndWords(text, numWords=50, legendRe=legendRe,):
     """
     Return list of (full) legends and parts of paragraphs that talk about
       figures or tables
@@ -137,63 +350,168 @@ def text2FigText_LegendAndWords(text, numWords=50,):
     """
     figParagraphs = []
 
-    for p in paragraphIterator(text):
-        if legendRe.match(p):		# have figure/table legend
-            figParagraphs.append(p)
-        else:				# not legend, get parts
-            figParagraphs += getFigureBlurbs(p, numWords)
+    for start, end, isLegend, figWords in scanParagraphs(text, True,
+                                                                legendRe):
+        if isLegend:			# have figure/table legend
+            figParagraphs.append(text[start:end])
+        elif figWords:			# not legend, get parts
+            figParagraphs += FigureWordIndex(text, start, end,
+                                [s for s, e in figWords]).getBlurbs(numWords)
 
     return figParagraphs
 #---------------------------------
 
-def getFigureBlurbs(text, numWords=50,):
+def getFigureBlurbs(text, numWords=50,
+    figStarts=None,		# start offsets in text of the figureRe matches
+                                #   if already found (see scanParagraphs())
+    ):
     """
     Search through text for references to figures/tables.
     Return a list of text blurbs consisting of numWords around those references
     """
-    matches = list(figureRe.finditer(text))	# all matches of fig/tbl words
-
-    if len(matches) == 0: return []
-
-    blurbs = []				# text blurbs to return
-
-    # 1st match, leading chunk before first fig/tbl word
-    m = matches[0]
-    textChunk = text[ : m.start() ]	# text before the fig/tbl word
-    words = textChunk.split()		# the words
-
-        # curBlurb is text so far of the numWords around the current
-        #   match we are looking at
-    curBlurb = ' '.join(words[-numWords:])	# Start w/ words before 1st m
+    return FigureWordIndex(text, figStarts=figStarts).getBlurbs(numWords)
+#---------------------------------
 
-    # for each match before last one,
-    #   look at textChunks between fig word matches
-    for i in range(len(matches)-1):
-        textChunk = text[ matches[i].start() : matches[i+1].start() ]
-        words = textChunk.split() 	# words incl 1st fig word but not 2nd
+class FigureWordIndex (object):
+    """
+    IS the words of a paragraph, split at its figure/table words, w/ the
+       word indexes of the figure/table words, so each blurb of numWords
+       words around them is one slice of the word list, for any numWords.
+       The words are the words of text[start:end].split(), also split at
+       the start of each figure/table word (so "x-fig" is "x-" "fig"), as
+       getFigureBlurbs() splits them.
+    HAS: words, figWords - the indexes in words of the figure/table words
+    DOES: getBlurbs(numWords)
+    """
+    def __init__(self, text, start=0, end=None,
+        figStarts=None,		# start offsets in text of the figureRe matches
+                                #   in text[start:end] if already found
+        ):
+        if end is None: end = len(text)
+        if figStarts is None:
+            figStarts = [m.start() for m in figureRe.finditer(text, start, end)]
+
+        self.words = text[start:figStarts[0]].split() if figStarts else []
+        self.figWords = []
+        for i, figStart in enumerate(figStarts):
+            nextStart = figStarts[i+1] if i+1 < len(figStarts) else end
+            self.figWords.append(len(self.words))
+            self.words += text[figStart:nextStart].split()
+
+    def getBlurbs(self, numWords=50):
+        """
+        Return the list of blurbs of numWords words around the figure/table
+          words (the blurbs of getFigureBlurbs())
+        """
+        if not self.figWords: return []
 
-        # Have '...fig ... intervening text fig...',
-        #   words[] are the words in   fig ...intervening text
-        # Could have two blurbs:  words[:numWords] and words[-numWords:]
-        # But if these two blurbs overlap, really only one blurb:
-        #   the whole intervening text
+        words = self.words
+        blurbs = [' '.join(words[first:last]) for first, last in
+                    getBlurbWordRanges(len(words), self.figWords, numWords)]
 
-        if numWords > (len(words)-1)/2:	# have overlap (-1: dont count fig word)
-            curBlurb += ' ' + ' '.join(words)	# no blurb boundary yet
+        # getFigureBlurbs() always had ' ' between the words before the 1st
+        #   figure/table word and the rest, even if there are no words before
+        if self.figWords[0] == 0: blurbs[0] = ' ' + blurbs[0]
+        return blurbs
+#---------------------------------
 
-        else:				# have 2 blurbs & blurb boundary
-            eoBlurbWords = ' '.join(words[:numWords+1]) # +1: incl 'fig' word
-            curBlurb += ' ' + eoBlurbWords
-            blurbs.append(curBlurb)			# save this blurb
+def getWordSpans(text, start=0, end=None,
+    splitAt=[],			# sorted offsets to also split words at
+    ):
+    """
+    Return ([word starts], [word ends]) of the words in text[start:end]:
+      the words of text[start:end].split(), also split at the offsets in
+      splitAt
+    """
+    if end is None: end = len(text)
+    starts = []
+    ends = []
+    for m in wordRe.finditer(text, start, end):
+        wStart = m.start()
+        i = bisect.bisect_right(splitAt, wStart)
+        while i < len(splitAt) and splitAt[i] < m.end():
+            starts.append(wStart)
+            ends.append(splitAt[i])
+            wStart = splitAt[i]
+            i += 1
+        starts.append(wStart)
+        ends.append(m.end())
+    return starts, ends
+#---------------------------------
 
-            curBlurb = ' '.join(words[-numWords:]) 	# start new blurb
+def getBlurbWordRanges(numTextWords, figWords, numWords=50,):
+    """
+    Return [(first word, last word + 1)] of the blurbs getFigureBlurbs()
+      makes from a text of numTextWords words, w/ figure/table words at the
+      (sorted) word indexes in figWords
+    """
+    def lastWords(lo, hi):		# 1st word of words[lo:hi][-numWords:]
+        if numWords == 0: return lo
+        return max(lo, hi - numWords)
+
+    ranges = []
+    blurbStart = lastWords(0, figWords[0])
+    for i in range(len(figWords)-1):
+        numChunkWords = figWords[i+1] - figWords[i]
+        if numWords > (numChunkWords-1)/2:	# overlap, no blurb boundary
+            continue
+        ranges.append((blurbStart, figWords[i] + numWords + 1))
+        blurbStart = lastWords(figWords[i], figWords[i+1])
+    ranges.append((blurbStart, min(numTextWords, figWords[-1] + numWords + 1)))
+    return ranges
+#---------------------------------
 
-    # last match, trailing chunk after last fig/tbl word
-    m = matches[len(matches) -1]
-    textChunk = text[ m.start() : ]
-    words = textChunk.split()
-    curBlurb += ' ' + ' '.join(words[:numWords+1])	# +1: incl 'fig' word
-    blurbs.append(curBlurb)
+def getFigureBlurbSpans(text, start=0, end=None, numWords=50,
+    figStarts=None,		# start offsets in text of the figureRe matches
+                                #   in text[start:end] if already found
+    ):
+    """
+    Return a list of (start, end) spans of text: the blurbs getFigureBlurbs()
+      returns for text[start:end] (see Text2FigConverter.text2FigSpans())
+    """
+    if end is None: end = len(text)
+    if figStarts is None:
+        figStarts = [m.start() for m in figureRe.finditer(text, start, end)]
+    if len(figStarts) == 0: return []
+
+    starts, ends = getWordSpans(text, start, end, figStarts)
+    figWords = [bisect.bisect_left(starts, s) for s in figStarts]
+    return [(starts[first], ends[last-1]) for first, last in
+                    getBlurbWordRanges(len(starts), figWords, numWords)]
+#---------------------------------
 
-    return blurbs
+def text2FigTextVariants(text, converters,):
+    """
+    Return a list of figure text blurb lists, one for each Text2FigConverter
+      in converters: the same as [c.text2FigText(text) for c in converters]
+      (the converters' legendRe's must be the same)
+    The text is split into paragraphs, the paragraphs are checked for
+      legends and searched for figure/table references, and the words of
+      the paragraphs w/ references are indexed (FigureWordIndex) only once
+      for all the converters.
+    """
+    needWords = [c for c in converters if c.conversionType == 'legCloseWords']
+
+    if not converters: return []
+    legendRe = converters[0].legendRe
+    paragraphs = []	# [(start, end, is legend, FigureWordIndex or None)]
+    for start, end, isLegend, figWords in scanParagraphs(text, True,
+                                                                legendRe):
+        if isLegend or (figWords and not needWords):
+            paragraphs.append((start, end, isLegend, None))
+        elif figWords:
+            paragraphs.append((start, end, isLegend, FigureWordIndex(text,
+                                    start, end, [s for s, e in figWords])))
+
+    variants = []
+    for c in converters:
+        figParagraphs = []
+        for start, end, isLegend, wordIndex in paragraphs:
+            if isLegend or c.conversionType == 'legParagraphs':
+                figParagraphs.append(text[start:end])
+            elif c.conversionType == 'legCloseWords':
+                figParagraphs += wordIndex.getBlurbs(c.numWords)
+        variants.append(figParagraphs)
+
+    return variants
 #---------------------------------
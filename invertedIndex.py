@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Persistent inverted index of the words of a sample file, w/
+            word positions and paragraph numbers, for phrase and proximity
+            queries w/o scanning the corpus:
+                "in situ"                    - a phrase
+                "in situ" near "e14.5" 10    - within 10 words of each other
+           Query results have matching doc IDs, per class (pos/neg) doc
+            counts and context snippets.
+
+  Tokens:  utilsLib.token_re words, lower cased. So "e14.5" is the phrase
+            "e14 5". Phrases are tokenized the same way as documents.
+           Paragraphs are split on '\n\n'. Phrases don't span paragraphs.
+           Word positions count words from the start of the document.
+
+  Index files (indexDir/):
+    meta.json      - doc IDs, isPositive flags, total pos/neg refs, info
+    vocab.json     - sorted list of words
+    termStarts.npy - postings of vocab[i] are postings[termStarts[i]:
+                        termStarts[i+1]], sorted by doc, position
+    postDocs.npy, postPositions.npy, postParas.npy, postCharStarts.npy
+                   - the postings: doc index, word position, paragraph
+                        number, char offset of the word in the doc text
+                        (smallest unsigned int types that fit)
+    text.npy, docOffsets.npy - utf-8 text of all docs, for snippets
+   The .npy files are memory mapped when the index is loaded.
+
+  To Use:
+    invertedIndex.buildIndex('myIndex', [(ID, isPositive, text), ...],
+                                                    totalNumPos, totalNumNeg)
+    index = invertedIndex.InvertedIndex.load('myIndex')
+    matches = index.findNear('in situ', 'e14.5', window=10)
+    numPos, numNeg = index.countDocs(matches)
+    for ID, snippet in index.getSnippets(matches, 5): ...
+
+  To Run Automated Unit Tests:  python test_invertedIndex.py [-v]
+'''
+import os
+import json
+import numpy as np
+from utilsLib import token_re
+#-----------------------------------
+
+INDEX_VERSION = 1
+PARAGRAPH_BOUNDARY = '\n\n'
+
+# Postings are compared as int64 keys: doc, paragraph, position bit fields
+POS_BITS  = 24
+PARA_BITS = 16
+DOC_BITS  = 63 - POS_BITS - PARA_BITS
+
+#-----------------------------------
+
+def tokenize(text):
+    """ Return list of (word, paragraph number, char offset) for the words
+        in text. Words are lower cased.
+    """
+    tokens = []
+    paraStart = 0
+    for paraNum, para in enumerate(text.split(PARAGRAPH_BOUNDARY)):
+        for m in token_re.finditer(para):
+            tokens.append((m.group().lower(), paraNum, paraStart + m.start()))
+        paraStart += len(para) + len(PARAGRAPH_BOUNDARY)
+    return tokens
+#-----------------------------------
+
+def phraseWords(phrase):
+    """ Return list of the words in phrase, tokenized like documents
+    """
+    return [word for word, paraNum, start in tokenize(phrase)]
+#-----------------------------------
+
+def _smallestUint(maxValue):
+    for dtype in [np.uint8, np.uint16, np.uint32]:
+        if maxValue <= np.iinfo(dtype).max: return dtype
+    return np.uint64
+
+def buildIndex(indexDir,
+                docs,               # iterator of (ID, isPositive, text)
+                totalNumPos,        # num of pos/neg refs in the sample set
+                totalNumNeg,
+                info={},            # dict of descriptive info for meta.json
+                progress=None,      # optional function(numDocs)
+                ):
+    """ Build the index and write it to indexDir.
+        Needs ~25 bytes of memory per word of the corpus.
+    """
+    os.makedirs(indexDir, exist_ok=True)
+    wordIds = {}                    # {word: id in order seen}
+    IDs, isPositives = [], []
+    docIdArrays, wordIdArrays, posArrays, paraArrays, startArrays = \
+                                                            [], [], [], [], []
+    textPieces, docOffsets = [], [0]
+
+    for docNum, (ID, isPositive, text) in enumerate(docs):
+        if progress: progress(docNum)
+        tokens = tokenize(text)
+        if len(tokens) >= 2**POS_BITS:
+            raise ValueError('%s has too many words to index' % ID)
+        IDs.append(ID)
+        isPositives.append(bool(isPositive))
+        wordIdArrays.append(np.array([wordIds.setdefault(w, len(wordIds))
+                                for w, p, s in tokens], dtype=np.int64))
+        paraArrays.append(np.array([p for w, p, s in tokens], dtype=np.int64))
+        startArrays.append(np.array([s for w, p, s in tokens], dtype=np.int64))
+        posArrays.append(np.arange(len(tokens), dtype=np.int64))
+        docIdArrays.append(np.full(len(tokens), docNum, dtype=np.int64))
+        data = text.encode('utf-8')
+        textPieces.append(data)
+        docOffsets.append(docOffsets[-1] + len(data))
+
+    def concat(arrays):
+        return np.concatenate(arrays) if arrays else np.zeros(0,dtype=np.int64)
+
+    postWordIds = concat(wordIdArrays)
+    postDocs  = concat(docIdArrays)
+    postPos   = concat(posArrays)
+    postParas = concat(paraArrays)
+    postStarts= concat(startArrays)
+
+    if len(IDs) >= 2**DOC_BITS or (len(postParas) and
+                                        postParas.max() >= 2**PARA_BITS):
+        raise ValueError('too many docs or paragraphs to index')
+
+    # renumber words alphabetically, sort postings by word (stable: keeps
+    #   them in doc, position order)
+    vocab = sorted(wordIds.keys())
+    newIds = np.zeros(len(vocab), dtype=np.int64)
+    for i, word in enumerate(vocab): newIds[wordIds[word]] = i
+    postWordIds = newIds[postWordIds] if len(postWordIds) else postWordIds
+    order = np.argsort(postWordIds, kind='stable')
+    termStarts = np.searchsorted(postWordIds[order], np.arange(len(vocab)+1))
+
+    def save(name, array):
+        np.save(os.path.join(indexDir, name + '.npy'), array)
+
+    save('termStarts', termStarts.astype(np.int64))
+    for name, values in [('postDocs', postDocs), ('postPositions', postPos),
+                    ('postParas', postParas), ('postCharStarts', postStarts)]:
+        maxValue = int(values.max()) if len(values) else 0
+        save(name, values[order].astype(_smallestUint(maxValue)))
+    save('text', np.frombuffer(b''.join(textPieces), dtype=np.uint8))
+    save('docOffsets', np.array(docOffsets, dtype=np.int64))
+
+    with open(os.path.join(indexDir, 'vocab.json'), 'w') as fp:
+        json.dump(vocab, fp)
+    meta = {'version'    : INDEX_VERSION,
+            'info'       : info,
+            'totalNumPos': totalNumPos,
+            'totalNumNeg': totalNumNeg,
+            'IDs'        : IDs,
+            'isPositives': isPositives,
+            }
+    with open(os.path.join(indexDir, 'meta.json'), 'w') as fp:
+        json.dump(meta, fp)
+#-----------------------------------
+
+class Matches (object):
+    """
+    Is a: set of query matches, sorted by doc, position
+    Has : parallel numpy arrays: docs, positions, paras, charStarts,
+            charEnds (char offsets of the whole match in the doc text)
+    """
+    def __init__(self, docs, positions, paras, charStarts, charEnds):
+        self.docs = docs
+        self.positions = positions
+        self.paras = paras
+        self.charStarts = charStarts
+        self.charEnds = charEnds
+
+    def getKeys(self):
+        return (self.docs << (POS_BITS + PARA_BITS)) | \
+                                    (self.paras << POS_BITS) | self.positions
+
+    def getDocs(self):
+        """ Return sorted array of the distinct doc indexes w/ matches
+        """
+        return np.unique(self.docs)
+
+    def __len__(self): return len(self.docs)
+# end class Matches -----------------------------------
+
+class InvertedIndex (object):
+    """
+    Is a: positional inverted index of the words of a set of documents
+    Has : vocab, postings, doc IDs, isPositive flags, doc texts
+    Does: findPhrase(), findNear(), countDocs(), getSnippets()
+    """
+    def __init__(self, indexDir, mmap=True):
+        with open(os.path.join(indexDir, 'meta.json')) as fp:
+            meta = json.load(fp)
+        if meta['version'] != INDEX_VERSION:
+            raise ValueError("index '%s' is version %s, need version %d" % \
+                                (indexDir, meta['version'], INDEX_VERSION))
+        with open(os.path.join(indexDir, 'vocab.json')) as fp:
+            self.wordIndex = {w: i for i, w in enumerate(json.load(fp))}
+        self.info = meta['info']
+        self.totalNumPos = meta['totalNumPos']
+        self.totalNumNeg = meta['totalNumNeg']
+        self.IDs = meta['IDs']
+        self.isPositives = np.array(meta['isPositives'], dtype=bool)
+
+        def load(name):
+            fileName = os.path.join(indexDir, name + '.npy')
+            if os.path.getsize(fileName) <= 128: mode = None   # empty array
+            else: mode = 'r' if mmap else None
+            return np.load(fileName, mmap_mode=mode)
+
+        self.termStarts  = load('termStarts')
+        self.postDocs    = load('postDocs')
+        self.postPositions = load('postPositions')
+        self.postParas   = load('postParas')
+        self.postCharStarts = load('postCharStarts')
+        self.text        = load('text')
+        self.docOffsets  = load('docOffsets')
+
+    @classmethod
+    def load(cls, indexDir, mmap=True):
+        return cls(indexDir, mmap)
+
+    def getNumDocs(self): return len(self.IDs)
+
+    def getWordMatches(self, word):
+        """ Return Matches for a single (lower case) word
+        """
+        i = self.wordIndex.get(word)
+        if i is None: lo, hi = 0, 0
+        else: lo, hi = int(self.termStarts[i]), int(self.termStarts[i+1])
+        charStarts = self.postCharStarts[lo:hi].astype(np.int64)
+        return Matches(self.postDocs[lo:hi].astype(np.int64),
+                        self.postPositions[lo:hi].astype(np.int64),
+                        self.postParas[lo:hi].astype(np.int64),
+                        charStarts, charStarts + len(word))
+
+    def findPhrase(self, phrase):
+        """ Return Matches for the phrase: its words consecutive in the same
+            paragraph
+        """
+        words = phraseWords(phrase)
+        if not words:
+            raise ValueError("no words in phrase '%s'" % phrase)
+        first = self.getWordMatches(words[0])
+        keep = np.ones(len(first), dtype=bool)
+        keys = first.getKeys()
+        last = first
+        for i, word in enumerate(words[1:], 1):
+            wordMatches = self.getWordMatches(word)
+            keep &= np.isin(keys + i, wordMatches.getKeys())
+            last = wordMatches
+        # char end of the match = end of the last word
+        lastKeys = last.getKeys()
+        charEnds = first.charEnds[keep]
+        if len(words) > 1 and keep.any():
+            idx = np.searchsorted(lastKeys, keys[keep] + len(words) - 1)
+            charEnds = last.charEnds[idx]
+        return Matches(first.docs[keep], first.positions[keep],
+                        first.paras[keep], first.charStarts[keep], charEnds)
+
+    def findNear(self, phrase1, phrase2, window=10, sameParagraph=False):
+        """ Return Matches for phrase1 where phrase2 is within window words
+            (words between them, either side)
+            Each match spans from the start of the 1st phrase to the end of
+            the 2nd (for snippets).
+        """
+        m1 = self.findPhrase(phrase1)
+        m2 = self.findPhrase(phrase2)
+        len1 = len(phraseWords(phrase1))
+        len2 = len(phraseWords(phrase2))
+        if not len(m1) or not len(m2):
+            return Matches(*[np.zeros(0, dtype=np.int64)] * 5)
+
+        # phrase2 occurrences sorted by (doc, position) key
+        shift = POS_BITS + PARA_BITS
+        key2 = (m2.docs << shift) | m2.positions
+        order = np.argsort(key2, kind='stable')
+        key2 = key2[order]
+        key1 = (m1.docs << shift) | m1.positions
+        # phrase2 may start from window+len2 words before phrase1 to
+        #   window+len1 words after it, in the same doc
+        lo = np.searchsorted(key2, key1 - np.minimum(m1.positions,
+                                                    window + len2), 'left')
+        hi = np.searchsorted(key2, key1 + window + len1, 'right')
+
+        keep = np.zeros(len(m1), dtype=bool)
+        charStarts = m1.charStarts.copy()
+        charEnds = m1.charEnds.copy()
+        for i in np.flatnonzero(hi > lo):
+            for j in order[lo[i]:hi[i]]:
+                if sameParagraph and m2.paras[j] != m1.paras[i]: continue
+                if m2.positions[j] == m1.positions[i] and phrase1 == phrase2:
+                    continue                # the same occurrence
+                keep[i] = True
+                charStarts[i] = min(charStarts[i], m2.charStarts[j])
+                charEnds[i] = max(charEnds[i], m2.charEnds[j])
+                break
+        return Matches(m1.docs[keep], m1.positions[keep], m1.paras[keep],
+                                        charStarts[keep], charEnds[keep])
+
+    def countDocs(self, matches):
+        """ Return (numPos, numNeg) num of pos/neg docs w/ matches
+        """
+        docs = matches.getDocs()
+        numPos = int(np.count_nonzero(self.isPositives[docs]))
+        return numPos, len(docs) - numPos
+
+    def getDocText(self, doc):
+        start, end = int(self.docOffsets[doc]), int(self.docOffsets[doc+1])
+        return self.text[start:end].tobytes().decode('utf-8')
+
+    def getSnippets(self, matches, maxSnippets=5, width=40):
+        """ Return list of (doc ID, text around the match) for up to
+            maxSnippets matches, at most one per doc
+        """
+        snippets = []
+        seen = set()
+        for i in range(len(matches)):
+            if len(snippets) >= maxSnippets: break
+            doc = int(matches.docs[i])
+            if doc in seen: continue
+            seen.add(doc)
+            text = self.getDocText(doc)
+            start = max(0, int(matches.charStarts[i]) - width)
+            end = int(matches.charEnds[i]) + width
+            snippets.append((self.IDs[doc],
+                                        text[start:end].replace('\n', ' ')))
+        return snippets
+# end class InvertedIndex -----------------------------------
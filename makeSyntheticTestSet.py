@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Write a synthetic test set: a sample file of made up GXD
+            classified reference records (see syntheticCorpus.py) that can
+            stand in for real test sets when benchmarking offline.
+
+  Outputs: Delimited file to specified output file.
+           See GXD2aryRefSample.ClassifiedRefSample for output format
+
+  Example:
+    # 10x today's ~17k ref corpus, reproducible
+    makeSyntheticTestSet.py synthetic.txt -n 170000 --seed 1
+    doBenchmark.py run synthetic.txt synthetic.bench.json
+'''
+import sys
+import time
+import argparse
+import syntheticCorpus
+import routerVocabs
+import GXD2aryRefSample as SampleLib
+#-----------------------------------
+
+sampleObjType = SampleLib.ClassifiedRefSample
+
+# for the Sample output file
+RECORDEND    = sampleObjType.getRecordEnd()
+FIELDSEP     = sampleObjType.getFieldSep()
+
+#-----------------------------------
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='Write a synthetic test set for GXD 2ndary triage proto.')
+
+    parser.add_argument('outFile', action='store',
+        help='output file to write to. "-" for stdout.')
+
+    parser.add_argument('-n', '--numrefs', dest='numRefs', action='store',
+        required=False, type=int, default=1000,
+        help="number of references to generate. Default: 1000")
+
+    parser.add_argument('--seed', dest='seed', action='store',
+        required=False, type=int, default=None,
+        help="random seed, for reproducible output. Default: none")
+
+    parser.add_argument('--vocabdir', dest='vocabDir', action='store',
+        required=False, default='.',
+        help="directory holding the vocab files to draw terms from. " +
+                "Default: '.'")
+
+    parser.add_argument('--lengths', dest='lengthDist', action='store',
+        required=False, default=syntheticCorpus.DEFAULT_LENGTH_DIST,
+        help="doc length distribution: lognormal:median:sigma, " +
+                "pareto:xmin:alpha, or fixed:length. Default: %s" % \
+                syntheticCorpus.DEFAULT_LENGTH_DIST)
+
+    parser.add_argument('--density', dest='densities', action='append',
+        required=False, default=[],
+        help="term density per 1000 words, category=n (may repeat). " +
+            "Categories: %s" % ', '.join(syntheticCorpus.DEFAULT_DENSITIES))
+
+    parser.add_argument('--posfraction', dest='positiveFraction',
+        action='store', required=False, type=float, default=0.12,
+        help="fraction of refs that are positive. Default: 0.12")
+
+    parser.add_argument('--artifacts', dest='artifactRate', action='store',
+        required=False, type=float, default=0.05,
+        help='fraction of legends that start letter-spaced, "f i g u r e". ' +
+                'Default: 0.05')
+
+    parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+        required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+
+    densities = {}
+    for d in args.densities:
+        category, value = d.split('=')
+        if category not in syntheticCorpus.DEFAULT_DENSITIES:
+            parser.error("invalid density category '%s'" % category)
+        densities[category] = float(value)
+    args.densities = densities
+
+    return args
+#-----------------------------------
+
+args = getArgs()
+
+#-----------------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+#-----------------------------------
+
+def cleanDelimiters(text):
+    """ remove RECORDEND and FIELDSEPs from text (replace w/ ' ')
+    """
+    return text.replace(RECORDEND,' ').replace(FIELDSEP,' ')
+#-----------------------------------
+
+def main():
+    startTime = time.time()
+    verbose(time.ctime() + '\n')
+
+    vocabs = routerVocabs.RouterVocabs.fromDir(args.vocabDir)
+    generator = syntheticCorpus.SyntheticRefGenerator(vocabs,
+                                seed=args.seed,
+                                densities=args.densities,
+                                lengthDist=args.lengthDist,
+                                positiveFraction=args.positiveFraction,
+                                artifactRate=args.artifactRate)
+
+    outputSampleSet = SampleLib.ClassifiedSampleSet(sampleObjType=sampleObjType)
+    outputSampleSet.setMetaItem('host', 'synthetic')
+    outputSampleSet.setMetaItem('db', 'seed=%s' % args.seed)
+
+    totalChars = 0
+    for i, fields in enumerate(generator.genRecords(args.numRefs)):
+        if i % 1000 == 0: verbose("..%d\n" % i)
+        fields['text'] = cleanDelimiters(fields['text'])
+        totalChars += len(fields['text'])
+        outputSampleSet.addSample(sampleObjType().setFields(fields))
+
+    outputSampleSet.setMetaItem('time', time.strftime("%Y/%m/%d-%H:%M:%S"))
+    outputSampleSet.write(args.outFile)
+
+    verbose("wrote %d samples, %d positive, %d chars to '%s'\n" % \
+                        (outputSampleSet.getNumSamples(),
+                        outputSampleSet.getNumPositives(), totalChars,
+                        args.outFile))
+    verbose("%8.3f seconds\n\n" %  (time.time()-startTime))
+
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
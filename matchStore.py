@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+'''
+  Purpose: A persisted, paragraph level store of everything the GXDrouter
+            searches find in each ref's full text, so routing rules that
+            search terms in a different scope (e.g., age in the full text
+            instead of the figure text, cat1 in legends only) can be
+            evaluated by filtering the stored matches instead of re-running
+            the regex's.
+
+           For each ref the store has:
+           - the paragraphs: (start, end) offsets of the stripped paragraphs
+              and whether each is a figure/table legend
+              (see figureText.scanParagraphs())
+           - the figure reference words (figureText.figureRe) in the other
+              paragraphs, and the word offsets of those paragraphs
+           - every occurrence of every cat1/cat2 term and exclude term
+              (overlapping ones too)
+           - the age mapping matches (GXD2aryRouter.getAgeMappings()), the
+              ageExclude term matches near them, overlapping ones too (within
+              the store's maxAgeContext, the largest ageContext rules can
+              use), and the text that blocks ageExcludes (see GXDrouter._isGoodAgeMatch())
+           All offsets are in the full text.
+
+           A scope is a set of (start, end) ranges of the full text:
+              'fullText'
+              'legends'          legend paragraphs
+              'legParagraphs'    legends + paragraphs w/ figure references
+              'legCloseWords/N'  legends + N words around figure references
+            (the figureText.Text2FigConverter conversion types, the
+            GXDrouter figure text is 'legCloseWords/75').
+           A match is in a scope if it is within one range.
+            Term matches are then masked like GXD2aryRouter.findMatches():
+            exclude terms first, then terms, each in vocab order, an
+            occurrence only counts if it doesn't overlap an earlier match.
+            An age match is excluded if an ageExclude match is in it, or in
+            the ageContext chars around it in the same range w/o blocking
+            text in between.
+
+           This gives the same counts as GXDrouter for the same scopes,
+            except in rare cases:
+           - figure text blurbs ('legCloseWords/N') are joined from words
+              w/ single spaces. Terms that only match once whitespace runs are
+              collapsed, and age context windows across whitespace runs,
+              differ.
+           - regex's that look at the chars around a match (\b, look
+              behinds) can see past the end of a range in the full text.
+           - terms w/o letters are not masked by earlier matches in
+              findMatches() (their upper case replacement is the same).
+
+  To Use:
+    store = matchStore.MatchStore(routerVocabs.RouterVocabs.fromDir('.'))
+    for ref in refs:
+        store.addRef(ID, text, journal, isPositive, isKeep)
+    store.save('testSet.matches')
+
+    store = matchStore.MatchStore.load('testSet.matches', vocabs)
+    fm = store.getFeatureMatrix(cat1Scope='fullText', ageScope='fullText',
+                                cat2Scope='legCloseWords/75', ageContext=210)
+    results = routingFeatures.evaluateRule(fm, routingFeatures.RoutingRule())
+
+  To Run Automated Unit Tests:  python test_matchStore.py [-v]
+'''
+import os
+import re
+import bisect
+import pickle
+import figureText
+import stageCache
+import routingFeatures
+from utilsLib import findMatchingGroup
+#-----------------------------------
+
+STORE_VERSION = 2       # bump if what is stored changes
+
+DEFAULT_MAX_AGE_CONTEXT = 300   # ageExcludes are stored this close to ages
+
+SCOPE_TYPES = ['fullText', 'legends', 'legParagraphs', 'legCloseWords']
+
+# term vocabs, in the order findMatches() masks them for each category
+TERM_VOCABS = {'cat1': ['cat1Exclude', 'cat1Terms'],
+               'cat2': ['cat2Exclude', 'cat2Terms']}
+
+#-----------------------------------
+
+def parseScope(scope):
+    """ Return (scope type, num of words or None) for a scope string,
+        e.g., 'legCloseWords/75' -> ('legCloseWords', 75)
+    """
+    scopeType, sep, numWords = scope.partition('/')
+    if scopeType not in SCOPE_TYPES or \
+                        bool(sep) != (scopeType == 'legCloseWords'):
+        raise ValueError("invalid scope '%s'. Expected one of: fullText, " \
+                "legends, legParagraphs, legCloseWords/N" % scope)
+    if scopeType == 'legCloseWords':
+        if not numWords.isdigit():
+            raise ValueError("invalid number of words in scope '%s'" % scope)
+        return (scopeType, int(numWords))
+    return (scopeType, None)
+#-----------------------------------
+
+class RefMatches (object):
+    """
+    Is a: the stored paragraphs and matches of one ref
+    Has : ID, isPositive, isKeep, journal, textLength,
+          paragraphs [(start, end, is legend)],
+          figRefs {paragraph index: ([(start, end)] of figure reference words,
+                    word starts, word ends, figure reference word indexes)}
+                  for the paragraphs that are not legends,
+          termOccurrences {vocab: {term: [start offsets]}},
+          ageMatches [(mapping name, start, end)],
+          ageExcludes [(start, end)], ageBlocks [(start, end)]
+    Does: getScopeRanges(), getTermMatches(), getAgeMatches(), getFeatures()
+    """
+    def __init__(self, ID, isPositive, isKeep, journal, textLength):
+        self.ID = ID
+        self.isPositive = isPositive
+        self.isKeep = isKeep
+        self.journal = journal
+        self.textLength = textLength
+        self.paragraphs = []
+        self.figRefs = {}
+        self.termOccurrences = {}
+        self.ageMatches = []
+        self.ageExcludes = []
+        self.ageBlocks = []
+
+    def _findParagraphs(self, text):
+        for pStart, pEnd, isLegend, refs in figureText.scanParagraphs(text):
+            if pStart == pEnd: continue
+            self.paragraphs.append((pStart, pEnd, isLegend))
+            if isLegend or not refs: continue
+
+            # words, split at the figure reference words like
+            #  getFigureBlurbs() does
+            refStarts = [s for s, e in refs]
+            starts, ends = figureText.getWordSpans(text, pStart, pEnd,
+                                                                refStarts)
+            figTokens = [bisect.bisect_left(starts, s) for s in refStarts]
+            self.figRefs[len(self.paragraphs)-1] = (refs, starts, ends,
+                                                                    figTokens)
+
+    def getScopeRanges(self, scope):
+        """ Return the sorted [(start, end)] ranges of the full text in scope
+        """
+        scopeType, numWords = parseScope(scope)
+        if scopeType == 'fullText': return [(0, self.textLength)]
+        ranges = []
+        for i, (pStart, pEnd, isLegend) in enumerate(self.paragraphs):
+            if isLegend:
+                ranges.append((pStart, pEnd))
+            elif i in self.figRefs and scopeType == 'legParagraphs':
+                ranges.append((pStart, pEnd))
+            elif i in self.figRefs and scopeType == 'legCloseWords':
+                refs, starts, ends, figTokens = self.figRefs[i]
+                for first, last in figureText.getBlurbWordRanges(len(starts),
+                                                        figTokens, numWords):
+                    ranges.append((starts[first], ends[last-1]))
+        return ranges
+
+    def getTermMatches(self, category, ranges):
+        """ Return {vocab: [(term, start, end)]} for the TERM_VOCABS of
+            category ('cat1' or 'cat2') in the ranges
+        """
+        rStarts = [s for s, e in ranges]
+        matchStarts = []            # non-overlapping matches so far, sorted
+        matchEnds = []
+        matches = {}
+        for vocab in TERM_VOCABS[category]:
+            matches[vocab] = []
+            for term, starts in self.termOccurrences[vocab].items():
+                termEnd = -1        # end of the last match of this term
+                for s in starts:
+                    e = s + len(term)
+                    if s < termEnd or not inRanges(s, e, ranges, rStarts):
+                        continue
+                    i = bisect.bisect_left(matchStarts, e)
+                    if i > 0 and matchEnds[i-1] > s: continue   # masked
+                    matchStarts.insert(i, s)
+                    matchEnds.insert(i, e)
+                    matches[vocab].append((term, s, e))
+                    termEnd = e
+        return matches
+
+    def getAgeMatches(self, ranges, ageContext=210):
+        """ Return ([(mapping name, start, end)] of the age matches in the
+            ranges, [the ones that are excluded])
+        """
+        rStarts = [s for s, e in ranges]
+        excludeStarts = [a for a, b in self.ageExcludes]
+        blockStarts = [a for a, b in self.ageBlocks]
+        good = []
+        excluded = []
+        for name, s, e in self.ageMatches:
+            if name.startswith('fix'): continue
+            i = bisect.bisect_right(rStarts, s) - 1
+            if i < 0 or e > ranges[i][1]: continue
+            preStart = max(ranges[i][0], s - ageContext)
+            postEnd = min(ranges[i][1], e + ageContext)
+            if self._isExcluded(s, e, preStart, postEnd, excludeStarts,
+                                                                blockStarts):
+                excluded.append((name, s, e))
+            else:
+                good.append((name, s, e))
+        return good, excluded
+
+    def _isExcluded(self, s, e, preStart, postEnd, excludeStarts,
+                                                                blockStarts):
+        """ Return True if an ageExclude match excludes the age match s:e
+            w/ context preStart:postEnd
+        """
+        i = bisect.bisect_left(excludeStarts, preStart)
+        for a, b in self.ageExcludes[i:]:
+            if a >= postEnd: break
+            if b > postEnd: continue
+            if a >= s and b <= e: return True                   # in match
+            if b <= s and not self._isBlocked(b, s, blockStarts):   # before
+                return True
+            if a >= e and not self._isBlocked(e, a, blockStarts):   # after
+                return True
+        return False
+
+    def _isBlocked(self, start, end, blockStarts):
+        """ Return True if blocking text is between start and end
+        """
+        i = bisect.bisect_left(blockStarts, start)
+        return i < len(self.ageBlocks) and self.ageBlocks[i][1] <= end
+
+    def getFeatures(self, skipJournals, cat1Scope='fullText',
+                        ageScope='legCloseWords/75', cat2Scope='legCloseWords/75',
+                        ageContext=210):
+        """ Return {feature name: value} for routingFeatures.FEATURE_NAMES
+            w/ cat1, age, and cat2 searched in the given scopes
+        """
+        cat1 = self.getTermMatches('cat1', self.getScopeRanges(cat1Scope))
+        cat2 = self.getTermMatches('cat2', self.getScopeRanges(cat2Scope))
+        age, ageExcluded = self.getAgeMatches(self.getScopeRanges(ageScope),
+                                                                    ageContext)
+        return {'goodJournal' : 0 if self.journal in skipJournals else 1,
+                'cat1Matches' : len(cat1['cat1Terms']),
+                'cat1Excludes': len(cat1['cat1Exclude']),
+                'ageMatches'  : len(age),
+                'ageExcludes' : len(ageExcluded),
+                'cat2Matches' : len(cat2['cat2Terms']),
+                'cat2Excludes': len(cat2['cat2Exclude']),
+                'textLength'  : self.textLength,
+                }
+# end class RefMatches -----------------------------------
+
+def inRanges(start, end, ranges, rangeStarts):
+    """ Return True if start:end is within one of the sorted ranges
+    """
+    i = bisect.bisect_right(rangeStarts, start) - 1
+    return i >= 0 and end <= ranges[i][1]
+
+def getWindows(matches, context, textLength):
+    """ Return the sorted, merged [(start, end)] of the text within context
+        chars of the (name, start, end) matches
+    """
+    windows = []
+    for name, s, e in matches:
+        wStart, wEnd = max(0, s - context), min(textLength, e + context)
+        if windows and wStart <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], wEnd))
+        else:
+            windows.append((wStart, wEnd))
+    return windows
+
+def findOccurrences(text, term):
+    """ Return [start offsets] of all occurrences of term in text,
+        overlapping ones too
+    """
+    starts = []
+    s = text.find(term)
+    while s != -1:
+        starts.append(s)
+        s = text.find(term, s + 1)
+    return starts
+#-----------------------------------
+
+class MatchStore (object):
+    """
+    Is a: a store of the paragraphs and matches of a set of refs
+    Has : the GXDrouter the matches are found w/ (built from vocabs, the
+          ageContext does not matter), the largest ageContext rules can use,
+          the fingerprint of these, {ID: RefMatches}
+    Does: addRef(), save(), load(), getFeatureMatrix()
+    """
+    def __init__(self, vocabs,      # routerVocabs.RouterVocabs
+                maxAgeContext=DEFAULT_MAX_AGE_CONTEXT,
+                ):
+        self.router = vocabs.buildRouter()
+        self.maxAgeContext = maxAgeContext
+        self.fingerprint = getStoreFingerprint(self.router, maxAgeContext)
+        self.refs = {}
+
+        # a regex for each ageExclude term, so an exclude that overlaps
+        #   another one is found too (see addRef())
+        flags = self.router.ageExcludeTextTransformer.getBigRe().flags
+        self.ageExcludeRes = [re.compile( \
+                    self.router.ageExcludeTextMapping._str2regex(t), flags)
+                                            for t in self.router.ageExclude]
+
+    def addRef(self, ID, text, journal, isPositive, isKeep):
+        """ Find and store the paragraphs and matches of a ref's full text
+        """
+        router = self.router
+        refMatches = RefMatches(ID, isPositive, isKeep, journal, len(text))
+        refMatches._findParagraphs(text)
+
+        findText = text.replace('\n', ' ')      # as findMatches() searches
+        for vocab, termDict in [('cat1Terms',   router.cat1TermsDict),
+                                ('cat1Exclude', router.cat1ExcludeDict),
+                                ('cat2Terms',   router.cat2TermsDict),
+                                ('cat2Exclude', router.cat2ExcludeDict)]:
+            refMatches.termOccurrences[vocab] = {}
+            for term in termDict:
+                starts = findOccurrences(findText, term)
+                if starts: refMatches.termOccurrences[vocab][term] = starts
+
+        for m in router.ageTextTransformer.getBigRe().finditer(text):
+            refMatches.ageMatches.append(findMatchingGroup(m))
+
+        # ageExcludes only matter within maxAgeContext of an age match.
+        # GXDrouter searches for them in the text before, in, and after
+        #   each age match separately, so an exclude that straddles the age
+        #   match doesn't hide the excludes in it (e.g., "weight" in
+        #   "fetal weight" where "fetal" is the age match): store the
+        #   matches of each term, overlapping or not.
+        ageExcludes = set()
+        for wStart, wEnd in getWindows(refMatches.ageMatches,
+                                            self.maxAgeContext, len(text)):
+            for excludeRe in self.ageExcludeRes:
+                ageExcludes.update([m.span() for m in
+                                    excludeRe.finditer(text, wStart, wEnd)])
+        refMatches.ageExcludes = sorted(ageExcludes)
+        refMatches.ageBlocks = [m.span() for m in
+                                    router.ageExcludeBlockRE.finditer(text)]
+        self.refs[ID] = refMatches
+
+    def __len__(self): return len(self.refs)
+
+    def save(self, fileName):
+        """ Write to fileName, atomically so an interrupted run can't
+            leave a truncated store
+        """
+        tmpName = fileName + '.tmp%d' % os.getpid()
+        with open(tmpName, 'wb') as fp:
+            pickle.dump((STORE_VERSION, self.maxAgeContext, self.fingerprint,
+                                list(self.refs.values())), fp,
+                                                    pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpName, fileName)
+
+    @classmethod
+    def load(cls, fileName, vocabs):
+        """ Return the MatchStore in fileName. vocabs must be the vocabs
+            it was built w/.
+        """
+        with open(fileName, 'rb') as fp:
+            version, maxAgeContext, fingerprint, refs = pickle.load(fp)
+        if version != STORE_VERSION:
+            raise ValueError("'%s' is a version %s match store, expected %d" \
+                                        % (fileName, version, STORE_VERSION))
+        store = cls(vocabs, maxAgeContext)
+        if fingerprint != store.fingerprint:
+            raise ValueError("'%s' was built w/ different vocabs" % fileName)
+        store.refs = {r.ID: r for r in refs}
+        return store
+
+    def getFeatureMatrix(self, cat1Scope='fullText',
+                        ageScope='legCloseWords/75', cat2Scope='legCloseWords/75',
+                        ageContext=210):
+        """ Return a routingFeatures.FeatureMatrix of the refs w/ cat1, age,
+            and cat2 searched in the given scopes
+        """
+        for scope in [cat1Scope, ageScope, cat2Scope]: parseScope(scope)
+        if ageContext > self.maxAgeContext:
+            raise ValueError("ageContext %d is more than the %d of the store" \
+                                            % (ageContext, self.maxAgeContext))
+        fm = routingFeatures.FeatureMatrix()
+        for r in self.refs.values():
+            fm.addRef(r.ID, r.isPositive, r.isKeep, r.journal,
+                        r.getFeatures(self.router.skipJournals, cat1Scope,
+                                            ageScope, cat2Scope, ageContext))
+        return fm._finish()
+# end class MatchStore -----------------------------------
+
+def getStoreFingerprint(router, maxAgeContext):
+    """ Return a digest of everything the stored matches depend on besides
+        the text
+    """
+    return stageCache.getFingerprint((STORE_VERSION, maxAgeContext,
+                    sorted(router.skipJournals),
+                    list(router.cat1TermsDict), list(router.cat1ExcludeDict),
+                    list(router.cat2TermsDict), list(router.cat2ExcludeDict),
+                    router.ageExclude,
+                    router.ageTextTransformer.getBigRegex(),
+                    router.ageExcludeTextTransformer.getBigRegex(),
+                    router.ageExcludeBlockRE.pattern))
+#-----------------------------------
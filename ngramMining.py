@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Mine candidate terms: find the word n-grams (1..4 words) whose
+            document frequency differs most between positive and negative
+            references (dValue = posFraction - negFraction, as in doStatic).
+
+           Counting every n-gram of a 17k reference corpus exactly needs
+            far more memory than we have, and almost all n-grams are rare.
+            So counting is done in two passes over the documents:
+            1) document frequencies of all n-grams go into a count-min
+                sketch (fixed size, never under-estimates)
+            2) exact pos/neg document frequencies are kept only for n-grams
+                whose sketch estimate is >= minDF
+            Exact counts are then pruned to n-grams w/ true df >= minDF.
+
+  Tokens: utilsLib.token_re words, within a paragraph ('\n\n'). Exclusion
+            masked words (upper cased by staticLib.maskText) break n-grams,
+            so mined terms never include text that doStatic would exclude.
+           Only tokens separated by a single space or '\n' are in the same
+            n-gram (staticLib.maskText makes '\n' a space), so every mined
+            term occurs in the text as is ("wild-type" or "e14.5" are not
+            the n-grams "wild type", "e14 5").
+           Note doStatic counts substrings, also inside longer words (e.g.,
+            'stain' in 'staining'), so doStatic's numPos/numNeg for a mined
+            term are >= the miner's token counts, and can be much higher for
+            short terms.
+
+  To Use:
+    miner = ngramMining.NgramMiner(minDF=5, maxN=4)
+    miner.mine(getDocs)     # getDocs() returns iterator of (text, isPositive)
+    for ts in miner.getTopTerms(totalNumPos, totalNumNeg, k=100):
+        print(ts.term, ts.dValue)
+
+  To Run Automated Unit Tests:  python test_ngramMining.py [-v]
+'''
+import numpy as np
+from utilsLib import token_re
+from staticLib import TermStats
+#-----------------------------------
+
+PARAGRAPH_BOUNDARY = '\n\n'
+NGRAM_GAPS = {' ', '\n'}        # text between the tokens of an n-gram
+
+#-----------------------------------
+
+def getNgrams(text, maxN=4, minN=1):
+    """ Return the set of word n-grams (minN..maxN words, joined by ' ')
+            in text.
+        N-grams don't span paragraphs, masked (non lower case) words, or
+            anything but NGRAM_GAPS between tokens (e.g., punctuation).
+    """
+    ngrams = set()
+    for para in text.split(PARAGRAPH_BOUNDARY):
+        run = []                # current run of unmasked tokens
+        end = 0                 # end of the previous token
+        for m in token_re.finditer(para):
+            token = m.group()
+            if token != token.lower():          # masked, break the run
+                run = []
+                continue
+            if para[end:m.start()] not in NGRAM_GAPS:   # not next to prev
+                run = []
+            end = m.end()
+            run.append(token)
+            if len(run) > maxN: del run[0]
+            for n in range(minN, len(run) + 1):  # n-grams ending at token
+                ngrams.add(' '.join(run[-n:]))
+    return ngrams
+#-----------------------------------
+
+class CountMinSketch (object):
+    """
+    Is a: fixed size approximate counter of items (strings)
+    Has : depth x width table of counts
+    Does: addItems(items), estimates(items). Estimates are >= true counts,
+            over-estimated by at most ~ e * totalCount / width w/ probability
+            1 - exp(-depth)
+    Note: uses python hash(), so the sketch is only meaningful within one
+            process (string hashes are randomized per process)
+    """
+    def __init__(self, width=2**22, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+        self.totalCount = 0
+
+    def _indexes(self, items):
+        """ Return depth x len(items) array of table columns for items,
+            from two hashes (Kirsch-Mitzenmacher double hashing)
+        """
+        hashes = np.fromiter(map(hash, items), dtype=np.int64,
+                                            count=len(items)).view(np.uint64)
+        h1 = hashes & np.uint64(0xffffffff)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64).reshape(-1, 1)
+        return ((h1 + rows * h2) % np.uint64(self.width)).astype(np.int64)
+
+    def addItems(self, items):
+        """ Add 1 to the count of each item in the list items
+        """
+        if not items: return
+        indexes = self._indexes(items)
+        for row in range(self.depth):
+            np.add.at(self.table[row], indexes[row], 1)
+        self.totalCount += len(items)
+
+    def estimates(self, items):
+        """ Return array of estimated counts, one per item in the list items
+        """
+        if not items: return np.zeros(0, dtype=np.uint32)
+        indexes = self._indexes(items)
+        return np.min([self.table[row][indexes[row]]
+                                    for row in range(self.depth)], axis=0)
+
+    def getNumBytes(self): return self.table.nbytes
+# end class CountMinSketch -----------------------------------
+
+class NgramMiner (object):
+    """
+    Is a: miner of discriminating word n-grams from classified documents
+    Has : count-min sketch of n-gram document frequencies,
+          {n-gram: [numPos, numNeg]} exact counts for frequent n-grams
+    Does: mine(getDocs), getTopTerms()
+    """
+    def __init__(self, minDF=5,     # ignore n-grams in fewer docs than this
+                maxN=4,             # longest n-gram, in words
+                minN=1,             # shortest n-gram
+                sketchWidth=2**22,  # count-min sketch size, width * depth *
+                sketchDepth=4,      #   4 bytes (64MB by default)
+                ):
+        self.minDF = minDF
+        self.maxN = maxN
+        self.minN = minN
+        self.sketch = CountMinSketch(sketchWidth, sketchDepth)
+        self.counts = {}            # {n-gram: [numPos, numNeg]}
+        self.numDocs = 0
+        self.numCandidates = 0      # n-grams exactly counted in pass 2
+
+    def sketchDoc(self, text):
+        """ Pass 1: add the doc's n-grams to the sketch
+        """
+        self.sketch.addItems(list(getNgrams(text, self.maxN, self.minN)))
+        self.numDocs += 1
+
+    def countDoc(self, text, isPositive):
+        """ Pass 2: exactly count the doc's n-grams that may be frequent
+        """
+        ngrams = list(getNgrams(text, self.maxN, self.minN))
+        if not ngrams: return
+        col = 0 if isPositive else 1
+        counts = self.counts
+        estimates = self.sketch.estimates(ngrams)
+        for i in np.flatnonzero(estimates >= self.minDF):
+            ngram = ngrams[i]
+            c = counts.get(ngram)
+            if c is None:
+                c = counts[ngram] = [0, 0]
+            c[col] += 1
+
+    def mine(self, getDocs, progress=None):
+        """ Do both passes.
+            getDocs: function returning a fresh iterator of (text, isPositive)
+            progress: optional function called w/ (passNum, docNum)
+        """
+        for i, (text, isPositive) in enumerate(getDocs()):
+            if progress: progress(1, i)
+            self.sketchDoc(text)
+        for i, (text, isPositive) in enumerate(getDocs()):
+            if progress: progress(2, i)
+            self.countDoc(text, isPositive)
+        self.numCandidates = len(self.counts)
+        self.counts = {ngram: c for ngram, c in self.counts.items()
+                                                if c[0] + c[1] >= self.minDF}
+
+    def getTopTerms(self, totalNumPos, totalNumNeg, k=100, lowest=False):
+        """ Return list of TermStats for the k n-grams w/ the highest
+            dValues (or lowest if lowest=True). Ties go to more frequent,
+            then alphabetically.
+        """
+        stats = [TermStats(ngram, c[0], c[1], totalNumPos, totalNumNeg)
+                                        for ngram, c in self.counts.items()]
+        sign = 1 if lowest else -1
+        stats.sort(key=lambda ts: (sign * ts.dValue,
+                                        -(ts.numPos + ts.numNeg), ts.term))
+        return stats[:k]
+# end class NgramMiner -----------------------------------
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Profiling support for doRouting2.py and doStatic.py
+           CpuProfiler    - wrap a run in cProfile, write a .pstats file and
+                            a flame graph compatible collapsed stacks file
+           StageTracker   - attribute elapsed time and peak memory
+                            (tracemalloc) to reference IDs and pipeline
+                            stages (figure text, match formatting, ...)
+
+  To Use:
+    cpuProfiler = profileLib.CpuProfiler()
+    tracker = profileLib.StageTracker(measureMemory=True)
+    cpuProfiler.start()
+    tracker.start()
+    for ref in refs:
+        tracker.setRef(ref.getID())
+        with tracker.stage('formatMatches'):
+            ...
+    tracker.stop()
+    cpuProfiler.stop()
+    cpuProfiler.write('Try1/profile')  # Try1/profile.pstats & .collapsed
+    open('Try1/memprofile.txt', 'w').write(tracker.getReport())
+
+  Collapsed stacks are one line per stack: "f1;f2;f3 microseconds", the
+  input format of flamegraph.pl and speedscope.
+  cProfile only records caller->callee edges, not whole stacks, so the
+  stacks are reconstructed by splitting each function's time among its
+  callees in proportion to their cumulative times. This is an
+  approximation, but good enough to see where the time goes.
+
+  To Run Automated Unit Tests:  python test_profileLib.py [-v]
+'''
+import time
+import pstats
+import cProfile
+import tracemalloc
+import contextlib
+#-----------------------------------
+
+class CpuProfiler (object):
+    """
+    Is a: wrapper around cProfile.Profile
+    Does: start(), stop(), write .pstats and collapsed stacks files
+    """
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self): self.profile.enable()
+    def stop(self):  self.profile.disable()
+
+    def getStats(self):
+        return pstats.Stats(self.profile)
+
+    def write(self, fileBase):
+        """ Write fileBase.pstats and fileBase.collapsed
+            Return the two filenames
+        """
+        pstatsFile    = fileBase + '.pstats'
+        collapsedFile = fileBase + '.collapsed'
+        self.profile.dump_stats(pstatsFile)
+        with open(collapsedFile, 'w') as fp:
+            for stack, micros in getCollapsedStacks(self.getStats()):
+                fp.write('%s %d\n' % (stack, micros))
+        return pstatsFile, collapsedFile
+# end class CpuProfiler -----------------------------------
+
+def funcLabel(func):
+    """ Return a flame graph label for a pstats function key
+        (filename, lineno, funcname)
+    """
+    fileName, lineNo, funcName = func
+    if fileName == '~':             # builtin
+        return funcName.replace(';', ':').replace(' ', '_')
+    baseName = fileName.split('/')[-1]
+    return ('%s:%s:%d' % (baseName, funcName, lineNo)).replace(' ', '_')
+#-----------------------------------
+
+def getCollapsedStacks(stats,
+                        minMicros=1,    # omit stacks w/ less time than this
+                        maxDepth=100,
+                        ):
+    """ Return list of (stack string, microseconds) reconstructed from a
+            pstats.Stats object.
+        stats.stats is {func: (cc, nc, tt, ct, {caller: (cc, nc, tt, ct)})}
+          tt = time in func itself, ct = cumulative time incl callees
+    """
+    # build callee edges: {caller: {callee: cumulative time on this edge}}
+    callees = {}
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+
+    roots = [func for func, s in stats.stats.items() if not s[4]]
+    stacks = {}
+
+    def descend(func, path, budget):
+        """ budget = seconds of func's cumulative time on this path
+        """
+        cc, nc, tt, ct, callers = stats.stats[func]
+        path = path + [funcLabel(func)]
+        if ct <= 0: return
+        scale = min(1.0, budget / ct)
+
+        selfMicros = int(tt * scale * 1e6)
+        if selfMicros >= minMicros:
+            key = ';'.join(path)
+            stacks[key] = stacks.get(key, 0) + selfMicros
+
+        if len(path) >= maxDepth: return
+        for callee, edgeTime in callees.get(func, {}).items():
+            if funcLabel(callee) in path: continue     # recursion
+            calleeBudget = edgeTime * scale
+            if calleeBudget * 1e6 >= minMicros:
+                descend(callee, path, calleeBudget)
+
+    for root in roots:
+        descend(root, [], stats.stats[root][3])
+
+    return sorted(stacks.items())
+#-----------------------------------
+
+class StageStats (object):
+    """ Elapsed time and peak memory for one (ref, stage)
+    """
+    def __init__(self):
+        self.count   = 0        # number of times the stage ran for the ref
+        self.seconds = 0.0      # total elapsed time
+        self.peak    = 0        # max peak bytes allocated during the stage
+#-----------------------------------
+
+class StageTracker (object):
+    """
+    Is a: tracker of time and peak memory by reference and pipeline stage
+    Has : {refID: {stage: StageStats}}
+    Does: setRef(), stage() context manager, getReport()
+    Note: stages should not be nested, since tracemalloc has only one peak
+    """
+    def __init__(self, measureMemory=True):
+        self.measureMemory = measureMemory
+        self.refStats = {}      # {refID: {stage: StageStats}}
+        self.refOrder = []      # refIDs in the order seen
+        self.curRef = None
+        self.startedTracing = False
+        self.snapshot = None    # tracemalloc snapshot taken at stop()
+
+    def start(self):
+        if self.measureMemory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.startedTracing = True
+
+    def stop(self):
+        if self.measureMemory and tracemalloc.is_tracing():
+            self.snapshot = tracemalloc.take_snapshot()
+        if self.startedTracing:
+            tracemalloc.stop()
+            self.startedTracing = False
+
+    def setRef(self, refID):
+        """ Set the reference that subsequent stages are attributed to
+        """
+        self.curRef = refID
+        if refID not in self.refStats:
+            self.refStats[refID] = {}
+            self.refOrder.append(refID)
+
+    @contextlib.contextmanager
+    def stage(self, stageName):
+        """ Context manager: attribute the time & peak memory of the
+            enclosed code to the current ref and stageName
+        """
+        tracing = self.measureMemory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - startTime
+            stats = self.refStats.setdefault(self.curRef, {}) \
+                                        .setdefault(stageName, StageStats())
+            stats.count   += 1
+            stats.seconds += elapsed
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1] - base
+                stats.peak = max(stats.peak, peak)
+
+    def getRefPeak(self, refID):
+        """ Return the max peak bytes over all stages for the ref
+        """
+        return max([s.peak for s in self.refStats[refID].values()] + [0])
+
+    def getRefSeconds(self, refID):
+        return sum([s.seconds for s in self.refStats[refID].values()])
+
+    def getStageTotals(self):
+        """ Return {stage: (total count, total seconds, max peak,
+                                                        refID w/ max peak)}
+        """
+        totals = {}
+        for refID in self.refOrder:
+            for stage, s in self.refStats[refID].items():
+                count, seconds, peak, peakRef = totals.get(stage,
+                                                        (0, 0.0, 0, None))
+                if s.peak > peak or peakRef is None:
+                    peak, peakRef = s.peak, refID
+                totals[stage] = (count + s.count, seconds + s.seconds,
+                                                            peak, peakRef)
+        return totals
+
+    def getReport(self, topN=25, numAllocSites=25):
+        """ Return report string:
+            stage summary, top refs by peak memory and by time,
+            top allocation sites still held at stop()
+        """
+        output = 'Stage summary\n'
+        output += '\t'.join(['stage', 'count', 'seconds', 'maxPeakMB',
+                                                        'maxPeakRef']) + '\n'
+        totals = self.getStageTotals()
+        for stage in sorted(totals.keys()):
+            count, seconds, peak, peakRef = totals[stage]
+            output += '\t'.join([stage, str(count), '%.3f' % seconds,
+                                '%.3f' % (peak/1e6), str(peakRef)]) + '\n'
+
+        stages = sorted(totals.keys())
+        for title, keyFunc in [('peak memory', self.getRefPeak),
+                                ('elapsed time', self.getRefSeconds)]:
+            output += '\nTop %d references by %s\n' % (topN, title)
+            output += '\t'.join(['ID', 'peakMB', 'seconds'] +
+                        ['%s peakMB/secs' % s for s in stages]) + '\n'
+            refIDs = sorted(self.refOrder, key=keyFunc, reverse=True)[:topN]
+            for refID in refIDs:
+                cols = [str(refID), '%.3f' % (self.getRefPeak(refID)/1e6),
+                                    '%.3f' % self.getRefSeconds(refID)]
+                for stage in stages:
+                    s = self.refStats[refID].get(stage)
+                    if s: cols.append('%.3f/%.3f' % (s.peak/1e6, s.seconds))
+                    else: cols.append('-')
+                output += '\t'.join(cols) + '\n'
+
+        if self.snapshot is not None:
+            output += '\nTop %d allocation sites still held at end of run\n' %\
+                                                                numAllocSites
+            for stat in self.snapshot.statistics('lineno')[:numAllocSites]:
+                output += '%s\n' % str(stat)
+        return output
+# end class StageTracker -----------------------------------
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Guard against catastrophic regex backtracking in the router.
+           Fuzz every regular expression the GXD2aryRouter uses (the age
+            mappings, the age exclude terms, the age exclude blocking re,
+            and the figure text legend/figure regexes) with adversarial
+            inputs: long runs of spaces, digits, hyphens, letter-spaced
+            words, etc.
+           For each (regex, input) pair, time the match at increasing input
+            lengths and estimate how match time scales with input length
+            (the slope of log(time) vs. log(length)).
+           A slope of ~1 is linear. Anything above the max exponent is
+            reported as super-linear.
+
+  Inputs:  the age exclude terms file (default: ageExclude.txt)
+
+  Outputs: report to stdout, one line per (regex, input) pair.
+           Exit code 1 if any pair scales super-linearly.
+
+  To Run Automated Unit Tests:  python test_regexScaling.py [-v]
+
+  Example:
+    python regexScaling.py                   # check everything
+    python regexScaling.py --sizes 2000,4000,8000,16000,32000 --maxexp 1.3
+'''
+import sys
+import re
+import math
+import time
+import argparse
+import figureText
+import GXD2aryRouter
+import routerVocabs
+import utilsLib
+#-----------------------------------
+
+DEFAULT_SIZES  = [2000, 4000, 8000, 16000]    # input lengths to time
+DEFAULT_MAXEXP = 1.5    # slope above this is considered super-linear
+DEFAULT_MINTIME = 0.002 # if the longest input takes less than this many
+                        #  seconds, don't bother computing a slope
+                        #  (timings this small are mostly noise)
+DEFAULT_REPEAT = 3      # time each match this many times, keep the best
+
+#-----------------------------------
+# Adversarial inputs.
+# Each is (name, unit): the input of length n is unit repeated to n chars.
+# These are the kinds of text PDF extraction produces that exercise the
+#  optional groups, alternations, and '[ ]*' sequences in the regexes.
+
+ADVERSARIAL_INPUTS = [
+    ('spaces',          ' '),
+    ('newlines',        '\n'),
+    ('digits',          '1'),
+    ('decimals',        '1.5'),
+    ('hyphens',         '-'),
+    ('digitHyphens',    '1-'),
+    ('eDigits',         'e1'),
+    ('eSpaceDigits',    'e 1 '),
+    ('dayDigits',       'd 1 '),
+    ('daysWords',       'days 12 abc-'),
+    ('wordHyphens',     'abc-'),
+    ('wordSpaces',      'abc '),
+    ('embryoWords',     'embryo '),
+    ('embryonicDays',   'embryonic day '),
+    ('mouseMice',       'mouse mice '),
+    ('letterSpaced',    'f i g u r e '),
+    ('letterSpacedTbl', 't a b l e '),
+    ('letterSpacedSup', 's u p p '),
+    ('letterSpacedOnl', 'o n l i n e '),
+    ('letters',         'a '),
+    ('dpc',             'd.p.c'),
+    ('cells',           '2 cell '),
+    ('periods',         '. '),
+    ('semicolons',      '; '),
+    ('hh',              'hh1'),
+    ]
+
+def getAdversarialText(unit, length):
+    """ Return a string of the given length made by repeating unit.
+    """
+    n = length // len(unit) + 1
+    return (unit * n)[:length]
+#-----------------------------------
+
+class RegexToCheck (object):
+    """
+    Is a: compiled re and how the router applies it:
+            'finditer' - scan the whole text (TextTransformer, etc.)
+            'match'    - anchored match at the start (legendRe on paragraphs)
+            'search'   - find first match (ageExcludeBlockRE)
+    """
+    def __init__(self, name, regexObj, mode='finditer'):
+        self.name = name
+        self.re   = regexObj
+        self.mode = mode
+
+    def apply(self, text):
+        """ apply the re to text the way the router does
+        """
+        if self.mode == 'finditer':
+            for m in self.re.finditer(text):
+                pass
+        elif self.mode == 'match':
+            self.re.match(text)
+        else:
+            self.re.search(text)
+#-----------------------------------
+
+def getRouterRegexes(ageExclude):
+    """ Return list of RegexToCheck for all the regexes the router uses.
+        ageExclude is the list of age exclude terms (strings)
+    """
+    regexes = []
+
+    # each age mapping on its own, then all of them together as the router
+    #  actually applies them
+    ageTransformer = GXD2aryRouter.AgeTextTransformer()
+    for m in GXD2aryRouter.getAgeMappings():
+        regexes.append(RegexToCheck('age_' + m.name,
+                                re.compile(m.regex, ageTransformer.reFlags)))
+    regexes.append(RegexToCheck('ageBigRe', ageTransformer.getBigRe()))
+
+    # the curator age exclude terms as _str2regex() converts them
+    ageExcludeMapping = GXD2aryRouter.TextMappingFromAgeExcludeTerms( \
+                                'excludeAge', ageExclude, lambda x: x.upper())
+    ageExcludeTransformer = GXD2aryRouter.TextTransformer([ageExcludeMapping])
+    regexes.append(RegexToCheck('ageExcludeTerms',
+                                ageExcludeTransformer.getBigRe()))
+
+    # ... and each exclude term on its own, so a bad term can be spotted
+    for term in ageExclude:
+        regex = ageExcludeMapping._str2regex(term)
+        regexes.append(RegexToCheck("ageExclude '%s'" % term,
+                                re.compile(regex, re.IGNORECASE)))
+
+    router = GXD2aryRouter.GXDrouter([], [], [], [], [], [])
+    regexes.append(RegexToCheck('ageExcludeBlockRE', router.ageExcludeBlockRE,
+                                                                'search'))
+    regexes.append(RegexToCheck('legendRe', figureText.legendRe, 'match'))
+    regexes.append(RegexToCheck('figureRe', figureText.figureRe))
+    regexes.append(RegexToCheck('paraOrFigureRe', figureText.paraOrFigureRe))
+    regexes.append(RegexToCheck('squeezedLegendRe', figureText.squeezedLegendRe,
+                                                                    'match'))
+    regexes.append(RegexToCheck('letterSpacedRe', utilsLib.letterSpacedRe))
+    return regexes
+#-----------------------------------
+
+def timeRegex(regexToCheck, text, repeat=DEFAULT_REPEAT):
+    """ Return the best elapsed time (seconds) of applying the regex to text
+    """
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        regexToCheck.apply(text)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+#-----------------------------------
+
+def scalingExponent(sizes, times):
+    """ Return the least squares slope of log(time) vs. log(size).
+        1.0 means time grows linearly with size, 2.0 quadratically, etc.
+    """
+    xs = [math.log(s) for s in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in times]
+    n = len(xs)
+    xMean = sum(xs) / n
+    yMean = sum(ys) / n
+    num = sum([(x - xMean) * (y - yMean) for x, y in zip(xs, ys)])
+    den = sum([(x - xMean) ** 2 for x in xs])
+    if den == 0: return 0.0
+    return num / den
+#-----------------------------------
+
+class ScalingResult (object):
+    """ The timings of one regex against one adversarial input
+    """
+    def __init__(self, regexName, inputName, sizes, times, exponent,
+                                                            superLinear):
+        self.regexName   = regexName
+        self.inputName   = inputName
+        self.sizes       = sizes
+        self.times       = times
+        self.exponent    = exponent  # None if timings too small to matter
+        self.superLinear = superLinear
+#-----------------------------------
+
+def checkScaling(regexToCheck, inputName, unit,
+                    sizes=DEFAULT_SIZES,
+                    maxExponent=DEFAULT_MAXEXP,
+                    minTime=DEFAULT_MINTIME,
+                    repeat=DEFAULT_REPEAT,
+                    ):
+    """ Time regexToCheck against unit repeated to each of the sizes.
+        Return a ScalingResult.
+    """
+    times = []
+    for size in sizes:
+        text = getAdversarialText(unit, size)
+        times.append(timeRegex(regexToCheck, text, repeat=repeat))
+
+    if times[-1] < minTime:         # too fast to matter or measure reliably
+        exponent = None
+        superLinear = False
+    else:
+        exponent = scalingExponent(sizes, times)
+        superLinear = exponent > maxExponent
+
+    return ScalingResult(regexToCheck.name, inputName, sizes, times,
+                                                    exponent, superLinear)
+#-----------------------------------
+
+def checkAllScaling(regexes, inputs=ADVERSARIAL_INPUTS, **kwargs):
+    """ Return list of ScalingResults for all regexes x inputs.
+        kwargs are passed to checkScaling()
+    """
+    results = []
+    for r in regexes:
+        for inputName, unit in inputs:
+            results.append(checkScaling(r, inputName, unit, **kwargs))
+    return results
+#-----------------------------------
+
+def formatResults(results, showAll=False):
+    """ Return report string for the results.
+        If not showAll, only report super-linear and measurable results.
+    """
+    output = '\t'.join(['status', 'exponent', 'maxTime', 'regex',
+                                                        'input']) + '\n'
+    for r in results:
+        if not showAll and r.exponent is None: continue
+        if r.superLinear: status = 'FAIL'
+        else:             status = 'ok'
+        if r.exponent is None: exp = '-'
+        else:                  exp = '%.2f' % r.exponent
+        output += '\t'.join([status, exp, '%.4f' % r.times[-1],
+                                        r.regexName, r.inputName]) + '\n'
+    return output
+#-----------------------------------
+
+def getArgs():
+
+    parser = argparse.ArgumentParser( \
+        description='fuzz the router regexes with adversarial inputs and ' +
+        'report any whose match time grows super-linearly with input length')
+
+    parser.add_argument('--ageexclude', dest='ageExcludeFileName',
+        action='store', required=False, default='ageExclude.txt',
+        help="age exclude terms file. Default: ageExclude.txt")
+
+    parser.add_argument('--sizes', dest='sizes', action='store',
+        required=False, default=','.join(map(str, DEFAULT_SIZES)),
+        help="comma separated input lengths. Default: %s" % \
+                                        ','.join(map(str, DEFAULT_SIZES)))
+
+    parser.add_argument('--maxexp', dest='maxExponent', action='store',
+        required=False, type=float, default=DEFAULT_MAXEXP,
+        help="fail if the time vs. length exponent is above this. " +
+                "Default: %.2f" % DEFAULT_MAXEXP)
+
+    parser.add_argument('--mintime', dest='minTime', action='store',
+        required=False, type=float, default=DEFAULT_MINTIME,
+        help="ignore pairs whose longest input takes less than this many " +
+                "seconds. Default: %.4f" % DEFAULT_MINTIME)
+
+    parser.add_argument('--regex', dest='regexFilter', action='store',
+        required=False, default=None,
+        help="only check regexes whose name contains this string")
+
+    parser.add_argument('--all', dest='showAll', action='store_true',
+        required=False, help="report all pairs, not just measurable ones")
+
+    parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+        required=False, help="skip helpful messages to stderr")
+
+    args =  parser.parse_args()
+    args.sizes = [int(s) for s in args.sizes.split(',')]
+
+    return args
+#-----------------------------------
+
+def main():
+    args = getArgs()
+    startTime = time.time()
+
+    regexes = getRouterRegexes( \
+                    routerVocabs.readAgeExcludeFile(args.ageExcludeFileName))
+    if args.regexFilter:
+        regexes = [r for r in regexes if args.regexFilter in r.name]
+
+    if args.verbose:
+        sys.stderr.write('checking %d regexes x %d inputs, sizes %s\n' % \
+                        (len(regexes), len(ADVERSARIAL_INPUTS), args.sizes))
+
+    results = checkAllScaling(regexes, sizes=args.sizes,
+                        maxExponent=args.maxExponent, minTime=args.minTime)
+    sys.stdout.write(formatResults(results, showAll=args.showAll))
+
+    failures = [r for r in results if r.superLinear]
+    sys.stdout.write('%d of %d regex/input pairs are super-linear\n' % \
+                                                (len(failures), len(results)))
+    if args.verbose:
+        sys.stderr.write("%8.3f seconds\n" %  (time.time()-startTime))
+
+    if failures: exit(1)
+    exit(0)
+#-----------------------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Differential testing of router engines.
+           Run the reference GXDrouter and a candidate router (any object with
+            the GXDrouter routeThisRef() and get*() methods) side by side over
+            the same documents and compare, for each reference:
+            - the routing decision, goodJournal, timedOut
+            - the number of matches in each match list
+            - the MatchRcd fields of each match
+           Report the divergences with context, and shrink the documents of
+            divergent references to minimal snippets that still reproduce
+            the divergence (delta debugging).
+
+  To Use:
+    import routerEquivalence as eq
+    checker = eq.EquivalenceChecker(refRouter, candRouter)
+    for ID, text, journal in docs:
+        checker.checkRef(ID, text, journal)
+    print(checker.getReport())
+
+  To Run Automated Unit Tests:  python test_routerEquivalence.py [-v]
+'''
+from GXD2aryRouter import PARABOUNDARY
+#-----------------------------------
+
+# the router match lists compared, getter name is 'get' + list name
+MATCH_LISTS = ['Cat1Matches', 'Cat1Excludes', 'AgeMatches', 'AgeExcludes',
+                                                'Cat2Matches', 'Cat2Excludes']
+
+MATCHRCD_FIELDS = ['matchType', 'start', 'end', 'matchText', 'preText',
+                                                    'postText', 'replText']
+CONTEXTLEN = 60         # chars of doc text to show around a divergence
+
+#-----------------------------------
+
+def getRoutingSignature(router, routing, ignoreFields=set(), ordered=True):
+    """ Return a comparable summary of the router's most recent routing:
+        dict {name: value} with
+            'routing', 'goodJournal', 'timedOut' and
+            each MATCH_LISTS name: list of tuples of MatchRcd field values
+        ignoreFields: MatchRcd field names to leave out of the comparison
+        ordered: False to compare match lists as sorted lists, so candidates
+            may find matches in a different order
+    """
+    fields = [f for f in MATCHRCD_FIELDS if f not in ignoreFields]
+    sig = {'routing'    : routing,
+           'goodJournal': router.getGoodJournal(),
+           'timedOut'   : getattr(router, 'getTimedOut', lambda: False)(),
+          }
+    for name in MATCH_LISTS:
+        matches = [tuple([getattr(m, f) for f in fields])
+                                    for m in getattr(router, 'get' + name)()]
+        if not ordered: matches.sort(key=str)
+        sig[name] = matches
+    return sig
+#-----------------------------------
+
+class Divergence (object):
+    """ One difference between the reference and candidate routers
+        for one reference document
+    """
+    def __init__(self, refID, what, refValue, candValue):
+        self.refID     = refID
+        self.what      = what       # e.g., 'routing', 'Cat2Matches count',
+                                    #    'Cat2Matches[3].preText'
+        self.refValue  = refValue
+        self.candValue = candValue  # values are None if missing, or tuples
+                                    #   of MatchRcd field values for matches
+#-----------------------------------
+
+def diffSignatures(refID, refSig, candSig, maxDiffs=None):
+    """ Return list of Divergences between two routing signatures
+    """
+    diffs = []
+    for name in ['routing', 'goodJournal', 'timedOut']:
+        if refSig[name] != candSig[name]:
+            diffs.append(Divergence(refID, name, refSig[name], candSig[name]))
+
+    for name in MATCH_LISTS:
+        refMatches  = refSig[name]
+        candMatches = candSig[name]
+        if len(refMatches) != len(candMatches):
+            diffs.append(Divergence(refID, name + ' count', len(refMatches),
+                                                            len(candMatches)))
+        for i in range(min(len(refMatches), len(candMatches))):
+            if refMatches[i] != candMatches[i]:
+                diffs.append(Divergence(refID, '%s[%d]' % (name, i),
+                                        refMatches[i], candMatches[i]))
+        if len(refMatches) > len(candMatches):
+            for i in range(len(candMatches), len(refMatches)):
+                diffs.append(Divergence(refID, '%s[%d]' % (name, i),
+                                                        refMatches[i], None))
+        elif len(candMatches) > len(refMatches):
+            for i in range(len(refMatches), len(candMatches)):
+                diffs.append(Divergence(refID, '%s[%d]' % (name, i),
+                                                        None, candMatches[i]))
+    if maxDiffs: diffs = diffs[:maxDiffs]
+    return diffs
+#-----------------------------------
+
+def ddmin(items, isFailing, maxTests=200):
+    """ Delta debugging: shrink the list items to a smaller list that
+            still makes isFailing(list) return True.
+        Assumes isFailing(items) is True.
+        Stops after maxTests calls to isFailing().
+        Return the smallest failing list found.
+    """
+    numTests = 0
+    n = 2
+    while len(items) >= 2 and numTests < maxTests:
+        chunkSize = max(1, len(items) // n)
+        chunks = [items[i:i+chunkSize] for i in range(0,len(items),chunkSize)]
+        reduced = False
+
+        for i in range(len(chunks)):     # try removing each chunk
+            if numTests >= maxTests: break
+            complement = [x for j, c in enumerate(chunks) if j != i for x in c]
+            numTests += 1
+            if complement and isFailing(complement):
+                items = complement
+                n = max(n - 1, 2)
+                reduced = True
+                break
+
+        if not reduced:
+            if n >= len(items): break       # at single item granularity
+            n = min(n * 2, len(items))
+    return items
+#-----------------------------------
+
+class EquivalenceChecker (object):
+    """
+    Is a: object that runs a reference router and a candidate router over
+            reference documents and records where they diverge
+    Has : the two routers, counts of refs checked and divergent,
+          the divergences found for the first maxReport divergent refs
+    Does: checkRef(), minimize(), getReport()
+    """
+    def __init__(self, refRouter, candRouter,
+                ignoreFields=set(),     # MatchRcd fields to not compare
+                ordered=True,           # compare match lists in order
+                maxReport=10,           # report details for this many refs
+                maxDiffsPerRef=5,       # report this many diffs per ref
+                minimize=True,          # find minimal reproducing snippets
+                maxTests=200,           # ... w/ at most this many re-routings
+                ):
+        self.refRouter  = refRouter
+        self.candRouter = candRouter
+        self.ignoreFields = set(ignoreFields)
+        self.ordered    = ordered
+        self.maxReport  = maxReport
+        self.maxDiffsPerRef = maxDiffsPerRef
+        self.doMinimize = minimize
+        self.maxTests   = maxTests
+
+        self.numChecked   = 0
+        self.numDivergent = 0
+        self.numRoutingDiffs = 0
+        self.diffCounts   = {}  # {list name or 'routing'...: num refs}
+        self.reported     = []  # [(refID, [Divergences], context, snippet)]
+
+    def _route(self, router, text, journal):
+        routing = router.routeThisRef(text, journal)
+        return getRoutingSignature(router, routing, self.ignoreFields,
+                                                                self.ordered)
+
+    def diffRef(self, refID, text, journal):
+        """ Route text with both routers. Return list of Divergences
+        """
+        refSig  = self._route(self.refRouter,  text, journal)
+        candSig = self._route(self.candRouter, text, journal)
+        return diffSignatures(refID, refSig, candSig)
+
+    def checkRef(self, refID, text, journal):
+        """ Route the reference with both routers and record divergences.
+            Return True if they agree.
+        """
+        self.numChecked += 1
+        diffs = self.diffRef(refID, text, journal)
+        if not diffs: return True
+
+        self.numDivergent += 1
+        whats = set([d.what.split('[')[0].replace(' count', '')
+                                                            for d in diffs])
+        for w in whats:
+            self.diffCounts[w] = self.diffCounts.get(w, 0) + 1
+        if 'routing' in whats: self.numRoutingDiffs += 1
+
+        if len(self.reported) < self.maxReport:
+            diffs = diffs[:self.maxDiffsPerRef]
+            context = self.getContext(text, diffs)
+            if self.doMinimize:
+                snippet = self.minimize(refID, text, journal)
+            else:
+                snippet = None
+            self.reported.append((refID, diffs, context, snippet))
+        return False
+
+    def getContext(self, text, diffs):
+        """ Return the reference router's searched text around the 1st
+            divergent match (or '').
+            Cat1 match coords are in the full text, age & cat2 match coords
+            are in the figure text.
+        """
+        for d in diffs:
+            value = d.refValue if d.refValue is not None else d.candValue
+            if type(value) != type(()) or 'start' in self.ignoreFields:
+                continue
+            start = value[[f for f in MATCHRCD_FIELDS
+                                if f not in self.ignoreFields].index('start')]
+            if not d.what.startswith('Cat1'):
+                text = PARABOUNDARY.join( \
+                            self.refRouter.figTextConverter.text2FigText(text))
+            if start < len(text):
+                return text[max(0, start-CONTEXTLEN) : start+CONTEXTLEN]
+        return ''
+
+    def minimize(self, refID, text, journal):
+        """ Return a small snippet of text that still makes the routers
+            diverge. Shrink by paragraphs first, then by words.
+        """
+        def isFailing(pieces, sep):
+            return len(self.diffRef(refID, sep.join(pieces), journal)) > 0
+
+        paragraphs = text.split('\n\n')
+        paragraphs = ddmin(paragraphs, lambda p: isFailing(p, '\n\n'),
+                                                    maxTests=self.maxTests)
+        snippet = '\n\n'.join(paragraphs)
+
+        words = snippet.split(' ')
+        words = ddmin(words, lambda w: isFailing(w, ' '),
+                                                    maxTests=self.maxTests)
+        snippet = ' '.join(words)
+        return snippet
+
+    def getSummary(self):
+        """ Return summary counts as a string
+        """
+        output = 'References checked:   %d\n' % self.numChecked
+        output += 'Divergent references: %d\n' % self.numDivergent
+        output += 'Routing differences:  %d\n' % self.numRoutingDiffs
+        for w in sorted(self.diffCounts.keys()):
+            output += '    refs w/ %s differences: %d\n' % \
+                                                    (w, self.diffCounts[w])
+        return output
+
+    def getReport(self):
+        """ Return the summary and details for the reported refs
+        """
+        output = self.getSummary()
+        for (refID, diffs, context, snippet) in self.reported:
+            output += '\n' + '-' * 50 + '\n'
+            output += 'Reference %s\n' % refID
+            for d in diffs:
+                output += '  %s\n' % d.what
+                output += '    reference: %s\n' % repr(d.refValue)
+                output += '    candidate: %s\n' % repr(d.candValue)
+            if context:
+                output += '  context: %s\n' % repr(context)
+            if snippet is not None:
+                output += '  minimal reproducing snippet (%d chars):\n' % \
+                                                                len(snippet)
+                output += '    %s\n' % repr(snippet)
+        return output
+# end class EquivalenceChecker -----------------------------------
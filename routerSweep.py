@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Evaluate a grid of GXDrouter configurations in one pass over a
+            set of refs, instead of one doRouting2 run per configuration.
+           A configuration (SweepConfig) is the figure text conversion type
+            ('legends', 'legParagraphs', 'legCloseWords') and number of
+            words (numFigTextWords), ageContext, numChars, and minTextLen.
+
+           Each ref's text is read once, and the work is shared across the
+            configurations:
+           - cat1 is searched once: it doesn't depend on any of these params
+           - the text is split into paragraphs, and the paragraphs are
+              checked for legends and searched for figure references once for
+              all the figure text conversions
+              (see figureText.text2FigTextVariants())
+           - age and cat2 are searched once for each distinct figure text.
+              Conversions that give the same figure text for a ref (e.g.,
+              refs w/ only legends) share the searches.
+           - age matches are found once w/ the largest ageContext. The
+              pre/post text of a smaller context are the ends of the larger
+              ones, so each smaller context only re-checks the ageExclude
+              terms in truncated copies of the matches.
+           - numChars only sets the context of the cat1/cat2 match records,
+              and minTextLen only the final rule: configurations that differ
+              only in these share all the searches, and minTextLen is applied
+              to the counts (routingFeatures.RoutingRule).
+           The words of the paragraphs w/ figure references are split and
+            indexed once (figureText.FigureWordIndex), the blurbs of each
+            numFigTextWords are slices of the index. But the figure texts w/
+            different numFigTextWords are searched separately: blurbs that
+            overlap at one word count are merged, so the figure text of a
+            smaller count is not a substring of a larger one.
+
+           The routing counts of each configuration are kept in a
+            routingFeatures.FeatureMatrix, so the results are the same as a
+            doRouting2 run w/ that configuration (w/o a time budget).
+
+  To Use:
+    configs = routerSweep.getConfigGrid(numFigTextWords=[50, 75],
+                                        ageContexts=[150, 210])
+    sweep = routerSweep.RouterSweep(routerVocabs.RouterVocabs.fromDir('.'),
+                                                                    configs)
+    for ref in refs:
+        sweep.addRef(ID, text, journal, isPositive, isKeep)
+    print(sweep.getTable())
+
+  To Run Automated Unit Tests:  python test_routerSweep.py [-v]
+'''
+import copy
+import itertools
+import figureText
+import routingFeatures
+from GXD2aryRouter import PARABOUNDARY
+#-----------------------------------
+
+CONVERSION_TYPES = ['legends', 'legParagraphs', 'legCloseWords']
+
+#-----------------------------------
+
+class SweepConfig (object):
+    """
+    Is a: one GXDrouter configuration of a sweep
+    Has : conversionType, numFigTextWords, ageContext, numChars, minTextLen
+    Does: getRouterArgs() for GXDrouter(), the keys of the results it shares
+            w/ other configurations
+    """
+    def __init__(self,
+                conversionType='legCloseWords', # figure text conversion type
+                numFigTextWords=75, # n words around "figure/table"
+                                    #   (only for 'legCloseWords')
+                ageContext=210,     # n chars around age matches
+                numChars=30,        # n chars around cat1/2 match to report
+                minTextLen=500,     # text shorter than this is routed Yes
+                ):
+        if conversionType not in CONVERSION_TYPES:
+            raise ValueError("invalid figure text conversion type '%s'" % \
+                                                                conversionType)
+        self.conversionType  = conversionType
+        self.numFigTextWords = numFigTextWords
+        self.ageContext      = ageContext
+        self.numChars        = numChars
+        self.minTextLen      = minTextLen
+
+    def getFigTextKey(self):
+        """ Return the key of the figure text this configuration searches
+        """
+        if self.conversionType == 'legCloseWords':
+            return (self.conversionType, self.numFigTextWords)
+        return (self.conversionType, None)
+
+    def getFeatureKey(self):
+        """ Return the key of the routing counts of this configuration
+            (configurations w/ the same key have the same counts)
+        """
+        return (self.getFigTextKey(), self.ageContext)
+
+    def getKey(self):
+        return (self.getFeatureKey(), self.numChars, self.minTextLen)
+
+    def getRouterArgs(self):
+        """ Return GXDrouter() keyword args for this configuration
+        """
+        return {'figTextConversion': self.conversionType,
+                'numFigTextWords'  : self.numFigTextWords,
+                'ageContext'       : self.ageContext,
+                'numChars'         : self.numChars,
+                'minTextLen'       : self.minTextLen,
+                }
+
+    def getColumnValues(self):
+        """ Return [values] for the configuration columns of the table
+        """
+        conversionType, numWords = self.getFigTextKey()
+        return [conversionType, '' if numWords is None else str(numWords),
+                str(self.ageContext), str(self.numChars),
+                str(self.minTextLen)]
+
+    def __str__(self):
+        s = self.conversionType
+        if self.conversionType == 'legCloseWords':
+            s += '/%d' % self.numFigTextWords
+        return s + ' ageContext=%d numChars=%d minTextLen=%d' % \
+                            (self.ageContext, self.numChars, self.minTextLen)
+# end class SweepConfig -----------------------------------
+
+CONFIG_COLUMNS = ['conversionType', 'numFigTextWords', 'ageContext',
+                                                    'numChars', 'minTextLen']
+
+def getConfigGrid(conversionTypes=['legCloseWords'],
+                    numFigTextWords=[75],
+                    ageContexts=[210],
+                    numChars=[30],
+                    minTextLens=[500],
+                    ):
+    """ Return [SweepConfig] for every combination of the param values,
+        w/o duplicates (numFigTextWords only matters for 'legCloseWords')
+    """
+    configs = {}
+    for params in itertools.product(conversionTypes, numFigTextWords,
+                                    ageContexts, numChars, minTextLens):
+        config = SweepConfig(*params)
+        configs.setdefault(config.getKey(), config)
+    return list(configs.values())
+#-----------------------------------
+
+class RouterSweep (object):
+    """
+    Is a: a sweep of GXDrouter configurations over a set of refs
+    Has : a GXDrouter for the vocabs (w/ the largest ageContext),
+          the configurations, a FeatureMatrix for each distinct set of
+          routing counts, counts of the searches done
+    Does: addRef() for each ref, getResults(), getTable(), getReport()
+    """
+    def __init__(self, vocabs,  # routerVocabs.RouterVocabs
+                    configs,    # [SweepConfig]
+                    ):
+        self.configs = configs
+        self.ageContexts = sorted({c.ageContext for c in configs})
+        self.router = vocabs.buildRouter(ageContext=max(self.ageContexts))
+
+        self.figTextKeys = list(dict.fromkeys([c.getFigTextKey()
+                                                        for c in configs]))
+        self.converters = []
+        for conversionType, numWords in self.figTextKeys:
+            if numWords is None: numWords = 0       # not used
+            self.converters.append(figureText.Text2FigConverter( \
+                            conversionType=conversionType, numWords=numWords))
+
+        self.features = {c.getFeatureKey(): routingFeatures.FeatureMatrix()
+                                                        for c in configs}
+        self.numRefs = 0
+        self.numFigTextSearches = 0 # num of figure texts searched (age, cat2)
+
+    def addRef(self, ID, text, journal, isPositive, isKeep):
+        """ Route the ref w/ all the configurations
+        """
+        router = self.router
+        goodJournal = 0 if journal in router.skipJournals else 1
+        router._gotCat1(text)
+        cat1Counts = (len(router.cat1Matches), len(router.cat1Excludes))
+
+        searched = {}       # {figure text: (age counts, cat2 counts)}
+        figTextCounts = {}  # {figure text key: (age counts, cat2 counts)}
+        variants = figureText.text2FigTextVariants(text, self.converters)
+        for key, blurbs in zip(self.figTextKeys, variants):
+            figText = PARABOUNDARY.join(blurbs)
+            if figText not in searched:
+                searched[figText] = (self._getAgeCounts(figText),
+                                                self._getCat2Counts(figText))
+            figTextCounts[key] = searched[figText]
+        self.numFigTextSearches += len(searched)
+
+        for (figTextKey, ageContext), fm in self.features.items():
+            ageCounts, cat2Counts = figTextCounts[figTextKey]
+            fm.addRef(ID, isPositive, isKeep, journal,
+                        {'goodJournal' : goodJournal,
+                         'cat1Matches' : cat1Counts[0],
+                         'cat1Excludes': cat1Counts[1],
+                         'ageMatches'  : ageCounts[ageContext][0],
+                         'ageExcludes' : ageCounts[ageContext][1],
+                         'cat2Matches' : cat2Counts[0],
+                         'cat2Excludes': cat2Counts[1],
+                         'textLength'  : len(text),
+                        })
+        self.numRefs += 1
+
+    def _getAgeCounts(self, figText):
+        """ Return {ageContext: (num age matches, num age excludes)}
+        """
+        router = self.router
+        router.ageTextTransformer.transformText(figText)
+        matches = [m for m in router.ageTextTransformer.getMatches()
+                                        if not m.matchType.startswith('fix')]
+        router.ageTextTransformer.resetMatches()
+
+        counts = {}
+        for context in self.ageContexts:
+            numGood = 0
+            for m in matches:
+                m = copy.copy(m)    # _isGoodAgeMatch() modifies it
+                m.preText  = m.preText[max(0, len(m.preText) - context):]
+                m.postText = m.postText[:context]
+                if router._isGoodAgeMatch(m): numGood += 1
+            counts[context] = (numGood, len(matches) - numGood)
+        return counts
+
+    def _getCat2Counts(self, figText):
+        """ Return (num cat2 matches, num cat2 excludes)
+        """
+        self.router._gotCat2(figText)
+        return (len(self.router.cat2Matches), len(self.router.cat2Excludes))
+
+    def getFeatureMatrix(self, config):
+        """ Return the FeatureMatrix of the routing counts of config
+        """
+        return self.features[config.getFeatureKey()]._finish()
+
+    def getResults(self):
+        """ Return [(config, {subset name: counts dict})] for 'Overall',
+            'Keeps', 'Discards' (see routingFeatures.evaluateRule())
+        """
+        results = []
+        for c in self.configs:
+            rule = routingFeatures.RoutingRule(minTextLen=c.minTextLen)
+            results.append((c, routingFeatures.evaluateRule(
+                                            self.getFeatureMatrix(c), rule)))
+        return results
+
+    def getTable(self):
+        """ Return text: tab delimited table, 1 line per configuration
+        """
+        cols = list(CONFIG_COLUMNS)
+        for label in routingFeatures.SUBSETS:
+            cols += ['%s %s' % (label, m) for m in ['Precision', 'Recall',
+                                                                    'NPV']]
+        cols += routingFeatures.PRED_TYPES
+        output = '\t'.join(cols) + '\n'
+        for config, result in self.getResults():
+            items = config.getColumnValues()
+            for label in routingFeatures.SUBSETS:
+                items += ['%.2f' % m for m in
+                            routingFeatures.computeMetrics(result[label])]
+            items += [str(result['Overall'][predType])
+                                for predType in routingFeatures.PRED_TYPES]
+            output += '\t'.join(items) + '\n'
+        return output
+
+    def getReport(self):
+        """ Return text: the searches done vs. separate runs
+        """
+        n = len(self.configs)
+        output = "%d configurations, %d refs\n" % (n, self.numRefs)
+        output += "cat1 searches:        %8d (separate runs: %d)\n" % \
+                                            (self.numRefs, self.numRefs * n)
+        output += "figure text searches: %8d (separate runs: %d)\n" % \
+                                    (self.numFigTextSearches, self.numRefs * n)
+        return output
+# end class RouterSweep -----------------------------------
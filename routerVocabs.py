@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Read the vocab files that the GXD2aryRouter needs and build a
+            router from them.
+           The vocab files live in one directory with fixed filenames
+            (the ones in this repo).
+
+  To Use:
+    import routerVocabs
+    vocabs = routerVocabs.RouterVocabs.fromDir('.')
+    router = vocabs.buildRouter(numChars=30)
+
+    # the router options of a doRouting2 run, saved w/ its vocabs
+    routerVocabs.writeRouterOptions('Try1/vocabs/', router)
+    router = vocabs.buildRouter(**routerVocabs.readRouterOptions('Try1/vocabs/'))
+'''
+import os.path
+import json
+from GXD2aryRouter import GXDrouter
+#-----------------------------------
+
+# Vocab filenames (relative to the vocab directory)
+SKIPJOURNALFILENAME = 'skipJournals.txt'
+CAT1EXCLUDEFILENAME = 'cat1Exclude.txt'
+CAT2TERMFILENAME    = 'cat2Terms.txt'
+CAT2EXCLUDEFILENAME = 'cat2Exclude.txt'
+AGEEXCLUDEFILENAME  = 'ageExclude.txt'
+
+# Router options filename (relative to the vocab directory)
+ROUTEROPTIONSFILENAME = 'routerOptions.json'
+
+# GXDrouter options that change what a router matches (and reports).
+#  Not timeBudget: it depends on the machine and load, not the vocabs.
+ROUTEROPTIONS = ['numChars', 'ageContext', 'minTextLen', 'numFigTextWords',
+                    'figTextConversion', 'useFigTextSpans', 'unifiedTermScan',
+                    'squeezeLetterSpacing', 'asciiText']
+
+# Category 1 terms: not in a file, same as doRouting2
+CAT1TERMS = ['embryo', 'the expression of']
+#-----------------------------------
+
+def readVocabFile(fileName):
+    """ Return list of terms in the file.
+        Skip comment lines and blank lines, strip whitespace from each term.
+    """
+    return [line.strip() for line in open(fileName, 'r') \
+                            if not line.startswith('#') and line.strip() != '']
+
+def readAgeExcludeFile(fileName):
+    """ Return list of age exclude terms in the file.
+        Note, no line.strip(). Spaces may be important
+    """
+    return [line[:-1] for line in open(fileName, 'r') \
+                            if not line.startswith('#') and line.strip() != '']
+
+def getRouterOptions(router):
+    """ Return {option name: value} of the ROUTEROPTIONS of the router,
+        to pass to buildRouter() for a router that matches the same way
+    """
+    return {name: getattr(router, name) for name in ROUTEROPTIONS}
+
+def writeRouterOptions(vocabDir, router):
+    """ Write the ROUTEROPTIONS of the router to the router options file in
+        vocabDir
+    """
+    with open(os.path.join(vocabDir, ROUTEROPTIONSFILENAME), 'w') as fp:
+        json.dump(getRouterOptions(router), fp, indent=2)
+
+def readRouterOptions(vocabDir):
+    """ Return {option name: value} from the router options file in vocabDir.
+        Raises FileNotFoundError if there is none (e.g., vocabs/ of a
+        doRouting2 run from before the options were saved)
+    """
+    with open(os.path.join(vocabDir, ROUTEROPTIONSFILENAME), 'r') as fp:
+        return json.load(fp)
+#-----------------------------------
+
+class RouterVocabs (object):
+    """
+    Is a: the set of vocabularies (lists of strings) a GXDrouter needs
+    Does: reads them from a vocab directory, builds a GXDrouter
+    """
+    def __init__(self,
+                skipJournals,   # [journal names] whose articles don't route
+                cat1Terms,      # [category 1 terms]
+                cat1Exclude,    # [category 1 exclude terms]
+                ageExclude,     # [age exclude terms]
+                cat2Terms,      # [category 2 terms]
+                cat2Exclude,    # [category 2 exclude terms]
+                ):
+        self.skipJournals = skipJournals
+        self.cat1Terms    = cat1Terms
+        self.cat1Exclude  = cat1Exclude
+        self.ageExclude   = ageExclude
+        self.cat2Terms    = cat2Terms
+        self.cat2Exclude  = cat2Exclude
+
+    @classmethod
+    def fromDir(cls, vocabDir):
+        """ Return RouterVocabs read from the vocab files in vocabDir
+        """
+        def path(fileName): return os.path.join(vocabDir, fileName)
+
+        return cls(readVocabFile(path(SKIPJOURNALFILENAME)),
+                    list(CAT1TERMS),
+                    readVocabFile(path(CAT1EXCLUDEFILENAME)),
+                    readAgeExcludeFile(path(AGEEXCLUDEFILENAME)),
+                    readVocabFile(path(CAT2TERMFILENAME)),
+                    readVocabFile(path(CAT2EXCLUDEFILENAME)),
+                    )
+
+    def buildRouter(self, **kwargs):
+        """ Return a GXDrouter for these vocabs.
+            kwargs are passed to GXDrouter(), e.g., numChars=30
+        """
+        return GXDrouter(self.skipJournals, self.cat1Terms, self.cat1Exclude,
+                        self.ageExclude, self.cat2Terms, self.cat2Exclude,
+                        **kwargs)
+# end class RouterVocabs -----------------------------------
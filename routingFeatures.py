@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Per-reference routing feature matrix and a vectorized "what if"
+            evaluator of routing rules.
+
+           doRouting2 computes, for each reference, the counts GXDrouter's
+            routing decision is based on (cat1/age/cat2 matches & excludes,
+            goodJournal, text length). A FeatureMatrix keeps them (plus the
+            known class, relevance, journal) in numpy arrays, saved as a
+            .npz file next to Routings.txt.
+           A RoutingRule is a variation of GXDrouter's rule:
+              (cat1 >= minCat1 and age >= minAge and cat2 >= minCat2
+                    and (goodJournal or not useJournal))
+              or textLength < minTextLen
+            (refs that timed out are routed Yes, as doRouting2 does).
+           evaluateRule() routes every reference w/ boolean array algebra
+            and returns the TP/FP/TN/FN counts and Precision/Recall/NPV for
+            Overall, Keeps and Discards, the same as doRouting2's Summary -
+            in milliseconds instead of a full re-route.
+
+           Only rules over the saved counts can be evaluated this way. New
+            vocab terms or regexes still need a re-route.
+
+  To Use:
+    fm = routingFeatures.FeatureMatrix.load('Try1/Features.npz')
+        (or FeatureMatrix.fromRoutingsFile('Try1/Routings.txt'))
+    results = routingFeatures.evaluateRule(fm, RoutingRule(minCat2=2))
+    print(routingFeatures.getSummary(results))
+
+  To Run Automated Unit Tests:  python test_routingFeatures.py [-v]
+'''
+import numpy as np
+#-----------------------------------
+
+FEATURE_NAMES = [           # columns of FeatureMatrix.features
+            'goodJournal',
+            'cat1Matches',
+            'cat1Excludes',
+            'ageMatches',
+            'ageExcludes',
+            'cat2Matches',
+            'cat2Excludes',
+            'textLength',
+            ]
+ROUTINGS_COLUMNS = [        # the Routings.txt columns of FEATURE_NAMES
+            'goodJournal',
+            'Cat1 matches',
+            'Cat1 Excludes',
+            'Age matches',
+            'Age Excludes',
+            'Cat2 matches',
+            'Cat2 Excludes',
+            'TextLength',
+            ]
+PRED_TYPES = ['TP', 'FP', 'TN', 'FN']
+SUBSETS    = ['Overall', 'Keeps', 'Discards']
+
+#-----------------------------------
+
+def computeMetrics(counts):
+    """ Return Precision, Recall, NPV (as percentages) for a dict of
+        TP/FP/TN/FN counts. 0.0 for any that would divide by zero.
+    """
+    if (counts['TP'] + counts['FP']) == 0: p = 0.0      # check for zero div
+    else: p = counts['TP'] / (counts['TP'] + counts['FP']) * 100
+
+    if (counts['TP'] + counts['FN']) == 0: r = 0.0      # check for zero div
+    else: r = counts['TP'] / (counts['TP'] + counts['FN']) * 100
+
+    if (counts['TN'] + counts['FN']) == 0: npv = 0.0      # check for zero div
+    else: npv = counts['TN'] / (counts['TN'] + counts['FN']) * 100
+
+    return p, r, npv
+#-----------------------------------
+
+def getPredType(isPositive, routedYes):
+    """ Return 'TP', 'FP', 'TN', or 'FN'
+    """
+    if routedYes: return 'TP' if isPositive else 'FP'
+    else:         return 'FN' if isPositive else 'TN'
+
+def getRouterFeatures(router, textLen):
+    """ Return {feature name: value} for the GXDrouter's last routeThisRef()
+        of a text of length textLen
+    """
+    return {'goodJournal' : router.getGoodJournal(),
+            'cat1Matches' : len(router.getCat1Matches()),
+            'cat1Excludes': len(router.getCat1Excludes()),
+            'ageMatches'  : len(router.getAgeMatches()),
+            'ageExcludes' : len(router.getAgeExcludes()),
+            'cat2Matches' : len(router.getCat2Matches()),
+            'cat2Excludes': len(router.getCat2Excludes()),
+            'textLength'  : textLen,
+            }
+#-----------------------------------
+
+def getSummary(results):
+    """ Return the doRouting2 Summary text for results from evaluateRule()
+        (or any {subset name: counts dict}), w/o the trailing totals
+    """
+    summary = 'Summary\n'
+    for label in SUBSETS:
+        counts = results[label]
+        numRefs = sum([counts[predType] for predType in PRED_TYPES])
+        summary += "%s - Total Refs: %d\n" % (label, numRefs)
+
+        summaryLineItems = []
+        p, r, npv = computeMetrics(counts)
+        summaryLineItems.append("Precision %.2f" % p)
+        summaryLineItems.append("Recall %.2f" % r)
+        summaryLineItems.append("NPV %.2f" % npv)
+        summary += '   '.join(summaryLineItems) + '\n'
+
+        summary += "    TP      FP      TN      FN\n"
+        countLineItems = []
+        for predType in PRED_TYPES:
+            countLineItems.append("%6d" % counts[predType])
+        summary += ', '.join(countLineItems) + '\n'
+
+        summary += '\n'
+    return summary
+#-----------------------------------
+
+class FeatureMatrix (object):
+    """
+    Is a: the routing features of a set of references
+    Has : IDs, isPositive, isKeep, journals, timedOut arrays (1 per ref),
+            features: int64 array (numRefs x len(FEATURE_NAMES))
+    Does: addRef() while routing, save()/load() (.npz), getColumn(),
+            fromRoutingsFile() for Routings.txt files of earlier runs
+    """
+    def __init__(self):
+        self.IDs = []
+        self.isPositive = []
+        self.isKeep = []
+        self.journals = []
+        self.timedOut = []
+        self.features = []      # list of rows until _finish()
+
+    def addRef(self, ID, isPositive, isKeep, journal, featureValues,
+                                                            timedOut=False):
+        """ featureValues: dict {feature name: value} for FEATURE_NAMES
+        """
+        self.IDs.append(ID)
+        self.isPositive.append(isPositive)
+        self.isKeep.append(isKeep)
+        self.journals.append(journal)
+        self.timedOut.append(timedOut)
+        self.features.append([int(featureValues[f]) for f in FEATURE_NAMES])
+        return self
+
+    def _finish(self):
+        """ Convert the lists to numpy arrays (once all refs are added)
+        """
+        if not isinstance(self.features, np.ndarray):
+            self.isPositive = np.array(self.isPositive, dtype=bool)
+            self.isKeep = np.array(self.isKeep, dtype=bool)
+            self.timedOut = np.array(self.timedOut, dtype=bool)
+            self.features = np.array(self.features, dtype=np.int64).reshape(
+                                                    -1, len(FEATURE_NAMES))
+        return self
+
+    def __len__(self): return len(self.IDs)
+
+    def getColumn(self, featureName):
+        self._finish()
+        return self.features[:, FEATURE_NAMES.index(featureName)]
+
+    def save(self, fileName):
+        self._finish()
+        with open(fileName, 'wb') as fp:
+            np.savez(fp, IDs=np.array(self.IDs, dtype=str),
+                        isPositive=self.isPositive, isKeep=self.isKeep,
+                        journals=np.array(self.journals, dtype=str),
+                        timedOut=self.timedOut, features=self.features,
+                        featureNames=np.array(FEATURE_NAMES, dtype=str))
+
+    @classmethod
+    def load(cls, fileName):
+        fm = cls()
+        with np.load(fileName) as data:
+            if list(data['featureNames']) != FEATURE_NAMES:
+                raise ValueError("'%s' has features %s, expected %s" % \
+                        (fileName, list(data['featureNames']), FEATURE_NAMES))
+            fm.IDs = data['IDs'].tolist()
+            fm.journals = data['journals'].tolist()
+            fm.isPositive = data['isPositive']
+            fm.isKeep = data['isKeep']
+            fm.timedOut = data['timedOut']
+            fm.features = data['features']
+        return fm
+
+    @classmethod
+    def fromRoutingsFile(cls, fileName, fieldSep='|'):
+        """ Build from a doRouting2 Routings.txt file
+            (timed out refs are not recorded there: timedOut is all False)
+        """
+        fm = cls()
+        with open(fileName, 'r') as fp:
+            fp.readline()                               # time stamp
+            colNames = fp.readline().rstrip('\n').split(fieldSep)
+            col = {name: i for i, name in enumerate(colNames)}
+            for line in fp:
+                if line.strip() == '': continue
+                values = line.rstrip('\n').split(fieldSep)
+                featureValues = {f: values[col[c]] for f, c in
+                                            zip(FEATURE_NAMES, ROUTINGS_COLUMNS)}
+                fm.addRef(values[col['ID']],
+                            values[col['knownClassName']] == 'Yes',
+                            values[col['relevance']] == 'keep',
+                            values[col['journal']], featureValues)
+        return fm._finish()
+# end class FeatureMatrix -----------------------------------
+
+class RoutingRule (object):
+    """
+    Is a: a variation of GXDrouter's routing rule
+    Has : thresholds. The defaults are GXDrouter's rule
+    Does: route(featureMatrix) -> bool array, True for routed 'Yes'
+    """
+    def __init__(self,
+                minCat1=1,          # min num of cat1 matches
+                minAge=1,           # min num of mouse age matches
+                minCat2=1,          # min num of cat2 matches
+                useJournal=True,    # False: ignore the skip journal list
+                minTextLen=500,     # text shorter than this is routed Yes
+                skipJournals=None,  # if set, use instead of goodJournal
+                ):
+        self.minCat1 = minCat1
+        self.minAge = minAge
+        self.minCat2 = minCat2
+        self.useJournal = useJournal
+        self.minTextLen = minTextLen
+        self.skipJournals = skipJournals
+
+    def route(self, fm):
+        yes = (fm.getColumn('cat1Matches') >= self.minCat1) & \
+              (fm.getColumn('ageMatches')  >= self.minAge)  & \
+              (fm.getColumn('cat2Matches') >= self.minCat2) & \
+              self.getJournalOK(fm)
+        return yes | self.getForcedYes(fm)
+
+    def getJournalOK(self, fm):
+        """ Return bool array: True for refs that pass the journal rule
+        """
+        fm._finish()
+        if not self.useJournal:
+            return np.ones(len(fm), dtype=bool)
+        if self.skipJournals is not None:
+            return ~np.isin(np.array(fm.journals, dtype=str),
+                                np.array(list(self.skipJournals), dtype=str))
+        return fm.getColumn('goodJournal') != 0
+
+    def getForcedYes(self, fm):
+        """ Return bool array: True for refs routed Yes regardless of their
+            matches (short text or timed out)
+        """
+        fm._finish()
+        return (fm.getColumn('textLength') < self.minTextLen) | fm.timedOut
+
+    def __str__(self):
+        s = 'cat1>=%d age>=%d cat2>=%d minTextLen=%d' % (self.minCat1,
+                            self.minAge, self.minCat2, self.minTextLen)
+        if not self.useJournal: s += ' noJournal'
+        elif self.skipJournals is not None:
+            s += ' skipJournals=%d' % len(self.skipJournals)
+        return s
+# end class RoutingRule -----------------------------------
+
+def getCounts(routedYes, isPositive, mask=None):
+    """ Return {'TP': n, 'FP': n, 'TN': n, 'FN': n} for the refs in mask
+        (default all)
+    """
+    if mask is not None:
+        routedYes = routedYes[mask]
+        isPositive = isPositive[mask]
+    tp = int(np.count_nonzero(routedYes & isPositive))
+    fp = int(np.count_nonzero(routedYes)) - tp
+    fn = int(np.count_nonzero(isPositive)) - tp
+    tn = len(routedYes) - tp - fp - fn
+    return {'TP': tp, 'FP': fp, 'TN': tn, 'FN': fn}
+
+def evaluateRule(fm, rule):
+    """ Return {subset name: counts dict} for 'Overall', 'Keeps', 'Discards'
+    """
+    routedYes = rule.route(fm)
+    return {'Overall' : getCounts(routedYes, fm.isPositive),
+            'Keeps'   : getCounts(routedYes, fm.isPositive, fm.isKeep),
+            'Discards': getCounts(routedYes, fm.isPositive, ~fm.isKeep),
+            }
+
+def getMetrics(results):
+    """ Return {subset name: (precision, recall, npv)} for evaluateRule()
+        results
+    """
+    return {label: computeMetrics(counts) for label, counts in results.items()}
+#-----------------------------------
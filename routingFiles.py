@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+'''
+  Purpose: The formats and names of doRouting2's output files that other
+            tools read and patch: the Routings file and the match files.
+
+           Match files are split by type of match (Cat1, Cat2, Age), and by
+            predType (TP, FP, TN, FN). TP's are split up into subfiles based
+            on the last two digits of the reference ID.
+            This is all because the match files get too big to import into
+            Excel and Google Sheets.
+
+  To Use:
+    for key, fileName in routingFiles.getMatchFileNames('Try1/').items(): ..
+    key = routingFiles.getMatchFileKey('Cat1', predType, refID)
+    fp[key].write(routingFiles.formatMatches(refID, routing, ...))
+
+    routings = routingFiles.RoutingsFile.read('Try1/Routings.txt')
+    routings.setValues(refID, {'routing': 'Yes', 'predType': 'TP'})
+    routings.write('Try1/Routings.txt')
+
+  To Run Automated Unit Tests:  python test_routingFiles.py [-v]
+'''
+import os
+#-----------------------------------
+
+fileSplitModulus = 4    # split big files based on this modulus,
+                        #  see getMatchFileKey()
+
+MATCH_CATEGORIES = ['Cat1', 'Cat2', 'Age']
+
+routingFieldSep = '|'
+
+matchesFieldSep = '\t'
+matchesHdr = matchesFieldSep.join(['ID',
+                    'routing',
+                    'predType',
+                    'goodJournal',
+                    'Cat1 matches',
+                    'Age matches',
+                    'Cat2 matches',
+                    'matchType',
+                    'preText',
+                    'matchText',
+                    'postText',
+                    'confidence',
+                    ]) + '\n'
+
+def formatMatches(ID, routing, predType, goodJournal, numCat1Matches,
+                    numAgeMatches, numCat2Matches, matchRcds, confidence):
+    output = ''
+    for m in matchRcds:
+        output += matchesFieldSep.join([
+                   str(ID),
+                   routing,
+                   predType,
+                   str(goodJournal),
+                   str(numCat1Matches),
+                   str(numAgeMatches),
+                   str(numCat2Matches),
+                   m.matchType,
+                   "'%s'" % m.preText.replace('\n','\\n').replace('\t','\\t'),
+                   "'%s'" % m.matchText.replace('\n','\\n').replace('\t','\\t'),
+                   "'%s'" % m.postText.replace('\n','\\n').replace('\t','\\t'),
+                   str(confidence),
+                   ]) + '\n'
+    return output
+#-----------------------------------
+
+def getMatchFileKey(cat, predType, refID):
+    """ Compute and return the key into the dict of Match output files
+        For predTypes FP, TN, FN, this is just (cat, predType)
+        For predType TP, the output files are split based on the modulus of
+            the last two digits of the reference ID
+            (because there are so many TP, the files get too big to import
+            into Excel or Google Sheets)
+    """
+    if predType == 'TP':
+        lastDig = int(refID[-2:])
+        dig = lastDig % fileSplitModulus
+        key = (cat, predType, dig)
+    else:
+        key = (cat, predType)
+    return key
+
+def getMatchFileNames(baseName):
+    """ Return {match file key: file name} for all the match files
+    """
+    fileNames = {}
+    for cat in MATCH_CATEGORIES:
+        for predType in ['FP', 'TN', 'FN']:
+            fileNames[(cat, predType)] = '%s%s%smatches.txt' % (baseName,
+                                                                cat, predType)
+        for predType in ['TP']:
+            for dig in range(fileSplitModulus):
+                fileNames[(cat, predType, dig)] = '%s%s%s_%dmatches.txt' % \
+                                            (baseName, cat, predType, dig)
+    return fileNames
+#-----------------------------------
+
+def patchMatchFiles(baseName, IDs, newMatches):
+    """ Replace the lines of the refs in IDs in all the match files.
+        newMatches: {match file key: formatMatches() text to append}
+    """
+    IDs = set(IDs)
+    for key, fileName in getMatchFileNames(baseName).items():
+        with open(fileName, 'r') as fp:
+            header = fp.readline()
+            lines = [line for line in fp
+                        if line.split(matchesFieldSep, 1)[0] not in IDs]
+        tmpName = fileName + '.tmp%d' % os.getpid()
+        with open(tmpName, 'w') as fp:
+            fp.write(header)
+            fp.write(''.join(lines))
+            fp.write(newMatches.get(key, ''))
+        os.replace(tmpName, fileName)
+#-----------------------------------
+
+class RoutingsFile (object):
+    """
+    Is a: the contents of a doRouting2 Routings.txt file
+    Has : time stamp line, column names, rows (lists of field values)
+    Does: read(), write(), getIDs(), getValue(), setValues()
+    """
+    def __init__(self, timeStamp, colNames, rows):
+        self.timeStamp = timeStamp
+        self.colNames = colNames
+        self.col = {name: i for i, name in enumerate(colNames)}
+        self.rows = rows
+        self.rowIndex = {row[self.col['ID']]: i for i, row in enumerate(rows)}
+
+    @classmethod
+    def read(cls, fileName):
+        with open(fileName, 'r') as fp:
+            timeStamp = fp.readline().rstrip('\n')
+            colNames = fp.readline().rstrip('\n').split(routingFieldSep)
+            rows = [line.rstrip('\n').split(routingFieldSep) for line in fp
+                                                        if line.strip() != '']
+        return cls(timeStamp, colNames, rows)
+
+    def write(self, fileName):
+        """ Write to fileName, atomically so an interrupted run can't
+            leave a truncated file
+        """
+        tmpName = fileName + '.tmp%d' % os.getpid()
+        with open(tmpName, 'w') as fp:
+            fp.write(self.timeStamp + '\n')
+            fp.write(routingFieldSep.join(self.colNames) + '\n')
+            for row in self.rows:
+                fp.write(routingFieldSep.join(row) + '\n')
+        os.replace(tmpName, fileName)
+
+    def __len__(self): return len(self.rows)
+
+    def getIDs(self): return [row[self.col['ID']] for row in self.rows]
+
+    def getValue(self, ID, colName):
+        return self.rows[self.rowIndex[ID]][self.col[colName]]
+
+    def setValues(self, ID, values):
+        """ values: {column name: value (string)}
+        """
+        row = self.rows[self.rowIndex[ID]]
+        for colName, value in values.items():
+            row[self.col[colName]] = value
+# end class RoutingsFile -----------------------------------
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Statistics for routing results: bootstrap confidence intervals
+            for Precision/Recall/NPV, and paired comparison of two routing
+            runs (McNemar test + paired bootstrap of the metric changes),
+            broken down by relevance (keep/discard) and journal.
+
+           Bootstrap: resampling n refs w/ replacement only changes the
+            TP/FP/TN/FN counts, and those counts are multinomial(n, observed
+            fractions). So each resample is one multinomial draw of 4
+            counts - thousands of resamples take milliseconds, whatever n
+            is. This is exactly the ordinary percentile bootstrap, not an
+            approximation of it.
+           Paired runs: each ref falls in 1 of 16 (run1 cell, run2 cell)
+            cells. Resampling refs = a multinomial draw of 16 counts, from
+            which both runs' metrics (and their differences) are computed.
+           McNemar: of the refs the two runs route differently, b are right
+            in run1 only and c in run2 only. Exact two sided binomial test
+            of b vs c (no scipy needed).
+
+           Metrics are percentages, 0.0 when they'd divide by zero, as
+            routingFeatures.computeMetrics() does.
+
+  To Use:
+    run = routingStats.RoutingRun.fromRoutingsFile('Try1/Routings.txt')
+    print(routingStats.getBootstrapReport(run))
+    run2 = routingStats.RoutingRun.fromRoutingsFile('Try2/Routings.txt')
+    print(routingStats.getComparisonReport(run, run2))
+
+  To Run Automated Unit Tests:  python test_routingStats.py [-v]
+'''
+import math
+import numpy as np
+import routingFeatures
+#-----------------------------------
+
+METRICS = ['Precision', 'Recall', 'NPV']
+PRED_TYPES = routingFeatures.PRED_TYPES         # cell order: TP FP TN FN
+DEFAULT_NUM_RESAMPLES = 2000
+
+#-----------------------------------
+
+class RoutingRun (object):
+    """
+    Is a: the routing of a set of references
+    Has : IDs, and arrays (1 per ref): routedYes, isPositive, isKeep, journals
+    Does: fromRoutingsFile(), getCells(), subset(mask), align(otherRun)
+    """
+    def __init__(self, IDs, routedYes, isPositive, isKeep, journals):
+        self.IDs = list(IDs)
+        self.routedYes = np.asarray(routedYes, dtype=bool)
+        self.isPositive = np.asarray(isPositive, dtype=bool)
+        self.isKeep = np.asarray(isKeep, dtype=bool)
+        self.journals = np.asarray(journals, dtype=str)
+
+    @classmethod
+    def fromRoutingsFile(cls, fileName, fieldSep='|'):
+        """ Read a doRouting2 Routings.txt file
+        """
+        IDs, routedYes, isPositive, isKeep, journals = [], [], [], [], []
+        with open(fileName, 'r') as fp:
+            fp.readline()                               # time stamp
+            colNames = fp.readline().rstrip('\n').split(fieldSep)
+            col = {name: i for i, name in enumerate(colNames)}
+            for line in fp:
+                if line.strip() == '': continue
+                values = line.rstrip('\n').split(fieldSep)
+                IDs.append(values[col['ID']])
+                routedYes.append(values[col['routing']] == 'Yes')
+                isPositive.append(values[col['knownClassName']] == 'Yes')
+                isKeep.append(values[col['relevance']] == 'keep')
+                journals.append(values[col['journal']])
+        return cls(IDs, routedYes, isPositive, isKeep, journals)
+
+    def __len__(self): return len(self.IDs)
+
+    def getCells(self):
+        """ Return array of cell numbers (index into PRED_TYPES), 1 per ref
+        """
+        return np.where(self.routedYes, np.where(self.isPositive, 0, 1),
+                                        np.where(self.isPositive, 3, 2))
+
+    def subset(self, mask):
+        return RoutingRun(np.array(self.IDs)[mask].tolist(),
+                    self.routedYes[mask], self.isPositive[mask],
+                    self.isKeep[mask], self.journals[mask])
+
+    def align(self, other):
+        """ Return (self, other) restricted to their common refs, in the same
+            order. Raise ValueError if the known classes of a ref differ.
+        """
+        otherIndex = {ID: i for i, ID in enumerate(other.IDs)}
+        mine = [i for i, ID in enumerate(self.IDs) if ID in otherIndex]
+        theirs = [otherIndex[self.IDs[i]] for i in mine]
+        run1 = self.subset(np.array(mine, dtype=np.int64))
+        run2 = other.subset(np.array(theirs, dtype=np.int64))
+        if not np.array_equal(run1.isPositive, run2.isPositive):
+            raise ValueError( \
+                        'runs have different known classes for some refs')
+        return run1, run2
+# end class RoutingRun -----------------------------------
+
+def getGroups(run, minJournalRefs=20):
+    """ Return [(label, bool mask)]: Overall, Keeps, Discards, and each
+        journal w/ at least minJournalRefs refs (most refs first)
+    """
+    groups = [('Overall', np.ones(len(run), dtype=bool)),
+              ('Keeps', run.isKeep), ('Discards', ~run.isKeep)]
+    journals, numRefs = np.unique(run.journals, return_counts=True)
+    for i in np.argsort(-numRefs, kind='stable'):
+        if numRefs[i] >= minJournalRefs:
+            groups.append(('Journal: %s' % journals[i],
+                                            run.journals == journals[i]))
+    return groups
+#-----------------------------------
+
+def getMetrics(counts):
+    """ Return {metric name: array} for counts array (..., 4) in PRED_TYPES
+        order. Vectorized routingFeatures.computeMetrics().
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    tp, fp, tn, fn = [counts[..., i] for i in range(4)]
+    def pct(num, denom):
+        return np.where(denom != 0, num / np.where(denom != 0, denom, 1)
+                                                                * 100, 0.0)
+    return {'Precision': pct(tp, tp + fp),
+            'Recall'   : pct(tp, tp + fn),
+            'NPV'      : pct(tn, tn + fn),
+            }
+
+def getCellCounts(cells, numCells=4):
+    return np.bincount(cells, minlength=numCells)
+
+def bootstrapCounts(counts, numResamples=DEFAULT_NUM_RESAMPLES, rng=None):
+    """ Return array (numResamples x len(counts)): cell counts of bootstrap
+        resamples of the refs counted in counts
+    """
+    if rng is None: rng = np.random.default_rng(1)
+    counts = np.asarray(counts, dtype=np.int64)
+    n = int(counts.sum())
+    if n == 0: return np.zeros((numResamples, len(counts)), dtype=np.int64)
+    return rng.multinomial(n, counts / n, size=numResamples)
+
+def getConfidenceIntervals(counts, numResamples=DEFAULT_NUM_RESAMPLES,
+                                                confidence=0.95, rng=None):
+    """ Return {metric: (estimate, low, high)} percentile bootstrap CIs
+        counts: TP, FP, TN, FN counts
+    """
+    estimates = getMetrics(counts)
+    resampled = getMetrics(bootstrapCounts(counts, numResamples, rng))
+    tail = (1 - confidence) / 2 * 100
+    return {m: (float(estimates[m]),
+                float(np.percentile(resampled[m], tail)),
+                float(np.percentile(resampled[m], 100 - tail)))
+                                                            for m in METRICS}
+
+def getPairedDifferences(cells1, cells2, numResamples=DEFAULT_NUM_RESAMPLES,
+                                                confidence=0.95, rng=None):
+    """ Return {metric: (run2 - run1 estimate, low, high, pWorse)} paired
+            bootstrap of the metric differences.
+        pWorse: fraction of resamples where run2 is not better than run1
+            (~ one sided p value for "run2 is better")
+        cells1, cells2: cell arrays (RoutingRun.getCells()) of the same refs
+    """
+    joint = getCellCounts(np.asarray(cells1) * 4 + np.asarray(cells2), 16)
+    resampled = bootstrapCounts(joint, numResamples, rng).reshape(-1, 4, 4)
+    m1 = getMetrics(resampled.sum(axis=2))
+    m2 = getMetrics(resampled.sum(axis=1))
+    e1 = getMetrics(joint.reshape(4, 4).sum(axis=1))
+    e2 = getMetrics(joint.reshape(4, 4).sum(axis=0))
+    tail = (1 - confidence) / 2 * 100
+    results = {}
+    for m in METRICS:
+        diffs = m2[m] - m1[m]
+        results[m] = (float(e2[m] - e1[m]),
+                      float(np.percentile(diffs, tail)),
+                      float(np.percentile(diffs, 100 - tail)),
+                      float(np.mean(diffs <= 0)))
+    return results
+
+def mcnemar(correct1, correct2):
+    """ Return (b, c, p value): b = refs right in run1 only, c = right in
+        run2 only, exact two sided binomial (McNemar) p value
+    """
+    correct1 = np.asarray(correct1, dtype=bool)
+    correct2 = np.asarray(correct2, dtype=bool)
+    b = int(np.count_nonzero(correct1 & ~correct2))
+    c = int(np.count_nonzero(~correct1 & correct2))
+    return b, c, binomialTwoSided(min(b, c), b + c)
+
+def binomialTwoSided(k, n):
+    """ Return P(X <= k or X >= n-k) for X ~ Binomial(n, 0.5), k <= n/2
+    """
+    if n == 0: return 1.0
+    logHalfN = n * math.log(0.5)
+    tail = sum([math.exp(math.lgamma(n + 1) - math.lgamma(i + 1) -
+                    math.lgamma(n - i + 1) + logHalfN) for i in range(k + 1)])
+    return min(1.0, 2 * tail)
+#-----------------------------------
+
+def getBootstrapReport(run, numResamples=DEFAULT_NUM_RESAMPLES,
+                            confidence=0.95, minJournalRefs=20, seed=1):
+    """ Return text: CIs for each group (see getGroups())
+    """
+    rng = np.random.default_rng(seed)
+    report = "Bootstrap %d%% confidence intervals (%d resamples)\n" % \
+                                        (round(confidence*100), numResamples)
+    report += '\t'.join(['group', 'refs'] + PRED_TYPES +
+                ['%s%s' % (m, x) for m in METRICS
+                                        for x in ['', ' low', ' high']]) + '\n'
+    for label, mask in getGroups(run, minJournalRefs):
+        counts = getCellCounts(run.getCells()[mask])
+        cis = getConfidenceIntervals(counts, numResamples, confidence, rng)
+        items = [label, str(int(counts.sum()))] + [str(n) for n in counts]
+        for m in METRICS:
+            items += ['%.2f' % x for x in cis[m]]
+        report += '\t'.join(items) + '\n'
+    return report
+
+def getComparisonReport(run1, run2, numResamples=DEFAULT_NUM_RESAMPLES,
+                            confidence=0.95, minJournalRefs=20, seed=1,
+                            labels=('run1', 'run2')):
+    """ Return text: paired comparison of two runs for each group, on the
+        refs in both runs
+    """
+    run1, run2 = run1.align(run2)
+    rng = np.random.default_rng(seed)
+    report = "Paired comparison: %s vs %s, %d common refs, %d routed " \
+                "differently\n" % (labels[1], labels[0], len(run1),
+                np.count_nonzero(run1.routedYes != run2.routedYes))
+    report += "  d = %s - %s, %d%% paired bootstrap interval (%d " \
+                "resamples), pWorse = fraction of resamples w/ d <= 0\n" % \
+                (labels[1], labels[0], round(confidence*100), numResamples)
+    report += "  McNemar: b = right in %s only, c = right in %s only\n" % \
+                                                        (labels[0], labels[1])
+    report += '\t'.join(['group', 'refs', 'b', 'c', 'McNemar p'] +
+                ['%s %s' % (m, x) for m in METRICS
+                    for x in ['d', 'low', 'high', 'pWorse']]) + '\n'
+    cells1 = run1.getCells()
+    cells2 = run2.getCells()
+    correct1 = run1.routedYes == run1.isPositive
+    correct2 = run2.routedYes == run2.isPositive
+    for label, mask in getGroups(run1, minJournalRefs):
+        b, c, p = mcnemar(correct1[mask], correct2[mask])
+        diffs = getPairedDifferences(cells1[mask], cells2[mask],
+                                            numResamples, confidence, rng)
+        items = [label, str(int(mask.sum())), str(b), str(c), '%.4f' % p]
+        for m in METRICS:
+            items += ['%.2f' % x for x in diffs[m][:3]] + \
+                                                    ['%.3f' % diffs[m][3]]
+        report += '\t'.join(items) + '\n'
+    return report
+#-----------------------------------
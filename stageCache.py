@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Persistent cache of the results of the GXDrouter routing steps
+            (stages): cat1, figText, age, cat2, so rerunning doRouting2
+            after a vocab change only recomputes the stages that change
+            affects.
+
+           A cached result is keyed by
+             (stage, stage parameter fingerprint, document hash)
+           The fingerprint is a digest of everything the stage result
+            depends on besides the document: its vocabs, regex's, context
+            sizes, and the fingerprints of the stages it reads from (age and
+            cat2 search the figure text). See GXDrouter.getStageParams().
+            The document hash is a digest of the extracted text.
+           So after a cat2Terms.txt change, only cat2 is recomputed (from
+            the cached figure text); after an ageExclude.txt change, only
+            age.
+
+           Each (stage, fingerprint) is a file in the cache directory:
+              cacheDir/<stage>.<fingerprint>.pickle
+            holding {document hash: compressed, pickled stage result}.
+            Results are unpickled on each get(), so callers get their own
+            copies of the MatchRcds.
+           Files for old fingerprints are never read again; delete the
+            cache directory to reclaim the space.
+
+  To Use:
+    cache = stageCache.StageCache('routingCache/')
+    router.setStageCache(cache)         # sets the stage fingerprints
+    ... router.routeThisRef(text, journal) ...
+    cache.save()
+    print(cache.getReport())
+
+  To Run Automated Unit Tests:  python test_stageCache.py [-v]
+'''
+import os
+import zlib
+import pickle
+import hashlib
+#-----------------------------------
+
+CACHE_VERSION = 1       # bump if a routing stage or the cache format changes
+
+STAGES = ['cat1', 'figText', 'age', 'cat2']
+
+#-----------------------------------
+
+def getDocKey(text):
+    """ Return the hash of a document's text
+    """
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def getFingerprint(params):
+    """ Return a digest of a stage's parameters (repr()-able values)
+    """
+    key = repr((CACHE_VERSION, params))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+#-----------------------------------
+
+class StageCache (object):
+    """
+    Is a: persistent cache of routing stage results
+    Has : cache directory, {stage: fingerprint},
+          {stage: {document hash: pickled result}} for the stages used so far,
+          hit & miss counts
+    Does: setStageParams(), has(), get(), put(), save(), getReport()
+    """
+    def __init__(self, cacheDir):
+        self.cacheDir = cacheDir
+        self.fingerprints = {}
+        self.entries = {}           # {stage: {docKey: bytes}}, loaded lazily
+        self.dirty = set()          # stages w/ entries not saved yet
+        self.hits = {s: 0 for s in STAGES}
+        self.misses = {s: 0 for s in STAGES}
+
+    def setStageParams(self, stageParams):
+        """ Set the fingerprint of each stage from {stage: params}
+        """
+        self.fingerprints = {stage: getFingerprint(params)
+                                    for stage, params in stageParams.items()}
+        self.entries = {}
+        self.dirty = set()
+
+    def getFileName(self, stage):
+        return os.path.join(self.cacheDir, '%s.%s.pickle' % (stage,
+                                                    self.fingerprints[stage]))
+
+    def _getEntries(self, stage):
+        """ Return {docKey: bytes} for stage, reading its file the first time
+        """
+        entries = self.entries.get(stage)
+        if entries is None:
+            entries = {}
+            fileName = self.getFileName(stage)
+            if os.path.exists(fileName):
+                with open(fileName, 'rb') as fp:
+                    version, fileEntries = pickle.load(fp)
+                if version == CACHE_VERSION: entries = fileEntries
+            self.entries[stage] = entries
+        return entries
+
+    def has(self, stage, docKey):
+        return docKey in self._getEntries(stage)
+
+    def get(self, stage, docKey):
+        """ Return the cached result of stage for the document or None
+        """
+        data = self._getEntries(stage).get(docKey)
+        if data is None:
+            self.misses[stage] += 1
+            return None
+        self.hits[stage] += 1
+        return pickle.loads(zlib.decompress(data))
+
+    def put(self, stage, docKey, result):
+        self._getEntries(stage)[docKey] = zlib.compress( \
+                        pickle.dumps(result, pickle.HIGHEST_PROTOCOL), 1)
+        self.dirty.add(stage)
+
+    def save(self):
+        """ Write the stages w/ new results, atomically so an interrupted
+            run can't leave a truncated cache file
+        """
+        if self.dirty: os.makedirs(self.cacheDir, exist_ok=True)
+        for stage in sorted(self.dirty):
+            fileName = self.getFileName(stage)
+            tmpName = fileName + '.tmp%d' % os.getpid()
+            with open(tmpName, 'wb') as fp:
+                pickle.dump((CACHE_VERSION, self.entries[stage]), fp,
+                                                    pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpName, fileName)
+        self.dirty = set()
+
+    def getReport(self):
+        """ Return text: hits and misses by stage
+        """
+        output = "Stage cache '%s':\n" % self.cacheDir
+        for stage in STAGES:
+            output += "    %-8s %6d hits %6d misses\n" % (stage,
+                                        self.hits[stage], self.misses[stage])
+        return output
+# end class StageCache -----------------------------------
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Static text analysis support for doStatic.py:
+            document frequencies of analysis terms in positive and
+            negative references.
+
+           Each document is normalized ('\n' -> ' ') and exclusion-masked
+            (exclude terms upper cased so lower case analysis terms can't
+            match inside them) ONCE. All the analysis terms are then counted
+            against the masked text together.
+
+  To Use:
+    excludeDict = staticLib.getExcludeDict(excludeTerms)
+    counter = staticLib.DocFreqCounter(terms)
+    for ref in refs:
+        counter.addDoc(staticLib.maskText(ref.getDocument(), excludeDict),
+                                                            ref.isPositive())
+    for ts in counter.getTermStats(totalNumPos, totalNumNeg):
+        print(ts.term, ts.numPos, ts.numNeg, ts.dValue)
+
+  For big corpora and repeated runs:
+    countDocFreqs() shards the documents across worker processes and
+        merges the per-shard DocFreqCounters.
+    MaskedCorpus holds the masked texts of a whole sample file and can be
+        saved to/loaded from a cache file whose name depends on the sample
+        file (path, size, mtime) and the exclude terms, see getCachePath().
+
+  To Run Automated Unit Tests:  python test_staticLib.py [-v]
+'''
+import os
+import pickle
+import hashlib
+import multiprocessing
+#-----------------------------------
+
+CACHE_VERSION = 1       # bump if maskText() or the cache format changes
+
+#-----------------------------------
+
+def getExcludeDict(excludeTerms):
+    """ Return {lower case exclude term: its upper case replacement}
+    """
+    return {x.lower() : x.upper() for x in excludeTerms}
+#-----------------------------------
+
+def maskText(text, excludeDict):
+    """ Return text normalized and with exclude terms masked (upper cased).
+        Exclude terms are replaced one at a time in excludeDict order, so
+            overlapping exclude terms behave as they always have in
+            doStatic.
+    """
+    newText = text.replace('\n', ' ')
+    for exTerm, replacement in excludeDict.items():
+        newText = newText.replace(exTerm, replacement)
+    return newText
+#-----------------------------------
+
+class TermStats (object):
+    """ Document frequencies and discriminative value of one term
+    """
+    def __init__(self, term, numPos, numNeg, totalNumPos=0, totalNumNeg=0):
+        self.term = term
+        self.numPos = numPos
+        self.numNeg = numNeg
+        self.posFraction = numPos / totalNumPos if totalNumPos else 0.0
+        self.negFraction = numNeg / totalNumNeg if totalNumNeg else 0.0
+        self.dValue = self.posFraction - self.negFraction # discrimative value
+#-----------------------------------
+
+class DocFreqCounter (object):
+    """
+    Is a: counter of the number of positive and negative documents that
+            contain each of a list of terms
+    Has : the (lower cased) terms, numPos and numNeg counts for each
+    Does: addDoc(maskedText, isPositive), merge(), getTermStats()
+    Note: a document is scanned once per distinct term with str.find, which
+            runs in C. Multi-pattern regexes (alternations, prefix tries)
+            were measured and are slower in CPython for ~100 terms.
+    """
+    def __init__(self, terms):
+        self.terms = [t.lower() for t in terms]     # in given order, w/ dups
+        self.uniqTerms = list(dict.fromkeys(self.terms))
+        self.numPos = [0] * len(self.uniqTerms)
+        self.numNeg = [0] * len(self.uniqTerms)
+        self.numDocs = 0
+
+    def addDoc(self, maskedText, isPositive):
+        """ Count the terms found in maskedText (see maskText())
+        """
+        counts = self.numPos if isPositive else self.numNeg
+        for i, term in enumerate(self.uniqTerms):
+            if term in maskedText:
+                counts[i] += 1
+        self.numDocs += 1
+
+    def merge(self, other):
+        """ Add the counts from another DocFreqCounter for the same terms
+        """
+        if other.uniqTerms != self.uniqTerms:
+            raise ValueError('cannot merge counters for different terms')
+        for i in range(len(self.uniqTerms)):
+            self.numPos[i] += other.numPos[i]
+            self.numNeg[i] += other.numNeg[i]
+        self.numDocs += other.numDocs
+        return self
+
+    def getTermStats(self, totalNumPos, totalNumNeg):
+        """ Return list of TermStats, one per term, in the original term order
+        """
+        index = {term: i for i, term in enumerate(self.uniqTerms)}
+        return [TermStats(term, self.numPos[index[term]],
+                            self.numNeg[index[term]], totalNumPos, totalNumNeg)
+                                                    for term in self.terms]
+# end class DocFreqCounter -----------------------------------
+
+# Worker process state, set by _initWorker() (inherited, not pickled, when
+#   the platform forks)
+_workerTexts = None
+_workerFlags = None
+_workerTerms = None
+_workerExcludeDict = None
+
+def _initWorker(texts, flags, terms, excludeDict):
+    global _workerTexts, _workerFlags, _workerTerms, _workerExcludeDict
+    _workerTexts = texts
+    _workerFlags = flags
+    _workerTerms = terms
+    _workerExcludeDict = excludeDict
+
+def _countShard(shard):
+    """ Return DocFreqCounter for the docs in shard = (start, end)
+    """
+    start, end = shard
+    counter = DocFreqCounter(_workerTerms)
+    for i in range(start, end):
+        text = _workerTexts[i]
+        if _workerExcludeDict is not None:
+            text = maskText(text, _workerExcludeDict)
+        counter.addDoc(text, _workerFlags[i])
+    return counter
+
+def _maskShard(shard):
+    """ Return list of masked texts for the docs in shard = (start, end)
+    """
+    start, end = shard
+    return [maskText(text, _workerExcludeDict)
+                                        for text in _workerTexts[start:end]]
+
+def getShards(numItems, numShards):
+    """ Return list of (start, end) ranges that split range(numItems) into
+        at most numShards contiguous pieces
+    """
+    numShards = max(1, min(numShards, numItems))
+    size, extra = divmod(numItems, numShards)
+    shards = []
+    start = 0
+    for i in range(numShards):
+        end = start + size + (1 if i < extra else 0)
+        shards.append((start, end))
+        start = end
+    return shards
+
+def _getPool(workers, texts, flags, terms, excludeDict):
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    return context.Pool(workers, initializer=_initWorker,
+                                initargs=(texts, flags, terms, excludeDict))
+#-----------------------------------
+
+def countDocFreqs(texts, isPositives, terms, excludeDict=None, workers=1):
+    """ Return DocFreqCounter for terms over the texts.
+        isPositives: list of True/False, one per text
+        excludeDict: mask each text w/ this before counting,
+                        None if the texts are already masked
+        workers: number of processes to shard the texts across
+    """
+    if workers <= 1 or len(texts) < 2:
+        _initWorker(texts, isPositives, terms, excludeDict)
+        try:
+            return _countShard((0, len(texts)))
+        finally:
+            _initWorker(None, None, None, None)
+
+    # several shards per worker to even out uneven document lengths
+    shards = getShards(len(texts), workers * 4)
+    counter = DocFreqCounter(terms)
+    with _getPool(workers, texts, isPositives, terms, excludeDict) as pool:
+        for shardCounter in pool.imap_unordered(_countShard, shards):
+            counter.merge(shardCounter)
+    return counter
+#-----------------------------------
+
+def getCachePath(cacheDir, sampleFileName, excludeTerms):
+    """ Return the masked text cache filename for the sample file & exclude
+        terms. Any change to the sample file (size or mtime) or the exclude
+        terms gives a different filename.
+    """
+    st = os.stat(sampleFileName)
+    key = '\n'.join([str(CACHE_VERSION), os.path.abspath(sampleFileName),
+                        str(st.st_size), str(st.st_mtime_ns)] + excludeTerms)
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    baseName = os.path.basename(sampleFileName)
+    return os.path.join(cacheDir, '%s.%s.masked.pickle' % (baseName, digest))
+#-----------------------------------
+
+class MaskedCorpus (object):
+    """
+    Is a: the exclusion-masked, normalized texts of a sample set
+    Has : IDs, isPositive flags, masked texts,
+          total num of positive & negative refs in the sample set
+    Does: build from samples (optionally w/ worker processes), save/load
+    """
+    def __init__(self, IDs, isPositives, texts, totalNumPos, totalNumNeg):
+        self.IDs = IDs
+        self.isPositives = isPositives
+        self.texts = texts
+        self.totalNumPos = totalNumPos
+        self.totalNumNeg = totalNumNeg
+
+    @classmethod
+    def fromSamples(cls, samples, excludeDict, totalNumPos, totalNumNeg,
+                                                                    workers=1):
+        """ Return MaskedCorpus for the samples (ClassifiedRefSamples)
+        """
+        IDs = [s.getID() for s in samples]
+        isPositives = [s.isPositive() for s in samples]
+        rawTexts = [s.getDocument() for s in samples]
+
+        if workers <= 1 or len(samples) < 2:
+            texts = [maskText(t, excludeDict) for t in rawTexts]
+        else:
+            texts = []
+            shards = getShards(len(rawTexts), workers * 4)
+            with _getPool(workers, rawTexts, None, None, excludeDict) as pool:
+                for maskedShard in pool.imap(_maskShard, shards):
+                    texts.extend(maskedShard)
+        return cls(IDs, isPositives, texts, totalNumPos, totalNumNeg)
+
+    def save(self, fileName):
+        """ Write to fileName, atomically so an interrupted run can't
+            leave a truncated cache file
+        """
+        dirName = os.path.dirname(fileName)
+        if dirName: os.makedirs(dirName, exist_ok=True)
+        tmpName = fileName + '.tmp%d' % os.getpid()
+        with open(tmpName, 'wb') as fp:
+            pickle.dump((CACHE_VERSION, self.__dict__), fp,
+                                                    pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpName, fileName)
+
+    @classmethod
+    def load(cls, fileName):
+        """ Return MaskedCorpus read from fileName or None if the file is
+            missing or from a different cache version
+        """
+        if not os.path.exists(fileName): return None
+        with open(fileName, 'rb') as fp:
+            version, attrs = pickle.load(fp)
+        if version != CACHE_VERSION: return None
+        corpus = cls.__new__(cls)
+        corpus.__dict__.update(attrs)
+        return corpus
+
+    def __len__(self): return len(self.texts)
+# end class MaskedCorpus -----------------------------------
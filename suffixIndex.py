@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Persistent suffix array index over the texts of a sample file,
+            for instant document frequencies (and example contexts) of any
+            literal term, w/o rescanning the corpus.
+
+           Document text is lower cased, normalized and exclusion-masked
+            like doStatic does (staticLib.maskText), so numPos/numNeg for a
+            term are the same as doStatic reports for the same exclude file.
+            A figure text index holds just the figure text of each document
+            (legends + 75 words around figure references).
+
+  Index:   The documents are concatenated (utf-8 bytes, '\x00' after each
+            doc) into shards of about shardSize bytes. Each shard has
+            text      - uint8 array
+            sa        - suffix array: start positions of all suffixes of
+                        text, sorted by their first maxLen bytes
+            docStarts - offset in text where each doc starts
+           A term lookup is a binary search in each shard's suffix array,
+            O(m log n) for a term of m bytes, and then a count of the
+            distinct documents of the matching suffixes.
+           Suffixes are only sorted by their first maxLen bytes, bounding
+            build time on repetitive text. Terms can't be longer.
+
+  Files:   indexDir/meta.json, indexDir/shardNN.{text,sa,docs}.npy
+           The .npy files are memory mapped when the index is loaded.
+
+  To Use:
+    docs = [(ID, isPositive, suffixIndex.prepText(text, excludeDict)), ...]
+    suffixIndex.buildIndex('myIndex', docs, totalNumPos, totalNumNeg)
+    index = suffixIndex.SuffixIndex.load('myIndex')
+    ts = index.getTermStats('in situ')     # a staticLib.TermStats
+    for docID, context in index.getContexts('in situ', 5): ...
+
+  To Run Automated Unit Tests:  python test_suffixIndex.py [-v]
+'''
+import os
+import json
+import numpy as np
+from staticLib import TermStats, maskText
+#-----------------------------------
+
+INDEX_VERSION = 1
+DOC_END = b'\x00'           # after each doc. Sorts before all other bytes
+DEFAULT_SHARD_SIZE = 2**24  # ~ bytes of text per shard
+DEFAULT_MAXLEN = 256        # suffixes are sorted by this many bytes
+
+#-----------------------------------
+
+def prepText(text, excludeDict):
+    """ Return the text as indexed: lower cased, '\n' -> ' ', exclude terms
+        masked (upper cased)
+    """
+    return maskText(text.lower(), excludeDict)
+#-----------------------------------
+
+def buildSuffixArray(codes, maxLen=DEFAULT_MAXLEN):
+    """ Return suffix array (int32, or int64 if needed) for the uint8 array
+            codes: suffix start positions sorted by their first maxLen bytes.
+        Prefix doubling: each round sorts suffixes by twice as many bytes,
+            using the ranks from the previous round. Stops when all
+            suffixes have distinct ranks or are sorted by >= maxLen bytes.
+    """
+    n = len(codes)
+    saType = np.int32 if n < 2**31 else np.int64
+    if n == 0: return np.zeros(0, dtype=saType)
+
+    rank = codes.astype(np.int64) + 1       # 0 is reserved for "past end"
+    base = max(n, 256) + 2                  # > any rank
+    k = 1
+    while True:
+        rank2 = np.zeros(n, dtype=np.int64)
+        rank2[:n-k] = rank[k:]
+        key = rank * base + rank2
+        sa = np.argsort(key)
+        sortedKey = key[sa]
+        newRank = np.empty(n, dtype=np.int64)
+        newRank[sa] = np.cumsum(np.concatenate(([1],
+                                        sortedKey[1:] != sortedKey[:-1])))
+        rank = newRank
+        if rank[sa[-1]] == n or 2 * k >= maxLen: break
+        k *= 2
+    return sa.astype(saType)
+#-----------------------------------
+
+class IndexShard (object):
+    """
+    Is a: suffix array index of a run of consecutive documents
+    Has : text, sa, docStarts (numpy arrays), firstDoc (global doc index of
+            its 1st document)
+    Does: findRange(term bytes), getDocs(lo, hi), getContext()
+    """
+    def __init__(self, text, sa, docStarts, firstDoc):
+        self.text = text
+        self.sa = sa
+        self.docStarts = docStarts
+        self.firstDoc = firstDoc
+
+    def _prefix(self, i, m):
+        pos = int(self.sa[i])
+        return self.text[pos:pos+m].tobytes()
+
+    def findRange(self, term):
+        """ Return (lo, hi): sa[lo:hi] are the suffixes starting w/ term
+            (bytes)
+        """
+        m = len(term)
+        lo, hi = 0, len(self.sa)
+        while lo < hi:                      # 1st suffix prefix >= term
+            mid = (lo + hi) // 2
+            if self._prefix(mid, m) < term: lo = mid + 1
+            else: hi = mid
+        start = lo
+        hi = len(self.sa)
+        while lo < hi:                      # 1st suffix prefix > term
+            mid = (lo + hi) // 2
+            if self._prefix(mid, m) <= term: lo = mid + 1
+            else: hi = mid
+        return start, lo
+
+    def getDocs(self, lo, hi):
+        """ Return sorted array of global doc indexes w/ suffixes sa[lo:hi]
+        """
+        positions = self.sa[lo:hi]
+        docs = np.searchsorted(self.docStarts, positions, side='right') - 1
+        return np.unique(docs) + self.firstDoc
+
+    def getContext(self, saIndex, m, width):
+        """ Return (global doc index, text around the match at sa[saIndex])
+            width is in bytes. The context doesn't extend past the doc
+            boundaries, partial utf-8 chars at its ends are dropped.
+        """
+        pos = int(self.sa[saIndex])
+        doc = int(np.searchsorted(self.docStarts, pos, side='right') - 1)
+        docStart = int(self.docStarts[doc])
+        if doc + 1 < len(self.docStarts):
+            docEnd = int(self.docStarts[doc+1]) - len(DOC_END)
+        else:
+            docEnd = len(self.text) - len(DOC_END)
+        start = max(docStart, pos - width)
+        end = min(docEnd, pos + m + width)
+        context = self.text[start:end].tobytes().decode('utf-8', 'ignore')
+        return doc + self.firstDoc, context
+# end class IndexShard -----------------------------------
+
+def _shardFileName(indexDir, shardNum, what):
+    return os.path.join(indexDir, 'shard%02d.%s.npy' % (shardNum, what))
+
+def buildIndex(indexDir,
+                docs,               # iterator of (ID, isPositive, text)
+                                    #   text should be from prepText()
+                totalNumPos,        # num of pos/neg refs in the sample set
+                totalNumNeg,
+                info={},            # dict of descriptive info to save in
+                                    #   meta.json (sample file name, ...)
+                shardSize=DEFAULT_SHARD_SIZE,
+                maxLen=DEFAULT_MAXLEN,
+                progress=None,      # optional function(shardNum, numDocs)
+                ):
+    """ Build the index and write it to indexDir
+    """
+    os.makedirs(indexDir, exist_ok=True)
+    IDs = []
+    isPositives = []
+    shardFirstDocs = []
+
+    def writeShard(pieces, docStarts):
+        shardNum = len(shardFirstDocs)
+        shardFirstDocs.append(len(IDs) - len(docStarts))
+        text = np.frombuffer(b''.join(pieces), dtype=np.uint8)
+        np.save(_shardFileName(indexDir, shardNum, 'text'), text)
+        np.save(_shardFileName(indexDir, shardNum, 'sa'),
+                                            buildSuffixArray(text, maxLen))
+        np.save(_shardFileName(indexDir, shardNum, 'docs'),
+                                        np.array(docStarts, dtype=np.int64))
+        if progress: progress(shardNum, len(IDs))
+
+    pieces = []
+    docStarts = []
+    shardLen = 0
+    for ID, isPositive, text in docs:
+        data = text.encode('utf-8') + DOC_END
+        if docStarts and shardLen + len(data) > shardSize:
+            writeShard(pieces, docStarts)
+            pieces, docStarts, shardLen = [], [], 0
+        docStarts.append(shardLen)
+        pieces.append(data)
+        shardLen += len(data)
+        IDs.append(ID)
+        isPositives.append(bool(isPositive))
+    if docStarts or not shardFirstDocs:
+        writeShard(pieces, docStarts)
+
+    meta = {'version'       : INDEX_VERSION,
+            'info'          : info,
+            'maxLen'        : maxLen,
+            'totalNumPos'   : totalNumPos,
+            'totalNumNeg'   : totalNumNeg,
+            'shardFirstDocs': shardFirstDocs,
+            'IDs'           : IDs,
+            'isPositives'   : isPositives,
+            }
+    with open(os.path.join(indexDir, 'meta.json'), 'w') as fp:
+        json.dump(meta, fp)
+#-----------------------------------
+
+class SuffixIndex (object):
+    """
+    Is a: suffix array index over the documents of a sample set
+    Has : IndexShards, doc IDs, isPositive flags, total num pos/neg refs
+    Does: load(), getDocFreq(term), getTermStats(term), getContexts(term)
+    """
+    def __init__(self, meta, shards):
+        self.info = meta['info']
+        self.maxLen = meta['maxLen']
+        self.totalNumPos = meta['totalNumPos']
+        self.totalNumNeg = meta['totalNumNeg']
+        self.IDs = meta['IDs']
+        self.isPositives = np.array(meta['isPositives'], dtype=bool)
+        self.shards = shards
+
+    @classmethod
+    def load(cls, indexDir, mmap=True):
+        """ Return SuffixIndex read from indexDir
+        """
+        with open(os.path.join(indexDir, 'meta.json')) as fp:
+            meta = json.load(fp)
+        if meta['version'] != INDEX_VERSION:
+            raise ValueError("index '%s' is version %s, need version %d" % \
+                                (indexDir, meta['version'], INDEX_VERSION))
+        mode = 'r' if mmap else None
+        shards = []
+        for shardNum, firstDoc in enumerate(meta['shardFirstDocs']):
+            shards.append(IndexShard(
+                np.load(_shardFileName(indexDir, shardNum, 'text'), mode),
+                np.load(_shardFileName(indexDir, shardNum, 'sa'), mode),
+                np.load(_shardFileName(indexDir, shardNum, 'docs'), mode),
+                firstDoc))
+        return cls(meta, shards)
+
+    def _termBytes(self, term):
+        termBytes = term.lower().encode('utf-8')
+        if len(termBytes) > self.maxLen:
+            raise ValueError("term longer than the index maxLen %d: '%s'" % \
+                                                        (self.maxLen, term))
+        return termBytes
+
+    def getDocs(self, term):
+        """ Return sorted array of the indexes of the docs containing term
+        """
+        termBytes = self._termBytes(term)
+        docs = [shard.getDocs(*shard.findRange(termBytes))
+                                                    for shard in self.shards]
+        return np.concatenate(docs) if docs else np.zeros(0, dtype=np.int64)
+
+    def getDocFreq(self, term):
+        """ Return (numPos, numNeg): num of pos/neg docs containing term
+        """
+        docs = self.getDocs(term)
+        numPos = int(np.count_nonzero(self.isPositives[docs]))
+        return numPos, len(docs) - numPos
+
+    def getTermStats(self, term):
+        """ Return staticLib.TermStats for term
+        """
+        numPos, numNeg = self.getDocFreq(term)
+        return TermStats(term.lower(), numPos, numNeg,
+                                        self.totalNumPos, self.totalNumNeg)
+
+    def getContexts(self, term, maxContexts=5, width=40):
+        """ Return list of (doc ID, text around term) for up to maxContexts
+            occurrences of term, at most one per doc
+        """
+        termBytes = self._termBytes(term)
+        contexts = []
+        seen = set()
+        for shard in self.shards:
+            lo, hi = shard.findRange(termBytes)
+            for i in range(lo, hi):
+                if len(contexts) >= maxContexts: return contexts
+                doc, context = shard.getContext(i, len(termBytes), width)
+                if doc in seen: continue
+                seen.add(doc)
+                contexts.append((self.IDs[doc], context))
+        return contexts
+
+    def getNumDocs(self): return len(self.IDs)
+# end class SuffixIndex -----------------------------------
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Generate synthetic GXD reference records that mimic the text in
+            real test sets, for offline benchmarking and scaling tests.
+           Real test sets come from the MGI database and can't be shipped
+            around, so this makes look-alikes:
+            - lower case ASCII text (as sdGetTestSet produces)
+            - paragraphs separated by '\n\n', PDF style line wraps ('\n')
+            - figure/table legends: paragraphs starting with "fig"/"table",
+                sometimes letter-spaced ("f i g u r e 2")
+            - "(fig. 3b)" references in body paragraphs
+            - controllable densities of cat1/cat2 terms, age expressions,
+                and exclude terms drawn from the vocabs
+            - document lengths from a heavy tailed distribution
+           Positive ("Yes") refs get more age & cat2 terms than negatives so
+            routing them gives non-trivial precision/recall.
+
+  To Use:
+    import syntheticCorpus, routerVocabs
+    vocabs = routerVocabs.RouterVocabs.fromDir('.')
+    gen = syntheticCorpus.SyntheticRefGenerator(vocabs, seed=1)
+    for fields in gen.genRecords(1000):
+        # fields is a dict of ClassifiedRefSample field values
+        ...
+
+  To Run Automated Unit Tests:  python test_syntheticCorpus.py [-v]
+'''
+import math
+import random
+#-----------------------------------
+
+# Term densities: expected number of occurrences per 1000 words
+DEFAULT_DENSITIES = {
+    'cat1'        : 1.5,     # cat1 terms ('embryo', ...)
+    'cat1Exclude' : 0.5,     # cat1 exclude terms
+    'cat2'        : 0.2,     # cat2 terms (assays)
+    'cat2Exclude' : 0.3,     # cat2 exclude terms
+    'age'         : 0.1,     # age expressions
+    'ageExclude'  : 0.5,     # age exclude terms
+    'figRef'      : 4.0,     # "(fig. 3b)" references in body paragraphs
+    }
+POSITIVE_BOOST = 10.0   # positive refs: age & cat2 densities times this
+LEGEND_BOOST   = 3.0    # legends: age & cat2 densities times this
+
+DEFAULT_LENGTH_DIST = 'lognormal:40000:0.8'   # see parseLengthDist()
+MINDOCLEN = 500         # clamp generated doc lengths (chars) to these
+MAXDOCLEN = 1000000
+
+# filler vocabulary for body text
+FILLER_WORDS = '''the of and in to a was were is with for that by as on at
+    from these this we are be or an which not cells expression mice mouse
+    gene protein data results shown analysis using levels increased reduced
+    significantly compared control mutant wild type tissue samples antibody
+    observed also signaling cell activity function development role study
+    however both each after during than between within into two three high
+    low levels response model loss regulation pathway factor region
+    specific consistent similar previously described indicated suggest
+    found further treated performed independent experiments n represent
+    mean sd p value statistical test differences group groups number
+    staining sections stained images quantified scale bar bars indicate
+    arrows arrowheads panel panels heterozygous homozygous littermates
+    genotype allele knockout conditional deletion transcript transcripts
+    isoform domain binding complex nuclear cytoplasmic membrane surface
+    neurons epithelium mesenchyme liver kidney heart lung brain retina
+    skin bone muscle stem progenitor differentiation proliferation
+    apoptosis migration formation morphogenesis patterning'''.split()
+
+# age expressions: '%d' is filled in with a number
+AGE_TEMPLATES = ['e%d.5', 'e%d.5', 'e%d', 'e %d.5', 'e-%d.5', '%d.5 dpc',
+    '%d dpc', 'embryonic day %d.5', 'embryonic day %d', 'gd%d', 'ed%d.5',
+    'ts%d', 'theiler stage %d', 'p%d', 'postnatal day %d', '%d day old embryos',
+    'blastocyst', 'blastocysts', 'somites', 'limb bud', 'headfold',
+    'fetal', 'fetuses', 'mouse embryos', 'zygote', 'morula',
+    'embryonic development', 'developmental stages',
+    ]
+
+LEGEND_STARTS = ['figure %d.', 'fig. %d', 'fig %d.', 'table %d.',
+    'figure %d', 'supplementary figure s%d.', 'extended data fig. %d',
+    'supplemental table s%d', 'online figure %d.',
+    ]
+LEGEND_ARTIFACT_STARTS = ['f i g u r e %d', 'f i g. %d', 't a b l e %d',
+    'f i g u r e  %d.', 's u p p l e m e n t a r y f i g u r e s%d',
+    ]
+
+FIGREF_TEMPLATES = ['(fig. %d%s)', '(figure %d%s)', '(fig %d%s)',
+    'fig. %d%s', 'figure %d%s', '(table %d)', 'table %d', '(figs. %d%s)',
+    '(supplementary fig. s%d%s)',
+    ]
+
+JOURNALS = ['Development', 'Dev Biol', 'Dev Dyn', 'PLoS One', 'Sci Rep',
+    'J Biol Chem', 'Cell Rep', 'Nat Commun', 'Elife', 'Gene Expr Patterns',
+    'Proc Natl Acad Sci U S A', 'Nature', 'Cell', 'J Neurosci',
+    ]
+#-----------------------------------
+
+def parseLengthDist(spec):
+    """ Parse a doc length distribution spec:
+            'lognormal:median:sigma'  e.g., 'lognormal:40000:0.8'
+            'pareto:xmin:alpha'       e.g., 'pareto:20000:1.5'
+            'fixed:length'            e.g., 'fixed:50000'
+        Return (name, [float params])
+    """
+    parts = spec.split(':')
+    name = parts[0]
+    params = [float(p) for p in parts[1:]]
+    nParams = {'lognormal': 2, 'pareto': 2, 'fixed': 1}
+    if name not in nParams or len(params) != nParams[name]:
+        raise ValueError("invalid length distribution '%s'\n" % spec)
+    return name, params
+#-----------------------------------
+
+def vocabTermToText(term, rng):
+    """ Return literal text for a vocab term.
+        Age exclude terms can have '#' (any digit) and '_' (word boundary)
+        (see GXD2aryRouter.TextMappingFromAgeExcludeTerms)
+    """
+    text = term.lower().replace('_', '')
+    while '#' in text:
+        text = text.replace('#', str(rng.randint(0, 9)), 1)
+    return text.strip()
+#-----------------------------------
+
+class SyntheticRefGenerator (object):
+    """
+    Is a: generator of synthetic reference records
+    Has : vocabs (routerVocabs.RouterVocabs), term densities,
+          doc length distribution, random number generator
+    Does: genText(), genRecord(), genRecords()
+    """
+    def __init__(self,
+                vocabs,                 # routerVocabs.RouterVocabs
+                seed=None,              # random seed for reproducible output
+                densities=None,         # {category: per 1000 words},
+                                        #   default DEFAULT_DENSITIES
+                lengthDist=DEFAULT_LENGTH_DIST, # see parseLengthDist()
+                positiveFraction=0.12,  # fraction of refs that are "Yes"
+                artifactRate=0.05,      # fraction of legends letter-spaced
+                skipJournalRate=0.03,   # fraction of negative refs in a
+                                        #   skipJournals journal
+                ):
+        self.rng = random.Random(seed)
+        self.densities = dict(DEFAULT_DENSITIES)
+        if densities: self.densities.update(densities)
+        self.lengthDist = parseLengthDist(lengthDist)
+        self.positiveFraction = positiveFraction
+        self.artifactRate = artifactRate
+        self.skipJournalRate = skipJournalRate
+
+        self.skipJournals = list(vocabs.skipJournals)
+        self.terms = {          # category : [term strings]
+            'cat1'        : [t.lower() for t in vocabs.cat1Terms],
+            'cat1Exclude' : [t.lower() for t in vocabs.cat1Exclude],
+            'cat2'        : [t.lower() for t in vocabs.cat2Terms],
+            'cat2Exclude' : [t.lower() for t in vocabs.cat2Exclude],
+            'ageExclude'  : list(vocabs.ageExclude),
+            }
+        self.numGenerated = 0
+
+    def genDocLength(self):
+        """ Return a random doc length (chars) from the length distribution
+        """
+        name, params = self.lengthDist
+        if name == 'lognormal':
+            median, sigma = params
+            length = self.rng.lognormvariate(math.log(median), sigma)
+        elif name == 'pareto':
+            xmin, alpha = params
+            length = xmin * self.rng.paretovariate(alpha)
+        else:
+            length = params[0]
+        return int(min(max(length, MINDOCLEN), MAXDOCLEN))
+
+    def _poisson(self, lam):
+        """ Return a random Poisson(lam) count
+        """
+        if lam <= 0: return 0
+        if lam > 30:        # normal approximation for big lambdas
+            return max(0, int(round(self.rng.gauss(lam, math.sqrt(lam)))))
+        limit = math.exp(-lam)
+        k = 0
+        p = self.rng.random()
+        while p > limit:
+            k += 1
+            p *= self.rng.random()
+        return k
+
+    def _genTerm(self, category):
+        """ Return text for a random term of the category
+        """
+        rng = self.rng
+        if category == 'age':
+            t = rng.choice(AGE_TEMPLATES)
+            if '%d' in t: t = t % rng.randint(1, 19)
+            return t
+        elif category == 'figRef':
+            t = rng.choice(FIGREF_TEMPLATES)
+            if '%s' in t: return t % (rng.randint(1,8), rng.choice('abcdefg'))
+            return t % rng.randint(1, 8)
+        terms = self.terms[category]
+        if not terms: return rng.choice(FILLER_WORDS)
+        return vocabTermToText(rng.choice(terms), rng)
+
+    def _genWords(self, numWords, densities):
+        """ Return list of numWords words (some are multiword terms)
+            with terms injected at the given densities
+        """
+        rng = self.rng
+        words = rng.choices(FILLER_WORDS, k=numWords)
+        for category, density in densities.items():
+            for i in range(self._poisson(numWords * density / 1000.0)):
+                words[rng.randrange(numWords)] = self._genTerm(category)
+
+        # sentence ends
+        i = rng.randint(5, 25)
+        while i < numWords:
+            words[i] = words[i] + '.'
+            i += rng.randint(5, 25)
+        return words
+
+    def _wrapLines(self, words):
+        """ Return words joined into text with PDF style line breaks
+        """
+        rng = self.rng
+        pieces = []
+        lineLen = 0
+        for w in words:
+            if pieces:
+                if lineLen > 60 and rng.random() < 0.3:
+                    pieces.append('\n')
+                    lineLen = 0
+                else:
+                    pieces.append(' ')
+            pieces.append(w)
+            lineLen += len(w) + 1
+        return ''.join(pieces)
+
+    def _legendStart(self, figNum):
+        rng = self.rng
+        if rng.random() < self.artifactRate:
+            return rng.choice(LEGEND_ARTIFACT_STARTS) % figNum
+        return rng.choice(LEGEND_STARTS) % figNum
+
+    def genText(self, targetLen, isPositive=False):
+        """ Return synthetic document text of about targetLen chars
+        """
+        rng = self.rng
+        bodyDens = dict(self.densities)
+        if isPositive:
+            bodyDens['age']  *= POSITIVE_BOOST
+            bodyDens['cat2'] *= POSITIVE_BOOST
+        legendDens = dict(bodyDens)
+        legendDens['age']  *= LEGEND_BOOST
+        legendDens['cat2'] *= LEGEND_BOOST
+        del legendDens['figRef']
+
+        # about 1 legend per 6000 chars, legends go at the end (like the
+        #  manuFigures section) or inline after a body paragraph
+        numLegends = max(1, targetLen // 6000)
+        figNum = 1
+        paragraphs = []
+        textLen = 0
+        while textLen < targetLen:
+            if figNum <= numLegends and \
+                            rng.random() < numLegends * 400.0 / targetLen:
+                words = self._genWords(rng.randint(40, 200), legendDens)
+                p = self._legendStart(figNum) + ' ' + self._wrapLines(words)
+                figNum += 1
+            else:
+                words = self._genWords(rng.randint(40, 250), bodyDens)
+                p = self._wrapLines(words)
+            paragraphs.append(p)
+            textLen += len(p) + 2
+
+        while figNum <= numLegends:     # remaining legends at the end
+            words = self._genWords(rng.randint(40, 200), legendDens)
+            paragraphs.append(self._legendStart(figNum) + ' ' +
+                                                    self._wrapLines(words))
+            figNum += 1
+
+        return '\n\n'.join(paragraphs) + '\n'
+
+    def genRecord(self):
+        """ Return dict of ClassifiedRefSample field values for a new ref
+        """
+        rng = self.rng
+        self.numGenerated += 1
+        refKey = 900000000 + self.numGenerated
+
+        isPositive = rng.random() < self.positiveFraction
+        if isPositive:
+            knownClassName = 'Yes'
+            status = rng.choice(['Chosen', 'Indexed', 'Full-coded'])
+            origTPFP = 'TP'
+            journal = rng.choice(JOURNALS)
+        else:
+            knownClassName = 'No'
+            status = rng.choice(['Rejected', 'Not Routed'])
+            origTPFP = rng.choice(['FP', 'NE'])
+            if self.skipJournals and rng.random() < self.skipJournalRate:
+                journal = rng.choice(self.skipJournals)
+            else:
+                journal = rng.choice(JOURNALS)
+
+        if isPositive or rng.random() < 0.4: relevance = 'keep'
+        else: relevance = 'discard'
+
+        return {'knownClassName' : knownClassName,
+                'ID'             : 'MGI:%d' % refKey,
+                '_refs_key'      : str(refKey),
+                'relevance'      : relevance,
+                'confidence'     : '%.4f' % rng.uniform(-2, 2),
+                'orig TP/FP'     : origTPFP,
+                'GXD status'     : status,
+                'journal'        : journal,
+                'text'           : self.genText(self.genDocLength(),
+                                                    isPositive=isPositive),
+                }
+
+    def genRecords(self, numRecords):
+        """ Generate numRecords field dicts
+        """
+        for i in range(numRecords):
+            yield self.genRecord()
+# end class SyntheticRefGenerator -----------------------------------
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Sparse reference x vocab term match matrix, and the "leave one
+            term out" impact of each term on routing TP/FP/TN/FN and
+            Precision/Recall/NPV.
+
+           Columns are vocab terms by category:
+              cat1, cat1Exclude, age (age mapping names), ageExclude, cat2,
+              cat2Exclude
+            named 'category:term', e.g., 'cat2:in situ'.
+           Entry [ref, column] is the number of matches to the term in the
+            ref (for ageExclude: the number of age matches it excluded).
+           The matrix is stored compressed sparse row (CSR): indptr,
+            indices, data numpy arrays, like scipy.sparse.csr_matrix (we
+            don't need scipy for this).
+
+           getTermImpacts() computes, for every column at once (vectorized
+            over the nonzero entries), how the routing counts would change
+            if that term were removed from its vocab:
+              cat1/age/cat2 term removed (the same as adding it as an exclude
+                term): the ref loses that term's matches
+              age exclude term removed: the age matches it excluded become
+                age matches
+              cat1/cat2 exclude term removed: each of its matches becomes a
+                match to each vocab term it contains (e.g., removing exclude
+                'in situ hybridization was not' unmasks 'in situ'). Exclude
+                terms that contain no vocab term have no effect.
+           Only refs w/ a match to the term can change routing, and only if
+            their other categories & journal pass the rule.
+
+           These are estimates: they ignore interactions between terms
+            (e.g., two overlapping cat2 terms, or a match excluded by two
+            exclude terms). Confirm the promising changes with doRouting2.
+
+  To Use:
+    tm = termMatrix.TermMatrix.fromRouter(gxdRouter)
+    for each ref:
+        gxdRouter.routeThisRef(...)
+        tm.addRouterMatches(refID, gxdRouter)
+    tm.save('Try1/TermMatrix.npz')
+    impacts = termMatrix.getTermImpacts(featureMatrix, tm, RoutingRule())
+
+  To Run Automated Unit Tests:  python test_termMatrix.py [-v]
+'''
+import re
+import numpy as np
+import routingFeatures
+#-----------------------------------
+
+CATEGORIES = ['cat1', 'cat1Exclude', 'age', 'ageExclude', 'cat2',
+                                                            'cat2Exclude']
+POS_CATEGORIES = ['cat1', 'age', 'cat2']        # categories the rule counts
+_POS_CATEGORY = {'cat1': 'cat1', 'cat1Exclude': 'cat1',
+                 'age' : 'age',  'ageExclude' : 'age',
+                 'cat2': 'cat2', 'cat2Exclude': 'cat2'}
+_FEATURE = {'cat1': 'cat1Matches', 'age': 'ageMatches', 'cat2': 'cat2Matches'}
+
+#-----------------------------------
+
+def columnName(category, term): return '%s:%s' % (category, term)
+
+def splitColumnName(name):
+    category, term = name.split(':', 1)
+    return category, term
+#-----------------------------------
+
+class TermMatrix (object):
+    """
+    Is a: sparse (CSR) matrix of vocab term match counts, 1 row per ref
+    Has : IDs, columns (names), gains, indptr/indices/data arrays
+            gains[col]: the change in its category's match count for each
+            match, if the term is removed (-1 for vocab terms)
+    Does: addRef(), addRouterMatches(), save()/load() (.npz),
+            getColumnNumRefs()
+    """
+    def __init__(self):
+        self.IDs = []
+        self.columns = []
+        self.colIndex = {}          # {column name: column number}
+        self.gains = []
+        self.ageExcludeRegexes = [] # [(term, compiled regex)] in vocab order
+        self.indptr = [0]
+        self.indices = []
+        self.data = []
+
+    @classmethod
+    def fromVocabs(cls, cat1Terms, cat1Exclude, ageMappingNames, ageExclude,
+                        cat2Terms, cat2Exclude, ageExcludeRegexes=None):
+        """ Set up the columns for all the terms (in vocab order).
+            Terms are lower cased as GXDrouter does.
+            ageExcludeRegexes: [regex string for each ageExclude term],
+                to attribute age exclusions to terms
+        """
+        tm = cls()
+        cat1Terms = [t.lower() for t in cat1Terms]
+        cat2Terms = [t.lower() for t in cat2Terms]
+        for t in cat1Terms: tm.addColumn('cat1', t)
+        for t in cat1Exclude:
+            t = t.lower()
+            tm.addColumn('cat1Exclude', t,
+                                    len([c for c in cat1Terms if c in t]))
+        for name in ageMappingNames: tm.addColumn('age', name)
+        for t in ageExclude: tm.addColumn('ageExclude', t, 1)
+        for t in cat2Terms: tm.addColumn('cat2', t)
+        for t in cat2Exclude:
+            t = t.lower()
+            tm.addColumn('cat2Exclude', t,
+                                    len([c for c in cat2Terms if c in t]))
+        if ageExcludeRegexes is not None:
+            tm.ageExcludeRegexes = [(t, re.compile(r, re.IGNORECASE))
+                                for t, r in zip(ageExclude, ageExcludeRegexes)]
+        return tm
+
+    @classmethod
+    def fromRouter(cls, router):
+        """ Set up the columns for the vocabs of a GXD2aryRouter.GXDrouter
+        """
+        import GXD2aryRouter
+        mappingNames = [m.name for m in GXD2aryRouter.getAgeMappings()
+                                            if not m.name.startswith('fix')]
+        ageExcludeRegexes = [router.ageExcludeTextMapping._str2regex(t)
+                                                    for t in router.ageExclude]
+        return cls.fromVocabs(router.cat1Terms, router.cat1Exclude,
+                        mappingNames, router.ageExclude, router.cat2Terms,
+                        router.cat2Exclude, ageExcludeRegexes)
+
+    def addColumn(self, category, term, gain=None):
+        """ Add a column (if it is new), return its column number
+            gain default: -1 for vocab terms, 0 for exclude terms
+        """
+        name = columnName(category, term)
+        col = self.colIndex.get(name)
+        if col is None:
+            if gain is None: gain = -1 if category in POS_CATEGORIES else 0
+            col = len(self.columns)
+            self.columns.append(name)
+            self.colIndex[name] = col
+            self.gains.append(gain)
+        return col
+
+    def addRef(self, ID, termCounts):
+        """ termCounts: {(category, term): num of matches}
+        """
+        row = {}
+        for (category, term), n in termCounts.items():
+            if n:
+                col = self.addColumn(category, term)
+                row[col] = row.get(col, 0) + n
+        self.IDs.append(ID)
+        for col in sorted(row.keys()):
+            self.indices.append(col)
+            self.data.append(row[col])
+        self.indptr.append(len(self.indices))
+        return self
+
+    def addRouterMatches(self, ID, router):
+        """ Add a row for the matches of the GXDrouter's last routeThisRef()
+        """
+        return self.addRef(ID, self.getRouterCounts(router))
+
+    def getRouterCounts(self, router):
+        """ Return {(category, term): num of matches} for the matches of the
+            GXDrouter's last routeThisRef()
+        """
+        counts = {}
+        def add(category, term):
+            counts[(category, term)] = counts.get((category, term), 0) + 1
+        for m in router.getCat1Matches():
+            add('cat1', m.matchText.replace('\n', ' ').lower())
+        for m in router.getCat1Excludes():
+            add('cat1Exclude', m.matchText.replace('\n', ' ').lower())
+        for m in router.getAgeMatches():
+            add('age', m.matchType)
+        for m in router.getAgeExcludes():
+            add('ageExclude', self.getAgeExcludeTerm(
+                                        getattr(m, 'excludeText', None)))
+        for m in router.getCat2Matches():
+            add('cat2', m.matchText.replace('\n', ' ').lower())
+        for m in router.getCat2Excludes():
+            add('cat2Exclude', m.matchText.replace('\n', ' ').lower())
+        return counts
+
+    def getRefCounts(self, row):
+        """ Return {(category, term): num of matches} for row number row
+        """
+        self._finish()
+        start, end = self.indptr[row], self.indptr[row+1]
+        return {splitColumnName(self.columns[col]): int(n) for col, n in
+                    zip(self.indices[start:end], self.data[start:end])}
+
+    def getAgeExcludeTerm(self, excludeText):
+        """ Return the ageExclude term whose regex matches excludeText:
+            the 1st in vocab order, like the regex alternation in the router
+        """
+        if excludeText is None: return '?'
+        for term, regex in self.ageExcludeRegexes:
+            if regex.fullmatch(excludeText): return term
+        return excludeText.lower()
+
+    def _finish(self):
+        if not isinstance(self.indices, np.ndarray):
+            self.indptr = np.array(self.indptr, dtype=np.int64)
+            self.indices = np.array(self.indices, dtype=np.int32)
+            self.data = np.array(self.data, dtype=np.int32)
+            self.gains = np.array(self.gains, dtype=np.int32)
+        return self
+
+    def __len__(self): return len(self.IDs)
+
+    def getNumColumns(self): return len(self.columns)
+
+    def getRows(self):
+        """ Return the row number of each nonzero entry (COO rows)
+        """
+        self._finish()
+        return np.repeat(np.arange(len(self.IDs)), np.diff(self.indptr))
+
+    def getColumnNumRefs(self, mask=None):
+        """ Return array: number of refs (in mask, default all) w/ a match to
+            each column
+        """
+        self._finish()
+        cols = self.indices
+        if mask is not None: cols = cols[mask[self.getRows()]]
+        return np.bincount(cols, minlength=len(self.columns))
+
+    def toDense(self):
+        self._finish()
+        dense = np.zeros((len(self.IDs), len(self.columns)), dtype=np.int32)
+        dense[self.getRows(), self.indices] = self.data
+        return dense
+
+    def save(self, fileName):
+        self._finish()
+        with open(fileName, 'wb') as fp:
+            np.savez_compressed(fp, IDs=np.array(self.IDs, dtype=str),
+                        columns=np.array(self.columns, dtype=str),
+                        gains=self.gains, indptr=self.indptr,
+                        indices=self.indices, data=self.data)
+
+    @classmethod
+    def load(cls, fileName):
+        tm = cls()
+        with np.load(fileName) as data:
+            tm.IDs = data['IDs'].tolist()
+            tm.columns = data['columns'].tolist()
+            tm.gains = data['gains']
+            tm.indptr = data['indptr']
+            tm.indices = data['indices']
+            tm.data = data['data']
+        tm.colIndex = {name: i for i, name in enumerate(tm.columns)}
+        return tm
+# end class TermMatrix -----------------------------------
+
+class TermImpacts (object):
+    """
+    Is a: the estimated routing counts if each term were removed
+    Has : columns, numRefs & numPosRefs (refs w/ a match to the column),
+            baseCounts {subset: counts dict} (the rule as is)
+            counts {subset: {predType: array, 1 count per column}}
+    Does: getMetrics(subset) -> (precision, recall, npv) arrays
+    """
+    def __init__(self, columns, numRefs, numPosRefs, baseCounts, counts):
+        self.columns = columns
+        self.numRefs = numRefs
+        self.numPosRefs = numPosRefs
+        self.baseCounts = baseCounts
+        self.counts = counts
+
+    def getMetrics(self, subset='Overall'):
+        """ Return precision, recall, npv arrays (percentages, 0.0 where
+            computeMetrics() would divide by zero)
+        """
+        c = self.counts[subset]
+        def pct(num, denom):
+            result = np.zeros(len(num))
+            nz = denom != 0
+            result[nz] = num[nz] / denom[nz] * 100
+            return result
+        return (pct(c['TP'], c['TP'] + c['FP']),
+                pct(c['TP'], c['TP'] + c['FN']),
+                pct(c['TN'], c['TN'] + c['FN']))
+# end class TermImpacts -----------------------------------
+
+def getCategoryCounts(fm):
+    """ Return array (numRefs x len(POS_CATEGORIES)) of the match counts
+        the routing rule uses
+    """
+    return np.stack([fm.getColumn(_FEATURE[c]) for c in POS_CATEGORIES],
+                                                                    axis=1)
+
+def getColumnCategories(tm):
+    """ Return array: the POS_CATEGORIES index each column's matches count in
+    """
+    return np.array([POS_CATEGORIES.index(
+                        _POS_CATEGORY[splitColumnName(name)[0]])
+                        for name in tm.columns], dtype=np.int64)
+
+def routeCounts(fm, rule, catCounts):
+    """ Return bool array, routed Yes, for the refs of FeatureMatrix fm w/
+        catCounts (see getCategoryCounts()) instead of fm's counts
+    """
+    mins = np.array([rule.minCat1, rule.minAge, rule.minCat2])
+    return (np.all(catCounts >= mins, axis=1) & rule.getJournalOK(fm)) | \
+                                                        rule.getForcedYes(fm)
+
+def getDeltaCounts(fm, rule, catCounts, rows, changes, cats, deltas,
+                                                                numChanges):
+    """ Return {subset: {predType: array w/ a count for each change}}:
+            the routing counts if each change were applied to catCounts.
+        A change is a list of entries (parallel arrays):
+            rows[i]   - ref
+            changes[i]- change number (0 .. numChanges-1)
+            cats[i]   - POS_CATEGORIES index
+            deltas[i] - amount added to catCounts[rows[i], cats[i]]
+        All the entries of a change must be in the same category.
+    """
+    fm._finish()
+    numRefs = len(fm)
+    routedYes = routeCounts(fm, rule, catCounts)
+    forcedYes = rule.getForcedYes(fm)
+    journalOK = rule.getJournalOK(fm)
+    mins = np.array([rule.minCat1, rule.minAge, rule.minCat2])
+    passes = catCounts >= mins
+    numPasses = passes.sum(axis=1)
+
+    # sum the deltas of each (change, ref)
+    keys = np.asarray(changes, dtype=np.int64) * numRefs + \
+                                            np.asarray(rows, dtype=np.int64)
+    keys, first, inverse = np.unique(keys, return_index=True,
+                                                        return_inverse=True)
+    deltas = np.bincount(inverse.ravel(), weights=deltas,
+                                    minlength=len(keys)).astype(np.int64)
+    changes = keys // numRefs
+    rows = keys % numRefs
+    cats = np.asarray(cats, dtype=np.int64)[first]
+
+    newCount = catCounts[rows, cats] + deltas
+    othersPass = (numPasses[rows] - passes[rows, cats]) == \
+                                                    len(POS_CATEGORIES) - 1
+    newYes = forcedYes[rows] | (journalOK[rows] & othersPass &
+                                                    (newCount >= mins[cats]))
+    oldYes = routedYes[rows]
+    isPos = fm.isPositive[rows]
+    becomesYes = newYes & ~oldYes
+    becomesNo = ~newYes & oldYes
+
+    counts = {}
+    for subset, refMask in [('Overall', None), ('Keeps', fm.isKeep),
+                                                ('Discards', ~fm.isKeep)]:
+        inSubset = np.ones(len(rows), dtype=bool) if refMask is None \
+                                                        else refMask[rows]
+        def changeSum(entryMask):
+            return np.bincount(changes[entryMask & inSubset],
+                                                    minlength=numChanges)
+        fnToTp = changeSum(becomesYes & isPos)
+        tnToFp = changeSum(becomesYes & ~isPos)
+        tpToFn = changeSum(becomesNo & isPos)
+        fpToTn = changeSum(becomesNo & ~isPos)
+        base = routingFeatures.getCounts(routedYes, fm.isPositive, refMask)
+        counts[subset] = {'TP': base['TP'] + fnToTp - tpToFn,
+                          'FP': base['FP'] + tnToFp - fpToTn,
+                          'TN': base['TN'] + fpToTn - tnToFp,
+                          'FN': base['FN'] + tpToFn - fnToTp,
+                         }
+    return counts
+
+def getTermImpacts(fm, tm, rule):
+    """ Return TermImpacts for removing each column of TermMatrix tm.
+        fm is the routingFeatures.FeatureMatrix for the same refs.
+    """
+    tm._finish()
+    fm._finish()
+    if list(tm.IDs) != list(fm.IDs):
+        raise ValueError('term matrix and feature matrix refs differ')
+
+    cols = tm.indices
+    counts = getDeltaCounts(fm, rule, getCategoryCounts(fm), tm.getRows(),
+                        cols, getColumnCategories(tm)[cols],
+                        tm.gains[cols] * tm.data, tm.getNumColumns())
+    return TermImpacts(tm.columns, tm.getColumnNumRefs(),
+                        tm.getColumnNumRefs(fm.isPositive),
+                        routingFeatures.evaluateRule(fm, rule), counts)
+#-----------------------------------
@@ -22,6 +22,191 @@ class FindMatchesTests(unittest.TestCase):
         self.assertEqual(m.postText, '.\nthe')
 #-----------------------------------
 
+class FigTextSpansTests(unittest.TestCase):
+    # Test routing w/ the figure text searched as spans of the full text
+    def setUp(self):
+        self.doc = 'Intro text about nothing.\n\n' + \
+            'We stained the tail of embryos in Fig 1. The embryo at E14.5 ' \
+            'has in\nsitu staining in the tail and limb. ' + \
+            'more words ' * 100 + '\n\n' + \
+            'Figure 2. Knockout mice at P5 show in situ staining, ' \
+            'but not in the heart. Age: adult, not e10.\n\nThe end.'
+        args = [[], ['in situ', 'staining'], ['not staining'], ['adult'],
+                        ['embryo', 'limb', 'heart', 'in situ'], ['the tail']]
+        self.gr      = GXDrouter(*args, minTextLen=10, numFigTextWords=10)
+        self.spansGr = GXDrouter(*args, minTextLen=10, numFigTextWords=10,
+                                                        useFigTextSpans=True)
+
+    def test_sameRouting(self):
+        for gr in [self.gr, self.spansGr]:
+            self.assertEqual(gr.routeThisRef(self.doc, 'journal'), 'Yes')
+        for get in ['getAgeMatches', 'getAgeExcludes', 'getCat2Matches',
+                                                            'getCat2Excludes']:
+            # blurbs have single spaces between words, spans the original
+            expected = [' '.join(m.matchText.split())
+                                            for m in getattr(self.gr, get)()]
+            got      = [' '.join(m.matchText.split())
+                                    for m in getattr(self.spansGr, get)()]
+            self.assertEqual(sorted(got), sorted(expected))
+        self.assertEqual(len(self.spansGr.getCat2Excludes()), 1)
+        self.assertEqual(len(self.spansGr.getAgeExcludes()), 1)
+
+    def test_fullTextOffsets(self):
+        self.spansGr.routeThisRef(self.doc, 'journal')
+        for m in self.spansGr.getAgeMatches() + \
+                            self.spansGr.getCat2Matches():
+            self.assertEqual(self.doc[m.start:m.end], m.matchText)
+        # "in situ" across a '\n' matches, and the text is not changed
+        m = [m for m in self.spansGr.getCat2Matches()
+                                        if m.matchText == 'in\nsitu'][0]
+        self.assertEqual(m.replText, 'IN SITU')
+
+    def test_lineBreaks(self):
+        # 'fix2' matches "fig e5" across a line break, so e5 isn't an age
+        doc = 'x ' * 300 + '\n\nthe in situ data of embryos is shown in ' \
+                                    'fig\ne5 and more words here.\n'
+        for gr in [self.gr, self.spansGr]:
+            gr.routeThisRef(doc, 'journal')
+            self.assertEqual(gr.getAgeMatches(), [])
+
+    def test_stageParams(self):
+        self.assertNotEqual(self.gr.getStageParams()['figText'],
+                            self.spansGr.getStageParams()['figText'])
+#-----------------------------------
+
+class UnifiedTermScanTests(FigTextSpansTests):
+    # Test routing w/ cat1 and cat2 terms searched in one copy of the text
+    def setUp(self):
+        FigTextSpansTests.setUp(self)
+        args = [[], ['in situ', 'staining'], ['not staining'], ['adult'],
+                        ['embryo', 'limb', 'heart', 'in situ'], ['the tail']]
+        self.spansGr = GXDrouter(*args, minTextLen=10, numFigTextWords=10,
+                                                        unifiedTermScan=True)
+
+    def test_sameCat1(self):
+        for gr in [self.gr, self.spansGr]:
+            gr.routeThisRef(self.doc, 'journal')
+        for get in ['getCat1Matches', 'getCat1Excludes']:
+            # findMatches() context can have earlier replacements in it
+            expected = [(m.start, m.end) for m in getattr(self.gr, get)()]
+            got      = [(m.start, m.end) for m in getattr(self.spansGr, get)()]
+            self.assertEqual(got, expected)
+
+    def test_sameAsDefault(self):
+        # line wrapped text, incl. "fig\neN" that is not an age
+        doc = 'x ' * 300 + '\n\nthe in situ\nstaining of embryos is ' \
+            'shown in fig\ne5 and in table\ne2, the embryo at\ne14.5 ' \
+            'has staining in the\nheart.\n\nfigure 3. adult\nmice at ' \
+            'p5 show\nin situ staining in the limb.\n'
+        for gr in [self.gr, self.spansGr]:
+            self.assertEqual(gr.routeThisRef(doc, 'journal'), 'Yes')
+        for get in ['getCat1Matches', 'getCat1Excludes', 'getAgeMatches',
+                    'getAgeExcludes', 'getCat2Matches', 'getCat2Excludes']:
+            expected = [' '.join(m.matchText.split())
+                                            for m in getattr(self.gr, get)()]
+            got      = [' '.join(m.matchText.split())
+                                    for m in getattr(self.spansGr, get)()]
+            self.assertEqual(sorted(got), sorted(expected))
+        self.assertEqual([m.matchText for m in self.spansGr.getAgeMatches()],
+                                                                ['e14.5'])
+
+    def test_spanBoundary(self):
+        text = 'we did in situ hyb. in situ'
+        terms = {'in situ': 'IN SITU'}
+        # a term across 2 spans doesn't match, text between spans isn't
+        #   searched
+        view = figureText.FigTextView(text, [(0, 10), (10, 19)])
+        self.assertEqual(findMatchesInSpans(view, terms, 'cat2', 5, []), [])
+        view = figureText.FigTextView(text, [(0, 19)])
+        ms = findMatchesInSpans(view, terms, 'cat2', 5, [])
+        self.assertEqual([(m.start, m.preText, m.postText) for m in ms],
+                                                    [(7, ' did ', ' hyb.')])
+        # earlier matches are skipped
+        view = figureText.FigTextView(text, [(3, 19), (20, 27)])
+        ms = findMatchesInSpans(view, terms, 'cat2', 5, [(8, 9)])
+        self.assertEqual([(m.start, m.preText, m.postText) for m in ms],
+                                                    [(20, '', '')])
+#-----------------------------------
+
+class SqueezeLetterSpacingTests(unittest.TestCase):
+    # Test routing w/ the letter spaced words squeezed first
+    def setUp(self):
+        self.doc = 'some embryo text ' * 40 + '\n\n' + \
+                'f i g u r e 1. in situ of mouse e14 embryos.\n\n' + \
+                't a b l e 2 lists e 1 things.'
+        args = [[], ['embryo'], [], ['chick'], ['in situ'], []]
+        self.gr        = GXDrouter(*args)
+        self.squeezeGr = GXDrouter(*args, squeezeLetterSpacing=True)
+
+    def test_sameRouting(self):
+        for gr in [self.gr, self.squeezeGr]:
+            self.assertEqual(gr.routeThisRef(self.doc, 'journal'), 'Yes')
+            self.assertEqual([m.matchText for m in gr.getAgeMatches()],
+                                                                    ['e14'])
+            self.assertEqual(len(gr.getCat2Matches()), 1)
+            self.assertEqual(len(gr.getCat1Matches()), 41)
+
+    def test_textOffsetMap(self):
+        self.squeezeGr.routeThisRef(self.doc, 'journal')
+        offsetMap = self.squeezeGr.getTextOffsetMap()
+        m = self.squeezeGr.getCat1Matches()[-1]     # after "f i g u r e"
+        self.assertEqual(self.doc[slice(*offsetMap.getOrigSpan(m.start,
+                                                        m.end))], 'embryo')
+        self.assertNotEqual(self.doc[m.start:m.end], 'embryo')
+
+        self.gr.routeThisRef(self.doc, 'journal')
+        self.assertIsNone(self.gr.getTextOffsetMap())
+
+    def test_singleLetters(self):
+        # single letters that don't spell a figure word are not squeezed
+        doc = 'some embryo text ' * 40 + '\n\n' + \
+                    'figure 1. in situ of panels a b e 14.5 embryos.'
+        for gr in [self.gr, self.squeezeGr]:
+            gr.routeThisRef(doc, 'journal')
+            self.assertEqual([m.matchText for m in gr.getAgeMatches()],
+                                                                ['e 14.5'])
+        self.assertTrue(self.squeezeGr.getTextOffsetMap().isIdentity())
+
+    def test_bodyFigureWords(self):
+        # a letter spaced "figure" in a body paragraph is a figure
+        #   reference once it is squeezed
+        doc = 'some embryo text ' * 40 + '\n\n' + \
+                'as we see in F I G U R E 3 the in situ of e14 embryos.'
+        self.assertEqual(self.gr.routeThisRef(doc, 'journal'), 'No')
+        self.assertEqual(self.squeezeGr.routeThisRef(doc, 'journal'), 'Yes')
+        self.assertEqual(len(self.gr.getCat2Matches()), 0)
+        self.assertEqual(len(self.squeezeGr.getCat2Matches()), 1)
+#-----------------------------------
+
+class AsciiTextTests(unittest.TestCase):
+    # Test routing w/ the age regex's in ASCII mode
+    def setUp(self):
+        self.doc = 'some embryo text ' * 40 + '\n\n' + \
+                'figure 1. in situ of mouse e14 embryos.\n\n' + \
+                'table 2. chick e5 embryos.'
+        args = [[], ['embryo'], [], ['chick'], ['in situ'], []]
+        self.gr      = GXDrouter(*args)
+        self.asciiGr = GXDrouter(*args, asciiText=True)
+
+    def test_sameRouting(self):
+        for gr in [self.gr, self.asciiGr]:
+            self.assertEqual(gr.routeThisRef(self.doc, 'journal'), 'Yes')
+            self.assertEqual([m.matchText for m in gr.getAgeMatches()],
+                                                                    ['e14'])
+            self.assertEqual([(m.matchText, m.excludeText)
+                            for m in gr.getAgeExcludes()], [('e5', 'chick')])
+
+    def test_reFlags(self):
+        self.assertTrue(self.asciiGr.ageTextTransformer.getBigRe().flags &
+                                                                    re.ASCII)
+        self.assertFalse(self.gr.ageTextTransformer.getBigRe().flags &
+                                                                    re.ASCII)
+        self.assertNotEqual(self.gr.getStageParams()['age'],
+                            self.asciiGr.getStageParams()['age'])
+        self.assertEqual(self.gr.getStageParams()['cat1'],
+                            self.asciiGr.getStageParams()['cat1'])
+#-----------------------------------
+
 class ShortTextTests(unittest.TestCase):
     # Test that refs with short text get routed
     def setUp(self):
@@ -39,6 +224,45 @@ class ShortTextTests(unittest.TestCase):
 
 #-----------------------------------
 
+class TimeBudgetTests(unittest.TestCase):
+    # Test that refs that take too long to route get routed
+    def test_noBudget(self):
+        gr = GXDrouter([], [], [], [], [], [], minTextLen=10)
+        routing = gr.routeThisRef('long enough, but no matches', 'journal')
+        self.assertEqual(routing, 'No')
+        self.assertFalse(gr.getTimedOut())
+
+    def test_overBudget(self):
+        # negative budget: always over budget after the 1st step
+        gr = GXDrouter([], ['embryo'], [], [], [], [], minTextLen=10,
+                                                            timeBudget=-1)
+        doc = '\n\nfig 1. embryo E14.5 more text'
+        routing = gr.routeThisRef(doc, 'journal')
+        self.assertEqual(routing, 'Yes')
+        self.assertTrue(gr.getTimedOut())
+        self.assertEqual(len(gr.getCat1Matches()), 1)   # 1st step was done
+        self.assertEqual(len(gr.getAgeMatches()), 0)    # ...but not the rest
+
+        # generous budget: routes normally
+        gr.timeBudget = 60
+        routing = gr.routeThisRef('long enough, but no matches', 'journal')
+        self.assertEqual(routing, 'No')
+        self.assertFalse(gr.getTimedOut())
+
+    def test_overBudgetInLastStep(self):
+        # the budget runs out during cat2: all steps were done, keep routing
+        gr = GXDrouter([], ['embryo'], [], [], [], [], minTextLen=10,
+                                                            timeBudget=60)
+        gotCat2 = gr._gotCat2
+        def slowCat2(text):
+            gr.timeBudget = -1
+            return gotCat2(text)
+        gr._gotCat2 = slowCat2
+        routing = gr.routeThisRef('long enough, but no matches', 'journal')
+        self.assertEqual(routing, 'No')
+        self.assertFalse(gr.getTimedOut())
+#-----------------------------------
+
 class AgeExcludeTests(unittest.TestCase):
     # Test the age exclude logic
     def setUp(self):
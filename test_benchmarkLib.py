@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for benchmarkLib.py
+Usage:   python test_benchmarkLib.py [-v]
+"""
+import unittest
+from benchmarkLib import *
+from GXD2aryRouter import GXDrouter
+
+class BucketAndPercentileTests(unittest.TestCase):
+    def test_bucketDocs(self):
+        docs = [BenchDoc(str(i), 'x' * n) for i, n in
+                                        enumerate([5, 50, 150, 99, 1000])]
+        bucketed = bucketDocs(docs, buckets=[10, 100, 500])
+        names = [name for name, docList in bucketed]
+        self.assertEqual(names, ['10-100', '100-500', '500+'])
+        self.assertEqual([d.ID for d in bucketed[0][1]], ['1', '3'])
+        self.assertEqual([d.ID for d in bucketed[1][1]], ['2'])
+        self.assertEqual([d.ID for d in bucketed[2][1]], ['4'])
+        # doc '0' is shorter than the smallest bucket: dropped
+
+    def test_percentile(self):
+        values = list(range(1, 101))        # 1..100
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 90), 90)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertEqual(percentile([], 50), 0.0)
+#-----------------------------------
+
+class RunAndCompareTests(unittest.TestCase):
+    def setUp(self):
+        self.router = GXDrouter([], ['embryo'], [], ['_hh##_'], ['in situ'],
+                                                                        [])
+        para = 'some text about embryo E14.5 and in situ (fig 1). ' * 20
+        self.docs = [BenchDoc('1', para),
+                     BenchDoc('2', para + '\n\nfigure 2. legend E12.5\n\n'),
+                     BenchDoc('3', para * 5)]
+
+    def test_runBenchmarks(self):
+        results = runBenchmarks(self.docs, self.router, buckets=[0, 2000])
+        benchNames = {r['benchmark'] for r in results['results']}
+        self.assertEqual(benchNames, {name for name, f in
+                                            getBenchmarks(self.router)})
+        for r in results['results']:
+            self.assertGreater(r['numDocs'], 0)
+            self.assertGreater(r['charsPerSec'], 0)
+            self.assertGreaterEqual(r['latencyMs']['max'],
+                                                    r['latencyMs']['p50'])
+            self.assertIsNotNone(r['peakMemBytes'])
+        self.assertEqual(results['meta']['numDocs'], 3)
+
+    def test_compareResults(self):
+        old = runBenchmarks(self.docs, self.router, benchNames=['findMatches'],
+                                                    measureMemory=False)
+        new = {'meta': old['meta'], 'results': []}
+        for r in old['results']:        # make the new run 2x slower
+            slow = dict(r)
+            slow['charsPerSec'] = r['charsPerSec'] / 2
+            slow['latencyMs'] = {k: v * 2 for k, v in r['latencyMs'].items()}
+            new['results'].append(slow)
+
+        comparisons, regressions = compareResults(old, new, threshold=10.0)
+        self.assertGreater(len(regressions), 0)
+        metrics = {reg.metric for reg in regressions}
+        self.assertIn('charsPerSec', metrics)
+        self.assertIn('latency p50', metrics)
+
+        comparisons, regressions = compareResults(old, old, threshold=10.0)
+        self.assertEqual(regressions, [])
+
+if __name__ == '__main__':
+    unittest.main()
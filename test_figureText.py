@@ -6,6 +6,7 @@ Usage:   python test_figureText.py [-v]
 """
 import unittest
 from figureText import *
+from utilsLib import squeezeLetterSpacing
 
 class figureText_basic_tests(unittest.TestCase):
 
@@ -119,6 +120,28 @@ class figureText_basic_tests(unittest.TestCase):
         exp = ['S u p p  t a b le 1 is interesting,']
         self.assertEqual(exp, t2f.text2FigText(text))
     
+    def test_squeezedLegends(self):
+        # letter spaced words squeezed, then plain words in the legend re
+        t2f = Text2FigConverter(conversionType='legends', squeezedText=True)
+        for text, exp in [
+            ("start\n\nF I G U R E 1 is\ninteresting,\n\nReally.",
+                                        ['FIGURE 1 is\ninteresting,']),
+            ("start\n\nO n l i n e f i g u r e 1 is good\n\nReally.",
+                                        ['Onlinefigure 1 is good']),
+            ("start\n\ns u p p l e m e n t a r y f i g u r e s2 is good",
+                                        ['supplementaryfigure s2 is good']),
+            ("start\n\nExtended D a t a  fig 1 is good,\n\nReally.",
+                                        ['Extended Data  fig 1 is good,']),
+            ("start\n\nSupplemental figure 1 is good,\n\nReally.",
+                                        ['Supplemental figure 1 is good,']),
+            ("start\n\nf i g u r e s are good\n\nT A B L E.",
+                                        ['TABLE.']),
+            ]:
+            newText, offsetMap = squeezeLetterSpacing(text)
+            self.assertEqual(exp, t2f.text2FigText(newText))
+            self.assertEqual(exp, [newText[s:e]
+                                    for s, e in t2f.text2FigSpans(newText)])
+
     def test_legendsAndWords(self):
         t2f = Text2FigConverter(conversionType='legCloseWords',numWords=2)
 
@@ -247,5 +270,114 @@ class figureText_basic_tests(unittest.TestCase):
         blurbs = text2FigText_LegendAndWords(simpleTestDoc, numWords=2)
         self.assertEqual(exp, blurbs)
 
+    def test_FigureWordIndex(self):
+        text = "start x-fig 1 here. fig 2 and\nfig 3, some more words Table 4."
+        #         0     1  2   3 4     5   6 7   8   9  10   11   12    13 14
+        index = FigureWordIndex(text)
+        self.assertEqual(index.figWords, [2, 5, 8, 13])
+        self.assertEqual(index.words[1:3], ['x-', 'fig'])
+
+        # several numWords from the same index
+        #  (0: all the words before each fig word, as words[-0:] did)
+        self.assertEqual(index.getBlurbs(0), ['start x- fig',
+                'fig 1 here. fig', 'fig 2 and fig',
+                'fig 3, some more words Table'])
+        self.assertEqual(index.getBlurbs(1), ['x- fig 1', 'here. fig 2',
+                                            'and fig 3,', 'words Table 4.'])
+        self.assertEqual(index.getBlurbs(2), ['start x- fig 1 here. fig 2 ' \
+                        'and fig 3, some', 'more words Table 4.'])
+        self.assertEqual(index.getBlurbs(50), [' '.join(text.split()) \
+                                                .replace('x-fig', 'x- fig')])
+
+        # w/ no words before the 1st fig word
+        index = FigureWordIndex(text, start=text.index('fig 2'),
+                                                    end=text.index(' and'))
+        self.assertEqual(index.getBlurbs(3), [' fig 2'])
+        self.assertEqual(FigureWordIndex("no legend refs here").getBlurbs(3), [])
+
+    def test_text2FigTextVariants(self):
+        converters = [Text2FigConverter(conversionType='legends'),
+                    Text2FigConverter(conversionType='legParagraphs'),
+                    Text2FigConverter(conversionType='legCloseWords',numWords=1),
+                    Text2FigConverter(conversionType='legCloseWords',numWords=3)]
+        for text in ["",
+            "Figures are good. Really.",
+            "That Table 1 is cool.\n\nTable 1 caption.\n\nI mean it. Really.",
+            "start of text. Fig 1 is fig 2 is\ninteresting,\n\nI mean it.",
+            "s\n\n figure 1 blah\n\nD\n\n a fig sentence\n\nE",
+            ]:
+            exp = [c.text2FigText(text) for c in converters]
+            self.assertEqual(exp, text2FigTextVariants(text, converters))
+
+    def test_paragraphSpanIterator(self):
+        for text in ["", "\n\n", "  one\n\n\n two \n\nthree\n\n", "x",
+                                    "a\n\n \n\n b \n"]:
+            self.assertEqual([text[s:e] for s, e in paragraphSpanIterator(text)],
+                                                list(paragraphIterator(text)))
+
+    def test_scanParagraphs(self):
+        # same paragraphs, legends, and figure words as the separate passes
+        for text in ["", "\n\n", "x", "Fig 1\n\nfig", "a\n\n \n\n b \n",
+                "  Table 1. caption\n\n\n configure the x-fig and figs, " \
+                "TABLES\n\nf i g u r e 2\n\nOnline Figure 3\n\nſupp fig",
+                "Figures\n\nEXTENDED DATA TABLE 1\n\néfig figé table"]:
+            exp = []
+            for p in paragraphIterator(text):
+                isLegend = legendRe.match(p) is not None
+                exp.append((p, isLegend,
+                            [m.group() for m in figureRe.finditer(p)]))
+            got = [(text[s:e], isLegend, [text[fs:fe] for fs, fe in figWords])
+                    for s, e, isLegend, figWords in scanParagraphs(text)]
+            self.assertEqual(exp, got)
+
+            got = [(text[s:e], isLegend, figWords) for s, e, isLegend,
+                        figWords in scanParagraphs(text, findFigWords=False)]
+            self.assertEqual([(p, isLegend, []) for p, isLegend, w in exp],
+                                                                        got)
+
+    def test_text2FigSpans(self):
+        texts = ["", "Figures are good. Really.",
+            "That Table 1 is cool.\n\nTable 1 caption.\n\nI mean it. Really.",
+            "start of text. Fig 1 is fig 2 is\ninteresting,\n\nI mean it.",
+            "s\n\n figure 1 blah\n\nD\n\n a fig sentence\n\nE",
+            "start\n\nS u p p  t a b le 1 is interesting,\n\nReally.",
+            "one two three fig four five six seven eight nine ten fig eleven",
+            ]
+        for conversionType in ['legends', 'legParagraphs']:
+            t2f = Text2FigConverter(conversionType=conversionType)
+            for text in texts:
+                self.assertEqual([text[s:e] for s, e in t2f.text2FigSpans(text)],
+                                                        t2f.text2FigText(text))
+        for numWords in [0, 1, 2, 3, 50]:
+            t2f = Text2FigConverter(conversionType='legCloseWords',
+                                                            numWords=numWords)
+            for text in texts:
+                self.assertEqual([' '.join(text[s:e].split())
+                                    for s, e in t2f.text2FigSpans(text)],
+                                [' '.join(b.split())
+                                    for b in t2f.text2FigText(text)])
+
+    def test_FigTextView(self):
+        text = "start of text. Fig 1 is\ninteresting,\n\nTable 1 caption."
+        t2f = Text2FigConverter(conversionType='legCloseWords', numWords=2)
+        view = FigTextView(text, t2f.text2FigSpans(text))
+        self.assertEqual(view.spans, [(6, 23), (38, 54)])
+        self.assertEqual(view.getText(), "of text. Fig 1 is\n\nTable 1 caption.")
+        self.assertEqual(len(view), len(view.getText()))
+        self.assertEqual(view.getTextOffset(0), 6)
+        self.assertEqual(view.getTextOffset(19), 38)    # 'Table'
+        self.assertRaises(IndexError, view.getTextOffset, 60)
+        self.assertEqual(view.getFindText()[23], ' ')
+        self.assertEqual(len(FigTextView(text, [])), 0)
+
+        packedText, packedStarts = view.getPackedFindText()
+        self.assertEqual(packedText, "of text. Fig 1 is" + SPAN_SEPARATOR +
+                                                        "Table 1 caption.")
+        self.assertEqual(packedStarts, [0, 18])
+        # the find text can be shared w/ another view of the same text
+        whole = FigTextView(text, [(0, len(text))],
+                                                findText=view.getFindText())
+        self.assertIs(whole.getPackedFindText()[0], view.getFindText())
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for invertedIndex.py
+Usage:   python test_invertedIndex.py [-v]
+"""
+import random
+import tempfile
+import unittest
+from invertedIndex import *
+
+class TokenizeTests(unittest.TestCase):
+    def test_tokenize(self):
+        text = 'In situ, e14.5\n\nWhole mount'
+        self.assertEqual(tokenize(text), [('in', 0, 0), ('situ', 0, 3),
+                            ('e14', 0, 9), ('5', 0, 13),
+                            ('whole', 1, 16), ('mount', 1, 22)])
+        self.assertEqual(phraseWords('E14.5'), ['e14', '5'])
+#-----------------------------------
+
+class InvertedIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.docs = [
+            ('ID0', True,  'in situ at e14.5 in the embryo'),
+            ('ID1', False, 'in situ.\n\ne14.5 embryos'),
+            ('ID2', True,  'e14.5 ' + 'x ' * 20 + 'in situ'),
+            ('ID3', False, 'western blot; no in-situ here, In Situ there'),
+            ('ID4', False, ''),
+            ]
+        self.tmpDir = tempfile.TemporaryDirectory()
+        buildIndex(self.tmpDir.name, self.docs, 2, 3, info={'x': 1})
+        self.index = InvertedIndex.load(self.tmpDir.name)
+
+    def tearDown(self):
+        self.tmpDir.cleanup()
+
+    def test_phrase(self):
+        matches = self.index.findPhrase('in situ')
+        self.assertEqual(matches.docs.tolist(), [0, 1, 2, 3, 3])
+        self.assertEqual(self.index.countDocs(matches), (2, 2))
+        self.assertEqual(matches.positions.tolist()[:2], [0, 0])
+
+        matches = self.index.findPhrase('E14.5 Embryos')
+        self.assertEqual(matches.docs.tolist(), [1])
+        self.assertEqual(len(self.index.findPhrase('situ e14')), 0)  # 2 paras
+        self.assertEqual(len(self.index.findPhrase('nothing here')), 0)
+        self.assertRaises(ValueError, self.index.findPhrase, '...')
+
+    def test_near(self):
+        matches = self.index.findNear('in situ', 'e14.5', window=2)
+        self.assertEqual(matches.docs.tolist(), [0, 1])
+        matches = self.index.findNear('in situ', 'e14.5', window=2,
+                                                        sameParagraph=True)
+        self.assertEqual(matches.docs.tolist(), [0])
+        matches = self.index.findNear('in situ', 'e14.5', window=20)
+        self.assertEqual(matches.docs.tolist(), [0, 1, 2])
+        matches = self.index.findNear('in situ', 'e14.5', window=19)
+        self.assertEqual(matches.docs.tolist(), [0, 1])
+        matches = self.index.findNear('in situ', 'in situ', window=5)
+        self.assertEqual(matches.docs.tolist(), [3, 3])
+
+    def test_snippets(self):
+        matches = self.index.findNear('in situ', 'embryo', window=5)
+        snippets = self.index.getSnippets(matches, width=0)
+        self.assertEqual(snippets, [('ID0', 'in situ at e14.5 in the embryo')])
+        snippets = self.index.getSnippets(self.index.findPhrase('in situ'),
+                                                    maxSnippets=3, width=3)
+        self.assertEqual([ID for ID, s in snippets], ['ID0', 'ID1', 'ID2'])
+        self.assertEqual(snippets[1][1], 'in situ.  ')
+
+    def test_randomNear(self):
+        # compare proximity results w/ brute force over token lists
+        rng = random.Random(3)
+        docs = [('ID%d' % i, i % 2 == 0,
+                ' '.join(rng.choice(['a', 'b', 'c', 'd']) for j in range(60)))
+                                                            for i in range(20)]
+        with tempfile.TemporaryDirectory() as tmpDir:
+            buildIndex(tmpDir, docs, 10, 10)
+            index = InvertedIndex.load(tmpDir)
+            for window in [0, 1, 3]:
+                for p1, p2 in [('a b', 'c'), ('a', 'd d'), ('b c a', 'a')]:
+                    w1, w2 = p1.split(), p2.split()
+                    expected = []
+                    for doc, (ID, isPos, text) in enumerate(docs):
+                        words = text.split()
+                        starts1 = [i for i in range(len(words))
+                                        if words[i:i+len(w1)] == w1]
+                        starts2 = [i for i in range(len(words))
+                                        if words[i:i+len(w2)] == w2]
+                        for s1 in starts1:
+                            if any(s1 - window - len(w2) <= s2 <=
+                                        s1 + len(w1) + window
+                                        for s2 in starts2):
+                                expected.append((doc, s1))
+                    matches = index.findNear(p1, p2, window=window)
+                    self.assertEqual(list(zip(matches.docs.tolist(),
+                            matches.positions.tolist())), expected, (p1, p2))
+
+if __name__ == '__main__':
+    unittest.main()
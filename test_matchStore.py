@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for matchStore.py
+Usage:   python test_matchStore.py [-v]
+"""
+import os
+import tempfile
+import unittest
+from matchStore import *
+from figureText import Text2FigConverter
+from routerVocabs import RouterVocabs
+from syntheticCorpus import SyntheticRefGenerator
+from routingFeatures import FEATURE_NAMES, getRouterFeatures
+
+def getVocabs(**changes):
+    vocabs = RouterVocabs(['J Skip'], ['embryo'], ['chick embryo'],
+                        ['_hh##_', 'chick'], ['in situ', 'northern', 'stain'],
+                        ['amount', 'in situ hybridization was not'])
+    for category, terms in changes.items(): setattr(vocabs, category, terms)
+    return vocabs
+
+class ScopeTests(unittest.TestCase):
+    def test_parseScope(self):
+        self.assertEqual(parseScope('legends'), ('legends', None))
+        self.assertEqual(parseScope('legCloseWords/75'), ('legCloseWords', 75))
+        for scope in ['legCloseWords', 'legends/5', 'figText',
+                                                        'legCloseWords/x']:
+            self.assertRaises(ValueError, parseScope, scope)
+
+    def test_scopesAreFigureText(self):
+        # the text in the scope ranges is the figure text, but for whitespace
+        text = "start of text. Fig 1 is fig 2 is\ninteresting,\n\n" + \
+                "Table 1 caption.\n\nno figure here\n\n" + \
+                "x-fig 3 and then some more words table 2b"
+        store = MatchStore(getVocabs())
+        store.addRef('1', text, 'J', True, True)
+        r = store.refs['1']
+        for scope, conversionType, numWords in [
+                ('legends', 'legends', 0),
+                ('legParagraphs', 'legParagraphs', 0),
+                ('legCloseWords/1', 'legCloseWords', 1),
+                ('legCloseWords/2', 'legCloseWords', 2),
+                ('legCloseWords/0', 'legCloseWords', 0)]:
+            c = Text2FigConverter(conversionType, numWords)
+            self.assertEqual([' '.join(text[s:e].replace('fig', ' fig').split())
+                                for s, e in r.getScopeRanges(scope)],
+                            [' '.join(b.replace('fig', ' fig').split())
+                                for b in c.text2FigText(text)], scope)
+        self.assertEqual(r.getScopeRanges('fullText'), [(0, len(text))])
+#-----------------------------------
+
+class MatchTests(unittest.TestCase):
+    def test_termMasking(self):
+        text = "the chick embryo and embryo and embryoembryo"
+        store = MatchStore(getVocabs(cat1Terms=['embryo', 'embryoe']))
+        store.addRef('1', text, 'J', True, True)
+        matches = store.refs['1'].getTermMatches('cat1', [(0, len(text))])
+        self.assertEqual(matches['cat1Exclude'], [('chick embryo', 4, 16)])
+        self.assertEqual(matches['cat1Terms'], [('embryo', 21, 27),
+                        ('embryo', 32, 38), ('embryo', 38, 44)])
+        matches = store.refs['1'].getTermMatches('cat1', [(10, 30)])
+        self.assertEqual(matches['cat1Exclude'], [])
+        self.assertEqual(matches['cat1Terms'], [('embryo', 10, 16),
+                                                        ('embryo', 21, 27)])
+
+    def test_ageExclude(self):
+        text = "chick at e14 embryos.\n\nchick. e14 embryos"
+        store = MatchStore(getVocabs())
+        store.addRef('1', text, 'J', True, True)
+        r = store.refs['1']
+        good, excluded = r.getAgeMatches([(0, len(text))], 210)
+        self.assertEqual([text[s:e] for n, s, e in good], ['e14'])
+        self.assertEqual([text[s:e] for n, s, e in excluded], ['e14'])
+        self.assertEqual(excluded[0][1], 9)
+        good, excluded = r.getAgeMatches([(0, len(text))], 2)
+        self.assertEqual(len(good), 2)
+        good, excluded = r.getAgeMatches([(6, 20)], 210)     # w/o chick
+        self.assertEqual([text[s:e] for n, s, e in good], ['e14'])
+
+    def test_straddlingAgeExclude(self):
+        # "fetal weight" straddles the age match "fetal", the router still
+        #   finds the "weight" exclude after it
+        vocabs = getVocabs(ageExclude=['fetal weight', 'weight'])
+        text = 'the embryo in fig 1 has fetal weight loss.'
+        store = MatchStore(vocabs)
+        store.addRef('1', text, 'J', True, True)
+        good, excluded = store.refs['1'].getAgeMatches([(0, len(text))], 210)
+        self.assertEqual([text[s:e] for n, s, e in excluded], ['fetal'])
+        self.assertEqual(good, [])
+
+        router = vocabs.buildRouter()
+        router.routeThisRef(text, 'J')
+        self.assertEqual([m.matchText for m in router.getAgeExcludes()],
+                                                                    ['fetal'])
+#-----------------------------------
+
+class MatchStoreTests(unittest.TestCase):
+    def test_sameAsRouter(self):
+        vocabs = getVocabs()
+        gen = SyntheticRefGenerator(vocabs, seed=11,
+                densities={'cat2': 2, 'age': 3, 'ageExclude': 3},
+                lengthDist='lognormal:7.5:0.7', skipJournalRate=0.2)
+        records = list(gen.genRecords(40))
+        store = MatchStore(vocabs)
+        for r in records:
+            store.addRef(r['ID'], r['text'], r['journal'],
+                    r['knownClassName'] == 'Yes', r['relevance'] == 'keep')
+        with tempfile.TemporaryDirectory() as tmpDir:
+            fileName = os.path.join(tmpDir, 'store')
+            store.save(fileName)
+            store = MatchStore.load(fileName, vocabs)
+            self.assertRaises(ValueError, MatchStore.load, fileName,
+                                            getVocabs(cat2Terms=['in situ']))
+        self.assertEqual(len(store), len(records))
+
+        for conversionType, numWords, scope in [
+                ('legCloseWords', 75, 'legCloseWords/75'),
+                ('legCloseWords', 5, 'legCloseWords/5'),
+                ('legends', 75, 'legends'),
+                ('legParagraphs', 75, 'legParagraphs')]:
+            for ageContext in [20, 210]:
+                router = vocabs.buildRouter(figTextConversion=conversionType,
+                            numFigTextWords=numWords, ageContext=ageContext)
+                fm = store.getFeatureMatrix('fullText', scope, scope,
+                                                                ageContext)
+                for i, r in enumerate(records):
+                    router.routeThisRef(r['text'], r['journal'])
+                    features = getRouterFeatures(router, len(r['text']))
+                    self.assertEqual(list(fm.features[i]),
+                                [features[f] for f in FEATURE_NAMES],
+                                (scope, ageContext, r['ID']))
+
+        # age in the full text finds more
+        fm = store.getFeatureMatrix(ageScope='fullText')
+        fm2 = store.getFeatureMatrix()
+        self.assertGreater(fm.getColumn('ageMatches').sum(),
+                                            fm2.getColumn('ageMatches').sum())
+#-----------------------------------
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for ngramMining.py
+Usage:   python test_ngramMining.py [-v]
+"""
+import unittest
+from ngramMining import *
+
+class GetNgramsTests(unittest.TestCase):
+    def test_ngrams(self):
+        self.assertEqual(getNgrams('a b c', maxN=2),
+                            {'a', 'b', 'c', 'a b', 'b c'})
+        self.assertEqual(getNgrams('a b c', maxN=3, minN=3), {'a b c'})
+        self.assertEqual(getNgrams('a, b.', maxN=2), {'a', 'b'})
+
+    def test_boundaries(self):
+        # no n-grams across paragraphs or masked words
+        self.assertEqual(getNgrams('a b\n\nc', maxN=2),
+                            {'a', 'b', 'a b', 'c'})
+        self.assertEqual(getNgrams('a IN SITU b', maxN=3), {'a', 'b'})
+
+    def test_punctuation(self):
+        # n-grams are only tokens separated by a single space or newline,
+        #  so they occur in the text as is
+        text = 'wild-type embryos (e14.5) in\nsitu,  stain'
+        ngrams = getNgrams(text, maxN=2)
+        self.assertEqual(ngrams, {'wild', 'type', 'embryos', 'e14', '5', 'in',
+                                    'situ', 'stain', 'type embryos', 'in situ'})
+        for ngram in ngrams:
+            self.assertIn(ngram, text.replace('\n', ' '))
+#-----------------------------------
+
+class CountMinSketchTests(unittest.TestCase):
+    def test_estimates(self):
+        sketch = CountMinSketch(width=64, depth=4)
+        items = ['w%d' % i for i in range(200)]
+        for n in range(3):
+            sketch.addItems(items[:50 * (n+1)])     # w0-w49 counted 3 times
+        estimates = sketch.estimates(items)
+        trueCounts = [3] * 50 + [2] * 50 + [1] * 50 + [0] * 50
+        for est, true in zip(estimates, trueCounts):
+            self.assertTrue(est >= true)            # never under-estimates
+        self.assertEqual(sketch.totalCount, 300)
+        self.assertEqual(len(sketch.estimates([])), 0)
+
+    def test_exactWhenWide(self):
+        sketch = CountMinSketch(width=2**16, depth=4)
+        sketch.addItems(['a', 'b'])
+        sketch.addItems(['a'])
+        self.assertEqual(list(sketch.estimates(['a', 'b', 'c'])), [2, 1, 0])
+#-----------------------------------
+
+class NgramMinerTests(unittest.TestCase):
+    def setUp(self):
+        self.docs = [('in situ hybridization of embryos', True),
+                     ('whole mount in situ', True),
+                     ('in situ stuff', False),
+                     ('western blot of embryos', False),
+                     ('western blot', False),
+                    ]
+
+    def test_mine(self):
+        miner = NgramMiner(minDF=2, maxN=2, sketchWidth=2**12)
+        miner.mine(lambda: iter(self.docs))
+        self.assertEqual(miner.numDocs, 5)
+        self.assertEqual(miner.counts['in situ'], [2, 1])
+        self.assertEqual(miner.counts['western blot'], [0, 2])
+        self.assertNotIn('whole mount', miner.counts)   # df 1 < minDF
+
+        top = miner.getTopTerms(2, 3, k=3)
+        self.assertEqual([ts.term for ts in top], ['in', 'in situ', 'situ'])
+        self.assertAlmostEqual(top[0].dValue, 1.0 - 1/3)
+
+        bottom = miner.getTopTerms(2, 3, k=3, lowest=True)
+        self.assertEqual([ts.term for ts in bottom],
+                                            ['blot', 'western', 'western blot'])
+
+    def test_smallSketch(self):
+        # collisions in a tiny sketch only add candidates, counts stay exact
+        exact = NgramMiner(minDF=2, maxN=3, sketchWidth=2**12)
+        exact.mine(lambda: iter(self.docs))
+        tiny = NgramMiner(minDF=2, maxN=3, sketchWidth=4, sketchDepth=1)
+        tiny.mine(lambda: iter(self.docs))
+        self.assertEqual(tiny.counts, exact.counts)
+        self.assertTrue(tiny.numCandidates >= exact.numCandidates)
+
+if __name__ == '__main__':
+    unittest.main()
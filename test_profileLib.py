@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for profileLib.py
+Usage:   python test_profileLib.py [-v]
+"""
+import os
+import tempfile
+import unittest
+from profileLib import *
+
+def leaf(n):
+    return sum([i*i for i in range(n)])
+
+def middle(n):
+    return leaf(n) + leaf(n)
+
+def top(n):
+    return middle(n)
+
+class CollapsedStacksTests(unittest.TestCase):
+    def test_stacks(self):
+        profiler = CpuProfiler()
+        profiler.start()
+        top(200000)
+        profiler.stop()
+
+        stacks = dict(getCollapsedStacks(profiler.getStats()))
+        self.assertTrue(len(stacks) > 0)
+        for stack, micros in stacks.items():
+            self.assertNotIn(' ', stack)
+            self.assertTrue(micros >= 1)
+        # leaf is reached through top and middle
+        leafStacks = [s for s in stacks if s.split(';')[-1].find(':leaf:') > 0]
+        self.assertTrue(leafStacks)
+        for s in leafStacks:
+            self.assertIn(':middle:', s)
+            self.assertIn(':top:', s)
+
+    def test_funcLabel(self):
+        self.assertEqual(funcLabel(('~', 0, "<method 'find' of 'str'>")),
+                                            "<method_'find'_of_'str'>")
+        self.assertEqual(funcLabel(('/a/b/mod.py', 12, 'f')), 'mod.py:f:12')
+
+    def test_write(self):
+        profiler = CpuProfiler()
+        profiler.start()
+        top(1000)
+        profiler.stop()
+        with tempfile.TemporaryDirectory() as tmpDir:
+            pstatsFile, collapsedFile = profiler.write(
+                                            os.path.join(tmpDir, 'profile'))
+            self.assertTrue(os.path.exists(pstatsFile))
+            lines = open(collapsedFile).read().splitlines()
+            self.assertTrue(lines)
+            self.assertTrue(lines[0].split(' ')[-1].isdigit())
+#-----------------------------------
+
+class StageTrackerTests(unittest.TestCase):
+    def test_stages(self):
+        tracker = StageTracker(measureMemory=True)
+        tracker.start()
+        tracker.setRef('ref1')
+        with tracker.stage('small'):
+            x = 'a' * 1000
+        with tracker.stage('big'):
+            y = 'b' * 2000000
+            del y
+        tracker.setRef('ref2')
+        with tracker.stage('small'):
+            x = 'a' * 1000
+        tracker.stop()
+
+        self.assertEqual(tracker.refOrder, ['ref1', 'ref2'])
+        self.assertTrue(tracker.refStats['ref1']['big'].peak >= 2000000)
+        self.assertTrue(tracker.refStats['ref1']['small'].peak < 100000)
+        self.assertEqual(tracker.getRefPeak('ref1'),
+                                        tracker.refStats['ref1']['big'].peak)
+
+        totals = tracker.getStageTotals()
+        count, seconds, peak, peakRef = totals['small']
+        self.assertEqual(count, 2)
+        count, seconds, peak, peakRef = totals['big']
+        self.assertEqual((count, peakRef), (1, 'ref1'))
+
+        report = tracker.getReport(topN=1)
+        self.assertIn('Stage summary', report)
+        self.assertIn('Top 1 references by peak memory\n', report)
+        self.assertIn('ref1\t', report)
+        self.assertIn('allocation sites', report)
+
+    def test_noMemory(self):
+        tracker = StageTracker(measureMemory=False)
+        tracker.start()
+        tracker.setRef('ref1')
+        with tracker.stage('s'):
+            x = 'a' * 1000000
+        tracker.stop()
+        self.assertEqual(tracker.getRefPeak('ref1'), 0)
+        self.assertEqual(tracker.refStats['ref1']['s'].count, 1)
+        self.assertNotIn('allocation sites', tracker.getReport())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for regexScaling.py
+Usage:   python test_regexScaling.py [-v]
+"""
+import unittest
+import re
+from regexScaling import *
+
+class ScalingExponentTests(unittest.TestCase):
+    def test_scalingExponent(self):
+        sizes = [1000, 2000, 4000, 8000]
+        linear    = [s * 1e-6 for s in sizes]
+        quadratic = [s * s * 1e-9 for s in sizes]
+        self.assertAlmostEqual(scalingExponent(sizes, linear), 1.0, places=5)
+        self.assertAlmostEqual(scalingExponent(sizes, quadratic),2.0,places=5)
+
+    def test_getAdversarialText(self):
+        self.assertEqual(getAdversarialText('ab ', 7), 'ab ab a')
+        self.assertEqual(len(getAdversarialText('f i g ', 1000)), 1000)
+#-----------------------------------
+
+class WorstCaseLatencyTests(unittest.TestCase):
+    # These time actual regex matches. The sizes are kept small so the tests
+    #  run quickly. Run regexScaling.py for the full check.
+    sizes = [2000, 4000, 8000]
+
+    def test_detectsSuperLinear(self):
+        # '(?:\w|[ ])*' and '\s+' can both eat spaces: quadratic w/ finditer
+        bad = RegexToCheck('bad', re.compile(r'\b(?:\w|[ ])*\s+figure'))
+        result = checkScaling(bad, 'letters', 'a ', sizes=self.sizes,
+                                                            minTime=0.0)
+        self.assertTrue(result.superLinear)
+
+    def test_routerRegexesAreLinear(self):
+        # the combined regexes the router actually applies
+        ageExclude = ['_hh##_', 'hamburger hamilton', 'chick', 'zebrafish']
+        names = ['ageBigRe', 'ageExcludeTerms', 'ageExcludeBlockRE',
+                                'legendRe', 'figureRe', 'paraOrFigureRe',
+                                'squeezedLegendRe', 'letterSpacedRe']
+        regexes = [r for r in getRouterRegexes(ageExclude) if r.name in names]
+        self.assertEqual(len(regexes), len(names))
+
+        results = checkAllScaling(regexes, sizes=self.sizes)
+        failures = [(r.regexName, r.inputName, r.exponent) for r in results
+                                                            if r.superLinear]
+        self.assertEqual(failures, [])
+
+if __name__ == '__main__':
+    unittest.main()
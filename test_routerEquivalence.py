@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for routerEquivalence.py
+Usage:   python test_routerEquivalence.py [-v]
+"""
+import unittest
+from routerEquivalence import *
+from GXD2aryRouter import GXDrouter
+
+def getRouter(cat2Terms=['in situ', 'northern']):
+    return GXDrouter(['J Skip'], ['embryo'], [], ['_hh##_'], cat2Terms, [],
+                                                                minTextLen=10)
+
+DOC = 'intro about embryo.\n\nsome methods text.\n\n' + \
+        'figure 1. an e14.5 embryo by in situ and northern blots.\n\n' + \
+        'more unrelated text here.\n\nthe end.'
+
+class DdminTests(unittest.TestCase):
+    def test_ddmin(self):
+        items = list(range(20))
+        result = ddmin(items, lambda l: 7 in l and 13 in l)
+        self.assertEqual(result, [7, 13])
+
+        result = ddmin(items, lambda l: True)
+        self.assertEqual(len(result), 1)
+#-----------------------------------
+
+class EquivalenceCheckerTests(unittest.TestCase):
+    def test_sameRouters(self):
+        checker = EquivalenceChecker(getRouter(), getRouter())
+        self.assertTrue(checker.checkRef('1', DOC, 'J Good'))
+        self.assertTrue(checker.checkRef('2', DOC, 'J Skip'))
+        self.assertEqual(checker.numChecked, 2)
+        self.assertEqual(checker.numDivergent, 0)
+
+    def test_divergentRouters(self):
+        # candidate is missing a cat2 term, still routes Yes (has in situ)
+        checker = EquivalenceChecker(getRouter(), getRouter(['in situ']))
+        self.assertFalse(checker.checkRef('1', DOC, 'J Good'))
+        self.assertEqual(checker.numDivergent, 1)
+        self.assertEqual(checker.numRoutingDiffs, 0)
+        self.assertEqual(checker.diffCounts, {'Cat2Matches': 1})
+
+        refID, diffs, context, snippet = checker.reported[0]
+        self.assertEqual(diffs[0].what, 'Cat2Matches count')
+        self.assertEqual((diffs[0].refValue, diffs[0].candValue), (2, 1))
+        self.assertIn('northern', snippet)
+        self.assertIn('northern', context)  # context from figure text
+        self.assertLess(len(snippet), len(DOC) / 2)
+        self.assertIn('Divergent references: 1', checker.getReport())
+
+    def test_routingDivergence(self):
+        checker = EquivalenceChecker(getRouter(), getRouter(['western']))
+        self.assertFalse(checker.checkRef('1', DOC, 'J Good'))
+        self.assertEqual(checker.numRoutingDiffs, 1)
+        refID, diffs, context, snippet = checker.reported[0]
+        self.assertEqual(diffs[0].what, 'routing')
+        self.assertEqual((diffs[0].refValue, diffs[0].candValue),('Yes','No'))
+
+    def test_ignoreFields(self):
+        router = getRouter()
+        routing = router.routeThisRef(DOC, 'J Good')
+        sig = getRoutingSignature(router, routing, ignoreFields={'start','end'})
+        self.assertEqual(len(sig['Cat2Matches'][0]), len(MATCHRCD_FIELDS) - 2)
+
+if __name__ == '__main__':
+    unittest.main()
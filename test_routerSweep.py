@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for routerSweep.py
+Usage:   python test_routerSweep.py [-v]
+"""
+import unittest
+import numpy as np
+from routerSweep import *
+from routerVocabs import RouterVocabs
+from syntheticCorpus import SyntheticRefGenerator
+from routingFeatures import FEATURE_NAMES, getRouterFeatures
+
+def getVocabs():
+    return RouterVocabs(['J Skip'], ['embryo'], ['chick embryo'],
+                        ['_hh##_', 'chick'], ['in situ', 'northern', 'stain'],
+                        ['amount', 'in situ hybridization was not'])
+
+class ConfigGridTests(unittest.TestCase):
+    def test_getConfigGrid(self):
+        configs = getConfigGrid(conversionTypes=['legends', 'legCloseWords'],
+                                numFigTextWords=[50, 75], minTextLens=[0, 500])
+        self.assertEqual([str(c) for c in configs], [
+            'legends ageContext=210 numChars=30 minTextLen=0',
+            'legends ageContext=210 numChars=30 minTextLen=500',
+            'legCloseWords/50 ageContext=210 numChars=30 minTextLen=0',
+            'legCloseWords/50 ageContext=210 numChars=30 minTextLen=500',
+            'legCloseWords/75 ageContext=210 numChars=30 minTextLen=0',
+            'legCloseWords/75 ageContext=210 numChars=30 minTextLen=500'])
+        self.assertEqual(configs[0].getColumnValues(),
+                                    ['legends', '', '210', '30', '0'])
+
+    def test_badConversionType(self):
+        self.assertRaises(ValueError, SweepConfig, 'captions')
+#-----------------------------------
+
+class RouterSweepTests(unittest.TestCase):
+    def test_sweepEqualsSeparateRuns(self):
+        gen = SyntheticRefGenerator(getVocabs(), seed=7,
+                densities={'cat2': 2, 'age': 3, 'ageExclude': 3},
+                lengthDist='lognormal:7.5:0.7', skipJournalRate=0.2)
+        records = list(gen.genRecords(40))
+        configs = getConfigGrid(conversionTypes=CONVERSION_TYPES,
+                                numFigTextWords=[5, 50], ageContexts=[20, 210],
+                                numChars=[10, 30], minTextLens=[500, 2000])
+        self.assertEqual(len(configs), 32)
+
+        sweep = RouterSweep(getVocabs(), configs)
+        for r in records:
+            sweep.addRef(r['ID'], r['text'], r['journal'],
+                    r['knownClassName'] == 'Yes', r['relevance'] == 'keep')
+
+        results = dict(sweep.getResults())
+        for config in configs:
+            router = getVocabs().buildRouter(**config.getRouterArgs())
+            fm = sweep.getFeatureMatrix(config)
+            routedYes = []
+            for i, r in enumerate(records):
+                routing = router.routeThisRef(r['text'], r['journal'])
+                routedYes.append(routing == 'Yes')
+                features = getRouterFeatures(router, len(r['text']))
+                self.assertEqual(list(fm.features[i]),
+                            [features[f] for f in FEATURE_NAMES], str(config))
+            isPositive = fm.isPositive
+            routedYes = np.array(routedYes)
+            self.assertEqual(results[config]['Overall'],
+                    routingFeatures.getCounts(routedYes, isPositive))
+
+        # the configs don't all route the same
+        self.assertGreater(len({str(result['Overall'])
+                                    for result in results.values()}), 1)
+        self.assertLess(sweep.numFigTextSearches, len(records) * 6)
+
+        table = sweep.getTable().split('\n')
+        self.assertEqual(table[0].split('\t')[:5], CONFIG_COLUMNS)
+        self.assertEqual(len(table), len(configs) + 2)
+#-----------------------------------
+
+if __name__ == '__main__':
+    unittest.main()
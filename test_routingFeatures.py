@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for routingFeatures.py
+Usage:   python test_routingFeatures.py [-v]
+"""
+import os
+import random
+import tempfile
+import unittest
+from routingFeatures import *
+
+def makeFeatures(numRefs, seed=1):
+    rng = random.Random(seed)
+    fm = FeatureMatrix()
+    for i in range(numRefs):
+        fm.addRef('MGI:%d' % i, rng.random() < 0.3, rng.random() < 0.5,
+                    rng.choice(['J Neurosci', 'Dev Biol', 'Skip Me']),
+                    {'goodJournal' : rng.random() < 0.9,
+                     'cat1Matches' : rng.choice([0, 1, 2, 5]),
+                     'cat1Excludes': rng.choice([0, 3]),
+                     'ageMatches'  : rng.choice([0, 1, 2]),
+                     'ageExcludes' : 0,
+                     'cat2Matches' : rng.choice([0, 1, 2, 3]),
+                     'cat2Excludes': 1,
+                     'textLength'  : rng.choice([100, 499, 500, 20000]),
+                    }, timedOut=rng.random() < 0.05)
+    return fm
+
+def routeOneRef(rule, values, journal, timedOut):
+    # GXDrouter.routeThisRef()'s decision, one ref at a time
+    if timedOut: return True
+    if rule.skipJournals is not None: good = journal not in rule.skipJournals
+    else: good = values['goodJournal']
+    return bool((values['cat1Matches'] >= rule.minCat1 and
+                 values['ageMatches']  >= rule.minAge and
+                 values['cat2Matches'] >= rule.minCat2 and
+                 (good or not rule.useJournal))
+                or values['textLength'] < rule.minTextLen)
+
+class ComputeMetricsTests(unittest.TestCase):
+    def test_metrics(self):
+        p, r, npv = computeMetrics({'TP': 3, 'FP': 1, 'TN': 4, 'FN': 1})
+        self.assertEqual((p, r, npv), (75.0, 75.0, 80.0))
+        self.assertEqual(computeMetrics({'TP': 0, 'FP': 0, 'TN': 0, 'FN': 0}),
+                                                            (0.0, 0.0, 0.0))
+#-----------------------------------
+
+class EvaluateRuleTests(unittest.TestCase):
+    def test_bruteForce(self):
+        fm = makeFeatures(300)
+        rows = [dict(zip(FEATURE_NAMES, row)) for row in fm.features]
+        for rule in [RoutingRule(), RoutingRule(minCat2=2),
+                     RoutingRule(minTextLen=1000, useJournal=False),
+                     RoutingRule(minCat1=2, minAge=0),
+                     RoutingRule(skipJournals=['Skip Me'])]:
+            results = evaluateRule(fm, rule)
+            expected = {label: {t: 0 for t in PRED_TYPES} for label in SUBSETS}
+            for i, values in enumerate(rows):
+                yes = routeOneRef(rule, values, fm.journals[i], fm.timedOut[i])
+                predType = ('T' if yes == fm.isPositive[i] else 'F') + \
+                                                        ('P' if yes else 'N')
+                expected['Overall'][predType] += 1
+                expected['Keeps' if fm.isKeep[i] else 'Discards'][predType] +=1
+            self.assertEqual(results, expected, str(rule))
+
+    def test_summary(self):
+        results = {label: {'TP': 1, 'FP': 1, 'TN': 2, 'FN': 0}
+                                                        for label in SUBSETS}
+        summary = getSummary(results)
+        self.assertTrue(summary.startswith('Summary\nOverall - Total Refs: 4\n'
+                        'Precision 50.00   Recall 100.00   NPV 100.00\n'
+                        '    TP      FP      TN      FN\n'
+                        '     1,      1,      2,      0\n\n'))
+#-----------------------------------
+
+class FeatureMatrixFileTests(unittest.TestCase):
+    def test_saveLoad(self):
+        fm = makeFeatures(20)
+        with tempfile.TemporaryDirectory() as tmpDir:
+            fileName = os.path.join(tmpDir, 'Features.npz')
+            fm.save(fileName)
+            fm2 = FeatureMatrix.load(fileName)
+        self.assertEqual(fm2.IDs, fm.IDs)
+        self.assertEqual(fm2.journals, fm.journals)
+        self.assertEqual(fm2.features.tolist(), fm.features.tolist())
+        self.assertEqual(fm2.timedOut.tolist(), fm.timedOut.tolist())
+        self.assertEqual(evaluateRule(fm2, RoutingRule()),
+                                            evaluateRule(fm, RoutingRule()))
+
+    def test_routingsFile(self):
+        lines = ['Mon Oct 19 2026',
+                 'ID|knownClassName|routing|predType|goodJournal|' +
+                 'Cat1 matches|Cat1 Excludes|Age matches|Age Excludes|' +
+                 'Cat2 matches|Cat2 Excludes|TextLength|relevance|' +
+                 'confidence|GXD status|journal',
+                 'MGI:1|Yes|Yes|TP|1|2|0|1|0|3|0|9000|keep|0.9|Full|Dev Biol',
+                 'MGI:2|No|Yes|FP|1|0|0|0|0|0|0|100|discard|0.1|Rej|Cell',
+                 'MGI:3|No|No|TN|0|4|1|2|0|1|0|8000|keep|0.2|Rej|Skip Me',
+                 ]
+        with tempfile.TemporaryDirectory() as tmpDir:
+            fileName = os.path.join(tmpDir, 'Routings.txt')
+            with open(fileName, 'w') as fp:
+                fp.write('\n'.join(lines) + '\n')
+            fm = FeatureMatrix.fromRoutingsFile(fileName)
+        self.assertEqual(fm.IDs, ['MGI:1', 'MGI:2', 'MGI:3'])
+        self.assertEqual(fm.isKeep.tolist(), [True, False, True])
+        self.assertEqual(fm.getColumn('cat2Matches').tolist(), [3, 0, 1])
+        self.assertEqual(RoutingRule().route(fm).tolist(), [True, True, False])
+        self.assertEqual(RoutingRule(useJournal=False).route(fm).tolist(),
+                                                        [True, True, True])
+        self.assertEqual(evaluateRule(fm, RoutingRule())['Overall'],
+                                        {'TP': 1, 'FP': 1, 'TN': 1, 'FN': 0})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for routingFiles.py
+Usage:   python test_routingFiles.py [-v]
+"""
+import os
+import tempfile
+import unittest
+from routingFiles import *
+from utilsLib import MatchRcd
+
+class MatchFilesTests(unittest.TestCase):
+    def test_getMatchFileKey(self):
+        self.assertEqual(getMatchFileKey('Cat1', 'FP', 'MGI:1234'),
+                                                            ('Cat1', 'FP'))
+        self.assertEqual(getMatchFileKey('Age', 'TP', 'MGI:1234'),
+                                                            ('Age', 'TP', 2))
+        names = getMatchFileNames('Try1/')
+        self.assertEqual(len(names), 3 * (3 + fileSplitModulus))
+        self.assertEqual(names[('Cat2', 'TP', 3)], 'Try1/Cat2TP_3matches.txt')
+
+    def test_formatMatches(self):
+        m = MatchRcd('cat1', 5, 11, 'embryo', 'the\n', '\tx', 'EMBRYO')
+        line = formatMatches('ID1', 'Yes', 'TP', 1, 1, 0, 0, [m], '0.5')
+        self.assertEqual(line.rstrip('\n').split(matchesFieldSep),
+                ['ID1', 'Yes', 'TP', '1', '1', '0', '0', 'cat1', "'the\\n'",
+                 "'embryo'", "'\\tx'", '0.5'])
+
+    def test_patchMatchFiles(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            baseName = os.path.join(tmpDir, 'Try1_')
+            for key, fileName in getMatchFileNames(baseName).items():
+                with open(fileName, 'w') as fp:
+                    fp.write('time ' + matchesHdr)
+                    if key == ('Cat1', 'FP'):
+                        fp.write('ID1\tNo\n' + 'ID2\tNo\n' + 'ID1\tNo\n')
+            patchMatchFiles(baseName, ['ID1'],
+                            {('Cat1', 'TN'): 'ID1\tNo\tTN\n'})
+            names = getMatchFileNames(baseName)
+            with open(names[('Cat1', 'FP')]) as fp:
+                self.assertEqual(fp.readlines()[1:], ['ID2\tNo\n'])
+            with open(names[('Cat1', 'TN')]) as fp:
+                self.assertEqual(fp.readlines(),
+                                ['time ' + matchesHdr, 'ID1\tNo\tTN\n'])
+#-----------------------------------
+
+class RoutingsFileTests(unittest.TestCase):
+    def test_readWrite(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            fileName = os.path.join(tmpDir, 'Routings.txt')
+            with open(fileName, 'w') as fp:
+                fp.write('Mon Oct 19 2026\nID|routing|journal\n' +
+                            '1|Yes|Dev Biol\n2|No|PLoS One\n')
+            routings = RoutingsFile.read(fileName)
+            self.assertEqual(routings.getIDs(), ['1', '2'])
+            self.assertEqual(routings.getValue('2', 'journal'), 'PLoS One')
+            routings.setValues('2', {'routing': 'Yes'})
+            routings.write(fileName)
+            with open(fileName) as fp:
+                self.assertEqual(fp.read(), 'Mon Oct 19 2026\n' +
+                    'ID|routing|journal\n1|Yes|Dev Biol\n2|Yes|PLoS One\n')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for routingStats.py
+Usage:   python test_routingStats.py [-v]
+"""
+import os
+import tempfile
+import unittest
+import numpy as np
+from routingStats import *
+from routingFeatures import computeMetrics
+
+def makeRun(numRefs, seed=1, flip=0.0):
+    # random run, and a 2nd run of the same refs w/ some routings flipped
+    rng = np.random.default_rng(seed)
+    isPositive = rng.random(numRefs) < 0.3
+    routedYes = np.where(isPositive, rng.random(numRefs) < 0.9,
+                                     rng.random(numRefs) < 0.4)
+    isKeep = rng.random(numRefs) < 0.5
+    journals = rng.choice(['Dev Biol', 'Development', 'PLoS One'], numRefs)
+    IDs = ['ID%d' % i for i in range(numRefs)]
+    run = RoutingRun(IDs, routedYes, isPositive, isKeep, journals)
+    routedYes2 = routedYes ^ (rng.random(numRefs) < flip)
+    run2 = RoutingRun(IDs, routedYes2, isPositive, isKeep, journals)
+    return run, run2
+
+class MetricsTests(unittest.TestCase):
+    def test_getMetrics(self):
+        for counts in [[4, 25, 20, 1], [0, 0, 5, 0], [0, 3, 0, 0], [0,0,0,0]]:
+            m = getMetrics(counts)
+            self.assertEqual(tuple(float(m[x]) for x in METRICS),
+                computeMetrics(dict(zip(PRED_TYPES, counts))), counts)
+        m = getMetrics([[1, 1, 1, 1], [2, 0, 0, 2]])       # vectorized
+        self.assertEqual(m['Precision'].tolist(), [50.0, 100.0])
+        self.assertEqual(m['NPV'].tolist(), [50.0, 0.0])
+
+    def test_cells(self):
+        run = RoutingRun(['a', 'b', 'c', 'd'], [True, True, False, False],
+                        [True, False, False, True], [True]*4, ['J']*4)
+        self.assertEqual(run.getCells().tolist(), [0, 1, 2, 3])
+        self.assertEqual(getCellCounts(run.getCells()).tolist(), [1, 1, 1, 1])
+#-----------------------------------
+
+class BootstrapTests(unittest.TestCase):
+    def test_matchesRefResampling(self):
+        # multinomial resampling of counts == resampling refs
+        run, run2 = makeRun(300)
+        cells = run.getCells()
+        counts = getCellCounts(cells)
+        cis = getConfidenceIntervals(counts, numResamples=4000)
+        rng = np.random.default_rng(3)
+        samples = cells[rng.integers(0, len(cells), (4000, len(cells)))]
+        resampled = getMetrics(np.stack([(samples == i).sum(axis=1)
+                                                for i in range(4)], axis=1))
+        for m in METRICS:
+            est, lo, hi = cis[m]
+            self.assertEqual(est, float(getMetrics(counts)[m]))
+            self.assertTrue(lo < est < hi, m)
+            self.assertAlmostEqual(lo, np.percentile(resampled[m], 2.5),
+                                                                delta=1.5)
+            self.assertAlmostEqual(hi, np.percentile(resampled[m], 97.5),
+                                                                delta=1.5)
+        self.assertEqual(bootstrapCounts(counts, 10).sum(axis=1).tolist(),
+                                                    [len(cells)] * 10)
+
+    def test_empty(self):
+        cis = getConfidenceIntervals([0, 0, 0, 0], numResamples=5)
+        self.assertEqual(cis['Recall'], (0.0, 0.0, 0.0))
+
+    def test_paired(self):
+        run, run2 = makeRun(300)
+        diffs = getPairedDifferences(run.getCells(), run2.getCells(), 500)
+        for m in METRICS:                   # same routings: no difference
+            self.assertEqual(diffs[m], (0.0, 0.0, 0.0, 1.0))
+
+        run, run2 = makeRun(300, flip=0.2)
+        diffs = getPairedDifferences(run.getCells(), run2.getCells(), 500)
+        for m in METRICS:
+            m1 = getMetrics(getCellCounts(run.getCells()))[m]
+            m2 = getMetrics(getCellCounts(run2.getCells()))[m]
+            d, lo, hi, pWorse = diffs[m]
+            self.assertAlmostEqual(d, float(m2 - m1))
+            self.assertTrue(lo <= d <= hi)
+            self.assertTrue(0 <= pWorse <= 1)
+#-----------------------------------
+
+class McNemarTests(unittest.TestCase):
+    def test_binomial(self):
+        self.assertAlmostEqual(binomialTwoSided(0, 5), 0.0625)
+        self.assertAlmostEqual(binomialTwoSided(1, 6), 2 * 7 / 64)
+        self.assertEqual(binomialTwoSided(3, 6), 1.0)
+        self.assertEqual(binomialTwoSided(0, 0), 1.0)
+
+    def test_mcnemar(self):
+        correct1 = [True, True, True, False, False, True]
+        correct2 = [True, False, False, False, True, False]
+        b, c, p = mcnemar(correct1, correct2)
+        self.assertEqual((b, c), (3, 1))
+        self.assertAlmostEqual(p, 2 * 5 / 16)
+#-----------------------------------
+
+class RunTests(unittest.TestCase):
+    def test_align(self):
+        run = RoutingRun(['a', 'b', 'c'], [True, False, True],
+                        [True, True, False], [True]*3, ['J']*3)
+        other = RoutingRun(['c', 'd', 'a'], [False, True, True],
+                        [False, True, True], [True]*3, ['J']*3)
+        r1, r2 = run.align(other)
+        self.assertEqual(r1.IDs, ['a', 'c'])
+        self.assertEqual(r2.IDs, ['a', 'c'])
+        self.assertEqual(r2.routedYes.tolist(), [True, False])
+        other.isPositive[0] = True
+        self.assertRaises(ValueError, run.align, other)
+
+    def test_fromRoutingsFile(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            fileName = os.path.join(tmpDir, 'Routings.txt')
+            with open(fileName, 'w') as fp:
+                fp.write('Mon Oct 19 2026\n')
+                fp.write('ID|routing|predType|knownClassName|relevance|' +
+                                                            'journal|x\n')
+                fp.write('1|Yes|TP|Yes|keep|Dev Biol|\n')
+                fp.write('2|No|TN|No|discard|PLoS One|\n')
+            run = RoutingRun.fromRoutingsFile(fileName)
+        self.assertEqual(run.IDs, ['1', '2'])
+        self.assertEqual(run.routedYes.tolist(), [True, False])
+        self.assertEqual(run.isPositive.tolist(), [True, False])
+        self.assertEqual(run.isKeep.tolist(), [True, False])
+        self.assertEqual(run.journals.tolist(), ['Dev Biol', 'PLoS One'])
+
+    def test_groups(self):
+        run, run2 = makeRun(100)
+        groups = getGroups(run, minJournalRefs=1)
+        self.assertEqual([g[0] for g in groups[:3]],
+                                            ['Overall', 'Keeps', 'Discards'])
+        self.assertEqual(sum([g[1].sum() for g in groups[3:]]), 100)
+        self.assertEqual(len(getGroups(run, minJournalRefs=101)), 3)
+
+    def test_reports(self):
+        run, run2 = makeRun(100, flip=0.1)
+        report = getBootstrapReport(run, 100, minJournalRefs=1)
+        lines = report.split('\n')
+        self.assertEqual(len(lines), 2 + 6 + 1)
+        self.assertTrue(lines[2].startswith('Overall\t100\t'))
+        report = getComparisonReport(run, run2, 100, minJournalRefs=1)
+        lines = report.split('\n')
+        self.assertEqual(len(lines), 4 + 6 + 1)
+        self.assertEqual(len(lines[4].split('\t')), 5 + 4 * len(METRICS))
+
+if __name__ == '__main__':
+    unittest.main()
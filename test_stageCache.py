@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for stageCache.py
+Usage:   python test_stageCache.py [-v]
+"""
+import tempfile
+import unittest
+from stageCache import *
+from GXD2aryRouter import GXDrouter
+
+DOCS = ['intro text about the embryo. ' * 20 +
+            '\n\nfigure 1. in situ hybridization of e12.5 mouse embryos, ' +
+            'sections stained.\n\nmore text',
+        'embryonic stem cells. ' * 30 +
+            '\n\nfig 2. northern blot of p5 and chick hh20 tissue\n\nend',
+        'too short',
+        ]
+
+def makeRouter(cat2Terms=['in situ', 'northern'], ageExclude=['chick']):
+    return GXDrouter([], ['embryo'], ['embryonic stem'], ageExclude,
+                        cat2Terms, ['not done'], minTextLen=50)
+
+def route(router):
+    # [(routing, [(matchType, matchText, preText, postText)])] for DOCS
+    results = []
+    for doc in DOCS:
+        routing = router.routeThisRef(doc, 'journal')
+        matches = [(m.matchType, m.matchText, m.preText, m.postText)
+                                            for m in router.getAllMatches()]
+        results.append((routing, matches))
+    return results
+
+class StageCacheTests(unittest.TestCase):
+    def test_putGet(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            cache = StageCache(tmpDir)
+            cache.setStageParams({s: s for s in STAGES})
+            key = getDocKey('some text')
+            self.assertFalse(cache.has('cat1', key))
+            self.assertEqual(cache.get('cat1', key), None)
+            cache.put('cat1', key, [[1, 2], 'x'])
+            self.assertEqual(cache.get('cat1', key), [[1, 2], 'x'])
+            self.assertFalse(cache.get('cat1', key) is cache.get('cat1', key))
+            cache.save()
+
+            cache = StageCache(tmpDir)          # persisted
+            cache.setStageParams({s: s for s in STAGES})
+            self.assertEqual(cache.get('cat1', key), [[1, 2], 'x'])
+            self.assertEqual((cache.hits['cat1'], cache.misses['cat1']),
+                                                                        (1, 0))
+            cache.setStageParams({s: s + 'new' for s in STAGES})
+            self.assertFalse(cache.has('cat1', key))
+
+    def test_fingerprint(self):
+        self.assertEqual(getFingerprint(('a', [1, 2])),
+                                                getFingerprint(('a', [1, 2])))
+        self.assertNotEqual(getFingerprint(('a', [1, 2])),
+                                                getFingerprint(('a', [2, 1])))
+        self.assertNotEqual(getDocKey('a'), getDocKey('b'))
+#-----------------------------------
+
+class RouterCacheTests(unittest.TestCase):
+    def test_sameResults(self):
+        expected = route(makeRouter())
+        with tempfile.TemporaryDirectory() as tmpDir:
+            for i in range(2):              # fill the cache, then use it
+                cache = StageCache(tmpDir)
+                router = makeRouter()
+                router.setStageCache(cache)
+                self.assertEqual(route(router), expected)
+                cache.save()
+            for stage in ['cat1', 'age', 'cat2']:
+                self.assertEqual(cache.hits[stage], len(DOCS))
+                self.assertEqual(cache.misses[stage], 0)
+            self.assertEqual(cache.hits['figText'] +
+                                            cache.misses['figText'], 0)
+
+    def test_vocabChange(self):
+        # changing one vocab only recomputes its stage
+        with tempfile.TemporaryDirectory() as tmpDir:
+            cache = StageCache(tmpDir)
+            router = makeRouter()
+            router.setStageCache(cache)
+            route(router)
+            cache.save()
+
+            for kwargs, recomputed in [
+                    ({'cat2Terms': ['in situ', 'sections']}, 'cat2'),
+                    ({'ageExclude': ['chick', 'hh']}, 'age')]:
+                expected = route(makeRouter(**kwargs))
+                cache = StageCache(tmpDir)
+                router = makeRouter(**kwargs)
+                router.setStageCache(cache)
+                self.assertEqual(route(router), expected, kwargs)
+                for stage in STAGES:
+                    if stage == recomputed:
+                        self.assertEqual(cache.misses[stage], len(DOCS))
+                    elif stage == 'figText':
+                        self.assertEqual(cache.hits[stage], len(DOCS))
+                    else:
+                        self.assertEqual(cache.misses[stage], 0, stage)
+                if recomputed == 'cat2':        # 'sections' matches
+                    self.assertNotEqual(expected, route(makeRouter()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for staticLib.py
+Usage:   python test_staticLib.py [-v]
+"""
+import os
+import tempfile
+import unittest
+from staticLib import *
+
+class MaskTextTests(unittest.TestCase):
+    def test_maskText(self):
+        excludeDict = getExcludeDict(['In Situ Hyb', 'mouse'])
+        self.assertEqual(excludeDict, {'in situ hyb': 'IN SITU HYB',
+                                        'mouse': 'MOUSE'})
+        text = 'the in situ hyb\nof mouse in situ'
+        self.assertEqual(maskText(text, excludeDict),
+                                    'the IN SITU HYB of MOUSE in situ')
+
+    def test_maskOrder(self):
+        # exclude terms are replaced in order, 1st one wins on overlap
+        excludeDict = getExcludeDict(['a b', 'b c'])
+        self.assertEqual(maskText('a b c', excludeDict), 'A B c')
+        excludeDict = getExcludeDict(['b c', 'a b'])
+        self.assertEqual(maskText('a b c', excludeDict), 'a B C')
+#-----------------------------------
+
+class DocFreqCounterTests(unittest.TestCase):
+    def setUp(self):
+        excludeDict = getExcludeDict(['in situ hyb'])
+        self.docs = [(maskText(text, excludeDict), isPos) for text, isPos in [
+                        ('in situ and in situ hybridization', True),
+                        ('in situ hyb only', True),
+                        ('embryo sections', False),
+                        ('In Situ embryo', False),
+                    ]]
+
+    def test_counts(self):
+        counter = DocFreqCounter(['In Situ', 'embryo', 'in situ', 'xyz'])
+        for text, isPos in self.docs:
+            counter.addDoc(text, isPos)
+        stats = counter.getTermStats(2, 2)
+        self.assertEqual([ts.term for ts in stats],
+                                    ['in situ', 'embryo', 'in situ', 'xyz'])
+        self.assertEqual([(ts.numPos, ts.numNeg) for ts in stats],
+                                    [(1, 0), (0, 2), (1, 0), (0, 0)])
+        self.assertEqual(stats[0].posFraction, 0.5)
+        self.assertEqual(stats[1].dValue, -1.0)
+        self.assertEqual(counter.numDocs, 4)
+
+    def test_merge(self):
+        terms = ['in situ', 'embryo']
+        whole = DocFreqCounter(terms)
+        part1 = DocFreqCounter(terms)
+        part2 = DocFreqCounter(terms)
+        for i, (text, isPos) in enumerate(self.docs):
+            whole.addDoc(text, isPos)
+            (part1 if i % 2 else part2).addDoc(text, isPos)
+        part1.merge(part2)
+        self.assertEqual((part1.numPos, part1.numNeg, part1.numDocs),
+                            (whole.numPos, whole.numNeg, whole.numDocs))
+        self.assertRaises(ValueError, part1.merge, DocFreqCounter(['x']))
+
+    def test_noTotals(self):
+        ts = TermStats('x', 0, 0, 0, 0)
+        self.assertEqual((ts.posFraction, ts.negFraction, ts.dValue),
+                                                            (0.0, 0.0, 0.0))
+#-----------------------------------
+
+class FakeSample (object):
+    """ the bits of ClassifiedRefSample that MaskedCorpus uses
+    """
+    def __init__(self, ID, text, isPos):
+        self.ID, self.text, self.isPos = ID, text, isPos
+    def getID(self): return self.ID
+    def getDocument(self): return self.text
+    def isPositive(self): return self.isPos
+#-----------------------------------
+
+class ParallelAndCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.excludeDict = getExcludeDict(['in situ hyb'])
+        self.terms = ['in situ', 'embryo', 'hyb']
+        self.samples = [FakeSample('ID%d' % i,
+                            ['in situ hyb\nembryo', 'in situ', 'embryo x',
+                                'nothing'][i % 4], i % 3 == 0)
+                                                        for i in range(40)]
+        self.texts = [s.getDocument() for s in self.samples]
+        self.flags = [s.isPositive() for s in self.samples]
+
+    def test_getShards(self):
+        self.assertEqual(getShards(10, 3), [(0, 4), (4, 7), (7, 10)])
+        self.assertEqual(getShards(2, 8), [(0, 1), (1, 2)])
+        self.assertEqual(getShards(0, 4), [(0, 0)])
+
+    def test_workers(self):
+        serial = countDocFreqs(self.texts, self.flags, self.terms,
+                                            self.excludeDict, workers=1)
+        parallel = countDocFreqs(self.texts, self.flags, self.terms,
+                                            self.excludeDict, workers=3)
+        self.assertEqual((serial.numPos, serial.numNeg, serial.numDocs),
+                        (parallel.numPos, parallel.numNeg, parallel.numDocs))
+        self.assertEqual(serial.numDocs, 40)
+
+    def test_maskedCorpus(self):
+        corpus = MaskedCorpus.fromSamples(self.samples, self.excludeDict,
+                                                            14, 26, workers=2)
+        self.assertEqual(corpus.texts[0], 'IN SITU HYB embryo')
+        self.assertEqual(corpus.IDs[:2], ['ID0', 'ID1'])
+        self.assertEqual(len(corpus), 40)
+        counter = countDocFreqs(corpus.texts, corpus.isPositives, self.terms)
+        expected = countDocFreqs(self.texts, self.flags, self.terms,
+                                                            self.excludeDict)
+        self.assertEqual((counter.numPos, counter.numNeg),
+                                        (expected.numPos, expected.numNeg))
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            fileName = os.path.join(tmpDir, 'sub', 'x.masked.pickle')
+            corpus.save(fileName)
+            loaded = MaskedCorpus.load(fileName)
+            self.assertEqual(loaded.texts, corpus.texts)
+            self.assertEqual((loaded.totalNumPos, loaded.totalNumNeg),(14,26))
+            self.assertEqual(MaskedCorpus.load(fileName + 'x'), None)
+
+    def test_getCachePath(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            sampleFile = os.path.join(tmpDir, 'sample.txt')
+            with open(sampleFile, 'w') as fp: fp.write('abc')
+            path1 = getCachePath('cache', sampleFile, ['a', 'b'])
+            self.assertTrue(path1.startswith(os.path.join('cache','sample.txt')))
+            self.assertEqual(path1, getCachePath('cache', sampleFile, ['a','b']))
+            self.assertNotEqual(path1, getCachePath('cache',sampleFile,['a']))
+            with open(sampleFile, 'w') as fp: fp.write('abcd')   # new size
+            self.assertNotEqual(path1, getCachePath('cache', sampleFile,
+                                                                ['a', 'b']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for suffixIndex.py
+Usage:   python test_suffixIndex.py [-v]
+"""
+import random
+import tempfile
+import unittest
+import numpy as np
+from suffixIndex import *
+from staticLib import getExcludeDict
+
+def naiveSuffixArray(data, maxLen):
+    return sorted(range(len(data)), key=lambda i: data[i:i+maxLen])
+
+class BuildSuffixArrayTests(unittest.TestCase):
+    def check(self, data, maxLen=DEFAULT_MAXLEN):
+        codes = np.frombuffer(data, dtype=np.uint8)
+        sa = buildSuffixArray(codes, maxLen)
+        self.assertEqual(sorted(sa.tolist()), list(range(len(data))))
+        # suffixes in sa order are sorted by their 1st maxLen bytes
+        prefixes = [data[i:i+maxLen] for i in sa]
+        self.assertEqual(prefixes, sorted(prefixes))
+
+    def test_small(self):
+        self.check(b'banana')
+        self.check(b'a')
+        self.check(b'aaaaaaaaaa')
+        self.check(b'in situ\x00in situ hyb\x00')
+        self.assertEqual(buildSuffixArray(np.frombuffer(b'banana',
+                    dtype=np.uint8)).tolist(), naiveSuffixArray(b'banana', 6))
+        self.assertEqual(len(buildSuffixArray(np.zeros(0, dtype=np.uint8))),0)
+
+    def test_random(self):
+        rng = random.Random(1)
+        for i in range(20):
+            data = bytes(rng.choice(b'ab \x00\xff') for j in range(200))
+            self.check(data)
+
+    def test_maxLen(self):
+        # long repeats only sorted by maxLen bytes
+        self.check(b'ab' * 100, maxLen=8)
+#-----------------------------------
+
+class SuffixIndexTests(unittest.TestCase):
+    def setUp(self):
+        excludeDict = getExcludeDict(['in situ hyb'])
+        rng = random.Random(2)
+        words = ['in', 'situ', 'hyb', 'embryo', 'e14.5', 'stain', 'blot',
+                                                                    'café']
+        self.docs = []
+        for i in range(30):
+            text = ' '.join(rng.choice(words) for j in range(rng.randint(0,40)))
+            if i % 7 == 0: text = 'In Situ\n' + text
+            self.docs.append(('ID%d' % i, i % 3 == 0,
+                                            prepText(text, excludeDict)))
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.indexDir = self.tmpDir.name
+        buildIndex(self.indexDir, self.docs, 10, 20, info={'x': 1},
+                                                                shardSize=200)
+        self.index = SuffixIndex.load(self.indexDir)
+
+    def tearDown(self):
+        self.tmpDir.cleanup()
+
+    def test_load(self):
+        self.assertTrue(len(self.index.shards) > 1)
+        self.assertEqual(self.index.getNumDocs(), 30)
+        self.assertEqual(self.index.info, {'x': 1})
+        self.assertEqual(self.index.IDs[:2], ['ID0', 'ID1'])
+
+    def test_docFreqs(self):
+        for term in ['in situ', 'situ', 'hyb', 'situ hyb', 'embryo stain',
+                        'e14.5', 'café', 'Embryo', 'xyz', 'n s', '']:
+            numPos = sum(1 for ID, isPos, text in self.docs
+                                            if isPos and term.lower() in text)
+            numNeg = sum(1 for ID, isPos, text in self.docs
+                                        if not isPos and term.lower() in text)
+            self.assertEqual(self.index.getDocFreq(term), (numPos, numNeg),
+                                                                        term)
+        ts = self.index.getTermStats('In Situ')
+        self.assertEqual(ts.term, 'in situ')
+        self.assertEqual(ts.posFraction, ts.numPos / 10)
+
+    def test_noSpanningDocs(self):
+        lastWords = set(text.split(' ')[-1] for ID, isPos, text in self.docs)
+        firstWords = set(text.split(' ')[0] for ID, isPos, text in self.docs)
+        for last in lastWords:
+            for first in firstWords:
+                term = last + first + ' '
+                expected = sum(1 for ID, isPos, text in self.docs
+                                                            if term in text)
+                self.assertEqual(sum(self.index.getDocFreq(term)), expected)
+
+    def test_contexts(self):
+        contexts = self.index.getContexts('embryo', maxContexts=3, width=5)
+        self.assertEqual(len(contexts), 3)
+        self.assertEqual(len(set(ID for ID, c in contexts)), 3)
+        texts = dict((ID, text) for ID, isPos, text in self.docs)
+        for ID, context in contexts:
+            self.assertIn('embryo', context)
+            self.assertIn(context, texts[ID])
+            self.assertTrue(len(context) <= len('embryo') + 10)
+
+    def test_maxLen(self):
+        self.assertRaises(ValueError, self.index.getDocFreq,
+                                                    'x' * (DEFAULT_MAXLEN+1))
+
+if __name__ == '__main__':
+    unittest.main()
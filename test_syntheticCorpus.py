@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for syntheticCorpus.py
+Usage:   python test_syntheticCorpus.py [-v]
+"""
+import unittest
+import figureText
+from syntheticCorpus import *
+from routerVocabs import RouterVocabs
+
+def getVocabs():
+    return RouterVocabs(['J Skip'], ['embryo'], ['chick embryo'],
+                        ['_hh##_', 'chick'], ['in situ', 'northern'], ['amount'])
+
+class SyntheticRefGeneratorTests(unittest.TestCase):
+    def test_parseLengthDist(self):
+        self.assertEqual(parseLengthDist('pareto:20000:1.5'),
+                                                ('pareto', [20000.0, 1.5]))
+        with self.assertRaises(ValueError):
+            parseLengthDist('lognormal:10')
+        with self.assertRaises(ValueError):
+            parseLengthDist('uniform:1:2')
+
+    def test_vocabTermToText(self):
+        rng = random.Random(1)
+        text = vocabTermToText('_hh##_', rng)
+        self.assertEqual(len(text), 4)
+        self.assertTrue(text.startswith('hh') and text[2:].isdigit())
+
+    def test_reproducible(self):
+        r1 = SyntheticRefGenerator(getVocabs(), seed=5).genRecord()
+        r2 = SyntheticRefGenerator(getVocabs(), seed=5).genRecord()
+        self.assertEqual(r1, r2)
+
+    def test_genText(self):
+        gen = SyntheticRefGenerator(getVocabs(), seed=2, artifactRate=1.0,
+                                                densities={'cat2': 50.0})
+        text = gen.genText(20000)
+        self.assertGreaterEqual(len(text), 20000)
+        self.assertEqual(text, text.lower())
+        self.assertTrue(text.isascii())
+        self.assertIn('\n\n', text)
+        self.assertIn('in situ', text)
+
+        # all legends are letter-spaced & are found as legends
+        legends = figureText.text2FigText_Legend(text)
+        self.assertEqual(len(legends), 20000 // 6000)
+        for p in legends:
+            self.assertTrue(p.startswith('f i ') or p.startswith('t a ') or
+                                                    p.startswith('s u '))
+
+    def test_genRecords(self):
+        gen = SyntheticRefGenerator(getVocabs(), seed=3,
+                            lengthDist='fixed:2000', positiveFraction=0.5)
+        records = list(gen.genRecords(20))
+        self.assertEqual(len(records), 20)
+        self.assertEqual(len({r['ID'] for r in records}), 20)
+        classes = {r['knownClassName'] for r in records}
+        self.assertEqual(classes, {'Yes', 'No'})
+        for r in records:
+            self.assertEqual(r['ID'], 'MGI:' + r['_refs_key'])
+
+    def test_lengthDistribution(self):
+        gen = SyntheticRefGenerator(getVocabs(), seed=4,
+                                            lengthDist='pareto:1000:1.5')
+        lengths = [gen.genDocLength() for i in range(2000)]
+        self.assertTrue(all([l >= 1000 for l in lengths]))
+        self.assertGreater(max(lengths), 20 * 1000)       # heavy tail
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for termMatrix.py
+Usage:   python test_termMatrix.py [-v]
+"""
+import os
+import random
+import tempfile
+import unittest
+from termMatrix import *
+from routingFeatures import FeatureMatrix, RoutingRule, evaluateRule, \
+                                            computeMetrics, FEATURE_NAMES
+from GXD2aryRouter import GXDrouter
+
+def makeRandom(numRefs, seed=1,
+                vocabs=(['embryo'], ['embryonic stem'], ['eday', 'dpc'],
+                        ['chick'], ['in situ', 'northern'],
+                        ['in situ hybridization was not', 'not done']),
+                posTermPrefix=None,     # column name prefix of the terms
+                                        #   more likely in positive refs
+                goodJournalRate=0.9, textLengths=(100, 5000)):
+    # random term matrix and the feature matrix consistent w/ it
+    #  (also used by test_vocabOptimizer.py)
+    rng = random.Random(seed)
+    tm = TermMatrix.fromVocabs(*vocabs)
+    fm = FeatureMatrix()
+    for i in range(numRefs):
+        isPos = rng.random() < 0.4
+        counts = {}
+        for name in tm.columns:
+            p = 0.3
+            if isPos and posTermPrefix and name.startswith(posTermPrefix):
+                p = 0.5
+            if rng.random() < p:
+                counts[splitColumnName(name)] = rng.choice([1, 1, 2])
+        tm.addRef('ID%d' % i, counts)
+        total = lambda cat: sum([n for (c, t), n in counts.items() if c==cat])
+        fm.addRef('ID%d' % i, isPos, rng.random() < 0.5, 'J',
+                    {'goodJournal' : int(rng.random() < goodJournalRate),
+                     'cat1Matches' : total('cat1'),
+                     'cat1Excludes': total('cat1Exclude'),
+                     'ageMatches'  : total('age'),
+                     'ageExcludes' : total('ageExclude'),
+                     'cat2Matches' : total('cat2'),
+                     'cat2Excludes': total('cat2Exclude'),
+                     'textLength'  : rng.choice(textLengths),
+                    })
+    return fm, tm
+
+class TermMatrixTests(unittest.TestCase):
+    def test_columns(self):
+        fm, tm = makeRandom(0)
+        self.assertEqual(tm.columns[:3], ['cat1:embryo',
+                                    'cat1Exclude:embryonic stem', 'age:eday'])
+        gains = dict(zip(tm.columns, tm._finish().gains.tolist()))
+        self.assertEqual(gains['cat2:northern'], -1)
+        self.assertEqual(gains['cat1Exclude:embryonic stem'], 1)
+        self.assertEqual(gains['cat2Exclude:in situ hybridization was not'],1)
+        self.assertEqual(gains['cat2Exclude:not done'], 0)
+        self.assertEqual(gains['ageExclude:chick'], 1)
+
+    def test_saveLoad(self):
+        fm, tm = makeRandom(30)
+        with tempfile.TemporaryDirectory() as tmpDir:
+            fileName = os.path.join(tmpDir, 'TermMatrix.npz')
+            tm.save(fileName)
+            tm2 = TermMatrix.load(fileName)
+        self.assertEqual(tm2.IDs, tm.IDs)
+        self.assertEqual(tm2.columns, tm.columns)
+        self.assertEqual(tm2.toDense().tolist(), tm.toDense().tolist())
+        self.assertEqual(tm2.getColumnNumRefs().tolist(),
+                            (tm.toDense() > 0).sum(axis=0).tolist())
+
+    def test_routerMatches(self):
+        gr = GXDrouter([], ['embryo'], ['embryonic stem'], ['chick'],
+                            ['in situ'], ['in situ hybridization was not'])
+        tm = TermMatrix.fromRouter(gr)
+        doc = 'embryo and embryonic stem cells\n\nfig 1. in situ of ' + \
+                'e14.5 embryos. in situ hybridization was not done. ' + \
+                'a chick at e12.5 stage.'
+        gr.routeThisRef(doc, 'journal')
+        tm.addRouterMatches('ID1', gr)
+        row = dict(zip(tm.columns, tm.toDense()[0].tolist()))
+        self.assertEqual(row['cat1:embryo'], 2)
+        self.assertEqual(row['cat1Exclude:embryonic stem'], 1)
+        self.assertEqual(row['cat2:in situ'], 1)
+        self.assertEqual(row['cat2Exclude:in situ hybridization was not'], 1)
+        self.assertEqual(row['age:eday'], 1)
+        self.assertEqual(row['ageExclude:chick'], 1)
+#-----------------------------------
+
+class TermImpactTests(unittest.TestCase):
+    def test_bruteForce(self):
+        # compare w/ re-evaluating the rule w/ each column's matches removed
+        fm, tm = makeRandom(200)
+        dense = tm.toDense()
+        for rule in [RoutingRule(), RoutingRule(minCat2=2, useJournal=False),
+                     RoutingRule(minAge=0)]:
+            impacts = getTermImpacts(fm, tm, rule)
+            self.assertEqual(impacts.baseCounts, evaluateRule(fm, rule))
+            for col, name in enumerate(tm.columns):
+                category = splitColumnName(name)[0]
+                feature = {'cat1': 'cat1Matches', 'age': 'ageMatches',
+                        'cat2': 'cat2Matches'}[category.replace('Exclude','')]
+                fm2 = FeatureMatrix()
+                fm2.IDs, fm2.journals = fm.IDs, fm.journals
+                fm2.isPositive, fm2.isKeep = fm.isPositive, fm.isKeep
+                fm2.timedOut = fm.timedOut
+                fm2.features = fm.features.copy()
+                fm2.features[:, FEATURE_NAMES.index(feature)] += \
+                                                tm.gains[col] * dense[:, col]
+                expected = evaluateRule(fm2, rule)
+                for subset in expected:
+                    got = {t: int(impacts.counts[subset][t][col])
+                                                    for t in expected[subset]}
+                    self.assertEqual(got, expected[subset], (name, subset))
+
+    def test_metrics(self):
+        fm, tm = makeRandom(50)
+        impacts = getTermImpacts(fm, tm, RoutingRule())
+        p, r, npv = impacts.getMetrics('Keeps')
+        for col in range(len(tm.columns)):
+            counts = {t: impacts.counts['Keeps'][t][col]
+                                        for t in ['TP', 'FP', 'TN', 'FN']}
+            self.assertEqual((p[col], r[col], npv[col]),
+                                                    computeMetrics(counts))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for trigramIndex.py
+Usage:   python test_trigramIndex.py [-v]
+"""
+import re
+import random
+import tempfile
+import unittest
+from trigramIndex import *
+
+def tri(t): return ('TRI', t)
+
+class QueryTests(unittest.TestCase):
+    def test_simplify(self):
+        self.assertEqual(andQuery([ALL, ALL]), ALL)
+        self.assertEqual(andQuery([tri('abc'), NONE]), NONE)
+        self.assertEqual(orQuery([tri('abc'), ALL]), ALL)
+        self.assertEqual(orQuery([NONE, tri('abc')]), tri('abc'))
+        self.assertEqual(andQuery([('AND', [tri('abc'), tri('bcd')]),
+                                    tri('abc')]),
+                                    ('AND', [tri('abc'), tri('bcd')]))
+        self.assertEqual(stringQuery('ab'), ALL)
+        self.assertEqual(stringQuery('abcd'), ('AND', [tri('abc'),tri('bcd')]))
+
+    def test_regexToQuery(self):
+        self.assertEqual(regexToQuery('In Situ'), stringQuery('in situ'))
+        self.assertEqual(regexToQuery(r'\d+'), ALL)
+        self.assertEqual(regexToQuery(r'\bE\d'), ALL)
+        self.assertEqual(queryToString(regexToQuery('northern|in situ')),
+                    "(('nor' AND 'ort' AND 'rth' AND 'the' AND 'her' AND " +
+                    "'ern') OR ('in ' AND 'n s' AND ' si' AND 'sit' AND 'itu'))")
+        q = regexToQuery(r'embryonic\s+days?')
+        self.assertEqual(q, andQuery([stringQuery('embryonic'),
+                                                        stringQuery('day')]))
+        q = regexToQuery(r'fetus(es)?')
+        self.assertEqual(q, stringQuery('fetus'))
+        q = regexToQuery(r'[ft]oo')          # small classes expand
+        self.assertEqual(q, orQuery([tri('foo'), tri('too')]))
+
+    def test_randomSoundness(self):
+        # every text a regex matches must satisfy the regex's query
+        rng = random.Random(7)
+        pieces = ['a', 'b', 'ab', 'abc', 'ba', '[ab]', '[abc]', '.', r'\s',
+                  'c*', '(?:ab|ca)', '(?:a|bc)+', 'b?', r'\b', 'x{2}',
+                  '(a|b|cc)', '[^a]']
+        for i in range(300):
+            regex = ''.join(rng.choice(pieces)
+                                    for j in range(rng.randint(1, 6)))
+            query = regexToQuery(regex)
+            for j in range(20):
+                text = ''.join(rng.choice('abcx AB') for k in range(12))
+                if re.search(regex, text, re.IGNORECASE):
+                    trigrams = getTrigrams(text.lower())
+                    self.assertTrue(satisfies(query, trigrams), (regex, text))
+#-----------------------------------
+
+def satisfies(query, trigrams):
+    op = query[0]
+    if op == 'ALL': return True
+    if op == 'NONE': return False
+    if op == 'TRI': return query[1] in trigrams
+    if op == 'AND': return all(satisfies(q, trigrams) for q in query[1])
+    return any(satisfies(q, trigrams) for q in query[1])
+#-----------------------------------
+
+class TrigramIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.docs = [
+            ('ID0', True,  'Embryonic day 14.5\n\nin situ'),
+            ('ID1', False, 'embryonic  Days 10'),
+            ('ID2', True,  'e14.5 embryos, fetus\n\nnorthern blot'),
+            ('ID3', False, ''),
+            ('ID4', False, 'Fétus 12 in\n\nsitu'),
+            ]
+        self.tmpDir = tempfile.TemporaryDirectory()
+        buildIndex(self.tmpDir.name, self.docs, paragraphs=True,
+                                                            info={'x': 1})
+        self.index = TrigramIndex.load(self.tmpDir.name)
+
+    def tearDown(self):
+        self.tmpDir.cleanup()
+
+    def test_load(self):
+        index = self.index
+        self.assertEqual(index.getNumDocs(), 5)
+        self.assertEqual(index.IDs, ['ID0', 'ID1', 'ID2', 'ID3', 'ID4'])
+        self.assertEqual(index.isPositives.tolist(),
+                                            [True, False, True, False, False])
+        self.assertEqual(index.info, {'x': 1})
+        for doc, (ID, isPos, text) in enumerate(self.docs):
+            self.assertEqual(index.getDocText(doc), text)
+
+    def test_candidates(self):
+        index = self.index
+        q = regexToQuery(r'embryonic\s+days?')
+        self.assertEqual(index.getCandidates(q).tolist(), [0, 1])
+        q = regexToQuery(r'in\s+situ')
+        self.assertEqual(index.getCandidates(q).tolist(), [0, 4])
+        paras = index.getCandidateParagraphs(q)
+        self.assertEqual(index.paraDocs[paras].tolist(), [0, 4])
+        q = regexToQuery('in situ')
+        self.assertEqual(index.getCandidates(q).tolist(), [0])
+        paras = index.getCandidateParagraphs(q)     # 'in\n\nsitu' is 2 paras
+        self.assertEqual(index.paraDocs[paras].tolist(), [0])
+        self.assertIsNone(index.getCandidates(regexToQuery(r'\d+')))
+        q = regexToQuery('nothing here')
+        self.assertEqual(index.getCandidates(q).tolist(), [])
+
+    def test_scan(self):
+        for regex in [r'embryonic\s+days?', r'in\s+situ', r'f[eé]tus',
+                        r'\d+', r'e\d', 'northern|whole mount', r'\bday\b']:
+            scanner = RegexScanner(self.index, regex)
+            result = scanner.scan()
+            expected = {doc: [m.group() for m in
+                                re.finditer(regex, text, re.IGNORECASE)]
+                        for doc, (ID, isPos, text) in enumerate(self.docs)}
+            expected = {d: m for d, m in expected.items() if m}
+            self.assertEqual({d: [m.group() for m in ms]
+                                for d, ms in result.items()}, expected, regex)
+            self.assertEqual(scanner.isFullScan, regex in [r'\d+', r'e\d'])
+
+    def test_scanGroup(self):
+        # the 'days' group loses the text of the earlier 'fix' group
+        scanRegex = r'(?P<fix>day 14)|(?P<days>days?\s+\d+)'
+        scanner = RegexScanner(self.index, r'days?\s+\d+',
+                                    scanRegex=scanRegex, groupName='days')
+        self.assertEqual({d: [m.group() for m in ms]
+                                for d, ms in scanner.scan().items()},
+                                                        {1: ['Days 10']})
+        scanner = RegexScanner(self.index, r'days?\s+\d+')   # w/o the fix
+        self.assertEqual(scanner.scan().keys(), {0, 1})
+
+if __name__ == '__main__':
+    unittest.main()
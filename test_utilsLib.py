@@ -92,6 +92,16 @@ class TextTransformer_tests(unittest.TestCase):
         matches = t.getMatches()
         self.assertEqual(len(matches), 4)
 
+    def test_findSpanMatches(self):
+        t = TextTransformer(self.THEmappings)
+        text = "the start. and These things\n\nthese ends"
+        t.findSpanMatches(text, [(4, 24), (29, 34)])
+        matches = t.getMatches()
+        self.assertEqual([(m.matchText, m.start, m.end, m.preText, m.postText)
+                            for m in matches],
+                        [('These', 15, 20, 'nd ', ' th'),
+                         ('these', 29, 34, '', '')])
+
 # end class TextTransformer_tests
 ######################################
 
@@ -120,6 +130,47 @@ class HelperFunction_tests(unittest.TestCase):
         self.assertIsNotNone(r.search(s2))
         self.assertIsNotNone(r.search('word ' + s2 + '.fun'))
 
+    def test_squeezeLetterSpacing(self):
+        text = 'F I G U R E 1. a b in x-y z w; ab c d e\n\nt a b l e 2'
+        # by default only figure words are squeezed
+        newText, offsetMap = squeezeLetterSpacing(text)
+        self.assertEqual(newText,
+                        'FIGURE 1. a b in x-y z w; ab c d e\n\ntable 2')
+        newText, offsetMap = squeezeLetterSpacing('panels a b e 14.5')
+        self.assertEqual(newText, 'panels a b e 14.5')
+        self.assertTrue(offsetMap.isIdentity())
+
+        newText, offsetMap = squeezeLetterSpacing(text, wordRe=None)
+        self.assertEqual(newText, 'FIGURE 1. a b in x-yzw; ab cde\n\ntable 2')
+        for i, c in enumerate(newText):     # each char maps to itself
+            self.assertEqual(text[offsetMap.getOrigOffset(i)], c)
+        start = newText.index('cde')
+        self.assertEqual(offsetMap.getOrigSpan(start, start+3),
+                                                    (text.index('c d e'),
+                                                    text.index('c d e') + 5))
+        self.assertFalse(offsetMap.isIdentity())
+
+        text = 'nothing to squeeze in a b'
+        newText, offsetMap = squeezeLetterSpacing(text)
+        self.assertEqual(newText, text)
+        self.assertTrue(offsetMap.isIdentity())
+        self.assertEqual(offsetMap.getOrigSpan(3, 3), (3, 3))
+
+    def test_getOrigMatchRcd(self):
+        text = 'in F I G U R E 1 we see e14 in t a b l e 2'
+        newText, offsetMap = squeezeLetterSpacing(text)
+        start = newText.index('e14')
+        m = MatchRcd('age', start, start+3, 'e14', newText[start-12:start],
+                                                newText[start+3:start+5], 'E')
+        origM = offsetMap.getOrigMatchRcd(m, text)
+        self.assertEqual((origM.start, origM.end), (text.index('e14'),
+                                                    text.index('e14') + 3))
+        self.assertEqual(origM.preText, 'R E 1 we see ')
+        self.assertEqual(origM.postText, ' i')
+        self.assertEqual(m.start, start)                # m is not changed
+        m = MatchRcd('age', start, start+3, 'e14', 'see ', ' i', 'E')
+        self.assertIs(offsetMap.getOrigMatchRcd(m, text), m)  # no squeezes
+
 # end class TextMappingFromStrings_tests
 ######################################
 
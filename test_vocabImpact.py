@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for vocabImpact.py
+Usage:   python test_vocabImpact.py [-v]
+"""
+import os
+import tempfile
+import unittest
+import numpy as np
+from vocabImpact import *
+from routerVocabs import RouterVocabs, writeRouterOptions, readRouterOptions
+from syntheticCorpus import SyntheticRefGenerator
+from routingFeatures import FeatureMatrix, getPredType, getRouterFeatures
+from termMatrix import TermMatrix
+import trigramIndex
+
+def getVocabs(**changes):
+    vocabs = RouterVocabs(['J Skip'], ['embryo'], ['chick embryo'],
+                        ['_hh##_', 'chick'], ['in situ', 'northern', 'stain'],
+                        ['amount', 'in situ hybridization was not'])
+    for category, terms in changes.items(): setattr(vocabs, category, terms)
+    return vocabs
+
+def writeRun(baseName, records, router):
+    # write the doRouting2 output files that vocabImpact reads and patches
+    routingCols = ['ID', 'knownClassName', 'routing', 'predType'] + \
+            ROUTINGS_COLUMNS + ['relevance', 'confidence', 'journal']
+    fm = FeatureMatrix()
+    tm = TermMatrix.fromRouter(router)
+    rows = []
+    matches = {}
+    for r in records:
+        routing = router.routeThisRef(r['text'], r['journal'])
+        isPositive = r['knownClassName'] == 'Yes'
+        predType = getPredType(isPositive, routing == 'Yes')
+        features = getRouterFeatures(router, len(r['text']))
+        fm.addRef(r['ID'], isPositive, r['relevance'] == 'keep',
+                                                    r['journal'], features)
+        tm.addRouterMatches(r['ID'], router)
+        rows.append([r['ID'], r['knownClassName'], routing, predType] +
+                    [str(features[f]) for f in FEATURE_NAMES] +
+                    [r['relevance'], r['confidence'], r['journal']])
+        for cat, rcds in [
+                ('Cat1', router.getCat1Matches() + router.getCat1Excludes()),
+                ('Age',  router.getAgeMatches()  + router.getAgeExcludes()),
+                ('Cat2', router.getCat2Matches() + router.getCat2Excludes())]:
+            key = routingFiles.getMatchFileKey(cat, predType, r['ID'])
+            matches[key] = matches.get(key, '') + routingFiles.formatMatches(
+                        r['ID'], routing, predType, features['goodJournal'],
+                        features['cat1Matches'], features['ageMatches'],
+                        features['cat2Matches'], rcds, r['confidence'])
+    routingFiles.RoutingsFile('time', routingCols, rows).write(
+                                                    baseName + 'Routings.txt')
+    for key, fileName in routingFiles.getMatchFileNames(baseName).items():
+        with open(fileName, 'w') as fp:
+            fp.write('time ' + routingFiles.matchesHdr + matches.get(key, ''))
+    fm.save(baseName + 'Features.npz')
+    tm.save(baseName + 'TermMatrix.npz')
+
+def readRun(baseName):
+    # everything but the order of the match file lines
+    files = {}
+    for fileName in [baseName + 'Routings.txt'] + \
+                list(routingFiles.getMatchFileNames(baseName).values()):
+        with open(fileName) as fp:
+            files[fileName[len(baseName):]] = sorted(fp.readlines()[1:])
+    for fileName in ['Features.npz', 'TermMatrix.npz']:
+        with np.load(baseName + fileName) as data:
+            files[fileName] = {k: data[k].tolist() for k in data.files}
+    return files
+
+class VocabChangesTests(unittest.TestCase):
+    def test_getVocabChanges(self):
+        changes = getVocabChanges(getVocabs(),
+                        getVocabs(cat2Terms=['In Situ', 'northern', 'wish'],
+                                  skipJournals=['J Skip', 'J other']))
+        self.assertEqual(changes, [('skipJournals', 'J other', 'added'),
+                                   ('cat2Terms', 'stain', 'removed'),
+                                   ('cat2Terms', 'wish', 'added')])
+        self.assertEqual(getVocabChanges(getVocabs(), getVocabs()), [])
+
+    def test_getTermPatterns(self):
+        router = getVocabs().buildRouter()
+        patterns = getTermPatterns('cat2Terms', 'in situ', router)
+        self.assertEqual(len(patterns), 2)
+        # figure text joins words that aren't adjacent in the text
+        text = 'in\n\nsitu. fig 1. more'
+        self.assertTrue(all([p.search(text) for p in patterns]))
+        patterns = getTermPatterns('ageExclude', '_hh## stage', router)
+        self.assertTrue(all([p.search('x hh12 y stage') for p in patterns]))
+        self.assertFalse(all([p.search('x hhx12 stage') for p in patterns]))
+        query = getTermQuery(getTermPatterns('cat2Terms', 'in situ', router))
+        self.assertEqual(query, ('AND', [('TRI', 'sit'), ('TRI', 'itu')]))
+#-----------------------------------
+
+class PatchRunTests(unittest.TestCase):
+    def test_patchEqualsRerun(self):
+        self.checkPatchEqualsRerun({})
+
+    def test_patchEqualsRerunWithOptions(self):
+        # re-routing uses the run's router options, not the defaults
+        self.checkPatchEqualsRerun({'squeezeLetterSpacing': True,
+                                'unifiedTermScan': True, 'asciiText': True})
+
+    def checkPatchEqualsRerun(self, routerOptions):
+        gen = SyntheticRefGenerator(getVocabs(), seed=3,
+                densities={'cat2': 2, 'age': 2, 'ageExclude': 2},
+                lengthDist='lognormal:8:0.5', skipJournalRate=0.2)
+        records = list(gen.genRecords(60))
+        oldVocabs = getVocabs()
+        newVocabs = getVocabs(cat2Terms=['in situ', 'stain', 'amount'],
+                                ageExclude=['chick', 'hh'],
+                                cat1Exclude=['chick embryo', 'embryo 1'],
+                                skipJournals=[])
+        changes = getVocabChanges(oldVocabs, newVocabs)
+        with tempfile.TemporaryDirectory() as tmpDir:
+            trigramIndex.buildIndex(os.path.join(tmpDir, 'index'),
+                    [(r['ID'], r['knownClassName'] == 'Yes', r['text'])
+                                                        for r in records])
+            index = trigramIndex.TrigramIndex.load(
+                                                os.path.join(tmpDir, 'index'))
+            run = os.path.join(tmpDir, 'run_')
+            runRouter = oldVocabs.buildRouter(numChars=30, **routerOptions)
+            writeRun(run, records, runRouter)
+            os.makedirs(run + 'vocabs/')
+            writeRouterOptions(run + 'vocabs/', runRouter)
+            expected = os.path.join(tmpDir, 'expected_')
+            writeRun(expected, records,
+                        newVocabs.buildRouter(numChars=30, **routerOptions))
+
+            router = newVocabs.buildRouter(
+                                    **readRouterOptions(run + 'vocabs/'))
+
+            fm = FeatureMatrix.load(run + 'Features.npz')
+            affected = findAffectedRefs(changes, fm, index, router)
+            self.assertTrue(0 < len(affected) < len(records))
+            routings = routingFiles.RoutingsFile.read(run + 'Routings.txt')
+            oldRoutings = {ID: routings.getValue(ID, 'routing')
+                                                        for ID in affected}
+            results = rerouteRefs(affected, fm, routings, index, router)
+            patchRun(run, routings, fm, results, router)
+
+            # unaffected refs route the same w/ the new vocabs
+            expectedRoutings = routingFiles.RoutingsFile.read(
+                                                expected + 'Routings.txt')
+            for ID in routings.getIDs():
+                if ID not in affected:
+                    self.assertEqual(expectedRoutings.getValue(ID, 'routing'),
+                                        routings.getValue(ID, 'routing'))
+            patched = readRun(run)
+            rerun = readRun(expected)
+            self.assertEqual(patched.keys(), rerun.keys())
+            for fileName in patched:
+                self.assertEqual(patched[fileName], rerun[fileName], fileName)
+
+            report = getImpactReport(changes, affected, oldRoutings, results)
+            self.assertIn("refs re-routed: %d" % len(affected), report)
+
+    def test_routerOptions(self):
+        router = getVocabs().buildRouter(numChars=20, unifiedTermScan=True,
+                                            timeBudget=1.0)
+        with tempfile.TemporaryDirectory() as tmpDir:
+            self.assertRaises(FileNotFoundError, readRouterOptions, tmpDir)
+            writeRouterOptions(tmpDir, router)
+            options = readRouterOptions(tmpDir)
+        self.assertNotIn('timeBudget', options)
+        rebuilt = getVocabs().buildRouter(**options)
+        for name in ['numChars', 'unifiedTermScan', 'useFigTextSpans',
+                        'squeezeLetterSpacing', 'asciiText', 'ageContext']:
+            self.assertEqual(getattr(router, name), getattr(rebuilt, name))
+
+    def test_notInIndex(self):
+        fm = FeatureMatrix()
+        fm.addRef('ID1', True, True, 'J', {f: 0 for f in FEATURE_NAMES})
+        with tempfile.TemporaryDirectory() as tmpDir:
+            trigramIndex.buildIndex(tmpDir, [('ID2', True, 'text')])
+            index = trigramIndex.TrigramIndex.load(tmpDir)
+            self.assertRaises(ValueError, findAffectedRefs, [], fm, index,
+                                                    getVocabs().buildRouter())
+
+if __name__ == '__main__':
+    unittest.main()
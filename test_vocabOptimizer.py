@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""
+These are tests for vocabOptimizer.py
+Usage:   python test_vocabOptimizer.py [-v]
+"""
+import os
+import random
+import tempfile
+import unittest
+from vocabOptimizer import *
+import test_termMatrix
+from routingFeatures import RoutingRule
+
+def makeRandom(numRefs, seed=1):
+    return test_termMatrix.makeRandom(numRefs, seed=seed,
+                    vocabs=(['embryo'], [], ['eday', 'dpc'],
+                        ['chick', 'zebrafish'],
+                        ['in situ', 'northern', 'section', 'stain'],
+                        ['in situ hybridization was not', 'not done',
+                                                        'section stain']),
+                    posTermPrefix='cat2:in', goodJournalRate=1,
+                    textLengths=(100, 5000, 5000))
+
+class VocabOptimizerTests(unittest.TestCase):
+    def setUp(self):
+        self.fm, self.tm = makeRandom(150)
+
+    def test_movesMatchApply(self):
+        # counts predicted for each move == counts after applying it,
+        #  also from states w/ terms already removed
+        opt = VocabOptimizer(self.fm, self.tm, RoutingRule(), minRecall=50)
+        rng = random.Random(2)
+        state = opt.getInitialState()
+        for step in range(5):
+            moves, counts = opt.evaluateMoves(state)
+            for i, col in enumerate(moves):
+                newState = opt.applyMove(state, col)
+                for subset in newState.counts:
+                    self.assertEqual({t: int(counts[subset][t][i])
+                                for t in counts[subset]},
+                                newState.counts[subset],
+                                (step, self.tm.columns[col], subset))
+            state = opt.applyMove(state, rng.choice(moves))
+
+    def test_excludeGain(self):
+        # removing a cat2 term takes away what a removed exclude unmasked
+        opt = VocabOptimizer(self.fm, self.tm, RoutingRule())
+        col = lambda name: self.tm.colIndex[name]
+        x = col('cat2Exclude:section stain')
+        state = opt.applyMove(opt.getInitialState(), x)
+        state = opt.applyMove(state, col('cat2:section'))
+        state = opt.applyMove(state, col('cat2:stain'))
+        expected = self.fm.getColumn('cat2Matches').copy()
+        dense = self.tm.toDense()
+        for name in ['cat2:section', 'cat2:stain']:
+            expected -= dense[:, col(name)]
+        self.assertEqual(state.catCounts[:, 2].tolist(), expected.tolist())
+
+    def test_search(self):
+        opt = VocabOptimizer(self.fm, self.tm, RoutingRule(), minRecall=40)
+        initial = opt.getInitialState()
+        greedy = opt.search(beamWidth=1)
+        beam = opt.search(beamWidth=4)
+        self.assertTrue(greedy.score > initial.score)
+        self.assertTrue(beam.score >= greedy.score)
+        path = greedy.getPath()
+        self.assertEqual(path[0].move, None)
+        for s1, s2 in zip(path, path[1:]):          # each step improves
+            self.assertTrue(s2.score > s1.score)
+        p, r, npv = greedy.getMetrics()
+        self.assertTrue(r >= 40)
+        self.assertEqual(len(greedy.getRemovedTerms()), len(path) - 1)
+        self.assertTrue(all(c in DEFAULT_CATEGORIES
+                                    for c, t in greedy.getRemovedTerms()))
+        self.assertEqual(len(opt.search(beamWidth=2, maxSteps=1).getPath()),2)
+
+    def test_belowFloor(self):
+        # can't reach the floor: get as much Recall as possible
+        opt = VocabOptimizer(self.fm, self.tm, RoutingRule(), minRecall=99)
+        initial = opt.getInitialState()
+        best = opt.search()
+        self.assertFalse(best.score[0])
+        self.assertTrue(best.getMetrics()[1] > initial.getMetrics()[1])
+#-----------------------------------
+
+class VocabDiffTests(unittest.TestCase):
+    def test_diff(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            cat2File = os.path.join(tmpDir, 'cat2Terms.txt')
+            ageFile = os.path.join(tmpDir, 'ageExclude.txt')
+            with open(cat2File, 'w') as fp:
+                fp.write('# cat2 terms\nIn Situ\nsection\n\nstain\n')
+            with open(ageFile, 'w') as fp:
+                fp.write('chick\n hh\n')
+            diff = getVocabDiff([('cat2', 'in situ'), ('ageExclude', ' hh'),
+                                 ('cat2Exclude', 'not done')],
+                                {'cat2': cat2File, 'ageExclude': ageFile})
+        lines = diff.split('\n')
+        self.assertIn('-In Situ', lines)
+        self.assertIn('- hh', lines)
+        self.assertIn(' section', lines)
+        self.assertEqual(len([l for l in lines if l.startswith('-') and
+                                        not l.startswith('---')]), 2)
+
+if __name__ == '__main__':
+    unittest.main()
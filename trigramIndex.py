@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Trigram index of the documents (and optionally paragraphs) of a
+            sample file, and a compiler from regular expressions to trigram
+            queries (after Russ Cox's Google Code Search, "Regular
+            Expression Matching with a Trigram Index").
+
+           Any text a regex can match must contain certain trigrams, e.g.
+            r'embryonic\s+day\s*\d' needs 'emb' AND 'mbr' ... AND 'day'.
+           The index gives the documents that contain those trigrams: the
+            only documents the regex could match. Running a new or changed
+            TextMapping (e.g., the age mappings) over just those candidates
+            gives the same matches as running it over the whole corpus.
+           Regexes that don't require any trigram (e.g., r'\d+') compile to
+            the ALL query: every document is a candidate (full scan).
+
+  Queries: tuples  ('ALL',)  ('NONE',)  ('TRI', 'abc')
+                   ('AND', [queries])  ('OR', [queries])
+
+  Text:    Trigrams are of lower cased text. Regexes are matched case
+            insensitively, like utilsLib.TextTransformer does.
+            (Exotic unicode case folds, e.g., long s matching 's', are not
+            handled.)
+
+  Index files (indexDir/):
+    meta.json       - doc IDs, isPositive flags, info, levels indexed
+    doc.trigrams.json, doc.starts.npy, doc.postings.npy
+                    - sorted trigrams, postings of trigrams[i] are
+                        postings[starts[i]:starts[i+1]]: sorted doc indexes
+    text.npy, docOffsets.npy - utf-8 text of all docs, for scanning
+    para.*          - same for paragraphs ('\n\n') if indexed, postings
+                        are paragraph numbers; para.docs.npy and
+                        para.offsets.npy give each paragraph's doc and
+                        char offset in the doc
+   The .npy files are memory mapped when the index is loaded.
+
+  To Use:
+    trigramIndex.buildIndex('myIndex', [(ID, isPositive, text), ...])
+    index = trigramIndex.TrigramIndex.load('myIndex')
+    query = trigramIndex.regexToQuery(r'embryonic\s+day\s*\d')
+    candidates = index.getCandidates(query)     # doc indexes or None (ALL)
+    matches = trigramIndex.RegexScanner(index, regex).scan()
+
+  To Run Automated Unit Tests:  python test_trigramIndex.py [-v]
+'''
+import os
+import re
+import json
+import numpy as np
+try:
+    from re import _parser as sre_parse         # python 3.11+
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+#-----------------------------------
+
+INDEX_VERSION = 1
+PARAGRAPH_BOUNDARY = '\n\n'
+
+MAX_EXACT = 64          # max num of strings in an exact/prefix/suffix set
+MAX_CLASS = 10          # char classes w/ more chars than this are "any char"
+
+ALL  = ('ALL',)
+NONE = ('NONE',)
+
+#-----------------------------------
+# Trigram queries
+
+def andQuery(queries):
+    """ Return the AND of queries, simplified
+    """
+    terms = []
+    for q in queries:
+        if q == NONE: return NONE
+        if q == ALL: continue
+        for t in (q[1] if q[0] == 'AND' else [q]):
+            if t not in terms: terms.append(t)
+    if not terms: return ALL
+    if len(terms) == 1: return terms[0]
+    return ('AND', terms)
+
+def orQuery(queries):
+    """ Return the OR of queries, simplified
+    """
+    terms = []
+    for q in queries:
+        if q == ALL: return ALL
+        if q == NONE: continue
+        for t in (q[1] if q[0] == 'OR' else [q]):
+            if t not in terms: terms.append(t)
+    if not terms: return NONE
+    if len(terms) == 1: return terms[0]
+    return ('OR', terms)
+
+def stringQuery(s):
+    """ Return query: AND of the trigrams of string s (ALL if len(s) < 3)
+    """
+    return andQuery([('TRI', s[i:i+3]) for i in range(len(s) - 2)])
+
+def stringsQuery(strings):
+    """ Return query for "one of these strings is in the text"
+    """
+    return orQuery([stringQuery(s) for s in sorted(strings)])
+
+def queryToString(q):
+    """ Return a readable string for query q
+    """
+    if q[0] in ('ALL', 'NONE'): return q[0]
+    if q[0] == 'TRI': return repr(q[1])
+    return '(' + (' %s ' % q[0]).join([queryToString(s) for s in q[1]]) + ')'
+#-----------------------------------
+# Regex analysis
+#   Info about the strings a regex (node) can match:
+#     exact  - the set of all strings it matches, or None if unknown/too big
+#     prefix - set of strings, every match starts w/ one of them
+#     suffix - set of strings, every match ends w/ one of them
+#     match  - a trigram query every matching string satisfies
+
+class RegexInfo (object):
+    def __init__(self, exact=None, prefix=None, suffix=None, match=ALL):
+        self.exact = exact
+        self.prefix = prefix if prefix is not None else {''}
+        self.suffix = suffix if suffix is not None else {''}
+        self.match = match
+
+    @classmethod
+    def anyString(cls):      return cls(None, {''}, {''}, ALL)
+
+    @classmethod
+    def emptyString(cls):    return cls({''})
+
+    @classmethod
+    def oneOf(cls, chars):   return cls(set(chars))
+
+    def getPrefix(self):
+        return self.exact if self.exact is not None else self.prefix
+
+    def getSuffix(self):
+        return self.exact if self.exact is not None else self.suffix
+
+    def simplify(self):
+        """ Keep the sets small: move what they know into self.match
+        """
+        if self.exact is not None and (len(self.exact) > MAX_EXACT or
+                                    any(len(s) > 3 for s in self.exact)):
+            self.match = andQuery([self.match, stringsQuery(self.exact)])
+            self.prefix = self.exact
+            self.suffix = self.exact
+            self.exact = None
+        if self.exact is None:
+            self.prefix = self._trim(self.prefix, lambda s: s[:2])
+            self.suffix = self._trim(self.suffix, lambda s: s[-2:])
+        return self
+
+    def _trim(self, strings, keep):
+        """ AND the trigrams of strings into match, return the strings
+            trimmed to 2 chars (or {''} if there are too many)
+        """
+        if any(len(s) >= 3 for s in strings):
+            self.match = andQuery([self.match, stringsQuery(strings)])
+            strings = set([keep(s) for s in strings])
+        if len(strings) > MAX_EXACT: strings = {''}
+        return strings
+
+    def getQuery(self):
+        """ Return the trigram query for this regex
+        """
+        if self.exact is not None:
+            return andQuery([self.match, stringsQuery(self.exact)])
+        return andQuery([self.match, stringsQuery(self.prefix),
+                                                stringsQuery(self.suffix)])
+#-----------------------------------
+
+def cross(set1, set2):
+    """ Return {s1 + s2}, or None if it would be too big
+    """
+    if len(set1) * len(set2) > MAX_EXACT: return None
+    return set([s1 + s2 for s1 in set1 for s2 in set2])
+
+def concatInfo(x, y):
+    """ Return RegexInfo for regex xy
+    """
+    match = andQuery([x.match, y.match])
+    if x.exact is not None and y.exact is not None:
+        exact = cross(x.exact, y.exact)
+        if exact is not None:
+            return RegexInfo(exact, match=match).simplify()
+        # too many strings. Use the prefixes/suffixes
+        info = RegexInfo(None, x.exact, y.exact, match)
+        info.match = andQuery([match, stringsQuery(x.exact),
+                                                    stringsQuery(y.exact)])
+        return info.simplify()
+
+    if x.exact is not None:
+        prefix = cross(x.exact, y.prefix) or x.exact
+    else:
+        prefix = x.prefix
+    if y.exact is not None:
+        suffix = cross(x.suffix, y.exact) or y.exact
+    else:
+        suffix = y.suffix
+    # text where x meets y
+    middle = cross(x.getSuffix(), y.getPrefix())
+    if middle is not None:
+        match = andQuery([match, stringsQuery(middle)])
+    return RegexInfo(None, prefix, suffix, match).simplify()
+
+def alternateInfo(x, y):
+    """ Return RegexInfo for regex x|y
+    """
+    if x.exact is not None and y.exact is not None:
+        return RegexInfo(x.exact | y.exact,
+                            match=orQuery([x.match, y.match])).simplify()
+    return RegexInfo(None, x.getPrefix() | y.getPrefix(),
+                            x.getSuffix() | y.getSuffix(),
+                            orQuery([andQuery([x.match, x.getQuery()]),
+                                     andQuery([y.match, y.getQuery()])])
+                            ).simplify()
+#-----------------------------------
+
+def _classChars(items):
+    """ Return set of the (lower case) chars in a char class, or None if
+        it is negated, has categories (\d \s ...) or is too big
+    """
+    chars = set()
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            chars.add(chr(av).lower())
+        elif op == sre_constants.RANGE:
+            lo, hi = av
+            if hi - lo >= MAX_CLASS: return None
+            chars.update([chr(c).lower() for c in range(lo, hi + 1)])
+        else:                                   # NEGATE, CATEGORY, ...
+            return None
+        if len(chars) > MAX_CLASS: return None
+    return chars
+
+def _seqInfo(items):
+    info = RegexInfo.emptyString()
+    for op, av in items:
+        info = concatInfo(info, _nodeInfo(op, av))
+    return info
+
+def _nodeInfo(op, av):
+    """ Return RegexInfo for one sre_parse node
+    """
+    c = sre_constants
+    if op == c.LITERAL:
+        return RegexInfo.oneOf([chr(av).lower()])
+    if op == c.IN:
+        chars = _classChars(av)
+        if chars is None: return RegexInfo.anyString()
+        return RegexInfo.oneOf(chars)
+    if op in (c.NOT_LITERAL, c.ANY):
+        return RegexInfo.anyString()
+    if op == c.AT or op in (c.ASSERT, c.ASSERT_NOT):  # anchors, lookarounds
+        return RegexInfo.emptyString()
+    if op == c.SUBPATTERN:
+        return _seqInfo(av[-1])
+    if op == getattr(c, 'ATOMIC_GROUP', None):
+        return _seqInfo(av)
+    if op == c.BRANCH:
+        branches = [_seqInfo(b) for b in av[1]]
+        info = branches[0]
+        for b in branches[1:]:
+            info = alternateInfo(info, b)
+        return info
+    if op in (c.MAX_REPEAT, c.MIN_REPEAT,
+                                getattr(c, 'POSSESSIVE_REPEAT', None)):
+        lo, hi, sub = av
+        subInfo = _seqInfo(sub)
+        if lo == 0 and hi == 1:                 # x?
+            return alternateInfo(subInfo, RegexInfo.emptyString())
+        if lo == 0:                             # x*
+            return RegexInfo.anyString()
+        # x+, x{n,m}: at least one x. Matches start/end w/ x, contain x
+        info = RegexInfo(None, subInfo.getPrefix(), subInfo.getSuffix(),
+                                    andQuery([subInfo.match,
+                                              subInfo.getQuery()]))
+        return info.simplify()
+    return RegexInfo.anyString()        # GROUPREF, etc: could be anything
+
+def regexToQuery(regex, flags=re.IGNORECASE):
+    """ Return the trigram query that any text matching regex satisfies
+    """
+    parsed = sre_parse.parse(regex, flags)
+    return _seqInfo(list(parsed)).getQuery()
+#-----------------------------------
+# The index
+
+def getTrigrams(text):
+    """ Return the set of trigrams in (lower cased) text
+    """
+    return set([text[i:i+3] for i in range(len(text) - 2)])
+
+def _buildPostings(unitTrigrams):
+    """ Return (sorted trigrams, starts, postings) from a list of trigram
+        sets, one per unit (doc or paragraph)
+    """
+    postings = {}
+    for unit, trigrams in enumerate(unitTrigrams):
+        for t in trigrams:
+            postings.setdefault(t, []).append(unit)
+    trigrams = sorted(postings.keys())
+    starts = np.zeros(len(trigrams) + 1, dtype=np.int64)
+    starts[1:] = np.cumsum([len(postings[t]) for t in trigrams])
+    allPostings = np.zeros(int(starts[-1]), dtype=np.uint32)
+    for i, t in enumerate(trigrams):
+        allPostings[starts[i]:starts[i+1]] = postings[t]
+    return trigrams, starts, allPostings
+
+def _savePostings(indexDir, level, trigrams, starts, postings):
+    with open(os.path.join(indexDir, level + '.trigrams.json'), 'w') as fp:
+        json.dump(trigrams, fp)
+    np.save(os.path.join(indexDir, level + '.starts.npy'), starts)
+    np.save(os.path.join(indexDir, level + '.postings.npy'), postings)
+
+def splitParagraphs(text):
+    """ Return list of (char offset, paragraph text)
+    """
+    paras = []
+    offset = 0
+    for para in text.split(PARAGRAPH_BOUNDARY):
+        paras.append((offset, para))
+        offset += len(para) + len(PARAGRAPH_BOUNDARY)
+    return paras
+
+def buildIndex(indexDir,
+                docs,               # iterator of (ID, isPositive, text)
+                paragraphs=False,   # also index paragraphs
+                info={},            # dict of descriptive info for meta.json
+                progress=None,      # optional function(numDocs)
+                ):
+    """ Build the index and write it to indexDir
+    """
+    os.makedirs(indexDir, exist_ok=True)
+    IDs, isPositives = [], []
+    docTrigrams, paraTrigrams, paraDocs, paraOffsets = [], [], [], []
+    textPieces, docOffsets = [], [0]
+    for docNum, (ID, isPositive, text) in enumerate(docs):
+        if progress: progress(docNum)
+        IDs.append(ID)
+        isPositives.append(bool(isPositive))
+        data = text.encode('utf-8')
+        textPieces.append(data)
+        docOffsets.append(docOffsets[-1] + len(data))
+        text = text.lower()
+        docTrigrams.append(getTrigrams(text))
+        if paragraphs:
+            for offset, para in splitParagraphs(text):
+                paraTrigrams.append(getTrigrams(para))
+                paraDocs.append(docNum)
+                paraOffsets.append(offset)
+
+    np.save(os.path.join(indexDir, 'text.npy'),
+                        np.frombuffer(b''.join(textPieces), dtype=np.uint8))
+    np.save(os.path.join(indexDir, 'docOffsets.npy'),
+                                        np.array(docOffsets, dtype=np.int64))
+    _savePostings(indexDir, 'doc', *_buildPostings(docTrigrams))
+    if paragraphs:
+        _savePostings(indexDir, 'para', *_buildPostings(paraTrigrams))
+        np.save(os.path.join(indexDir, 'para.docs.npy'),
+                                    np.array(paraDocs, dtype=np.uint32))
+        np.save(os.path.join(indexDir, 'para.offsets.npy'),
+                                    np.array(paraOffsets, dtype=np.int64))
+    meta = {'version'    : INDEX_VERSION,
+            'info'       : info,
+            'paragraphs' : paragraphs,
+            'IDs'        : IDs,
+            'isPositives': isPositives,
+            }
+    with open(os.path.join(indexDir, 'meta.json'), 'w') as fp:
+        json.dump(meta, fp)
+#-----------------------------------
+
+class Postings (object):
+    """ Trigram postings for one level (docs or paragraphs)
+    """
+    def __init__(self, indexDir, level, numUnits, mmap=True):
+        with open(os.path.join(indexDir, level + '.trigrams.json')) as fp:
+            self.trigramIndex = {t: i for i, t in enumerate(json.load(fp))}
+        self.starts = np.load(os.path.join(indexDir, level + '.starts.npy'))
+        fileName = os.path.join(indexDir, level + '.postings.npy')
+        mode = 'r' if mmap and os.path.getsize(fileName) > 128 else None
+        self.postings = np.load(fileName, mmap_mode=mode)
+        self.numUnits = numUnits
+
+    def getUnits(self, trigram):
+        i = self.trigramIndex.get(trigram)
+        if i is None: return np.zeros(0, dtype=np.int64)
+        return self.postings[self.starts[i]:self.starts[i+1]].astype(np.int64)
+
+    def evaluate(self, query):
+        """ Return sorted array of the units that satisfy the query,
+            or None for all units
+        """
+        op = query[0]
+        if op == 'ALL': return None
+        if op == 'NONE': return np.zeros(0, dtype=np.int64)
+        if op == 'TRI': return self.getUnits(query[1])
+        results = [self.evaluate(q) for q in query[1]]
+        if op == 'AND':
+            results = sorted([r for r in results if r is not None], key=len)
+            if not results: return None
+            units = results[0]
+            for r in results[1:]:
+                if not len(units): break
+                units = np.intersect1d(units, r, assume_unique=True)
+            return units
+        if op == 'OR':
+            if any(r is None for r in results): return None
+            return np.unique(np.concatenate(results))
+        raise ValueError("invalid query op '%s'" % op)
+# end class Postings -----------------------------------
+
+class TrigramIndex (object):
+    """
+    Is a: trigram index of the documents (and paragraphs) of a sample set
+    Has : doc IDs, isPositive flags, doc (and paragraph) Postings
+    Does: getCandidates(query), getCandidateParagraphs(query), getDocText()
+    """
+    def __init__(self, indexDir, mmap=True):
+        with open(os.path.join(indexDir, 'meta.json')) as fp:
+            meta = json.load(fp)
+        if meta['version'] != INDEX_VERSION:
+            raise ValueError("index '%s' is version %s, need version %d" % \
+                                (indexDir, meta['version'], INDEX_VERSION))
+        self.info = meta['info']
+        self.IDs = meta['IDs']
+        self.isPositives = np.array(meta['isPositives'], dtype=bool)
+        self.docPostings = Postings(indexDir, 'doc', len(self.IDs), mmap)
+        fileName = os.path.join(indexDir, 'text.npy')
+        mode = 'r' if mmap and os.path.getsize(fileName) > 128 else None
+        self.text = np.load(fileName, mmap_mode=mode)
+        self.docOffsets = np.load(os.path.join(indexDir, 'docOffsets.npy'))
+        self.hasParagraphs = meta['paragraphs']
+        if self.hasParagraphs:
+            self.paraDocs = np.load(os.path.join(indexDir, 'para.docs.npy'))
+            self.paraOffsets = np.load(os.path.join(indexDir,
+                                                        'para.offsets.npy'))
+            self.paraPostings = Postings(indexDir, 'para',
+                                                    len(self.paraDocs), mmap)
+
+    @classmethod
+    def load(cls, indexDir, mmap=True):
+        return cls(indexDir, mmap)
+
+    def getNumDocs(self): return len(self.IDs)
+
+    def getDocText(self, doc):
+        start, end = int(self.docOffsets[doc]), int(self.docOffsets[doc+1])
+        return self.text[start:end].tobytes().decode('utf-8')
+
+    def getCandidates(self, query):
+        """ Return sorted array of the doc indexes that may match the query,
+            or None if all docs may
+        """
+        return self.docPostings.evaluate(query)
+
+    def getCandidateParagraphs(self, query):
+        """ Return sorted array of paragraph numbers that may match, or None
+            Only valid for regexes that can't match across paragraphs.
+        """
+        if not self.hasParagraphs:
+            raise ValueError('index has no paragraphs')
+        return self.paraPostings.evaluate(query)
+# end class TrigramIndex -----------------------------------
+
+class RegexScanner (object):
+    """
+    Is a: runner of a regex over just the candidate docs of a TrigramIndex
+    Has : the regex, its trigram query, the candidate docs
+    Does: scan() - find the matches in the candidates
+    """
+    def __init__(self, index, regex, flags=re.IGNORECASE,
+                scanRegex=None, # regex to run over the candidates, e.g., a
+                                #   TextTransformer big regex that has regex
+                                #   as its group named groupName.
+                                #   Default: regex
+                groupName=None, # only keep the scanRegex matches of this
+                                #   group
+                ):
+        self.index = index
+        self.regex = regex
+        self.groupName = groupName
+        self.compiledRe = re.compile(scanRegex or regex, flags)
+        # the candidates of regex are enough: where the group matches,
+        #   regex matches
+        self.query = regexToQuery(regex, flags)
+        self.candidates = index.getCandidates(self.query)
+        self.isFullScan = self.candidates is None
+        if self.isFullScan:
+            self.candidates = np.arange(index.getNumDocs())
+
+    def scan(self, getText=None):
+        """ Return {doc index: [re match objects]} for docs w/ matches
+            getText(doc index) returns the text of the doc.
+                Default: the doc text stored in the index
+            If self.groupName, only the matches of that group are returned,
+                so, like in a TextTransformer, the group loses the text that
+                earlier groups (and earlier matches) match.
+        """
+        if getText is None: getText = self.index.getDocText
+        results = {}
+        for doc in self.candidates:
+            doc = int(doc)
+            matches = list(self.compiledRe.finditer(getText(doc)))
+            if self.groupName:
+                matches = [m for m in matches
+                                if m.group(self.groupName) is not None]
+            if matches: results[doc] = matches
+        return results
+# end class RegexScanner -----------------------------------
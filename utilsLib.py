@@ -6,6 +6,8 @@
 import sys
 import os.path
 import re
+import copy
+import bisect
 import string
 import configparser
 
@@ -121,10 +123,11 @@ class TextMapping (object):
         """
         return self.matchRcds
 
-    def foundMatch(self, text, start, end):
+    def foundMatch(self, text, start, end, lo=0, hi=None):
         """ Process the fact that text[start:end] matched this TextMapping.
             Register the match and
             Return the string that should replace text[start:end].
+            The context chars kept are within text[lo:hi].
         """
         matchText = text[start:end]
 
@@ -134,8 +137,9 @@ class TextMapping (object):
             replacement = self.replacement(matchText)
             
         # Get n chars around the matching text
-        preText  = text[max(0, start-self.numChars) : start]
-        postText = text[end : end+self.numChars]
+        if hi is None: hi = len(text)
+        preText  = text[max(lo, start-self.numChars) : start]
+        postText = text[end : min(hi, end+self.numChars)]
 
         # Record the match
         matchRcd = MatchRcd(self.name, start, end, matchText, preText,
@@ -232,6 +236,104 @@ def spacedOutRegex(s):
 
 #---------------------------------
 
+# letter spaced words: 3 or more single letters separated by single spaces
+#   that are not part of longer words, e.g., "F I G U R E 1".
+#   Matches from the space after the 1st letter: starting w/ a literal lets
+#   the re module skip ahead to the spaces instead of trying every char.
+letterSpacedRe = re.compile( \
+            r' (?<=[^\W\d_] )(?<!\w\w )[^\W\d_](?: [^\W\d_])+(?!\w)')
+
+# the letter spaced words squeezeLetterSpacing() squeezes by default: the
+#   words the figure text and age regex's look for letter spaced
+#   (spacedOutRegex()): figure/table and the words before them in legends
+figureWordsRe = re.compile( \
+            r'(?:supp[a-z]*|online|extended(?:data)?|data)?' +
+            r'(?:fig(?:ure)?s?|tables?)?', re.IGNORECASE)
+
+def squeezeLetterSpacing(text, wordRe=figureWordsRe):
+    """ Return (new text, OffsetMap): text w/ the spaces removed from its
+            letter spaced words ("F I G U R E 1" -> "FIGURE 1"), so regex's
+            can search for plain words instead of spacedOutRegex()'s.
+        Only the letter spaced words that wordRe fullmatches are squeezed
+            (None = all of them), so runs of single letters like
+            "panels a b e 14.5" are not changed.
+        One pass through the text. The OffsetMap maps offsets in the new
+            text back to text.
+        Letter spaced words next to each other can't be told apart, so they
+            become one word ("s u p p f i g" -> "suppfig"), and partially
+            spaced words ("F I Gu RE") are not changed.
+    """
+    offsetMap = OffsetMap()
+    pieces = []
+    prevEnd = 0
+    removed = 0         # n chars removed so far
+    for m in letterSpacedRe.finditer(text):
+        start = m.start() - 1           # the 1st letter
+        letters = text[start:m.end():2]
+        if wordRe is not None and not wordRe.fullmatch(letters): continue
+        newStart = start - removed
+        for i in range(1, len(letters)):
+            offsetMap.addShift(newStart + i, removed + i)
+        pieces.append(text[prevEnd:start])
+        pieces.append(letters)
+        removed += len(letters) - 1
+        prevEnd = m.end()
+
+    if not pieces: return text, offsetMap
+    pieces.append(text[prevEnd:])
+    return ''.join(pieces), offsetMap
+#---------------------------------
+
+class OffsetMap (object):
+    """
+    IS a map from offsets in a text that had chars removed from it (e.g., by
+        squeezeLetterSpacing()) back to offsets in the original text.
+    HAS: the offsets in the new text where the number of chars removed before
+        them changes, and those numbers
+    DOES: getOrigOffset(), getOrigSpan(), getOrigMatchRcd()
+    """
+    def __init__(self):
+        self.offsets = [0]      # sorted offsets in the new text
+        self.shifts  = [0]      # n chars removed before each offset
+
+    def addShift(self, offset, shift):
+        """ Add: from offset on (until the next shift), shift chars were
+            removed before offsets in the new text. Add them in order.
+        """
+        self.offsets.append(offset)
+        self.shifts.append(shift)
+
+    def getOrigOffset(self, offset):
+        return offset + self.shifts[bisect.bisect_right(self.offsets, offset)-1]
+
+    def getOrigSpan(self, start, end):
+        """ Return (start, end) in the original text of new text[start:end]
+        """
+        if end <= start:
+            start = self.getOrigOffset(start)
+            return (start, start)
+        return (self.getOrigOffset(start), self.getOrigOffset(end-1) + 1)
+
+    def isIdentity(self): return len(self.offsets) == 1
+
+    def getOrigMatchRcd(self, m, origText):
+        """ Return MatchRcd m (of the new text) w/ its start/end and text
+            from origText (a copy), or m if no chars were removed from m's
+            text or context.
+        """
+        preStart = m.start - len(m.preText)
+        postEnd  = m.end + len(m.postText)
+        origPreStart, origPostEnd = self.getOrigSpan(preStart, postEnd)
+        if origPostEnd - origPreStart == postEnd - preStart: return m
+
+        origM = copy.copy(m)
+        origM.start, origM.end = self.getOrigSpan(m.start, m.end)
+        origM.matchText = origText[origM.start:origM.end]
+        origM.preText   = origText[origPreStart:origM.start]
+        origM.postText  = origText[origM.end:origPostEnd]
+        return origM
+#---------------------------------
+
 class TextTransformer (object):
     """
     IS: an object that efficiently does a bunch of text transformations based
@@ -320,6 +422,19 @@ class TextTransformer (object):
         transformed += text[endOfLastMatch:]
         return transformed
 
+    def findSpanMatches(self, text, spans):
+        """ Record the matches of the mappings in the (start, end) spans of
+            text, like transformText() on each text[start:end] but w/o
+            copying the spans or building the transformed text.
+            MatchRcd start/end are offsets in text, and their context stays
+            within the span.
+        """
+        for spanStart, spanEnd in spans:
+            for m in self.bigRe.finditer(text, spanStart, spanEnd):
+                name, start, end = findMatchingGroup(m)
+                self.mappingDict[name].foundMatch(text, start, end,
+                                                        spanStart, spanEnd)
+
     def getMatches(self):
         """ Return list of MatchRcds for matches found so far by this 
             TextTransformer.
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Vocab change impact: find the refs of a doRouting2 run that a
+            vocab change (terms added to or removed from skipJournals,
+            cat1Exclude, ageExclude, cat2Terms, cat2Exclude) can affect,
+            re-route just those refs w/ the new vocabs, and patch the run's
+            output files (Routings, match files, Features.npz,
+            TermMatrix.npz, Details) in place.
+
+           A term can only change the routing of a ref whose text it can
+            match. Added and removed terms are the same in this respect.
+           Affected refs: for each term, the refs whose text contains every
+            whitespace separated piece of the term (for ageExclude terms:
+            matches the regex of every piece, see GXD2aryRouter
+            TextMappingFromAgeExcludeTerms). This is a superset of the refs
+            where the term can match: cat2 and age exclude terms are
+            searched in figure text, which is made of the words of the full
+            text, and a multi word term may match across figure text
+            paragraphs or line breaks.
+            ageExclude changes only affect refs w/ age matches.
+            skipJournals changes affect the refs of those journals.
+           The candidate refs for a term come from a trigram index of the
+            full text of the run's sample file (see trigramIndex.py,
+            doTrigramIndex.py build), and are then checked against the
+            text. The texts of the affected refs also come from the index, so
+            the sample file is not read at all.
+
+           Reordered vocab terms are not changes (order only matters for
+            overlapping terms).
+           The run's time budget (if any) is not applied when re-routing.
+
+  To Use:
+    changes = vocabImpact.getVocabChanges(oldVocabs, newVocabs)
+    router = newVocabs.buildRouter(
+                        **routerVocabs.readRouterOptions('Try1/vocabs/'))
+    fm = routingFeatures.FeatureMatrix.load('Try1/Features.npz')
+    index = trigramIndex.TrigramIndex.load('testSet.tri')
+    affected = vocabImpact.findAffectedRefs(changes, fm, index, router)
+    routings = routingFiles.RoutingsFile.read('Try1/Routings.txt')
+    results = vocabImpact.rerouteRefs(affected, fm, routings, index, router)
+    vocabImpact.patchRun('Try1/', routings, fm, results, router)
+
+  To Run Automated Unit Tests:  python test_vocabImpact.py [-v]
+'''
+import re
+import time
+import numpy as np
+import trigramIndex
+import termMatrix
+import routingFiles
+import routingFeatures
+from routingFeatures import FEATURE_NAMES, ROUTINGS_COLUMNS
+#-----------------------------------
+
+# vocabs (routerVocabs.RouterVocabs attributes) that are read from files
+CATEGORIES = ['skipJournals', 'cat1Exclude', 'ageExclude', 'cat2Terms',
+                                                                'cat2Exclude']
+LOWER_CASED = ['cat1Exclude', 'cat2Terms', 'cat2Exclude'] # by GXDrouter
+
+#-----------------------------------
+
+def getVocabChanges(oldVocabs, newVocabs):
+    """ Return [(category, term, 'added' or 'removed')]: the terms in one
+        version of the vocabs (routerVocabs.RouterVocabs) and not the other
+    """
+    changes = []
+    for category in CATEGORIES:
+        def norm(terms):
+            if category in LOWER_CASED: terms = [t.lower() for t in terms]
+            return list(dict.fromkeys(terms))       # unique, in vocab order
+        old = norm(getattr(oldVocabs, category))
+        new = norm(getattr(newVocabs, category))
+        changes += [(category, t, 'removed') for t in old if t not in new]
+        changes += [(category, t, 'added')   for t in new if t not in old]
+    return changes
+#-----------------------------------
+
+def getTermPatterns(category, term, router):
+    """ Return [compiled regexes]: the text of a ref must match all of them
+        for term to match in it
+    """
+    pieces = [p for p in term.split(' ') if p != '']
+    if category == 'ageExclude':
+        regexes = [router.ageExcludeTextMapping._str2regex(p) for p in pieces]
+    else:
+        regexes = [re.escape(p) for p in pieces]
+    return [re.compile(r, re.IGNORECASE) for r in regexes]
+
+def getTermQuery(patterns):
+    """ Return the trigram query for docs that may match all the patterns
+    """
+    return trigramIndex.andQuery([trigramIndex.regexToQuery(p.pattern)
+                                                        for p in patterns])
+#-----------------------------------
+
+def getDocNums(fm, index):
+    """ Return {ID: index doc number} for the refs in FeatureMatrix fm
+    """
+    docNums = {ID: i for i, ID in enumerate(index.IDs)}
+    missing = [ID for ID in fm.IDs if ID not in docNums]
+    if missing:
+        raise ValueError("%d refs of the run are not in the index, e.g., %s" \
+                                                    % (len(missing), missing[0]))
+    if index.info.get('figText'):
+        raise ValueError("the index is of figure text, need the full text")
+    return {ID: docNums[ID] for ID in fm.IDs}
+
+def findAffectedRefs(changes, fm, index, router):
+    """ Return {ID: [changes that may affect it]} in fm order
+        changes: from getVocabChanges()
+        fm:      FeatureMatrix of the run
+        index:   TrigramIndex of the full text of (at least) the run's refs
+        router:  GXDrouter w/ the new vocabs (for the ageExclude regexes)
+    """
+    fm._finish()
+    docNums = getDocNums(fm, index)
+    runDocs = np.array(sorted(docNums.values()), dtype=np.int64)
+    # timed out refs may not have gotten to the age step
+    hasAge = (fm.getColumn('ageMatches') + fm.getColumn('ageExcludes') > 0) \
+                                                                | fm.timedOut
+    hasAge = {ID for ID, h in zip(fm.IDs, hasAge) if h}
+
+    affected = {}
+    for change in changes:
+        category, term, action = change
+        if category == 'skipJournals':
+            IDs = [ID for ID, j in zip(fm.IDs, fm.journals) if j == term]
+        else:
+            patterns = getTermPatterns(category, term, router)
+            candidates = index.getCandidates(getTermQuery(patterns))
+            if candidates is None: candidates = runDocs
+            else: candidates = np.intersect1d(candidates, runDocs)
+            IDs = []
+            for doc in candidates:
+                ID = index.IDs[doc]
+                if category == 'ageExclude' and ID not in hasAge: continue
+                text = index.getDocText(doc)
+                if all([p.search(text) for p in patterns]): IDs.append(ID)
+        for ID in IDs:
+            affected.setdefault(ID, []).append(change)
+    return {ID: affected[ID] for ID in fm.IDs if ID in affected}
+#-----------------------------------
+
+class RefRouting (object):
+    """
+    Is a: the routing of one ref by the new vocabs
+    Has : routing, predType, features {feature name: value},
+          termCounts {(category, term): n}, matches {match file key: text}
+    """
+    def __init__(self, routing, predType, features, termCounts, matches):
+        self.routing = routing
+        self.predType = predType
+        self.features = features
+        self.termCounts = termCounts
+        self.matches = matches
+# end class RefRouting -----------------------------------
+
+def rerouteRefs(IDs, fm, routings, index, router):
+    """ Return {ID: RefRouting} for the refs in IDs
+        routings: routingFiles.RoutingsFile of the run (for the confidence)
+        router: w/ the new vocabs and the run's router options
+            (routerVocabs.readRouterOptions()), else the re-routed refs
+            aren't routed the way the rest of the run was
+    """
+    fm._finish()
+    docNums = getDocNums(fm, index)
+    row = {ID: i for i, ID in enumerate(fm.IDs)}
+    tm = termMatrix.TermMatrix.fromRouter(router)   # to attribute matches
+    results = {}
+    for ID in IDs:
+        i = row[ID]
+        text = index.getDocText(docNums[ID])
+        routing = router.routeThisRef(text, fm.journals[i])
+        predType = routingFeatures.getPredType(fm.isPositive[i],
+                                                            routing == 'Yes')
+        features = routingFeatures.getRouterFeatures(router, len(text))
+        conf = routings.getValue(ID, 'confidence')
+        matches = {}
+        for cat, matchRcds in [
+                ('Cat1', router.getCat1Matches() + router.getCat1Excludes()),
+                ('Age',  router.getAgeMatches()  + router.getAgeExcludes()),
+                ('Cat2', router.getCat2Matches() + router.getCat2Excludes())]:
+            key = routingFiles.getMatchFileKey(cat, predType, ID)
+            matches[key] = routingFiles.formatMatches(ID, routing, predType,
+                                features['goodJournal'],
+                                features['cat1Matches'],
+                                features['ageMatches'],
+                                features['cat2Matches'], matchRcds, conf)
+        results[ID] = RefRouting(routing, predType, features,
+                                        tm.getRouterCounts(router), matches)
+    return results
+#-----------------------------------
+
+def patchRun(baseName, routings, fm, results, router, timeString=None):
+    """ Patch the doRouting2 output files of baseName w/ the new routings
+        of the refs in results {ID: RefRouting}.
+        routings, fm: RoutingsFile and FeatureMatrix of the run, updated
+        Writes Routings, match files, Features.npz, TermMatrix.npz, Details.
+        (the Summary is up to the caller)
+    """
+    if timeString is None: timeString = time.ctime()
+    fm._finish()
+    row = {ID: i for i, ID in enumerate(fm.IDs)}
+    matches = {}                    # {match file key: text}
+    for ID, r in results.items():
+        values = {'routing': r.routing, 'predType': r.predType}
+        for f, colName in zip(FEATURE_NAMES, ROUTINGS_COLUMNS):
+            values[colName] = str(r.features[f])
+        routings.setValues(ID, values)
+
+        fm.features[row[ID]] = [int(r.features[f]) for f in FEATURE_NAMES]
+        fm.timedOut[row[ID]] = False
+
+        for key, text in r.matches.items():
+            matches[key] = matches.get(key, '') + text
+
+    routings.timeStamp = timeString
+    routings.write(baseName + 'Routings.txt')
+    routingFiles.patchMatchFiles(baseName, results.keys(), matches)
+    fm.save(baseName + 'Features.npz')
+
+    # new columns for the new vocabs: rebuild the term matrix
+    oldTm = termMatrix.TermMatrix.load(baseName + 'TermMatrix.npz')
+    tm = termMatrix.TermMatrix.fromRouter(router)
+    for i, ID in enumerate(oldTm.IDs):
+        if ID in results: tm.addRef(ID, results[ID].termCounts)
+        else: tm.addRef(ID, oldTm.getRefCounts(i))
+    tm.save(baseName + 'TermMatrix.npz')
+
+    with open(baseName + 'Details.txt', 'w') as fp:
+        fp.write(timeString + '\n')
+        fp.write(router.getExplanation())
+#-----------------------------------
+
+def getImpactReport(changes, affected, oldRoutings, results):
+    """ Return text: for each change, the num of refs it may affect and the
+        num whose routing changed; then each ref whose routing changed
+        oldRoutings: {ID: old routing} of the affected refs
+    """
+    changed = {ID for ID, r in results.items()
+                                        if r.routing != oldRoutings[ID]}
+    report = "Vocab changes: %d, refs re-routed: %d, routings changed: %d\n" \
+                                % (len(changes), len(results), len(changed))
+    report += '\t'.join(['change', 'category', 'term', 'refs',
+                                                    'routings changed']) + '\n'
+    for change in changes:
+        IDs = [ID for ID, c in affected.items() if change in c]
+        report += '\t'.join([change[2], change[0], "'%s'" % change[1],
+                    str(len(IDs)), str(len([ID for ID in IDs
+                                                if ID in changed]))]) + '\n'
+    if changed:
+        report += '\t'.join(['ID', 'old routing', 'new routing',
+                                                        'predType']) + '\n'
+        for ID in affected:
+            if ID in changed:
+                report += '\t'.join([ID, oldRoutings[ID],
+                            results[ID].routing, results[ID].predType]) + '\n'
+    return report
+#-----------------------------------
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+'''
+  Purpose: Search for vocab subsets (cat2Terms, cat2Exclude, ageExclude by
+            default) that maximize routing Precision while keeping Recall at
+            or above a floor, e.g., 95%.
+
+           Candidate vocabs are evaluated from the cached match data of one
+            doRouting2 run (Features.npz + TermMatrix.npz, see
+            routingFeatures.py and termMatrix.py), not by re-routing:
+            a move removes one term from its vocab, and the routing counts
+            of every possible move from a vocab are computed at once,
+            vectorized over the refs that match the terms (see
+            termMatrix.getDeltaCounts()).
+           Removing a vocab term drops its matches (and any matches a
+            removed exclude term had unmasked for it). Removing an exclude
+            term unmasks its matches: an age exclude gives back the age
+            matches it excluded, a cat2 exclude becomes a match for each
+            (still present) cat2 term it contains.
+           These are the same estimates as termMatrix (interactions between
+            overlapping terms are ignored), so confirm the proposed vocab w/
+            doRouting2.
+
+           Search: beam search. Each step expands every vocab in the beam by
+            every single term removal and keeps the best beamWidth results.
+            beamWidth=1 is greedy. It stops when no step improves the best
+            vocab found.
+           Score (higher is better): vocabs meeting the Recall floor beat
+            those that don't; then higher Precision (or, below the floor,
+            higher Recall); then higher Recall.
+
+  To Use:
+    opt = vocabOptimizer.VocabOptimizer(fm, tm, RoutingRule(), minRecall=95)
+    best = opt.search(beamWidth=3)
+    for state in best.getPath(): print(state.move, state.getMetrics())
+    print(vocabOptimizer.getVocabDiff(best.getRemovedTerms(),
+                                    {'cat2': 'cat2Terms.txt', ...}))
+
+  To Run Automated Unit Tests:  python test_vocabOptimizer.py [-v]
+'''
+import difflib
+import numpy as np
+import termMatrix
+import routingFeatures
+#-----------------------------------
+
+DEFAULT_CATEGORIES = ['cat2', 'cat2Exclude', 'ageExclude']
+
+#-----------------------------------
+
+class VocabState (object):
+    """
+    Is a: a candidate vocab: the original vocab w/ some terms removed
+    Has : removed (frozenset of TermMatrix columns), catCounts (per ref
+            match counts used by the routing rule), counts {subset: counts},
+            parent state and the move (column) that led here
+    Does: getMetrics(), getPath(), getRemovedTerms()
+    """
+    def __init__(self, optimizer, removed, catCounts, counts, parent=None,
+                                                                move=None):
+        self.optimizer = optimizer
+        self.removed = removed
+        self.catCounts = catCounts
+        self.counts = counts
+        self.parent = parent
+        self.move = move
+        self.score = optimizer.getScore(counts)
+
+    def getMetrics(self, subset=None):
+        """ Return (precision, recall, npv) for subset (default: the
+            optimizer's subset)
+        """
+        if subset is None: subset = self.optimizer.subset
+        return routingFeatures.computeMetrics(self.counts[subset])
+
+    def getPath(self):
+        """ Return [states] from the original vocab to this one
+        """
+        path = []
+        state = self
+        while state is not None:
+            path.append(state)
+            state = state.parent
+        return path[::-1]
+
+    def getRemovedTerms(self):
+        """ Return [(category, term)] removed, in the order removed
+        """
+        return [termMatrix.splitColumnName(
+                        self.optimizer.tm.columns[s.move])
+                        for s in self.getPath()[1:]]
+# end class VocabState -----------------------------------
+
+class VocabOptimizer (object):
+    """
+    Is a: beam search for the vocab w/ the best Precision at a Recall floor
+    Has : FeatureMatrix, TermMatrix, RoutingRule, the candidate columns
+    Does: search(), evaluateMoves(state), applyMove(state, column)
+    """
+    def __init__(self, fm, tm, rule,
+                categories=DEFAULT_CATEGORIES, # vocabs to remove terms from
+                minRecall=95.0,         # Recall floor (percent)
+                subset='Overall',       # 'Overall', 'Keeps' or 'Discards'
+                ):
+        tm._finish()
+        fm._finish()
+        if list(tm.IDs) != list(fm.IDs):
+            raise ValueError('term matrix and feature matrix refs differ')
+        self.fm = fm
+        self.tm = tm
+        self.rule = rule
+        self.minRecall = minRecall
+        self.subset = subset
+        self.colCats = termMatrix.getColumnCategories(tm)
+
+        # the entries of each column (CSC view of the CSR matrix)
+        rows = tm.getRows()
+        order = np.argsort(tm.indices, kind='stable')
+        colStarts = np.zeros(tm.getNumColumns() + 1, dtype=np.int64)
+        colStarts[1:] = np.cumsum(np.bincount(tm.indices,
+                                            minlength=tm.getNumColumns()))
+        self.colRows = [rows[order[colStarts[c]:colStarts[c+1]]]
+                                    for c in range(tm.getNumColumns())]
+        self.colData = [tm.data[order[colStarts[c]:colStarts[c+1]]]
+                                    for c in range(tm.getNumColumns())]
+
+        # which vocab terms each cat1/cat2 exclude term contains
+        self.contains = {}          # {exclude col: [vocab cols]}
+        self.containedIn = {}       # {vocab col: [exclude cols]}
+        for x, name in enumerate(tm.columns):
+            category, term = termMatrix.splitColumnName(name)
+            if category not in ('cat1Exclude', 'cat2Exclude'): continue
+            vocabCategory = category[:-len('Exclude')]
+            for t, name2 in enumerate(tm.columns):
+                cat2, term2 = termMatrix.splitColumnName(name2)
+                if cat2 == vocabCategory and term2 in term:
+                    self.contains.setdefault(x, []).append(t)
+                    self.containedIn.setdefault(t, []).append(x)
+
+        # candidates: columns in the categories that match some ref
+        self.candidates = [c for c, name in enumerate(tm.columns)
+                    if termMatrix.splitColumnName(name)[0] in categories
+                    and len(self.colRows[c]) > 0]
+
+    def getScore(self, counts):
+        """ Return a sortable score for {subset: counts}, higher is better
+        """
+        p, r, npv = routingFeatures.computeMetrics(counts[self.subset])
+        feasible = r >= self.minRecall
+        return (feasible, p if feasible else r, r)
+
+    def getInitialState(self):
+        catCounts = termMatrix.getCategoryCounts(self.fm)
+        return VocabState(self, frozenset(), catCounts,
+                                                self._getCounts(catCounts))
+
+    def _getCounts(self, catCounts):
+        routedYes = termMatrix.routeCounts(self.fm, self.rule, catCounts)
+        fm = self.fm
+        return {'Overall' : routingFeatures.getCounts(routedYes,
+                                                            fm.isPositive),
+                'Keeps'   : routingFeatures.getCounts(routedYes,
+                                                fm.isPositive, fm.isKeep),
+                'Discards': routingFeatures.getCounts(routedYes,
+                                                fm.isPositive, ~fm.isKeep),
+                }
+
+    def _getMoveEntries(self, state, col):
+        """ Return (rows, deltas): the change to the category counts of the
+            refs if column col is removed from state's vocab
+        """
+        category = termMatrix.splitColumnName(self.tm.columns[col])[0]
+        if category in termMatrix.POS_CATEGORIES:
+            # lose its matches, and those removed excludes unmasked for it
+            rows = [self.colRows[col]]
+            deltas = [-self.colData[col]]
+            for x in self.containedIn.get(col, []):
+                if x in state.removed:
+                    rows.append(self.colRows[x])
+                    deltas.append(-self.colData[x])
+            return np.concatenate(rows), np.concatenate(deltas)
+        if category == 'ageExclude':
+            return self.colRows[col], self.colData[col]
+        # cat1/cat2 exclude: a match for each vocab term it contains
+        gain = len([t for t in self.contains.get(col, [])
+                                                if t not in state.removed])
+        return self.colRows[col], gain * self.colData[col]
+
+    def evaluateMoves(self, state):
+        """ Return ([candidate columns], {subset: {predType: array}}):
+            the routing counts after removing each candidate from state
+        """
+        moves = [c for c in self.candidates if c not in state.removed]
+        rows, changes, cats, deltas = [], [], [], []
+        for i, col in enumerate(moves):
+            r, d = self._getMoveEntries(state, col)
+            rows.append(r)
+            deltas.append(d)
+            changes.append(np.full(len(r), i, dtype=np.int64))
+            cats.append(np.full(len(r), self.colCats[col], dtype=np.int64))
+        if not moves: return moves, None
+        counts = termMatrix.getDeltaCounts(self.fm, self.rule,
+                    state.catCounts, np.concatenate(rows),
+                    np.concatenate(changes), np.concatenate(cats),
+                    np.concatenate(deltas), len(moves))
+        return moves, counts
+
+    def applyMove(self, state, col):
+        """ Return the VocabState w/ column col removed from state
+        """
+        rows, deltas = self._getMoveEntries(state, col)
+        catCounts = state.catCounts.copy()
+        np.add.at(catCounts, (rows, self.colCats[col]), deltas)
+        return VocabState(self, state.removed | {col}, catCounts,
+                            self._getCounts(catCounts), parent=state, move=col)
+
+    def search(self, beamWidth=1, maxSteps=None, progress=None):
+        """ Return the best VocabState found.
+            progress(step, best state) is called after each step
+        """
+        best = self.getInitialState()
+        beam = [best]
+        seen = {best.removed}
+        step = 0
+        while maxSteps is None or step < maxSteps:
+            step += 1
+            children = []           # [(score, state, move)]
+            for state in beam:
+                moves, counts = self.evaluateMoves(state)
+                for i, col in enumerate(moves):
+                    removed = state.removed | {col}
+                    if removed in seen: continue
+                    seen.add(removed)
+                    moveCounts = {subset: {t: int(c[t][i]) for t in c}
+                                            for subset, c in counts.items()}
+                    children.append((self.getScore(moveCounts), -col,
+                                                                state, col))
+            if not children: break
+            children.sort(key=lambda c: c[:2], reverse=True)
+            beam = [self.applyMove(state, col)
+                            for score, negCol, state, col in
+                                                    children[:beamWidth]]
+            if progress: progress(step, beam[0])
+            if beam[0].score <= best.score: break
+            best = beam[0]
+        return best
+# end class VocabOptimizer -----------------------------------
+
+def _normalizeTerm(category, line):
+    """ Return the term of a vocab file line as it is named in TermMatrix
+        columns, or None for comments and blank lines.
+        (ageExclude lines are not stripped, spaces may be important)
+    """
+    if line.startswith('#') or line.strip() == '': return None
+    if category == 'ageExclude': return line.rstrip('\n')
+    return line.strip().lower()
+
+def getVocabDiff(removedTerms, vocabFiles):
+    """ Return a unified diff removing the terms from the vocab files.
+        removedTerms: [(category, term)]
+        vocabFiles:   {category: vocab file name}
+    """
+    diff = ''
+    for category, fileName in vocabFiles.items():
+        remove = set([t for c, t in removedTerms if c == category])
+        if not remove: continue
+        with open(fileName, 'r') as fp:
+            lines = fp.readlines()
+        newLines = [line for line in lines
+                        if _normalizeTerm(category, line) not in remove]
+        diff += ''.join(difflib.unified_diff(lines, newLines,
+                            fromfile=fileName, tofile=fileName + '.proposed'))
+    return diff
+#-----------------------------------